@@ -0,0 +1,388 @@
+# core/archive.py
+"""
+Arquivamento de vendas antigas (partições por ano ou por mês).
+
+Depois de alguns anos Vendas, ItensVenda e PagamentosVenda ficam enormes e todo
+fechamento de caixa e relatório mexe no mesmo arquivo. Aqui os períodos FECHADOS saem
+do pdv.db para bancos de arquivo separados, um por período:
+
+    arquivo/vendas-2023.db       (granularidade 'ano')
+    arquivo/vendas-2024-05.db    (granularidade 'mes')
+
+A tabela ParticoesVendas (no pdv.db) registra cada partição e o intervalo de datas.
+Os relatórios pedem as fontes de um intervalo (report_sources) e recebem, para cada
+tabela, um SELECT ... UNION ALL só com as partições que o intervalo toca; o banco
+ao vivo fica pequeno e quente.
+
+A mudança é feita em lotes curtos (cópia + exclusão na mesma transação), para não
+segurar o lock de escrita do caixa por muito tempo.
+
+Configuração: PDV_ARQUIVO_DIR (padrão: pasta 'arquivo' ao lado do pdv.db)
+Linha de comando:
+    python -m core.archive --listar
+    python -m core.archive --periodo 2023
+    python -m core.archive --anteriores-a 2025-01 [--granularidade mes]
+    python -m core.archive --atualizar            (colunas novas do pdv.db nas partições)
+    python -m core.archive --compactar            (VACUUM, com o PDV fechado)
+
+Os relatórios só leem as partições: colunas criadas no pdv.db depois do arquivamento
+aparecem como NULL até a partição ser atualizada (archive_period ou --atualizar).
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import date, datetime
+
+from core.database import connect_db, database_path
+
+ENV_ARCHIVE_DIR = 'PDV_ARQUIVO_DIR'
+
+GRANULARIDADE_ANO = 'ano'
+GRANULARIDADE_MES = 'mes'
+
+# Tabelas arquivadas (a venda primeiro; na exclusão, a ordem inversa)
+ARCHIVED_TABLES = ('Vendas', 'ItensVenda', 'PagamentosVenda')
+# Vendas movidas por transação
+ARCHIVE_BATCH = 2000
+# O SQLite aceita até 10 bancos anexados por conexão
+MAX_ATTACHED_PARTITIONS = 9
+
+
+class ArchiveError(Exception):
+    """Arquivamento recusado ou intervalo de relatório que não pode ser montado."""
+
+
+def archive_dir(conn=None) -> str:
+    return os.environ.get(ENV_ARCHIVE_DIR) or os.path.join(os.path.dirname(database_path(conn)), 'arquivo')
+
+
+def ensure_archive_tables(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ParticoesVendas (
+            nome TEXT PRIMARY KEY,        -- '2023' ou '2023-05'
+            arquivo TEXT NOT NULL,        -- nome do arquivo dentro da pasta de arquivo
+            inicio TEXT NOT NULL,         -- primeira data do período (inclusive)
+            fim TEXT NOT NULL,            -- primeira data DEPOIS do período (exclusive)
+            vendas INTEGER NOT NULL DEFAULT 0,
+            arquivado_em TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def period_bounds(periodo: str) -> tuple:
+    """'2023' ou '2023-05' -> (nome, inicio, fim), com fim exclusivo ('YYYY-MM-DD')."""
+    try:
+        if len(periodo) == 4:
+            ano = int(periodo)
+            return periodo, date(ano, 1, 1).isoformat(), date(ano + 1, 1, 1).isoformat()
+        ano, mes = (int(parte) for parte in periodo.split('-'))
+        proximo = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+        return f"{ano:04d}-{mes:02d}", date(ano, mes, 1).isoformat(), proximo.isoformat()
+    except ValueError as e:
+        raise ArchiveError(f"período inválido '{periodo}' (use AAAA ou AAAA-MM)") from e
+
+
+def _table_columns(conn, tabela: str, schema: str = 'main') -> list:
+    """[(nome, tipo, pk)] de uma tabela."""
+    return [(row[1], row[2], row[5]) for row in conn.execute(f"PRAGMA {schema}.table_info({tabela})")]
+
+
+def _sync_archive_schema(conn, schema: str):
+    """
+    Cria/atualiza as tabelas no banco de arquivo anexado como 'schema', com as colunas
+    atuais do pdv.db (sem chaves estrangeiras: Produtos/Caixa não vão para o arquivo).
+    """
+    for tabela in ARCHIVED_TABLES:
+        live = _table_columns(conn, tabela)
+        existentes = {nome for nome, _, _ in _table_columns(conn, tabela, schema)}
+        if not existentes:
+            colunas = ", ".join(
+                f"{nome} {tipo} PRIMARY KEY" if pk else f"{nome} {tipo}" for nome, tipo, pk in live
+            )
+            conn.execute(f"CREATE TABLE {schema}.{tabela} ({colunas})")
+        else:
+            # Coluna nova no pdv.db depois do último arquivamento
+            for nome, tipo, _ in live:
+                if nome not in existentes:
+                    conn.execute(f"ALTER TABLE {schema}.{tabela} ADD COLUMN {nome} {tipo}")
+
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_arq_vendas_data ON Vendas(data_hora)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_arq_itens_venda ON ItensVenda(venda_id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_arq_pagamentos_venda ON PagamentosVenda(venda_id)")
+
+
+def _upgrade_partition(conn, caminho: str):
+    """
+    Acrescenta no banco de arquivo as colunas criadas no pdv.db depois que ele foi gerado.
+    Grava no arquivo: só para o arquivamento/linha de comando, nunca para relatórios.
+    """
+    arquivo = sqlite3.connect(caminho)
+    try:
+        for tabela in ARCHIVED_TABLES:
+            existentes = {nome for nome, _, _ in _table_columns(arquivo, tabela)}
+            for nome, tipo, _ in _table_columns(conn, tabela):
+                if nome not in existentes:
+                    arquivo.execute(f"ALTER TABLE {tabela} ADD COLUMN {nome} {tipo}")
+        arquivo.commit()
+    finally:
+        arquivo.close()
+
+
+def _partition_columns(caminho: str) -> dict:
+    """{tabela: {colunas}} do banco de arquivo, aberto só para leitura."""
+    arquivo = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+    try:
+        return {tabela: {nome for nome, _, _ in _table_columns(arquivo, tabela)} for tabela in ARCHIVED_TABLES}
+    finally:
+        arquivo.close()
+
+
+def upgrade_partitions(conn) -> int:
+    """Atualiza o esquema de todas as partições registradas. Retorna quantas foram abertas."""
+    pasta = archive_dir(conn)
+    total = 0
+    for nome, arquivo, *_ in list_partitions(conn):
+        caminho = os.path.join(pasta, arquivo)
+        if not os.path.exists(caminho):
+            raise ArchiveError(f"arquivo da partição {nome} não encontrado: {caminho}")
+        try:
+            _upgrade_partition(conn, caminho)
+        except sqlite3.Error as e:
+            raise ArchiveError(f"não foi possível atualizar a partição {nome}: {e}") from e
+        total += 1
+    if total:
+        print(f"LOG: Esquema de {total} partição(ões) atualizado.")
+    return total
+
+
+def _partition_alias(nome: str) -> str:
+    return "arq_" + nome.replace('-', '_')
+
+
+# ----------------------------------------------------
+# --- ARQUIVAMENTO ---
+# ----------------------------------------------------
+
+def _check_closed(conn, nome: str, inicio: str, fim: str):
+    hoje = date.today().isoformat()
+    if fim > hoje:
+        raise ArchiveError(f"o período {nome} ainda não terminou")
+    cursor = conn.execute("""
+        SELECT COUNT(*) FROM Vendas AS V
+        JOIN Caixa AS C ON C.id = V.id_caixa
+        WHERE C.status = 'Aberto' AND V.data_hora >= ? AND V.data_hora < ?
+    """, (inicio, fim))
+    if cursor.fetchone()[0]:
+        raise ArchiveError(f"o período {nome} tem vendas de um caixa ainda aberto")
+
+
+def archive_period(conn, periodo: str, batch: int = ARCHIVE_BATCH) -> int:
+    """
+    Move as vendas do período (com itens e pagamentos) para o banco de arquivo dele.
+    Cada lote é copiado e apagado na mesma transação (os dois arquivos são gravados de
+    forma atômica pelo SQLite). Retorna quantas vendas foram arquivadas.
+    """
+    nome, inicio, fim = period_bounds(periodo)
+    ensure_archive_tables(conn)
+    _check_closed(conn, nome, inicio, fim)
+
+    pasta = archive_dir(conn)
+    os.makedirs(pasta, exist_ok=True)
+    arquivo = f"vendas-{nome}.db"
+    alias = _partition_alias(nome)
+
+    conn.execute("ATTACH DATABASE ? AS " + alias, (os.path.join(pasta, arquivo),))
+    total = 0
+    try:
+        _sync_archive_schema(conn, alias)
+        conn.commit()
+        colunas = {tabela: ", ".join(nome_col for nome_col, _, _ in _table_columns(conn, tabela))
+                   for tabela in ARCHIVED_TABLES}
+
+        while True:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT venda_id FROM Vendas WHERE data_hora >= ? AND data_hora < ?
+                ORDER BY venda_id LIMIT ?
+            """, (inicio, fim, batch))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            filtro = "venda_id IN (SELECT venda_id FROM temp.arquivando)"
+
+            try:
+                cursor.execute("CREATE TEMP TABLE IF NOT EXISTS arquivando (venda_id INTEGER PRIMARY KEY)")
+                cursor.execute("DELETE FROM temp.arquivando")
+                cursor.executemany("INSERT INTO temp.arquivando VALUES (?)", [(i,) for i in ids])
+                for tabela in ARCHIVED_TABLES:
+                    cursor.execute(
+                        f"INSERT OR REPLACE INTO {alias}.{tabela} ({colunas[tabela]}) "
+                        f"SELECT {colunas[tabela]} FROM main.{tabela} WHERE {filtro}"
+                    )
+                # Filhas antes da venda (ItensVenda tem FK sem cascade)
+                for tabela in reversed(ARCHIVED_TABLES):
+                    cursor.execute(f"DELETE FROM main.{tabela} WHERE {filtro}")
+                cursor.execute("""
+                    INSERT INTO ParticoesVendas (nome, arquivo, inicio, fim, vendas, arquivado_em)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(nome) DO UPDATE SET vendas = vendas + excluded.vendas,
+                                                   arquivado_em = excluded.arquivado_em
+                """, (nome, arquivo, inicio, fim, len(ids), datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise ArchiveError(f"falha ao arquivar {nome}: {e}") from e
+            total += len(ids)
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.arquivando")
+        conn.execute("DETACH DATABASE " + alias)
+
+    if total:
+        print(f"LOG: {total} venda(s) de {nome} arquivada(s) em {arquivo}.")
+    return total
+
+
+def archive_closed_periods(conn, antes_de: str, granularidade: str = GRANULARIDADE_ANO) -> int:
+    """
+    Arquiva todos os períodos fechados com vendas antes de 'antes_de' (AAAA-MM, exclusive).
+    Na granularidade 'ano', 'antes_de' precisa ser janeiro (ano fechado inteiro).
+    """
+    _, limite, _ = period_bounds(antes_de)
+    if granularidade == GRANULARIDADE_ANO and not limite.endswith('-01-01'):
+        raise ArchiveError("na granularidade por ano, use um limite em janeiro (AAAA-01)")
+    formato = '%Y' if granularidade == GRANULARIDADE_ANO else '%Y-%m'
+
+    cursor = conn.execute(
+        f"SELECT DISTINCT strftime('{formato}', data_hora) FROM Vendas WHERE data_hora < ? ORDER BY 1",
+        (limite,)
+    )
+    total = 0
+    for (periodo,) in cursor.fetchall():
+        total += archive_period(conn, periodo)
+    return total
+
+
+def list_partitions(conn) -> list:
+    ensure_archive_tables(conn)
+    return conn.execute("SELECT nome, arquivo, inicio, fim, vendas, arquivado_em FROM ParticoesVendas ORDER BY inicio").fetchall()
+
+
+# ----------------------------------------------------
+# --- CONSULTA (RELATÓRIOS) ---
+# ----------------------------------------------------
+
+def partitions_for_range(conn, inicio: str, fim: str) -> list:
+    """
+    Partições que o intervalo [inicio, fim] toca (datas/horas como texto 'YYYY-MM-DD ...').
+    Retorna [(alias, caminho)]; levanta ArchiveError se passar do limite de anexos.
+    Não grava nada: os arquivos só são abertos para leitura (ver union_sources).
+    """
+    try:
+        rows = conn.execute("""
+            SELECT nome, arquivo FROM ParticoesVendas
+            WHERE inicio <= ? AND fim > ? ORDER BY inicio
+        """, (fim, inicio[:10])).fetchall()
+    except sqlite3.OperationalError:
+        return []  # Nenhum arquivamento feito ainda
+
+    if len(rows) > MAX_ATTACHED_PARTITIONS:
+        raise ArchiveError(
+            f"o intervalo abrange {len(rows)} partições arquivadas (máximo {MAX_ATTACHED_PARTITIONS}); "
+            f"reduza o intervalo do relatório"
+        )
+    pasta = archive_dir(conn)
+    particoes = []
+    for nome, arquivo in rows:
+        caminho = os.path.join(pasta, arquivo)
+        if not os.path.exists(caminho):
+            raise ArchiveError(f"arquivo da partição {nome} não encontrado: {caminho}")
+        particoes.append((_partition_alias(nome), caminho))
+    return particoes
+
+
+def union_sources(conn, particoes: list) -> dict:
+    """
+    {tabela: fonte SQL} para usar no FROM: a própria tabela, ou um SELECT ... UNION ALL
+    com as partições anexadas [(alias, caminho)] (as colunas atuais do pdv.db, na mesma
+    ordem; coluna que a partição ainda não tem vem como NULL).
+    """
+    try:
+        existentes = {alias: _partition_columns(caminho) for alias, caminho in particoes}
+    except sqlite3.Error as e:
+        raise ArchiveError(f"não foi possível ler a partição: {e}") from e
+
+    fontes = {}
+    for tabela in ARCHIVED_TABLES:
+        if not particoes:
+            fontes[tabela] = tabela
+            continue
+        live = [nome for nome, _, _ in _table_columns(conn, tabela)]
+        partes = [f"SELECT {', '.join(live)} FROM main.{tabela}"]
+        for alias, _ in particoes:
+            colunas = ", ".join(nome if nome in existentes[alias][tabela] else f"NULL AS {nome}" for nome in live)
+            partes.append(f"SELECT {colunas} FROM {alias}.{tabela}")
+        fontes[tabela] = "(" + " UNION ALL ".join(partes) + ")"
+    return fontes
+
+
+def report_sources(conn, inicio: str, fim: str) -> tuple:
+    """
+    Prepara a conexão sqlite3 'conn' para um relatório de [inicio, fim]: anexa só as
+    partições necessárias (desanexando as que sobraram de consultas anteriores).
+    Retorna {tabela: fonte SQL} (ver union_sources).
+    """
+    particoes = partitions_for_range(conn, inicio, fim)
+    necessarias = dict(particoes)
+    anexadas = {row[1] for row in conn.execute("PRAGMA database_list")}
+
+    for alias in anexadas:
+        if alias.startswith('arq_') and alias not in necessarias:
+            conn.execute("DETACH DATABASE " + alias)
+    for alias, caminho in particoes:
+        if alias not in anexadas:
+            conn.execute("ATTACH DATABASE ? AS " + alias, (caminho,))
+    return union_sources(conn, particoes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arquivamento de vendas antigas do PDV.")
+    acao = parser.add_mutually_exclusive_group(required=True)
+    acao.add_argument('--listar', action='store_true', help="lista as partições arquivadas")
+    acao.add_argument('--periodo', metavar='AAAA[-MM]', help="arquiva um ano ou mês fechado")
+    acao.add_argument('--anteriores-a', metavar='AAAA-MM', help="arquiva tudo antes do mês informado")
+    acao.add_argument('--atualizar', action='store_true', help="leva as colunas novas do pdv.db às partições")
+    acao.add_argument('--compactar', action='store_true', help="VACUUM do pdv.db (com o PDV fechado)")
+    parser.add_argument('--granularidade', choices=(GRANULARIDADE_ANO, GRANULARIDADE_MES),
+                        default=GRANULARIDADE_ANO)
+    args = parser.parse_args(argv)
+
+    conn = connect_db()
+    if conn is None:
+        print("Erro: não foi possível abrir o banco.")
+        return 1
+    try:
+        if args.listar:
+            for nome, arquivo, inicio, fim, vendas, arquivado_em in list_partitions(conn):
+                print(f"{nome:8} {arquivo:24} {inicio} a {fim} (exclusive)  {vendas} venda(s)  em {arquivado_em}")
+        elif args.periodo:
+            archive_period(conn, args.periodo)
+        elif args.anteriores_a:
+            archive_closed_periods(conn, args.anteriores_a, args.granularidade)
+        elif args.atualizar:
+            upgrade_partitions(conn)
+        elif args.compactar:
+            conn.execute("VACUUM")
+            print("LOG: Banco compactado.")
+    except (ArchiveError, sqlite3.Error) as e:
+        print(f"Erro: {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
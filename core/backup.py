@@ -0,0 +1,460 @@
+# core/backup.py
+"""
+Backup "a quente" do pdv.db, sem parar o caixa.
+
+Copiar o arquivo com o PDV aberto pode gerar uma cópia corrompida (uma venda gravando
+no meio da cópia). Aqui a cópia usa a API de backup do SQLite em passos pequenos, numa
+thread própria e com conexão só de leitura: cada passo segura o lock de leitura por
+poucos milissegundos e a venda grava entre um passo e outro. A cópia começa depois
+de uma pausa nas gravações (wait_for_quiet); se o caixa gravar demais no meio dela, o
+backup é adiado (BackupBusy), nunca feito num passo só que travaria a venda.
+
+Cada backup:
+  1. copia o banco para um arquivo temporário na pasta de backups;
+  2. confere a cópia (PRAGMA integrity_check) — cópia com problema é descartada;
+  3. comprime (gzip) com escrita atômica (.tmp + rename) e apaga a cópia temporária;
+  4. mantém só os PDV_BACKUP_MANTER mais recentes.
+
+Configuração:  PDV_BACKUP_DIR=/mnt/backup/pdv  PDV_BACKUP_INTERVALO=60 (minutos)  PDV_BACKUP_MANTER=48
+
+Restaurar exige o PDV fechado: cada PDV aberto segura a trava compartilhada do banco
+(lock_database) e a restauração recusa enquanto houver alguma.
+
+Linha de comando:
+    python -m core.backup --pasta /mnt/backup/pdv --agora
+    python -m core.backup --pasta /mnt/backup/pdv --listar
+    python -m core.backup --verificar /mnt/backup/pdv/pdv-20250101-120000.db.gz
+    python -m core.backup --restaurar /mnt/backup/pdv/pdv-20250101-120000.db.gz [--banco pdv.db]
+"""
+
+import argparse
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl  # trava do banco (POSIX)
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from core.database import DB_NAME, connect_readonly, create_snapshot, database_path
+
+ENV_BACKUP_DIR = 'PDV_BACKUP_DIR'
+ENV_BACKUP_INTERVAL = 'PDV_BACKUP_INTERVALO'
+ENV_BACKUP_KEEP = 'PDV_BACKUP_MANTER'
+
+DEFAULT_INTERVAL_MIN = 60
+DEFAULT_KEEP = 48
+# Espera depois de abrir o PDV antes do primeiro backup (não disputa com a inicialização)
+STARTUP_DELAY = 120.0
+# Páginas por passo da cópia (4096 páginas de 4 KB = 16 MB por passo): cada passo
+# segura o lock de leitura só enquanto copia essas páginas
+BACKUP_PAGES_PER_STEP = 4096
+BACKUP_STEP_SLEEP = 0.005
+# Cada gravação no banco durante a cópia faz o SQLite recomeçar do zero (journal padrão).
+# Depois de tantos recomeços (caixa movimentado) o backup desiste e tenta de novo em
+# RETRY_DELAY. Nunca copia num passo só: no journal padrão isso seguraria o lock de
+# leitura durante a cópia inteira e a venda esperaria (até falhar com "database is locked").
+MAX_RESTARTS = 5
+RETRY_DELAY = 300.0
+# Antes de copiar, espera o banco ficar QUIET_PERIOD segundos sem gravação (no máximo
+# QUIET_MAX_WAIT; depois tenta assim mesmo), para a cópia cair num intervalo entre vendas
+QUIET_PERIOD = 10.0
+QUIET_MAX_WAIT = 120.0
+QUIET_POLL = 1.0
+
+BACKUP_PREFIX = 'pdv-'
+BACKUP_SUFFIX = '.db.gz'
+# Trava "PDV aberto" (ver lock_database)
+LOCK_SUFFIX = '.lock'
+LOCK_RANGE = 2 ** 30
+
+
+class BackupError(Exception):
+    """Backup ou restauração que não pôde ser concluído (o backup anterior continua válido)."""
+
+
+class BackupCancelled(BackupError):
+    """Backup interrompido porque o PDV está fechando."""
+
+
+class BackupBusy(BackupError):
+    """Banco alterado demais durante a cópia (caixa movimentado); tentar de novo mais tarde."""
+
+
+class _MuitosRecomecos(Exception):
+    """A cópia em passos recomeçou mais de MAX_RESTARTS vezes (sai do backup() do SQLite)."""
+
+
+def backup_settings_from_env():
+    """(pasta, intervalo_em_segundos, quantos_manter), ou None se o backup estiver desligado."""
+    backup_dir = os.environ.get(ENV_BACKUP_DIR)
+    if not backup_dir:
+        return None
+    try:
+        interval_min = float(os.environ.get(ENV_BACKUP_INTERVAL, DEFAULT_INTERVAL_MIN))
+        keep = int(os.environ.get(ENV_BACKUP_KEEP, DEFAULT_KEEP))
+    except ValueError:
+        print(f"Erro na configuração do backup ({ENV_BACKUP_INTERVAL}/{ENV_BACKUP_KEEP}); usando o padrão.")
+        interval_min, keep = DEFAULT_INTERVAL_MIN, DEFAULT_KEEP
+    return backup_dir, max(interval_min, 1.0) * 60, max(keep, 1)
+
+
+def integrity_check(db_path: str) -> str:
+    """Roda PRAGMA integrity_check no arquivo; retorna 'ok' ou a primeira mensagem de erro."""
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            return conn.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return str(e)
+
+
+def _compress(src_path: str, dest_path: str):
+    tmp_path = dest_path + '.tmp'
+    with open(src_path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=6) as dest:
+        shutil.copyfileobj(src, dest, 1024 * 1024)
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, dest_path)
+
+
+def _decompress(src_path: str, dest_path: str):
+    with gzip.open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+        shutil.copyfileobj(src, dest, 1024 * 1024)
+        dest.flush()
+        os.fsync(dest.fileno())
+
+
+def list_backups(backup_dir: str) -> list:
+    """Backups da pasta, do mais antigo para o mais recente (o nome carrega data e hora)."""
+    return sorted(glob.glob(os.path.join(backup_dir, f"{BACKUP_PREFIX}*{BACKUP_SUFFIX}")))
+
+
+def rotate_backups(backup_dir: str, keep: int = DEFAULT_KEEP) -> int:
+    """Apaga os backups mais antigos, mantendo os 'keep' mais recentes. Retorna quantos apagou."""
+    removed = 0
+    for path in list_backups(backup_dir)[:-keep]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError as e:
+            print(f"Erro ao apagar backup antigo {path}: {e}")
+    return removed
+
+
+def _assinatura(db_path: str):
+    """(mtime, tamanho) do banco e do journal: muda a cada gravação."""
+    partes = []
+    for caminho in (db_path, db_path + '-journal', db_path + '-wal'):
+        try:
+            st = os.stat(caminho)
+            partes.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            partes.append(None)
+    return tuple(partes)
+
+
+def wait_for_quiet(db_path: str, quiet: float = None, max_wait: float = None,
+                   stop_event: threading.Event = None) -> bool:
+    """
+    Espera o banco ficar 'quiet' segundos sem gravação, por no máximo 'max_wait'.
+    Retorna True se achou o intervalo (False se o tempo acabou ou o PDV está fechando).
+    """
+    quiet = QUIET_PERIOD if quiet is None else quiet
+    max_wait = QUIET_MAX_WAIT if max_wait is None else max_wait
+    limite = time.monotonic() + max_wait
+    assinatura = _assinatura(db_path)
+    parado_desde = time.monotonic()
+    while time.monotonic() - parado_desde < quiet:
+        if time.monotonic() >= limite:
+            return False
+        if stop_event is not None:
+            if stop_event.wait(QUIET_POLL):
+                return False
+        else:
+            time.sleep(QUIET_POLL)
+        atual = _assinatura(db_path)
+        if atual != assinatura:
+            assinatura = atual
+            parado_desde = time.monotonic()
+    return True
+
+
+def create_backup(backup_dir: str, source_path: str = None, keep: int = DEFAULT_KEEP,
+                  stop_event: threading.Event = None) -> str:
+    """
+    Faz um backup completo (cópia em passos + verificação + gzip + rodízio).
+    Retorna o caminho do .db.gz gerado; levanta BackupError se algo falhar
+    (BackupBusy se o caixa gravou demais durante a cópia).
+    """
+    source_path = source_path or database_path()
+    os.makedirs(backup_dir, exist_ok=True)
+    if not wait_for_quiet(source_path, stop_event=stop_event):
+        if stop_event is not None and stop_event.is_set():
+            raise BackupCancelled("backup interrompido (PDV fechando)")
+        print("LOG: Caixa sem pausa nas gravações; iniciando o backup assim mesmo (em passos).")
+    inicio = time.monotonic()
+    reinicios = [0]
+    ultimo = [None]
+
+    def progress(status, remaining, total):
+        if stop_event is not None and stop_event.is_set():
+            raise BackupCancelled("backup interrompido (PDV fechando)")
+        # Restantes não diminuíram: o banco mudou no meio e o SQLite recomeçou a cópia
+        if ultimo[0] is not None and remaining >= ultimo[0]:
+            reinicios[0] += 1
+            if reinicios[0] > MAX_RESTARTS:
+                raise _MuitosRecomecos()
+        ultimo[0] = remaining
+
+    # A cópia crua fica na própria pasta de backups (mesmo disco do .gz final)
+    fd, raw_path = tempfile.mkstemp(prefix='.copia-', suffix='.db', dir=backup_dir)
+    os.close(fd)
+    try:
+        source = connect_readonly(source_path)
+        if source is None:
+            raise BackupError(f"não foi possível abrir {source_path}")
+        # Em WAL a leitura não bloqueia a gravação: cópia de uma vez, num retrato consistente.
+        # No journal padrão, passos curtos (a venda só espera o passo em andamento).
+        wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal'
+        try:
+            create_snapshot(source, raw_path, pages=-1 if wal else BACKUP_PAGES_PER_STEP,
+                            progress=progress, sleep=BACKUP_STEP_SLEEP)
+        except _MuitosRecomecos:
+            raise BackupBusy(f"banco alterado {reinicios[0]} vezes durante a cópia (caixa movimentado)")
+        except sqlite3.Error as e:
+            raise BackupError(f"falha na cópia: {e}") from e
+        finally:
+            source.close()
+
+        resultado = integrity_check(raw_path)
+        if resultado != 'ok':
+            raise BackupError(f"cópia reprovada no integrity_check: {resultado}")
+
+        nome = f"{BACKUP_PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S')}{BACKUP_SUFFIX}"
+        final_path = os.path.join(backup_dir, nome)
+        try:
+            _compress(raw_path, final_path)
+        except OSError as e:
+            raise BackupError(f"falha ao gravar {final_path}: {e}") from e
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+    removidos = rotate_backups(backup_dir, keep)
+    print(f"LOG: Backup gravado em {final_path} ({time.monotonic() - inicio:.1f}s, "
+          f"{reinicios[0]} recomeço(s) da cópia, {removidos} backup(s) antigo(s) apagado(s)).")
+    return final_path
+
+
+def verify_backup(backup_path: str) -> str:
+    """Descompacta o backup num temporário e roda integrity_check. Retorna 'ok' ou o erro."""
+    fd, tmp_path = tempfile.mkstemp(prefix='.verifica-', suffix='.db', dir=os.path.dirname(os.path.abspath(backup_path)))
+    os.close(fd)
+    try:
+        _decompress(backup_path, tmp_path)
+        return integrity_check(tmp_path)
+    except (OSError, EOFError) as e:
+        return f"arquivo de backup ilegível: {e}"
+    finally:
+        os.remove(tmp_path)
+
+
+# ----------------------------------------------------
+# --- TRAVA DO BANCO (PDV ABERTO) ---
+# ----------------------------------------------------
+
+def _travar(arquivo, exclusiva: bool):
+    """Trava sem esperar (OSError se não estiver livre)."""
+    if fcntl is not None:
+        fcntl.flock(arquivo.fileno(), (fcntl.LOCK_EX if exclusiva else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+    else:
+        # msvcrt só trava faixas de bytes, e sempre exclusivo: cada PDV trava o byte do seu
+        # pid e a restauração a faixa inteira (que falha se algum PDV estiver com o seu byte)
+        arquivo.seek(0 if exclusiva else os.getpid())
+        msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, LOCK_RANGE if exclusiva else 1)
+
+
+def lock_database(db_path: str = None, exclusiva: bool = False):
+    """
+    Trava <banco>.lock enquanto o arquivo retornado estiver aberto. O PDV pega a trava
+    compartilhada ao abrir (vários caixas podem usar o mesmo banco); a restauração precisa
+    da exclusiva, então só roda com todos os PDVs fechados. O sistema solta a trava quando
+    o processo termina, mesmo se o PDV cair (um .lock esquecido não bloqueia nada).
+    Retorna None se a trava estiver com outro; OSError se nem der para criar o arquivo.
+    """
+    arquivo = open(os.path.abspath(db_path or DB_NAME) + LOCK_SUFFIX, 'a+')
+    try:
+        _travar(arquivo, exclusiva)
+    except OSError:
+        arquivo.close()
+        return None
+    return arquivo
+
+
+def _ensure_not_in_use(db_path: str):
+    """Levanta BackupError se outro programa (ex: um editor de SQLite) estiver no meio de uma transação."""
+    if not os.path.exists(db_path):
+        return
+    conn = sqlite3.connect(db_path, timeout=0)
+    try:
+        conn.execute("BEGIN EXCLUSIVE")
+        conn.rollback()
+    except sqlite3.OperationalError as e:
+        raise BackupError(f"o banco {db_path} está em uso; feche o PDV antes de restaurar ({e})") from e
+    finally:
+        conn.close()
+
+
+def restore_backup(backup_path: str, target_path: str = None) -> str:
+    """
+    Restaura um backup sobre o banco (com o PDV FECHADO). O backup é descompactado e
+    verificado antes; o banco atual é renomeado para <banco>.antes-restauracao-<data>
+    (nada é apagado). Retorna o caminho em que o banco anterior foi guardado (ou None).
+    """
+    target_path = os.path.abspath(target_path or DB_NAME)
+    # Trava exclusiva durante toda a troca: falha com algum PDV aberto e impede que um
+    # PDV abra o banco no meio da restauração
+    trava = lock_database(target_path, exclusiva=True)
+    if trava is None:
+        raise BackupError(f"o banco {target_path} está aberto num PDV; feche todos os caixas antes de restaurar")
+    try:
+        _ensure_not_in_use(target_path)
+
+        # Temporário na pasta do banco: o rename final é atômico
+        fd, tmp_path = tempfile.mkstemp(prefix='.restaura-', suffix='.db', dir=os.path.dirname(target_path))
+        os.close(fd)
+        try:
+            try:
+                _decompress(backup_path, tmp_path)
+            except (OSError, EOFError) as e:
+                raise BackupError(f"backup ilegível: {e}") from e
+            resultado = integrity_check(tmp_path)
+            if resultado != 'ok':
+                raise BackupError(f"backup reprovado no integrity_check: {resultado}")
+
+            anterior = None
+            if os.path.exists(target_path):
+                anterior = f"{target_path}.antes-restauracao-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+                os.replace(target_path, anterior)
+            # Journal do banco antigo não pode ser aplicado sobre o restaurado
+            journal = target_path + '-journal'
+            if os.path.exists(journal):
+                os.replace(journal, (anterior or target_path) + '-journal')
+            os.replace(tmp_path, target_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    finally:
+        trava.close()
+
+    print(f"LOG: Banco {target_path} restaurado a partir de {backup_path}.")
+    return anterior
+
+
+# ----------------------------------------------------
+# --- AGENDADOR ---
+# ----------------------------------------------------
+
+class BackupScheduler(threading.Thread):
+    """
+    Thread que faz um backup a cada 'interval' segundos. O primeiro sai STARTUP_DELAY
+    depois de abrir o PDV, ou antes do intervalo se o último backup da pasta já venceu.
+    """
+
+    def __init__(self, backup_dir: str, interval: float, keep: int = DEFAULT_KEEP,
+                 source_path: str = None):
+        super().__init__(name="BackupScheduler", daemon=True)
+        self.backup_dir = backup_dir
+        self.interval = interval
+        self.keep = keep
+        self.source_path = source_path or database_path()
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _first_delay(self) -> float:
+        backups = list_backups(self.backup_dir) if os.path.isdir(self.backup_dir) else []
+        if not backups:
+            return STARTUP_DELAY
+        idade = time.time() - os.path.getmtime(backups[-1])
+        return max(STARTUP_DELAY, self.interval - idade)
+
+    def run(self):
+        delay = self._first_delay()
+        while not self._stop_event.wait(delay):
+            try:
+                create_backup(self.backup_dir, self.source_path, self.keep, self._stop_event)
+            except BackupCancelled:
+                return
+            except BackupBusy as e:
+                delay = min(RETRY_DELAY, self.interval)
+                print(f"LOG: Backup adiado ({e}); nova tentativa em {delay:.0f}s.")
+                continue
+            except (BackupError, OSError) as e:
+                delay = min(RETRY_DELAY, self.interval)
+                print(f"Erro no backup automático (o anterior continua válido; nova tentativa em {delay:.0f}s): {e}")
+                continue
+            delay = self.interval
+
+
+def start_backup_scheduler_from_env():
+    """Inicia o backup automático se PDV_BACKUP_DIR estiver definido; senão retorna None."""
+    settings = backup_settings_from_env()
+    if settings is None:
+        return None
+    backup_dir, interval, keep = settings
+    scheduler = BackupScheduler(backup_dir, interval, keep)
+    scheduler.start()
+    print(f"LOG: Backup automático ativo ({backup_dir}, a cada {interval / 60:.0f} min, mantendo {keep}).")
+    return scheduler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backup e restauração do banco do PDV.")
+    parser.add_argument('--pasta', default=os.environ.get(ENV_BACKUP_DIR), help="pasta dos backups")
+    parser.add_argument('--banco', default=DB_NAME, help="arquivo do banco do PDV")
+    parser.add_argument('--manter', type=int, default=DEFAULT_KEEP, help="quantos backups manter")
+    acao = parser.add_mutually_exclusive_group(required=True)
+    acao.add_argument('--agora', action='store_true', help="faz um backup agora")
+    acao.add_argument('--listar', action='store_true', help="lista os backups da pasta")
+    acao.add_argument('--verificar', metavar='ARQUIVO', help="confere a integridade de um backup")
+    acao.add_argument('--restaurar', metavar='ARQUIVO', help="restaura um backup (com o PDV fechado)")
+    args = parser.parse_args(argv)
+
+    if (args.agora or args.listar) and not args.pasta:
+        parser.error(f"informe --pasta ou defina {ENV_BACKUP_DIR}")
+
+    try:
+        if args.agora:
+            create_backup(args.pasta, os.path.abspath(args.banco), args.manter)
+        elif args.listar:
+            for path in list_backups(args.pasta):
+                print(f"{path}  {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+        elif args.verificar:
+            resultado = verify_backup(args.verificar)
+            print(f"{args.verificar}: {resultado}")
+            return 0 if resultado == 'ok' else 1
+        elif args.restaurar:
+            anterior = restore_backup(args.restaurar, args.banco)
+            if anterior:
+                print(f"Banco anterior guardado em {anterior}")
+    except BackupError as e:
+        print(f"Erro: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
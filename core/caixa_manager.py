@@ -3,6 +3,181 @@
 import sqlite3
 from datetime import datetime
 
+from core.formatting import brl
+
+# Linha de CaixaTotais com o resumo das VENDAS da sessão (as outras são por forma de pagamento)
+METODO_VENDAS = '*'
+METODO_DINHEIRO = 'Dinheiro'
+
+# Movimentações de gaveta (sangria = retirada, suprimento = reforço de troco)
+TIPO_SANGRIA = 'Sangria'
+TIPO_SUPRIMENTO = 'Suprimento'
+# Linhas de CaixaTotais com o acumulado de cada tipo de movimentação
+METODOS_MOVIMENTO = {TIPO_SANGRIA: '*sangria', TIPO_SUPRIMENTO: '*suprimento'}
+
+
+def ensure_caixa_totals_table(conn):
+    """
+    Cria CaixaTotais: totais acumulados por sessão de caixa e forma de pagamento,
+    atualizados dentro da transação de cada venda (fechamento e leitura X sem varrer Vendas).
+    Sessões abertas antes da tabela existir são recalculadas uma vez a partir das vendas.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'CaixaTotais'")
+    nova = cursor.fetchone() is None
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS CaixaTotais (
+            id_caixa INTEGER NOT NULL,
+            metodo TEXT NOT NULL,              -- forma de pagamento, ou '*' = vendas da sessão
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            valor REAL NOT NULL DEFAULT 0,
+            troco REAL NOT NULL DEFAULT 0,     -- troco dado (sai da gaveta, só em Dinheiro)
+            PRIMARY KEY (id_caixa, metodo)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vendas_caixa ON Vendas(id_caixa)")
+
+    # Sangrias e suprimentos (o acumulado da sessão também vai para CaixaTotais)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS MovimentosCaixa (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_caixa INTEGER NOT NULL,
+            id_funcionario INTEGER NOT NULL,
+            tipo TEXT NOT NULL,               -- 'Sangria' ou 'Suprimento'
+            valor REAL NOT NULL,
+            motivo TEXT NOT NULL,
+            data_hora TEXT NOT NULL,
+            FOREIGN KEY (id_caixa) REFERENCES Caixa(id),
+            FOREIGN KEY (id_funcionario) REFERENCES Funcionarios(id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movimentos_caixa_caixa ON MovimentosCaixa(id_caixa)")
+    conn.commit()
+
+    if nova:
+        cursor.execute("SELECT id FROM Caixa WHERE status = 'Aberto'")
+        for (id_caixa,) in cursor.fetchall():
+            rebuild_caixa_totals(conn, id_caixa)
+
+
+def add_sale_to_caixa_totals(cursor, id_caixa: int, total_venda: float, troco: float, pagamentos):
+    """
+    Soma uma venda nos totais da sessão, SEM commit (faz parte da transação da venda).
+    pagamentos: [(metodo, valor)]. O troco é lançado na linha de Dinheiro.
+    """
+    troco = troco or 0.0
+    por_metodo = {}
+    for metodo, valor in pagamentos:
+        quantidade, soma = por_metodo.get(metodo, (0, 0.0))
+        por_metodo[metodo] = (quantidade + 1, soma + valor)
+    if troco and METODO_DINHEIRO not in por_metodo:
+        por_metodo[METODO_DINHEIRO] = (0, 0.0)
+
+    rows = [(id_caixa, METODO_VENDAS, 1, total_venda, troco)]
+    rows += [
+        (id_caixa, metodo, quantidade, soma, troco if metodo == METODO_DINHEIRO else 0.0)
+        for metodo, (quantidade, soma) in por_metodo.items()
+    ]
+    cursor.executemany("""
+        INSERT INTO CaixaTotais (id_caixa, metodo, quantidade, valor, troco)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(id_caixa, metodo) DO UPDATE SET
+            quantidade = quantidade + excluded.quantidade,
+            valor = valor + excluded.valor,
+            troco = troco + excluded.troco
+    """, rows)
+
+
+def rebuild_caixa_totals(conn, id_caixa: int):
+    """Recalcula os totais de uma sessão a partir de Vendas/PagamentosVenda (migração ou conferência)."""
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM CaixaTotais WHERE id_caixa = ?", (id_caixa,))
+        cursor.execute("""
+            INSERT INTO CaixaTotais (id_caixa, metodo, quantidade, valor, troco)
+            SELECT ?, ?, COUNT(*), COALESCE(SUM(total_venda), 0), COALESCE(SUM(troco), 0)
+            FROM Vendas WHERE id_caixa = ?
+        """, (id_caixa, METODO_VENDAS, id_caixa))
+        cursor.execute("""
+            INSERT INTO CaixaTotais (id_caixa, metodo, quantidade, valor, troco)
+            SELECT ?, PV.metodo, COUNT(*), SUM(PV.valor), 0
+            FROM Vendas AS V JOIN PagamentosVenda AS PV ON PV.venda_id = V.venda_id
+            WHERE V.id_caixa = ?
+            GROUP BY PV.metodo
+        """, (id_caixa, id_caixa))
+        cursor.execute("""
+            INSERT INTO CaixaTotais (id_caixa, metodo, quantidade, valor, troco)
+            SELECT ?, ?, 0, 0, COALESCE(SUM(troco), 0) FROM Vendas WHERE id_caixa = ?
+            ON CONFLICT(id_caixa, metodo) DO UPDATE SET troco = excluded.troco
+        """, (id_caixa, METODO_DINHEIRO, id_caixa))
+        for tipo, metodo in METODOS_MOVIMENTO.items():
+            cursor.execute("""
+                INSERT INTO CaixaTotais (id_caixa, metodo, quantidade, valor, troco)
+                SELECT ?, ?, COUNT(*), SUM(valor), 0 FROM MovimentosCaixa
+                WHERE id_caixa = ? AND tipo = ? HAVING COUNT(*) > 0
+            """, (id_caixa, metodo, id_caixa, tipo))
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro ao recalcular os totais do caixa {id_caixa}: {e}")
+
+
+# Sessão(ões) de caixa com o vendedor e as linhas de CaixaTotais (completar com o WHERE)
+SESSION_TOTALS_SELECT = """
+    SELECT C.id, C.valor_abertura, C.data_abertura, F.nome, C.status,
+           T.metodo, T.quantidade, T.valor, T.troco
+    FROM Caixa AS C
+    JOIN Funcionarios AS F ON C.id_funcionario = F.id
+    LEFT JOIN CaixaTotais AS T ON T.id_caixa = C.id
+"""
+
+
+def summarize_session_rows(rows):
+    """
+    Monta o resumo de UMA sessão a partir das linhas (id, valor_abertura, data_abertura,
+    vendedor, status, metodo, quantidade, valor, troco) de Caixa + CaixaTotais.
+    """
+    id_caixa_db, valor_abertura, data_abertura, vendedor_nome, status = rows[0][:5]
+
+    quantidade_vendas, total_vendas, troco_total = 0, 0.0, 0.0
+    totais_por_metodo = {}
+    movimentos = {tipo: {'quantidade': 0, 'valor': 0.0} for tipo in METODOS_MOVIMENTO}
+    tipo_por_metodo = {metodo: tipo for tipo, metodo in METODOS_MOVIMENTO.items()}
+    for *_, metodo, quantidade, valor, troco in rows:
+        if metodo is None:
+            continue  # Sessão sem vendas nem movimentações
+        if metodo == METODO_VENDAS:
+            quantidade_vendas, total_vendas, troco_total = quantidade, valor, troco
+        elif metodo in tipo_por_metodo:
+            movimentos[tipo_por_metodo[metodo]] = {'quantidade': quantidade, 'valor': valor}
+        else:
+            totais_por_metodo[metodo] = {'quantidade': quantidade, 'valor': valor, 'troco': troco}
+
+    # Na gaveta só fica o dinheiro: recebido em espécie menos o troco devolvido,
+    # mais os suprimentos e menos as sangrias
+    dinheiro = totais_por_metodo.get(METODO_DINHEIRO, {'valor': 0.0, 'troco': 0.0})
+    dinheiro_liquido = dinheiro['valor'] - dinheiro['troco']
+    total_suprimentos = movimentos[TIPO_SUPRIMENTO]['valor']
+    total_sangrias = movimentos[TIPO_SANGRIA]['valor']
+
+    return {
+        'id_caixa': id_caixa_db,
+        'status': status,
+        'vendedor_nome': vendedor_nome,
+        'data_abertura': data_abertura,
+        'valor_abertura': valor_abertura,
+        'quantidade_vendas': quantidade_vendas,
+        'total_vendas': total_vendas,
+        'troco_total': troco_total,
+        'totais_por_metodo': totais_por_metodo,
+        'dinheiro_liquido': dinheiro_liquido,
+        'movimentos': movimentos,
+        'total_suprimentos': total_suprimentos,
+        'total_sangrias': total_sangrias,
+        'valor_esperado': valor_abertura + dinheiro_liquido + total_suprimentos - total_sangrias,
+    }
+
+
 class CaixaManager:
     """
     Gerencia as operações de abertura, fechamento e consulta do caixa.
@@ -105,48 +280,96 @@ class CaixaManager:
             print(f"Erro ao abrir caixa: {e}")
             return False
 
-    # Arquivo: core/caixa_manager.py
+    def resumo_caixa(self, id_caixa: int):
+        """
+        Números da sessão a partir dos totais acumulados (CaixaTotais): não varre as vendas,
+        então serve para o fechamento e para consultas no meio do turno.
+        Retorna um dicionário ou None se o caixa não existir.
+        """
+        # Uma consulta só, toda por chave primária: Caixa + vendedor + linhas de CaixaTotais
+        cursor = self.db_connection.cursor()
+        cursor.execute(SESSION_TOTALS_SELECT + " WHERE C.id = ?", (id_caixa,))
+        rows = cursor.fetchall()
+        if not rows:
+            return None
+        return summarize_session_rows(rows)
+
+    def registrar_movimentacao(self, id_caixa: int, id_funcionario: int, tipo: str,
+                               valor: float, motivo: str) -> tuple:
+        """
+        Registra uma sangria (retirada) ou suprimento (reforço) na sessão ABERTA e soma
+        no acumulado da sessão, na mesma transação. A sangria não pode passar do dinheiro
+        que o sistema espera na gaveta. Retorna (sucesso, mensagem).
+        """
+        if tipo not in METODOS_MOVIMENTO:
+            return False, f"Tipo de movimentação inválido: {tipo}"
+        if valor is None or valor <= 0:
+            return False, "O valor da movimentação deve ser positivo."
+        if not motivo or not motivo.strip():
+            return False, "É necessário informar o motivo da movimentação."
+
+        conn = self.db_connection
+        cursor = conn.cursor()
+        try:
+            if not conn.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+            resumo = self.resumo_caixa(id_caixa)
+            if not resumo or resumo['status'] != 'Aberto':
+                conn.rollback()
+                return False, "Nenhuma sessão de caixa aberta para esta movimentação."
+
+            if tipo == TIPO_SANGRIA and valor > resumo['valor_esperado'] + 0.001:
+                conn.rollback()
+                return False, (f"Sangria de {brl(valor)} maior que o dinheiro esperado na gaveta "
+                               f"({brl(resumo['valor_esperado'])}).")
+
+            cursor.execute("""
+                INSERT INTO MovimentosCaixa (id_caixa, id_funcionario, tipo, valor, motivo, data_hora)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (id_caixa, id_funcionario, tipo, valor, motivo.strip(),
+                  datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            cursor.execute("""
+                INSERT INTO CaixaTotais (id_caixa, metodo, quantidade, valor, troco)
+                VALUES (?, ?, 1, ?, 0)
+                ON CONFLICT(id_caixa, metodo) DO UPDATE SET
+                    quantidade = quantidade + 1, valor = valor + excluded.valor
+            """, (id_caixa, METODOS_MOVIMENTO[tipo], valor))
+            conn.commit()
+
+            saldo = resumo['valor_esperado'] + (valor if tipo == TIPO_SUPRIMENTO else -valor)
+            return True, f"{tipo} de {brl(valor)} registrado(a). Dinheiro esperado na gaveta: {brl(saldo)}."
+
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Erro ao registrar {tipo}: {e}")
+            return False, f"Erro de DB: {e}"
 
     def fechar_caixa(self, id_caixa: int, valor_fechamento_declarado: float) -> dict:
         """
         Fecha o caixa, calcula a diferença e retorna o resumo.
-        Adicionado busca por todos os metadados (datas, vendedor, etc.)
+        O valor esperado na gaveta é o fundo de troco + dinheiro recebido - troco
+        + suprimentos - sangrias (cartão e PIX não ficam na gaveta), lido dos totais
+        acumulados da sessão.
         """
         conn = self.db_connection
         cursor = conn.cursor()
         data_fechamento = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        # 1. Obter TODOS os dados necessários: Abertura, Vendas e Dados da Sessão
-        # Adicionamos F.nome (vendedor) e C.data_abertura ao SELECT principal
-        cursor.execute("""
-            SELECT 
-                C.id, C.valor_abertura, C.data_abertura, 
-                F.nome AS vendedor_nome,
-                SUM(V.total_venda) AS total_vendas_liquidas
-            FROM Caixa AS C
-            JOIN Funcionarios AS F ON C.id_funcionario = F.id
-            LEFT JOIN Vendas AS V ON V.id_caixa = C.id
-            WHERE C.id = ?
-            GROUP BY C.id
-        """, (id_caixa,))
-
-        result = cursor.fetchone()
-        
-        if not result:
-            return {'success': False, 'message': 'Caixa não encontrado ou sem dados de abertura.'}
+        try:
+            # 1. Resumo da sessão (totais acumulados, sem varrer as vendas), lido já com o
+            # lock de escrita: nenhuma venda entra entre a conta e o fechamento
+            if not conn.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+            resumo = self.resumo_caixa(id_caixa)
             
-        # Desempacotamento dos resultados com os novos campos
-        id_caixa_db, valor_abertura, data_abertura, vendedor_nome, total_vendas = result
-        
-        if total_vendas is None:
-            total_vendas = 0.0
+            if not resumo:
+                conn.rollback()
+                return {'success': False, 'message': 'Caixa não encontrado ou sem dados de abertura.'}
+                
+            valor_esperado = resumo['valor_esperado']
+            diferenca = valor_fechamento_declarado - valor_esperado
             
-        # Se o seu valor esperado deve incluir o fundo de troco (e é o que parece estar fazendo):
-        valor_esperado = valor_abertura + total_vendas 
-        diferenca = valor_fechamento_declarado - valor_esperado
-        
-        # 2. Atualizar a tabela Caixa (O restante do código é mantido)
-        try:
+            # 2. Atualizar a tabela Caixa
             cursor.execute("""
                 UPDATE Caixa SET
                     data_fechamento = ?,
@@ -163,18 +386,14 @@ class CaixaManager:
             conn.commit()
             
             # 3. Retornar Dicionário COMPLETO para a Impressão
-            return {
+            resumo.update({
                 'success': True,
-                'id_caixa': id_caixa,
-                'vendedor_nome': vendedor_nome,
-                'data_abertura': data_abertura,
+                'status': 'Fechado',
                 'data_fechamento': data_fechamento,
-                'valor_abertura': valor_abertura,
-                'total_vendas': total_vendas,
-                'valor_esperado': valor_esperado,
                 'valor_declarado': valor_fechamento_declarado,
                 'diferenca': diferenca
-            }
+            })
+            return resumo
             
         except sqlite3.Error as e:
             conn.rollback()
@@ -0,0 +1,167 @@
+# core/caixa_reports.py
+"""
+Leitura X (sessão de caixa em andamento) e Redução Z (todas as sessões de um dia).
+
+Os números vêm dos agregados já mantidos pelo sistema:
+  - CaixaTotais (por sessão e forma de pagamento, sangrias, suprimentos): leitura por chave;
+  - Vendas pelo índice idx_vendas_caixa, numa única passada agrupada por hora, que
+    também soma valor bruto, descontos e taxas de serviço.
+
+As consultas são curtas e só de leitura (use uma conexão connect_readonly), então gerar
+o relatório num caixa movimentado leva milissegundos e não segura a venda.
+"""
+
+from datetime import date, datetime, timedelta
+
+from core.archive import report_sources
+from core.caixa_manager import (
+    METODOS_MOVIMENTO,
+    SESSION_TOTALS_SELECT,
+    TIPO_SANGRIA,
+    TIPO_SUPRIMENTO,
+    summarize_session_rows,
+)
+from core.receipt_template import Centro, ReceiptTemplate, Repetir, Separador, Texto, Valor
+
+TIPO_X = 'X'
+TIPO_Z = 'Z'
+
+LARGURA = 40
+
+
+def _sessions(conn, ids_caixa: list) -> list:
+    """Resumos das sessões (uma consulta, por chave primária)."""
+    if not ids_caixa:
+        return []
+    marks = ','.join('?' * len(ids_caixa))
+    rows_por_caixa = {}
+    for row in conn.execute(SESSION_TOTALS_SELECT + f" WHERE C.id IN ({marks}) ORDER BY C.id", ids_caixa):
+        rows_por_caixa.setdefault(row[0], []).append(row)
+    return [summarize_session_rows(rows) for rows in rows_por_caixa.values()]
+
+
+def _sales_by_hour(conn, ids_caixa: list, vendas_source: str = 'Vendas') -> list:
+    """[(hora, quantidade, bruto, descontos, taxas, total)] das vendas das sessões, numa passada."""
+    if not ids_caixa:
+        return []
+    marks = ','.join('?' * len(ids_caixa))
+    return conn.execute(f"""
+        SELECT substr(data_hora, 12, 2) AS hora, COUNT(*),
+               COALESCE(SUM(valor_bruto), 0), COALESCE(SUM(desconto_aplicado), 0),
+               COALESCE(SUM(taxa_servico), 0), COALESCE(SUM(total_venda), 0)
+        FROM {vendas_source}
+        WHERE id_caixa IN ({marks})
+        GROUP BY hora ORDER BY hora
+    """, ids_caixa).fetchall()
+
+
+def _build_report(tipo: str, titulo: str, sessoes: list, por_hora: list) -> dict:
+    """Soma as sessões num relatório único (por forma de pagamento, por hora, gaveta)."""
+    por_metodo = {}
+    movimentos = {t: {'quantidade': 0, 'valor': 0.0} for t in METODOS_MOVIMENTO}
+    for sessao in sessoes:
+        for metodo, totais in sessao['totais_por_metodo'].items():
+            acumulado = por_metodo.setdefault(metodo, {'quantidade': 0, 'valor': 0.0, 'troco': 0.0})
+            for chave in acumulado:
+                acumulado[chave] += totais[chave]
+        for t, movimento in sessao['movimentos'].items():
+            movimentos[t]['quantidade'] += movimento['quantidade']
+            movimentos[t]['valor'] += movimento['valor']
+
+    quantidade_vendas = sum(s['quantidade_vendas'] for s in sessoes)
+    total_vendas = sum(s['total_vendas'] for s in sessoes)
+    return {
+        'tipo': tipo,
+        'titulo': titulo,
+        'gerado_em': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'sessoes': sessoes,
+        'quantidade_vendas': quantidade_vendas,
+        'total_vendas': total_vendas,
+        'ticket_medio': total_vendas / quantidade_vendas if quantidade_vendas else 0.0,
+        'valor_bruto': sum(h[2] for h in por_hora),
+        'descontos': sum(h[3] for h in por_hora),
+        'taxas': sum(h[4] for h in por_hora),
+        'troco_total': sum(s['troco_total'] for s in sessoes),
+        'por_metodo': por_metodo,
+        'por_hora': por_hora,
+        'movimentos': movimentos,
+        'valor_abertura': sum(s['valor_abertura'] for s in sessoes),
+        'valor_esperado': sum(s['valor_esperado'] for s in sessoes),
+    }
+
+
+def report_x(conn, id_caixa: int):
+    """Leitura X de uma sessão (normalmente a aberta). Retorna o relatório ou None."""
+    sessoes = _sessions(conn, [id_caixa])
+    if not sessoes:
+        return None
+    return _build_report(TIPO_X, f"LEITURA X - CAIXA {id_caixa}", sessoes, _sales_by_hour(conn, [id_caixa]))
+
+
+def report_z(conn, dia: date = None):
+    """
+    Redução Z do dia: todas as sessões abertas no dia (abertas ou já fechadas).
+    Vendas de dias já arquivados entram pelas partições (core/archive.py).
+    """
+    dia = dia or date.today()
+    inicio = dia.isoformat()
+    fim = (dia + timedelta(days=1)).isoformat()
+    ids_caixa = [row[0] for row in conn.execute(
+        "SELECT id FROM Caixa WHERE data_abertura >= ? AND data_abertura < ? ORDER BY id", (inicio, fim)
+    )]
+    sources = report_sources(conn, inicio, f"{inicio} 23:59:59")
+    return _build_report(
+        TIPO_Z, f"REDUCAO Z - {dia.strftime('%d/%m/%Y')}",
+        _sessions(conn, ids_caixa), _sales_by_hour(conn, ids_caixa, sources['Vendas'])
+    )
+
+
+# ----------------------------------------------------
+# --- TEXTO PARA IMPRESSÃO ---
+# ----------------------------------------------------
+
+RELATORIO = ReceiptTemplate([
+    Separador('='),
+    Centro("{titulo}"),
+    Centro("Emitido em {gerado_em}"),
+    Separador('='),
+    Repetir('sessoes', [
+        Texto("CAIXA {id_caixa} - {vendedor_nome} ({status})"),
+        Texto("  Abertura: {data_abertura}"),
+        Valor("  Vendas: {quantidade_vendas} /", 'total_vendas'),
+    ]),
+    Separador('-'),
+    Valor("VENDAS:", 'quantidade_vendas', 'inteiro'),
+    Valor("VALOR BRUTO:", 'valor_bruto'),
+    Valor("(-) DESCONTOS:", 'descontos'),
+    Valor("(+) TAXAS DE SERVICO:", 'taxas'),
+    Valor("TOTAL LIQUIDO:", 'total_vendas'),
+    Valor("TICKET MEDIO:", 'ticket_medio'),
+    Separador('-'),
+    Texto("POR FORMA DE PAGAMENTO"),
+    Repetir('metodos', [Valor("  {metodo} ({quantidade}x)", 'valor')]),
+    Valor("  (-) Troco dado", 'troco_total', se='troco_total'),
+    Separador('-'),
+    Texto("POR HORA"),
+    Repetir('horas', [Valor("  {hora}h ({quantidade})", 'total')]),
+    Separador('-'),
+    Texto("GAVETA (DINHEIRO)"),
+    Valor("  Fundo de troco", 'valor_abertura'),
+    Valor("  (+) Suprimentos ({suprimentos_qtd})", 'suprimentos'),
+    Valor("  (-) Sangrias ({sangrias_qtd})", 'sangrias'),
+    Valor("  ESPERADO NA GAVETA", 'valor_esperado'),
+    Separador('='),
+], largura=LARGURA)
+
+
+def render_report(rel: dict) -> str:
+    """Texto do relatório X/Z na largura da bobina (LARGURA colunas)."""
+    ctx = dict(rel)
+    ctx['metodos'] = [{'metodo': metodo, **totais} for metodo, totais in sorted(rel['por_metodo'].items())]
+    ctx['horas'] = [{'hora': hora, 'quantidade': quantidade, 'total': total}
+                    for hora, quantidade, _, _, _, total in rel['por_hora']]
+    ctx['suprimentos_qtd'] = rel['movimentos'][TIPO_SUPRIMENTO]['quantidade']
+    ctx['suprimentos'] = rel['movimentos'][TIPO_SUPRIMENTO]['valor']
+    ctx['sangrias_qtd'] = rel['movimentos'][TIPO_SANGRIA]['quantidade']
+    ctx['sangrias'] = rel['movimentos'][TIPO_SANGRIA]['valor']
+    return RELATORIO.render(ctx)
@@ -17,31 +17,29 @@ class CartManager:
         """
         Adiciona ou incrementa um item no carrinho. Soma apenas se for "Unidade".
         product_data: (codigo, nome, preco, tipo_medicao, ...)
+        Retorna a posição do item afetado em cart_items (para atualizar só aquela linha na tela).
         """
         # A tupla product_data vem da busca: (codigo, nome, preco, tipo_medicao, categoria)
         codigo, nome, preco, tipo_medicao = product_data[:4] 
         
         # 1. Tenta encontrar item, MAS SÓ SOMA SE FOR UNIDADE
-        found_and_summed = False
-        
         if tipo_medicao.lower() == 'unidade':
             for i, item in enumerate(self.cart_items):
                 # Usamos o código para identificar se já está no carrinho
                 if item['codigo'] == codigo: 
                     self.cart_items[i]['quantidade'] += quantity
-                    found_and_summed = True
-                    break
+                    return i
         
         # 2. SE NÃO ENCONTROU OU SE FOR PESO (Deve ser uma nova linha)
-        if not found_and_summed:
-            # Note que 'tipo' foi renomeado para 'tipo_medicao' para consistência
-            self.cart_items.append({
-                'codigo': codigo, 
-                'nome': nome, 
-                'preco': preco, 
-                'quantidade': quantity,
-                'tipo_medicao': tipo_medicao
-            })
+        # Note que 'tipo' foi renomeado para 'tipo_medicao' para consistência
+        self.cart_items.append({
+            'codigo': codigo, 
+            'nome': nome, 
+            'preco': preco, 
+            'quantidade': quantity,
+            'tipo_medicao': tipo_medicao
+        })
+        return len(self.cart_items) - 1
             
     def remove_item(self, codigo: str):
         """
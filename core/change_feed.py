@@ -0,0 +1,157 @@
+# core/change_feed.py
+"""
+Feed de alterações (CDC) de Produtos, Vendas e Caixa.
+
+Gatilhos (triggers) gravam em Alteracoes um registro compacto por linha alterada:
+(versao, tabela, id_linha, operacao). A versão é o próprio rowid do diário, portanto
+cresce a cada alteração confirmada. Quem mantém um cache (catálogo de produtos,
+telas de gerenciamento, totais de relatório, sincronização) guarda a última versão
+que já aplicou e pede só o que mudou depois dela:
+
+    for alteracao in changes_since(conn, versao, tabelas=('Produtos',)):
+        ...
+
+Os dados em si continuam nas tabelas de origem; o diário só diz QUAIS linhas reler.
+"""
+
+import sqlite3
+
+OP_INSERT = 'I'
+OP_UPDATE = 'U'
+OP_DELETE = 'D'
+
+# tabela -> (coluna da chave, colunas cuja alteração interessa aos caches)
+TRACKED_TABLES = {
+    'Produtos': ('id', ('codigo', 'nome', 'preco', 'quantidade', 'tipo_medicao', 'categoria', 'ativo')),
+    'Vendas': ('venda_id', None),
+    'Caixa': ('id', None),
+}
+
+# Leitura do diário em páginas (o gerador não segura um cursor aberto entre páginas)
+PAGE_SIZE = 1000
+# Quantas alterações o diário guarda (as mais antigas são apagadas na inicialização)
+RETENTION = 200_000
+
+
+class Change:
+    """Um registro do diário de alterações."""
+
+    __slots__ = ('versao', 'tabela', 'id_linha', 'operacao')
+
+    def __init__(self, versao, tabela, id_linha, operacao):
+        self.versao = versao
+        self.tabela = tabela
+        self.id_linha = id_linha
+        self.operacao = operacao
+
+    def __repr__(self):
+        return f"Change({self.versao}, {self.tabela}, {self.id_linha}, {self.operacao})"
+
+
+def ensure_change_feed(conn):
+    """Cria o diário Alteracoes e os gatilhos das tabelas acompanhadas (se ainda não existirem)."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Alteracoes (
+            versao INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabela TEXT NOT NULL,
+            id_linha INTEGER NOT NULL,
+            operacao TEXT NOT NULL      -- I, U, D
+        )
+    """)
+
+    for tabela, (chave, colunas) in TRACKED_TABLES.items():
+        # UPDATE OF: só colunas que importam (ex: recalcular nome_busca não gera alteração)
+        update_of = f" OF {', '.join(colunas)}" if colunas else ""
+        for sufixo, evento, linha, op in (
+            ('ins', 'INSERT', 'NEW', OP_INSERT),
+            ('upd', f'UPDATE{update_of}', 'NEW', OP_UPDATE),
+            ('del', 'DELETE', 'OLD', OP_DELETE),
+        ):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_cdc_{tabela.lower()}_{sufixo}
+                AFTER {evento} ON {tabela}
+                BEGIN
+                    INSERT INTO Alteracoes (tabela, id_linha, operacao)
+                    VALUES ('{tabela}', {linha}.{chave}, '{op}');
+                END
+            """)
+    conn.commit()
+
+
+def current_version(conn) -> int:
+    """Última versão gravada no diário (0 se vazio)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(versao), 0) FROM Alteracoes")
+    return cursor.fetchone()[0]
+
+
+def changes_since(conn, versao: int, tabelas=None, page_size: int = PAGE_SIZE):
+    """
+    Gerador das alterações com versão > 'versao', em ordem, opcionalmente só das
+    'tabelas' indicadas. Lê o diário em páginas pela chave primária.
+    """
+    filtro = ""
+    params = []
+    if tabelas:
+        filtro = f" AND tabela IN ({','.join('?' * len(tabelas))})"
+        params = list(tabelas)
+
+    cursor = conn.cursor()
+    while True:
+        cursor.execute(
+            f"SELECT versao, tabela, id_linha, operacao FROM Alteracoes "
+            f"WHERE versao > ?{filtro} ORDER BY versao LIMIT ?",
+            [versao] + params + [page_size]
+        )
+        rows = cursor.fetchall()
+        for row in rows:
+            yield Change(*row)
+        if len(rows) < page_size:
+            return
+        versao = rows[-1][0]
+
+
+def changed_rows(conn, tabela: str, versao: int, limite: int = None):
+    """
+    Resume as alterações de uma tabela depois de 'versao': retorna (ultima_versao, {id_linha: operacao})
+    com a ÚLTIMA operação de cada linha. Retorna (versao_atual, None) quando é melhor o
+    cache recarregar tudo: mais linhas que 'limite', ou diário já limpo depois de 'versao'.
+    """
+    # Diário já limpo depois da versão do cache: não dá para saber o que mudou
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(versao) FROM Alteracoes")
+    menor = cursor.fetchone()[0]
+    if menor is not None and menor > versao + 1 and versao < current_version(conn):
+        return current_version(conn), None
+
+    ultima = versao
+    linhas = {}
+    for change in changes_since(conn, versao, (tabela,)):
+        ultima = change.versao
+        if change.operacao == OP_UPDATE and linhas.get(change.id_linha) == OP_INSERT:
+            continue  # Inserida e depois alterada: para o cache, continua sendo nova
+        linhas[change.id_linha] = change.operacao
+        if limite is not None and len(linhas) > limite:
+            return current_version(conn), None
+    return ultima, linhas
+
+
+def prune_changes(conn, ate_versao: int = None) -> int:
+    """
+    Apaga do diário as alterações com versão <= ate_versao (padrão: tudo menos as
+    últimas RETENTION). Um cache mais antigo que isso recarrega por inteiro.
+    """
+    if ate_versao is None:
+        ate_versao = current_version(conn) - RETENTION
+    if ate_versao <= 0:
+        return 0
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM Alteracoes WHERE versao <= ?", (ate_versao,))
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro ao limpar o diário de alterações: {e}")
+        return 0
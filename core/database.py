@@ -1,27 +1,117 @@
 import sqlite3
 import os
+import tempfile
 from datetime import datetime
 import datetime as dt # Alias para evitar conflito com datetime.now() em finalizar_venda
+from core.text_search import normalize_search_text
+from core.stock_ledger import (
+    TIPO_VENDA,
+    ensure_stock_ledger_tables,
+    maybe_take_stock_snapshot,
+    record_stock_movements,
+)
+from core.stock_reservation import ensure_reservation_table
+from core.change_feed import ensure_change_feed, prune_changes
+from core.caixa_manager import ensure_caixa_totals_table
+from core.print_spooler import ensure_print_spool_table
+from core.nfce_queue import ensure_fiscal_table
 
 # Usaremos o hash SHA-256 da senha "admin" para compatibilidade com o LoginDialog
 # Hash de "admin" (SHA-256): 8c6976e5b5410415bde908bd4dee15dfb167a9c873fc4bb8a81f6f2ab448a918
 DEFAULT_ADMIN_PASSWORD_HASH = "8c6976e5b5410415bde908bd4dee15dfb167a9c873fc4bb8a81f6f2ab448a918" 
 
-DB_NAME = 'pdv.db'
+# Banco local do caixa; PDV_DB permite apontar outro arquivo (ex: vários caixas na mesma máquina)
+DB_NAME = os.environ.get('PDV_DB', 'pdv.db')
 LOW_STOCK_THRESHOLD = 5 
+# Com vários caixas no mesmo pdv.db, espera até X segundos por um lock de escrita
+# (as transações são curtas) em vez de falhar na hora com 'database is locked'
+DB_BUSY_TIMEOUT = 10.0
 
 # --- FUNÇÕES DE CONEXÃO E INICIALIZAÇÃO ---
 
 def connect_db(parent=None):
     """Cria e retorna a conexão com o banco de dados SQLite."""
     try:
-        conn = sqlite3.connect(DB_NAME)
+        conn = sqlite3.connect(DB_NAME, timeout=DB_BUSY_TIMEOUT)
         conn.execute("PRAGMA foreign_keys = ON") 
         return conn
     except sqlite3.Error as e:
         if parent and hasattr(parent, 'show_error_message'):
             parent.show_error_message("Erro de Conexão com o Banco de Dados", f"Falha ao conectar: {e}")
-        return None 
+        return None
+
+
+# --- CONEXÕES DE LEITURA (RELATÓRIOS / TELAS DE CONSULTA) ---
+
+# Relatórios pesados podem ler de uma cópia do banco (PDV_RELATORIO_SNAPSHOT=1)
+ENV_REPORT_SNAPSHOT = 'PDV_RELATORIO_SNAPSHOT'
+# Páginas copiadas por passo do backup do snapshot (entre passos o lock é liberado)
+SNAPSHOT_PAGES_PER_STEP = 1024
+
+
+def database_path(conn=None) -> str:
+    """
+    Caminho absoluto do arquivo do banco: o da conexão informada (PRAGMA database_list)
+    ou, sem conexão, o DB_NAME configurado.
+    """
+    if conn is not None:
+        for _, name, path in conn.execute("PRAGMA database_list"):
+            if name == 'main' and path:
+                return path
+    return os.path.abspath(DB_NAME)
+
+
+def connect_readonly(path: str = None):
+    """
+    Conexão SÓ DE LEITURA (mode=ro + query_only) para relatórios e consultas.
+    Não consegue gravar nem pegar o lock de escrita, então nunca disputa com a venda;
+    as leituras devem ser curtas (fetchall) para não segurar o lock compartilhado.
+    """
+    path = path or database_path()
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=DB_BUSY_TIMEOUT)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+    except sqlite3.Error as e:
+        print(f"Erro ao abrir conexão de leitura ({path}): {e}")
+        return None
+
+
+def report_snapshot_enabled() -> bool:
+    return os.environ.get(ENV_REPORT_SNAPSHOT, '').strip().lower() in ('1', 'true', 'sim', 's')
+
+
+def create_snapshot(source_conn=None, dest_path: str = None, pages: int = SNAPSHOT_PAGES_PER_STEP,
+                    progress=None, sleep: float = 0.25) -> str:
+    """
+    Copia o banco para um arquivo temporário com a API de backup do SQLite, em passos
+    de 'pages' páginas (a venda pode gravar entre um passo e outro; o SQLite recomeça a
+    cópia se o banco mudar no meio). progress(status, restantes, total) e sleep (pausa entre
+    passos) são repassados ao backup.
+    Retorna o caminho da cópia; quem chamou apaga o arquivo quando terminar.
+    """
+    if dest_path is None:
+        fd, dest_path = tempfile.mkstemp(prefix='pdv-relatorio-', suffix='.db')
+        os.close(fd)
+
+    own_source = source_conn is None
+    source = connect_readonly() if own_source else source_conn
+    if source is None:
+        raise sqlite3.OperationalError("não foi possível abrir o banco para o snapshot")
+    try:
+        dest = sqlite3.connect(dest_path)
+        try:
+            source.backup(dest, pages=pages, progress=progress, sleep=sleep)
+        finally:
+            dest.close()
+    except Exception:
+        os.remove(dest_path)
+        raise
+    finally:
+        if own_source:
+            source.close()
+    return dest_path
+
 
 def _check_and_update_tables(conn):
     """
@@ -62,6 +152,55 @@ def _check_and_update_tables(conn):
     conn.commit()
 
 
+SEARCH_INDEXES = {
+    'idx_produtos_nome_busca': 'Produtos(nome_busca)',
+    'idx_produtos_codigo_busca': 'Produtos(codigo_busca)',
+}
+
+
+def create_search_indexes(cursor):
+    """Cria os índices das chaves de busca (se ainda não existirem)."""
+    for index_name, target in SEARCH_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {target}")
+
+
+def drop_search_indexes(cursor):
+    """Remove os índices de busca (usado na importação em massa, que os recria uma vez no fim)."""
+    for index_name in SEARCH_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+def _ensure_search_columns(conn):
+    """
+    Garante as colunas nome_busca/codigo_busca em Produtos e seus índices.
+    As chaves são gravadas pela aplicação (search_keys_for); o gatilho abaixo só
+    as invalida (NULL) quando nome/código mudam por outro caminho (ex: edição direta
+    no QSqlTableModel), para que refresh_search_keys as recalcule.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(Produtos)")
+    columns = [info[1] for info in cursor.fetchall()]
+
+    if 'nome_busca' not in columns:
+        print("LOG: Adicionando colunas de busca normalizada à tabela Produtos.")
+        cursor.execute("ALTER TABLE Produtos ADD COLUMN nome_busca TEXT")
+    if 'codigo_busca' not in columns:
+        cursor.execute("ALTER TABLE Produtos ADD COLUMN codigo_busca TEXT")
+
+    create_search_indexes(cursor)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_invalida_busca
+        AFTER UPDATE OF nome, codigo ON Produtos
+        WHEN NEW.nome_busca IS OLD.nome_busca
+             AND (NEW.nome IS NOT OLD.nome OR NEW.codigo IS NOT OLD.codigo)
+        BEGIN
+            UPDATE Produtos SET nome_busca = NULL, codigo_busca = NULL WHERE id = NEW.id;
+        END
+    """)
+    conn.commit()
+
+
 def create_and_populate_tables(conn):
     """
     Cria as tabelas do sistema, executa migrações necessárias e popula com dados iniciais.
@@ -84,9 +223,14 @@ def create_and_populate_tables(conn):
             quantidade REAL NOT NULL DEFAULT 0, 
             tipo_medicao TEXT NOT NULL DEFAULT 'Unidade', 
             categoria TEXT NOT NULL, 
-            ativo INTEGER NOT NULL DEFAULT 1 
+            ativo INTEGER NOT NULL DEFAULT 1,
+            nome_busca TEXT,   -- nome normalizado (sem acentos/pontuação) para busca
+            codigo_busca TEXT  -- código normalizado para busca
         );
     """)
+
+    # 1.1. Chaves de busca pré-calculadas (migração + índices)
+    _ensure_search_columns(conn)
     
     # 2. Tabela Funcionarios
     cursor.execute("""
@@ -151,6 +295,46 @@ def create_and_populate_tables(conn):
         )
     """)
 
+    # 6. Tabela HistoricoPrecos (auditoria dos reajustes de preço)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS HistoricoPrecos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codigo TEXT NOT NULL,
+            preco_anterior REAL NOT NULL,
+            preco_novo REAL NOT NULL,
+            data_hora TEXT NOT NULL,
+            lote TEXT NOT NULL,          -- identifica o reajuste (todas as linhas de uma aplicação)
+            motivo TEXT,
+            id_funcionario INTEGER,
+            FOREIGN KEY (codigo) REFERENCES Produtos(codigo),
+            FOREIGN KEY (id_funcionario) REFERENCES Funcionarios(id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_historico_precos_codigo ON HistoricoPrecos(codigo)")
+
+    # 7. Ledger de estoque (MovimentosEstoque) e fotografias de saldo (SaldosEstoque)
+    ensure_stock_ledger_tables(conn)
+
+    # 8. Reservas de estoque entre caixas (modo PDV_RESERVA_ESTOQUE)
+    ensure_reservation_table(conn)
+
+    # 9. Diário de alterações (CDC) de Produtos, Vendas e Caixa
+    ensure_change_feed(conn)
+    prune_changes(conn)
+
+    # 10. Itens/pagamentos por venda (detalhe da venda, sincronização e arquivamento em lotes)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_itens_venda_venda ON ItensVenda(venda_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pagamentos_venda_venda ON PagamentosVenda(venda_id)")
+
+    # 11. Totais acumulados por sessão de caixa e forma de pagamento
+    ensure_caixa_totals_table(conn)
+
+    # 12. Fila de impressão persistida (recibos reimprimíveis pelo id da venda)
+    ensure_print_spool_table(conn)
+
+    # 13. Fila fiscal (NFC-e montadas, assinadas e autorizadas em segundo plano)
+    ensure_fiscal_table(conn)
+
     # --- Popula as tabelas APENAS se estiverem vazias ---
     
     # Popula Produtos
@@ -169,10 +353,10 @@ def create_and_populate_tables(conn):
         
         cursor.executemany("""
             INSERT INTO Produtos (
-                codigo, nome, preco, quantidade, tipo_medicao, categoria
+                codigo, nome, preco, quantidade, tipo_medicao, categoria, nome_busca, codigo_busca
             ) 
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, produtos_iniciais)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [p + search_keys_for(p[0], p[1]) for p in produtos_iniciais])
         print("LOG: Produtos iniciais populados.")
 
     # Popula Administrador Inicial
@@ -187,6 +371,12 @@ def create_and_populate_tables(conn):
 
     conn.commit()
 
+    # Preenche as chaves de bancos antigos ou de produtos editados por fora do cadastro
+    refresh_search_keys(conn)
+
+    # Fotografa os saldos de estoque uma vez por dia (na primeira vez, registra o saldo inicial)
+    maybe_take_stock_snapshot(conn)
+
 # --- FUNÇÕES DE DECREMENTO DE ESTOQUE, FINALIZAÇÃO DE VENDA, etc. ---
 # (Mantidas inalteradas, pois o fluxo atômico é tratado no VendasController)
 
@@ -252,37 +442,127 @@ def get_all_products(conn):
     """)
     return cursor.fetchall()
 
-def update_stock_after_sale(conn, cart_items):
+def update_stock_after_sale(conn, cart_items, venda_id=None, id_funcionario=None):
     """
-    Subtrai a quantidade vendida do estoque de cada produto.
+    Subtrai a quantidade vendida do estoque de cada produto e registra os movimentos
+    de 'venda' no ledger (MovimentosEstoque), tudo em lote e SEM commit: a baixa faz
+    parte da transação da venda.
     Assume que 'cart_items' são dicionários com 'codigo', 'quantidade', 'nome'.
     """
     
     cursor = conn.cursor()
     low_stock_alerts = []
-    
+
+    # 1. Baixa + ledger em lote (executemany)
+    record_stock_movements(
+        cursor,
+        [(item['codigo'], -item['quantidade']) for item in cart_items],
+        TIPO_VENDA,
+        referencia=f"venda:{venda_id}" if venda_id else None,
+        id_funcionario=id_funcionario
+    )
+
+    # 2. Verifica o nível de estoque após a baixa (uma consulta para todos os itens)
+    codes = list({item['codigo'] for item in cart_items})
+    if not codes:
+        return low_stock_alerts
+
+    cursor.execute(
+        f"SELECT codigo, quantidade FROM Produtos WHERE codigo IN ({','.join('?' * len(codes))})",
+        codes
+    )
+    stock_by_code = dict(cursor.fetchall())
+
+    alerted = set()
     for item in cart_items:
-        product_code = item['codigo'] 
-        quantity_sold = item['quantidade']
-        product_name = item['nome']
-        
-        # 1. Subtrai a quantidade vendida (Usando codigo)
-        cursor.execute("""
-            UPDATE Produtos 
-            SET quantidade = quantidade - ? 
-            WHERE codigo = ?; 
-        """, (quantity_sold, product_code))
-        
-        # 2. Verifica o nível de estoque após a baixa
-        cursor.execute("SELECT quantidade FROM Produtos WHERE codigo = ?", (product_code,))
-        
-        result = cursor.fetchone()
-        if result is None:
+        product_code = item['codigo']
+        if product_code not in stock_by_code:
             raise Exception(f"Produto não encontrado no DB durante a baixa de estoque: Código {product_code}")
-            
-        current_stock = result[0]
         
-        if current_stock <= LOW_STOCK_THRESHOLD:
-            low_stock_alerts.append(f"⚠️ {product_name}: Apenas {current_stock} em estoque!")
+        current_stock = stock_by_code[product_code]
+        
+        if current_stock <= LOW_STOCK_THRESHOLD and product_code not in alerted:
+            alerted.add(product_code)
+            low_stock_alerts.append(f"⚠️ {item['nome']}: Apenas {current_stock} em estoque!")
             
-    return low_stock_alerts
\ No newline at end of file
+    return low_stock_alerts
+
+
+# --- CHAVES DE BUSCA NORMALIZADAS (nome_busca / codigo_busca) ---
+
+# Caractere maior que qualquer um das chaves ([a-z0-9 ]): fecha a faixa da busca por prefixo
+SEARCH_PREFIX_END = '~'
+
+
+def search_keys_for(codigo, nome) -> tuple:
+    """Retorna a tupla (nome_busca, codigo_busca) a ser gravada junto com o produto."""
+    return normalize_search_text(nome), normalize_search_text(codigo)
+
+
+def refresh_search_keys(conn) -> int:
+    """
+    Recalcula as chaves de busca que estiverem NULL (produtos antigos, importados ou
+    editados por fora do cadastro). Usa o índice de nome_busca, então é barato quando
+    não há pendências. Retorna o número de produtos atualizados.
+    """
+    if conn is None:
+        return 0
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT id, codigo, nome FROM Produtos
+            WHERE nome_busca IS NULL OR codigo_busca IS NULL
+        """)
+        pendentes = [(*search_keys_for(codigo, nome), produto_id) for produto_id, codigo, nome in cursor.fetchall()]
+        if not pendentes:
+            return 0
+
+        cursor.executemany(
+            "UPDATE Produtos SET nome_busca = ?, codigo_busca = ? WHERE id = ?", pendentes
+        )
+        conn.commit()
+        return len(pendentes)
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro ao atualizar chaves de busca: {e}")
+        return 0
+
+
+def search_products(conn, search_text: str) -> list:
+    """
+    Busca de produtos por código ou nome, sem acentos/pontuação, nas chaves
+    pré-calculadas (gravadas no cadastro/importação/sincronização e por
+    refresh_search_keys; a busca não grava nada).
+    Primeiro vêm os que começam com o termo (faixa que usa os índices de nome_busca
+    e codigo_busca), depois os que só o contêm (LIKE, varre a tabela), sem repetir.
+    Retorna tuplas (codigo, nome, preco, tipo_medicao, categoria), cada grupo ordenado por nome.
+    """
+    if conn is None:
+        return []
+
+    termo = normalize_search_text(search_text)
+    if not termo:
+        return []
+
+    # A chave só contém [a-z0-9 ]; '~' vem depois de todos eles, então
+    # [termo, termo + '~') é exatamente "começa com termo". Pelo mesmo motivo não há
+    # curingas do LIKE para escapar.
+    fim = termo + SEARCH_PREFIX_END
+    padrao = f"%{termo}%"
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT codigo, nome, preco, tipo_medicao, categoria FROM (
+            SELECT codigo, nome, preco, tipo_medicao, categoria, 0 AS contem
+            FROM Produtos
+            WHERE (codigo_busca >= :termo AND codigo_busca < :fim)
+               OR (nome_busca >= :termo AND nome_busca < :fim)
+            UNION ALL
+            SELECT codigo, nome, preco, tipo_medicao, categoria, 1 AS contem
+            FROM Produtos
+            WHERE (codigo_busca LIKE :padrao OR nome_busca LIKE :padrao)
+              AND NOT (codigo_busca >= :termo AND codigo_busca < :fim)
+              AND NOT (nome_busca >= :termo AND nome_busca < :fim)
+        )
+        ORDER BY contem, nome
+    """, {'termo': termo, 'fim': fim, 'padrao': padrao})
+    return cursor.fetchall()
\ No newline at end of file
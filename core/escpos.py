@@ -0,0 +1,294 @@
+# core/escpos.py
+"""
+Saída para impressora térmica ESC/POS.
+
+O cupom é montado uma vez só num bytearray (EscPosBuilder) com os comandos ESC/POS e o
+texto já codificado na página de código da impressora (CP860, português: ç, ã, é...).
+Os bytes vão para uma fila; a thread PrintQueue entrega na impressora (arquivo de
+dispositivo, socket TCP ou arquivo comum para testes). O operador nunca espera a
+impressora entre um cliente e outro; se ela estiver sem papel/desligada, a thread tenta de novo.
+
+Configuração (opcional): PDV_IMPRESSORA
+  - dev:/dev/usb/lp0        -> arquivo de dispositivo (USB/paralela)
+  - tcp:192.168.0.50:9100   -> impressora de rede (porta RAW 9100)
+  - arquivo:/tmp/cupom.bin  -> grava os bytes no arquivo (testes)
+Sem PDV_IMPRESSORA o PrinterManager continua imprimindo no console.
+"""
+
+import os
+import queue
+import socket
+import threading
+
+ENV_PRINTER = 'PDV_IMPRESSORA'
+
+ESC = b'\x1b'
+GS = b'\x1d'
+
+# Página de código: ESC t n (n=3 é a PC860 Português nas Epson e compatíveis)
+CODEPAGE = 'cp860'
+CODEPAGE_SELECT = ESC + b't\x03'
+
+INIT = ESC + b'@'
+ALIGN_LEFT, ALIGN_CENTER, ALIGN_RIGHT = 0, 1, 2
+
+# Código de barras (GS k, formato B: m, n, dados)
+BARCODE_EAN13 = 67
+BARCODE_CODE128 = 73
+
+# QR Code: nível de correção de erro (GS ( k, função 169)
+QR_EC_LEVELS = {'L': 48, 'M': 49, 'Q': 50, 'H': 51}
+
+DEFAULT_TCP_PORT = 9100
+SOCKET_TIMEOUT = 5.0
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 3.0
+
+
+class EscPosBuilder:
+    """
+    Monta o conteúdo de um cupom num único bytearray (sem concatenar strings).
+    Os métodos retornam self para encadear: EscPosBuilder().bold().line("X").cut().
+    """
+
+    def __init__(self, codepage: str = CODEPAGE):
+        self.codepage = codepage
+        self.buffer = bytearray(INIT)
+        self.buffer += CODEPAGE_SELECT
+
+    def raw(self, data: bytes):
+        self.buffer += data
+        return self
+
+    def text(self, texto: str):
+        # Caracteres fora da página de código viram '?' em vez de derrubar a impressão
+        self.buffer += texto.encode(self.codepage, errors='replace')
+        return self
+
+    def line(self, texto: str = ''):
+        self.text(texto)
+        self.buffer += b'\n'
+        return self
+
+    def lines(self, texto: str):
+        """Texto de várias linhas (ex: o recibo formatado do PrinterManager)."""
+        self.text(texto)
+        if not texto.endswith('\n'):
+            self.buffer += b'\n'
+        return self
+
+    def align(self, alinhamento: int = ALIGN_LEFT):
+        self.buffer += ESC + b'a' + bytes((alinhamento,))
+        return self
+
+    def bold(self, ligado: bool = True):
+        self.buffer += ESC + b'E' + (b'\x01' if ligado else b'\x00')
+        return self
+
+    def double(self, ligado: bool = True):
+        """Letra em altura e largura duplas (GS ! n)."""
+        self.buffer += GS + b'!' + (b'\x11' if ligado else b'\x00')
+        return self
+
+    def feed(self, linhas: int = 1):
+        self.buffer += ESC + b'd' + bytes((max(0, min(linhas, 255)),))
+        return self
+
+    def cut(self, parcial: bool = True, avanco: int = 3):
+        """Avança o papel até a guilhotina e corta (GS V 66 n)."""
+        self.buffer += GS + b'V' + (b'\x42' if parcial else b'\x41') + bytes((max(0, min(avanco, 255)),))
+        return self
+
+    def barcode(self, dados: str, tipo: int = BARCODE_CODE128, altura: int = 80, texto_abaixo: bool = True):
+        dados_bytes = dados.encode('ascii')
+        if tipo == BARCODE_CODE128:
+            dados_bytes = b'{B' + dados_bytes  # Code set B
+        if len(dados_bytes) > 255:
+            raise ValueError("código de barras muito longo")
+        self.buffer += GS + b'h' + bytes((max(1, min(altura, 255)),))
+        self.buffer += GS + b'H' + (b'\x02' if texto_abaixo else b'\x00')
+        self.buffer += GS + b'k' + bytes((tipo, len(dados_bytes))) + dados_bytes
+        self.buffer += b'\n'
+        return self
+
+    def qrcode(self, dados: str, tamanho: int = 6, correcao: str = 'M'):
+        """QR Code nativo da impressora (modelo 2), ex: a URL de consulta da NFC-e."""
+        dados_bytes = dados.encode('utf-8')
+        if len(dados_bytes) > 7089:
+            raise ValueError("conteúdo muito longo para QR Code")
+
+        def funcao(fn: int, parametros: bytes) -> bytes:
+            tamanho_bloco = len(parametros) + 3
+            return GS + b'(k' + bytes((tamanho_bloco & 0xFF, tamanho_bloco >> 8, 49, fn)) + parametros
+
+        self.buffer += funcao(65, b'\x32\x00')                               # modelo 2
+        self.buffer += funcao(67, bytes((max(1, min(tamanho, 16)),)))         # tamanho do módulo
+        self.buffer += funcao(69, bytes((QR_EC_LEVELS.get(correcao, 49),)))   # correção de erro
+        self.buffer += funcao(80, b'\x30' + dados_bytes)                     # armazena os dados
+        self.buffer += funcao(81, b'\x30')                                   # imprime
+        self.buffer += b'\n'
+        return self
+
+    def build(self) -> bytes:
+        return bytes(self.buffer)
+
+
+def text_to_escpos(texto: str, cortar: bool = True) -> bytes:
+    """Converte um texto já formatado (relatórios, fechamento) em bytes ESC/POS."""
+    builder = EscPosBuilder().lines(texto)
+    if cortar:
+        builder.cut()
+    return builder.build()
+
+
+# ----------------------------------------------------
+# --- DESTINOS (SINKS) ---
+# ----------------------------------------------------
+
+class DeviceSink:
+    """Arquivo de dispositivo da impressora (ex: /dev/usb/lp0)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, data: bytes):
+        with open(self.path, 'wb', buffering=0) as device:
+            device.write(data)
+
+    def __str__(self):
+        return f"dispositivo {self.path}"
+
+
+class FileSink:
+    """Acrescenta os bytes num arquivo comum (testes e depuração)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, data: bytes):
+        with open(self.path, 'ab') as arquivo:
+            arquivo.write(data)
+
+    def __str__(self):
+        return f"arquivo {self.path}"
+
+
+class TcpSink:
+    """Impressora de rede na porta RAW (9100)."""
+
+    def __init__(self, host: str, port: int = DEFAULT_TCP_PORT, timeout: float = SOCKET_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def write(self, data: bytes):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as conexao:
+            conexao.sendall(data)
+
+    def __str__(self):
+        return f"impressora {self.host}:{self.port}"
+
+
+def create_sink(destination: str):
+    """'dev:caminho', 'tcp:host[:porta]' ou 'arquivo:caminho'. Levanta ValueError se inválido."""
+    tipo, _, alvo = destination.partition(':')
+    if not alvo:
+        raise ValueError(f"destino de impressão inválido: {destination!r}")
+    tipo = tipo.lower()
+    if tipo == 'dev':
+        return DeviceSink(alvo)
+    if tipo == 'arquivo':
+        return FileSink(alvo)
+    if tipo == 'tcp':
+        host, _, porta = alvo.partition(':')
+        return TcpSink(host, int(porta) if porta else DEFAULT_TCP_PORT)
+    raise ValueError(f"tipo de destino de impressão desconhecido: {tipo!r}")
+
+
+# ----------------------------------------------------
+# --- FILA DE IMPRESSÃO ---
+# ----------------------------------------------------
+
+class PrintQueue(threading.Thread):
+    """
+    Thread que entrega os cupons (bytes) no destino, em ordem, com novas tentativas.
+    É a única que escreve na impressora: o spooler (FilaImpressao) também entrega por aqui,
+    com on_done, para dois cupons nunca saírem intercalados.
+    """
+
+    def __init__(self, sink, max_attempts: int = MAX_ATTEMPTS, retry_delay: float = RETRY_DELAY):
+        super().__init__(name="PrintQueue", daemon=True)
+        self.sink = sink
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._jobs = queue.Queue()
+        self._stop_event = threading.Event()
+
+    def submit(self, data: bytes, descricao: str = 'cupom', on_done=None):
+        """
+        Coloca o trabalho na fila e volta na hora (não espera a impressora).
+        on_done(erro): chamado nesta thread depois de uma tentativa só (erro None se
+        imprimiu, ou o OSError); quem passa on_done cuida das novas tentativas.
+        """
+        self._jobs.put((data, descricao, on_done))
+
+    def pending(self) -> int:
+        return self._jobs.qsize()
+
+    def stop(self, timeout: float = None):
+        """Para a thread depois de esvaziar a fila (timeout: quanto esperar por ela)."""
+        self._stop_event.set()
+        self._jobs.put(None)
+        if timeout is not None and self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            data, descricao, on_done = job
+            if on_done is None:
+                self._deliver(data, descricao)
+                continue
+            try:
+                self.sink.write(data)
+            except OSError as e:
+                on_done(e)
+            else:
+                on_done(None)
+
+    def _deliver(self, data: bytes, descricao: str):
+        for tentativa in range(1, self.max_attempts + 1):
+            try:
+                self.sink.write(data)
+                return True
+            except OSError as e:
+                if tentativa == self.max_attempts or self._stop_event.is_set():
+                    print(f"Erro ao imprimir {descricao} em {self.sink} (desistindo após {tentativa} tentativa(s)): {e}")
+                    return False
+                print(f"Erro ao imprimir {descricao} em {self.sink} (tentativa {tentativa}, nova em {self.retry_delay:.0f}s): {e}")
+                self._stop_event.wait(self.retry_delay)
+        return False
+
+
+def printer_destination():
+    """Destino da impressora configurado (ou None: imprime no console)."""
+    return os.environ.get(ENV_PRINTER) or None
+
+
+def start_print_queue_from_env():
+    """Cria e inicia a fila de impressão se PDV_IMPRESSORA estiver definida; senão None."""
+    destination = printer_destination()
+    if not destination:
+        return None
+    try:
+        sink = create_sink(destination)
+    except ValueError as e:
+        print(f"Erro na configuração da impressora ({ENV_PRINTER}): {e}")
+        return None
+    print_queue = PrintQueue(sink)
+    print_queue.start()
+    print(f"LOG: Impressão ESC/POS ativa ({sink}).")
+    return print_queue
@@ -0,0 +1,135 @@
+# core/formatting.py
+"""
+Formatação de números no padrão brasileiro (R$ 1.234,56), sem depender do locale do
+sistema nem de QLocale.
+
+Um lugar só para o que estava copiado em cada tela:
+    f"R$ {v:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+
+  - brl / numero_br / peso_br: um valor; memoizados (as tabelas repintam sempre os
+    mesmos preços, então a maioria das chamadas vira uma consulta num dict);
+  - brl_many / numero_br_many: uma coluna inteira de uma vez (modelos de tabela, relatórios):
+    cada valor distinto é consultado no cache uma vez só e os que faltam são formatados
+    juntos, numa string só, com uma troca de ',' e '.' para o lote inteiro.
+
+Comparação com o idioma antigo: python -m core.formatting --benchmark
+"""
+
+import argparse
+import timeit
+
+# Limite do cache por formatador (preços distintos de uma loja cabem folgado)
+CACHE_MAX = 50000
+
+_SEP = '\n'
+
+
+def _swap(texto: str) -> str:
+    """'1,234.56' -> '1.234,56'."""
+    return texto.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def _memoized(formato: str, prefixo: str = ''):
+    cache = {}
+
+    def formatar(valor) -> str:
+        try:
+            return cache[valor]
+        except KeyError:
+            pass
+        except TypeError:  # valor não-hashable: formata sem guardar
+            return prefixo + _swap(format(valor, formato))
+        # + 0.0: -0.0 e 0.0 são a mesma chave no dict; os dois saem "0,00"
+        texto = prefixo + _swap(format(valor + 0.0, formato))
+        if len(cache) < CACHE_MAX:
+            cache[valor] = texto
+        return texto
+
+    def formatar_varios(valores) -> list:
+        valores = valores if isinstance(valores, list) else list(valores)
+        # Só os valores distintos que ainda não estão no cache são formatados, todos juntos:
+        # uma string só e uma troca de ',' e '.' para o lote (o separador não tem nenhum dos dois)
+        novos = [valor for valor in dict.fromkeys(valores) if valor not in cache]
+        if novos:
+            partes = _swap(_SEP.join([format(valor + 0.0, formato) for valor in novos])).split(_SEP)
+            novos = dict(zip(novos, [prefixo + parte for parte in partes] if prefixo else partes))
+            if len(cache) + len(novos) > CACHE_MAX:
+                return [cache[valor] if valor in cache else novos[valor] for valor in valores]
+            cache.update(novos)
+        return list(map(cache.__getitem__, valores))
+
+    formatar.cache = cache
+    return formatar, formatar_varios
+
+
+brl, brl_many = _memoized(',.2f', 'R$ ')
+brl.__doc__ = "1234.5 -> 'R$ 1.234,50'."
+
+numero_br, numero_br_many = _memoized(',.2f')
+numero_br.__doc__ = "1234.5 -> '1.234,50'."
+
+peso_br, peso_br_many = _memoized(',.3f')
+peso_br.__doc__ = "1.5 -> '1,500' (3 casas, balança)."
+
+
+def parse_br(texto: str) -> float:
+    """'R$ 1.234,56' / '1234,56' -> 1234.56. Levanta ValueError se não for número."""
+    texto = texto.replace('R$', '').strip().replace('.', '').replace(',', '.')
+    return float(texto)
+
+
+def clear_cache():
+    for formatador in (brl, numero_br, peso_br):
+        formatador.cache.clear()
+
+
+# ----------------------------------------------------
+# --- BENCHMARK ---
+# ----------------------------------------------------
+
+def _idioma_antigo(valor) -> str:
+    return f"R$ {valor:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+
+
+def benchmark(n: int = 10000, distintos: int = 500, repeticoes: int = 5) -> dict:
+    """
+    Tempo (µs por valor) do idioma antigo x brl (cache frio e quente) x brl_many,
+    numa coluna de n valores com 'distintos' preços diferentes (como uma tabela de produtos).
+    """
+    valores = [round((i % distintos) * 1.37 + 0.99, 2) for i in range(n)]
+    assert [_idioma_antigo(v) for v in valores] == brl_many(valores)
+
+    def medir(funcao, preparar=None):
+        tempos = []
+        for _ in range(repeticoes):
+            if preparar:
+                preparar()
+            tempos.append(timeit.timeit(funcao, number=1))
+        return min(tempos) / n * 1e6
+
+    resultado = {
+        'idioma_antigo': medir(lambda: [_idioma_antigo(v) for v in valores]),
+        'brl_cache_frio': medir(lambda: [brl(v) for v in valores], clear_cache),
+        'brl_cache_quente': medir(lambda: [brl(v) for v in valores]),
+        'brl_many_cache_frio': medir(lambda: brl_many(valores), clear_cache),
+        'brl_many_cache_quente': medir(lambda: brl_many(valores)),
+    }
+    clear_cache()
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Formatação BRL do PDV.")
+    parser.add_argument('--benchmark', action='store_true', help="compara com o idioma antigo de replace")
+    parser.add_argument('-n', type=int, default=10000, help="quantidade de valores no benchmark")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        for nome, us in benchmark(args.n).items():
+            print(f"{nome:<22} {us:8.3f} µs/valor")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
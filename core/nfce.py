@@ -0,0 +1,454 @@
+# core/nfce.py
+"""
+Documento fiscal NFC-e (modelo 65, layout 4.00): montagem do XML, assinatura e QR Code.
+
+A partir da venda gravada (load_sale: Vendas/ItensVenda/PagamentosVenda) monta o infNFe
+com ElementTree, calcula a chave de acesso (44 dígitos, DV módulo 11), assina com o
+certificado A1 do emitente (XMLDSig envelopada, RSA-SHA1, C14N, como a SEFAZ exige) e
+acrescenta o infNFeSupl com a URL do QR Code (versão 2, online ou contingência offline).
+
+Quem transmite e guarda os documentos é o core.nfce_queue; aqui só há funções puras
+(nada de banco nem rede), usadas também pelo SEFAZ de testes (core.sefaz_mock).
+
+Configuração do emitente (variáveis de ambiente):
+    PDV_NFCE_CNPJ, PDV_NFCE_RAZAO, PDV_NFCE_IE, PDV_NFCE_UF (sigla), PDV_NFCE_MUNICIPIO
+    (código IBGE), PDV_NFCE_CIDADE, PDV_NFCE_LOGRADOURO, PDV_NFCE_NUMERO, PDV_NFCE_BAIRRO,
+    PDV_NFCE_CEP, PDV_NFCE_SERIE (1), PDV_NFCE_AMBIENTE (1 produção, 2 homologação - padrão),
+    PDV_NFCE_CSC / PDV_NFCE_CSC_ID (código de segurança do contribuinte, para o QR Code),
+    PDV_NFCE_NCM (NCM padrão: o cadastro de produtos ainda não tem NCM),
+    PDV_NFCE_URL_CONSULTA (URL do QR Code da UF), PDV_NFCE_FUSO (-03:00)
+Certificado: PDV_NFCE_CERTIFICADO (.pfx/.p12 ou .pem com chave e certificado) e
+PDV_NFCE_SENHA. Assinar exige o pacote 'cryptography' (opcional, como o pyserial).
+"""
+
+import base64
+import copy
+import hashlib
+import os
+import random
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+try:
+    from cryptography import x509  # opcional: só necessário para assinar/verificar
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from cryptography.hazmat.primitives.serialization import pkcs12
+except ImportError:
+    x509 = None
+
+NFE_NS = 'http://www.portalfiscal.inf.br/nfe'
+DSIG_NS = 'http://www.w3.org/2000/09/xmldsig#'
+VERSAO = '4.00'
+MODELO = '65'
+
+TP_EMIS_NORMAL = 1
+TP_EMIS_OFFLINE = 9  # contingência offline da NFC-e (transmitida depois)
+XJUST_CONTINGENCIA = "SEFAZ indisponivel no momento da venda - emissao em contingencia offline"
+
+UF_CODIGOS = {
+    'RO': '11', 'AC': '12', 'AM': '13', 'RR': '14', 'PA': '15', 'AP': '16', 'TO': '17',
+    'MA': '21', 'PI': '22', 'CE': '23', 'RN': '24', 'PB': '25', 'PE': '26', 'AL': '27',
+    'SE': '28', 'BA': '29', 'MG': '31', 'ES': '32', 'RJ': '33', 'SP': '35', 'PR': '41',
+    'SC': '42', 'RS': '43', 'MS': '50', 'MT': '51', 'GO': '52', 'DF': '53',
+}
+
+# Forma de pagamento (tPag) pelo nome usado no checkout
+FORMAS_PAGAMENTO = (
+    ('dinheiro', '01'), ('créd', '03'), ('cred', '03'), ('déb', '04'), ('deb', '04'), ('pix', '17'),
+)
+TPAG_CARTAO = {'03', '04', '17'}
+
+_C14N = 'http://www.w3.org/TR/2001/REC-xml-c14n-20010315'
+
+
+class CertificadoError(Exception):
+    """Certificado ausente, ilegível ou 'cryptography' não instalado."""
+
+
+class NfceInvalidaError(ValueError):
+    """Documento que a SEFAZ recusaria (chave, totais, assinatura); cstat é o código de rejeição."""
+
+    def __init__(self, motivo: str, cstat: int = 225):
+        super().__init__(motivo)
+        self.cstat = cstat
+
+
+# ----------------------------------------------------
+# --- CONFIGURAÇÃO ---
+# ----------------------------------------------------
+
+def emitente_from_env() -> dict:
+    """Dados do emitente das variáveis PDV_NFCE_*. Levanta ValueError se faltar o essencial."""
+    env = os.environ.get
+    cnpj = ''.join(ch for ch in env('PDV_NFCE_CNPJ', '') if ch.isdigit())
+    uf = env('PDV_NFCE_UF', 'SP').upper()
+    if len(cnpj) != 14:
+        raise ValueError("PDV_NFCE_CNPJ não definido ou inválido (14 dígitos)")
+    if uf not in UF_CODIGOS:
+        raise ValueError(f"PDV_NFCE_UF inválida: {uf!r}")
+    if not env('PDV_NFCE_CSC'):
+        raise ValueError("PDV_NFCE_CSC não definido (necessário para o QR Code)")
+    return {
+        'cnpj': cnpj,
+        'razao': env('PDV_NFCE_RAZAO', 'NOME DA SUA EMPRESA S.A.'),
+        'ie': env('PDV_NFCE_IE', 'ISENTO'),
+        'uf': uf,
+        'cuf': UF_CODIGOS[uf],
+        'municipio': env('PDV_NFCE_MUNICIPIO', '3550308'),
+        'cidade': env('PDV_NFCE_CIDADE', 'SAO PAULO'),
+        'logradouro': env('PDV_NFCE_LOGRADOURO', 'RUA SEM NOME'),
+        'numero': env('PDV_NFCE_NUMERO', 'S/N'),
+        'bairro': env('PDV_NFCE_BAIRRO', 'CENTRO'),
+        'cep': env('PDV_NFCE_CEP', '01001000'),
+        'serie': int(env('PDV_NFCE_SERIE', '1')),
+        'ambiente': env('PDV_NFCE_AMBIENTE', '2'),
+        'csc': env('PDV_NFCE_CSC'),
+        'csc_id': env('PDV_NFCE_CSC_ID', '1'),
+        'ncm': env('PDV_NFCE_NCM', '21069090'),
+        'url_consulta': env('PDV_NFCE_URL_CONSULTA', 'https://www.homologacao.nfce.fazenda.sp.gov.br/qrcode'),
+        'fuso': env('PDV_NFCE_FUSO', '-03:00'),
+    }
+
+
+# ----------------------------------------------------
+# --- CHAVE DE ACESSO ---
+# ----------------------------------------------------
+
+def digito_modulo11(numero: str) -> int:
+    """DV da chave de acesso: pesos 2..9 da direita para a esquerda; resto 0 ou 1 -> 0."""
+    soma = 0
+    peso = 2
+    for digito in reversed(numero):
+        soma += int(digito) * peso
+        peso = 2 if peso == 9 else peso + 1
+    resto = soma % 11
+    return 0 if resto < 2 else 11 - resto
+
+
+def chave_acesso(cuf: str, aamm: str, cnpj: str, serie: int, numero: int, tp_emis: int, codigo: int) -> str:
+    base = f"{cuf}{aamm}{cnpj}{MODELO}{serie:03d}{numero:09d}{tp_emis}{codigo:08d}"
+    return base + str(digito_modulo11(base))
+
+
+def chave_valida(chave: str) -> bool:
+    return len(chave) == 44 and chave.isdigit() and digito_modulo11(chave[:43]) == int(chave[43])
+
+
+# ----------------------------------------------------
+# --- MONTAGEM DO XML ---
+# ----------------------------------------------------
+
+def _sub(pai, tag: str, texto=None):
+    elemento = ET.SubElement(pai, f'{{{NFE_NS}}}{tag}')
+    if texto is not None:
+        elemento.text = str(texto)
+    return elemento
+
+
+def _grupo(pai, tag: str, campos: list):
+    """Grupo com filhos simples, na ordem do leiaute: [(tag, texto), ...]."""
+    elemento = _sub(pai, tag)
+    for filho, texto in campos:
+        _sub(elemento, filho, texto)
+    return elemento
+
+
+def _v(valor: float) -> str:
+    return f"{valor:.2f}"
+
+
+def _ratear(total: float, bases: list) -> list:
+    """Divide 'total' (centavos exatos) proporcionalmente às bases; a última linha leva o arredondamento."""
+    centavos = round(total * 100)
+    soma = sum(bases)
+    if not centavos or not soma:
+        return [0.0] * len(bases)
+    partes = [int(centavos * base / soma) for base in bases]
+    partes[-1] += centavos - sum(partes)
+    return [parte / 100 for parte in partes]
+
+
+def _tpag(metodo: str) -> str:
+    nome = (metodo or '').lower()
+    for trecho, codigo in FORMAS_PAGAMENTO:
+        if trecho in nome:
+            return codigo
+    return '99'
+
+
+def _data_hora(data_hora: str, fuso: str) -> str:
+    """'2025-01-31 14:05:00' (Vendas.data_hora) -> '2025-01-31T14:05:00-03:00'."""
+    return data_hora.replace(' ', 'T')[:19] + fuso
+
+
+def build_nfce(venda_data: dict, itens: list, pagamentos: list, emitente: dict, numero: int,
+               tp_emis: int = TP_EMIS_NORMAL, dh_cont: str = None, codigo: int = None):
+    """
+    Monta o infNFe da venda (ainda sem assinatura). Retorna (chave, elemento infNFe).
+    Os itens podem trazer 'unidade' ('UN'/'KG'); desconto e taxa de serviço da venda são
+    rateados pelos itens (vDesc/vOutro), para o total bater com o somatório dos itens.
+    """
+    if not itens:
+        raise NfceInvalidaError(f"venda #{venda_data.get('id')} sem itens")
+
+    serie = emitente['serie']
+    data_hora = venda_data['data_hora']
+    aamm = data_hora[2:4] + data_hora[5:7]
+    if codigo is None:
+        codigo = random.SystemRandom().randrange(100000000)
+        if codigo == numero:
+            codigo = (codigo + 1) % 100000000
+    chave = chave_acesso(emitente['cuf'], aamm, emitente['cnpj'], serie, numero, tp_emis, codigo)
+
+    # Totais: vNF = vProd - vDesc + vOutro, com vDesc/vOutro rateados pelos itens
+    valores_prod = [round(item['quantidade'] * item['preco_unitario'], 2) for item in itens]
+    v_prod = round(sum(valores_prod), 2)
+    v_outro = round(venda_data.get('taxa_servico') or 0.0, 2)
+    v_desc = round(v_prod + v_outro - venda_data['total_venda'], 2)
+    if v_desc < 0:  # total acima do bruto sem taxa registrada: a diferença vai para vOutro
+        v_outro, v_desc = round(v_outro - v_desc, 2), 0.0
+    descontos = _ratear(v_desc, valores_prod)
+    outros = _ratear(v_outro, valores_prod)
+    v_nf = round(v_prod - v_desc + v_outro, 2)
+
+    inf = ET.Element(f'{{{NFE_NS}}}infNFe', {'Id': 'NFe' + chave, 'versao': VERSAO})
+
+    ide = [
+        ('cUF', emitente['cuf']), ('cNF', f"{codigo:08d}"), ('natOp', 'VENDA'), ('mod', MODELO),
+        ('serie', serie), ('nNF', numero), ('dhEmi', _data_hora(data_hora, emitente['fuso'])),
+        ('tpNF', 1), ('idDest', 1), ('cMunFG', emitente['municipio']), ('tpImp', 4),
+        ('tpEmis', tp_emis), ('cDV', chave[-1]), ('tpAmb', emitente['ambiente']), ('finNFe', 1),
+        ('indFinal', 1), ('indPres', 1), ('procEmi', 0), ('verProc', 'PDV 1.0'),
+    ]
+    if tp_emis != TP_EMIS_NORMAL:
+        ide += [('dhCont', dh_cont or _data_hora(data_hora, emitente['fuso'])), ('xJust', XJUST_CONTINGENCIA)]
+    _grupo(inf, 'ide', ide)
+
+    emit = _grupo(inf, 'emit', [('CNPJ', emitente['cnpj']), ('xNome', emitente['razao'])])
+    _grupo(emit, 'enderEmit', [
+        ('xLgr', emitente['logradouro']), ('nro', emitente['numero']), ('xBairro', emitente['bairro']),
+        ('cMun', emitente['municipio']), ('xMun', emitente['cidade']), ('UF', emitente['uf']),
+        ('CEP', emitente['cep']),
+    ])
+    _sub(emit, 'IE', emitente['ie'])
+    _sub(emit, 'CRT', 1)  # Simples Nacional
+
+    for n, (item, valor_prod, desconto, outro) in enumerate(zip(itens, valores_prod, descontos, outros), start=1):
+        det = _sub(inf, 'det')
+        det.set('nItem', str(n))
+        unidade = item.get('unidade', 'UN')
+        quantidade = f"{item['quantidade']:.4f}"
+        preco = f"{item['preco_unitario']:.2f}"
+        prod = [
+            ('cProd', item['codigo']), ('cEAN', 'SEM GTIN'), ('xProd', item['nome'][:120]),
+            ('NCM', item.get('ncm', emitente['ncm'])), ('CFOP', 5102), ('uCom', unidade),
+            ('qCom', quantidade), ('vUnCom', preco), ('vProd', _v(valor_prod)), ('cEANTrib', 'SEM GTIN'),
+            ('uTrib', unidade), ('qTrib', quantidade), ('vUnTrib', preco),
+        ]
+        if desconto:
+            prod.append(('vDesc', _v(desconto)))
+        if outro:
+            prod.append(('vOutro', _v(outro)))
+        prod.append(('indTot', 1))
+        _grupo(det, 'prod', prod)
+
+        imposto = _sub(det, 'imposto')
+        _grupo(_sub(imposto, 'ICMS'), 'ICMSSN102', [('orig', 0), ('CSOSN', 102)])
+        _grupo(_sub(imposto, 'PIS'), 'PISNT', [('CST', '07')])
+        _grupo(_sub(imposto, 'COFINS'), 'COFINSNT', [('CST', '07')])
+
+    total = _sub(inf, 'total')
+    _grupo(total, 'ICMSTot', [
+        ('vBC', '0.00'), ('vICMS', '0.00'), ('vICMSDeson', '0.00'), ('vFCP', '0.00'), ('vBCST', '0.00'),
+        ('vST', '0.00'), ('vFCPST', '0.00'), ('vFCPSTRet', '0.00'), ('vProd', _v(v_prod)),
+        ('vFrete', '0.00'), ('vSeg', '0.00'), ('vDesc', _v(v_desc)), ('vII', '0.00'), ('vIPI', '0.00'),
+        ('vIPIDevol', '0.00'), ('vPIS', '0.00'), ('vCOFINS', '0.00'), ('vOutro', _v(v_outro)),
+        ('vNF', _v(v_nf)),
+    ])
+    _grupo(inf, 'transp', [('modFrete', 9)])
+
+    pag = _sub(inf, 'pag')
+    for pagamento in pagamentos or [{'method': 'Dinheiro', 'value': v_nf}]:
+        tpag = _tpag(pagamento['method'])
+        det_pag = _grupo(pag, 'detPag', [('tPag', tpag)])
+        if tpag == '99':
+            _sub(det_pag, 'xPag', (pagamento['method'] or 'Outros')[:60])
+        _sub(det_pag, 'vPag', _v(pagamento['value']))
+        if tpag in TPAG_CARTAO:
+            _grupo(det_pag, 'card', [('tpIntegra', 2)])  # maquininha não integrada
+    troco = venda_data.get('troco') or 0.0
+    if troco > 0:
+        _sub(pag, 'vTroco', _v(troco))
+
+    return chave, inf
+
+
+# ----------------------------------------------------
+# --- ASSINATURA ---
+# ----------------------------------------------------
+
+def xml_text(elemento, namespace: str = NFE_NS) -> str:
+    """
+    Elemento como texto, com o namespace como xmlns padrão (sem prefixo ns0:, como a SEFAZ espera).
+    Serve para elementos montados aqui e para os lidos de um XML recebido.
+    """
+    copia = copy.deepcopy(elemento)
+    for filho in copia.iter():
+        filho.tag = filho.tag.rpartition('}')[2]
+    copia.set('xmlns', namespace)
+    copia.tail = None
+    return ET.tostring(copia, encoding='unicode')
+
+
+def _canonical(elemento, namespace: str) -> bytes:
+    """C14N do elemento isolado (a declaração de namespace herdada vai nele, como no XMLDSig)."""
+    return ET.canonicalize(xml_text(elemento, namespace)).encode('utf-8')
+
+
+def _signed_info(uri: str, digest_b64: str) -> str:
+    return (
+        f'<SignedInfo xmlns="{DSIG_NS}">'
+        f'<CanonicalizationMethod Algorithm="{_C14N}"></CanonicalizationMethod>'
+        f'<SignatureMethod Algorithm="{DSIG_NS}rsa-sha1"></SignatureMethod>'
+        f'<Reference URI="#{uri}"><Transforms>'
+        f'<Transform Algorithm="{DSIG_NS}enveloped-signature"></Transform>'
+        f'<Transform Algorithm="{_C14N}"></Transform>'
+        f'</Transforms><DigestMethod Algorithm="{DSIG_NS}sha1"></DigestMethod>'
+        f'<DigestValue>{digest_b64}</DigestValue></Reference></SignedInfo>'
+    )
+
+
+class CertificadoA1:
+    """Certificado A1 do emitente (arquivo .pfx/.p12, ou .pem com chave privada e certificado)."""
+
+    def __init__(self, caminho: str, senha: str = None):
+        if x509 is None:
+            raise CertificadoError("assinar a NFC-e exige o pacote 'cryptography' (pip install cryptography)")
+        senha_bytes = senha.encode('utf-8') if senha else None
+        try:
+            with open(caminho, 'rb') as f:
+                dados = f.read()
+            if caminho.lower().endswith('.pem'):
+                self._chave = serialization.load_pem_private_key(dados, senha_bytes)
+                certificado = x509.load_pem_x509_certificate(dados)
+            else:
+                self._chave, certificado, _ = pkcs12.load_key_and_certificates(dados, senha_bytes)
+        except (OSError, ValueError) as e:
+            raise CertificadoError(f"não foi possível ler o certificado {caminho}: {e}") from e
+        if self._chave is None or certificado is None:
+            raise CertificadoError(f"{caminho} não tem chave privada e certificado")
+        self.caminho = caminho
+        self.certificado_der = certificado.public_bytes(serialization.Encoding.DER)
+        self.validade = getattr(certificado, 'not_valid_after_utc', None) or certificado.not_valid_after
+
+    def sign(self, dados: bytes) -> bytes:
+        return self._chave.sign(dados, padding.PKCS1v15(), hashes.SHA1())
+
+
+def certificado_from_env():
+    """CertificadoA1 de PDV_NFCE_CERTIFICADO/PDV_NFCE_SENHA. Levanta CertificadoError."""
+    caminho = os.environ.get('PDV_NFCE_CERTIFICADO')
+    if not caminho:
+        raise CertificadoError("PDV_NFCE_CERTIFICADO não definido")
+    return CertificadoA1(caminho, os.environ.get('PDV_NFCE_SENHA'))
+
+
+def qrcode_url(chave: str, emitente: dict, tp_emis: int, dh_emi: str = None, v_nf: str = None,
+               digest_b64: str = None) -> str:
+    """URL do QR Code versão 2 (online ou, em contingência offline, com dia, valor e digest)."""
+    csc_id = str(int(emitente['csc_id']))
+    if tp_emis == TP_EMIS_OFFLINE:
+        dig_val = digest_b64.encode('ascii').hex()
+        parametros = f"{chave}|2|{emitente['ambiente']}|{dh_emi[8:10]}|{v_nf}|{dig_val}|{csc_id}"
+    else:
+        parametros = f"{chave}|2|{emitente['ambiente']}|{csc_id}"
+    hash_qr = hashlib.sha1((parametros + emitente['csc']).encode('utf-8')).hexdigest().upper()
+    return f"{emitente['url_consulta']}?p={parametros}|{hash_qr}"
+
+
+def sign_nfce(inf, emitente: dict, certificado) -> str:
+    """
+    NFe completa e assinada (infNFe + infNFeSupl + Signature), pronta para o lote.
+    'certificado' é qualquer objeto com sign(bytes) e certificado_der (CertificadoA1).
+    """
+    chave = inf.get('Id')[3:]
+    digest_b64 = base64.b64encode(hashlib.sha1(_canonical(inf, NFE_NS)).digest()).decode('ascii')
+    signed_info = _signed_info(inf.get('Id'), digest_b64)
+    assinatura = base64.b64encode(certificado.sign(ET.canonicalize(signed_info).encode('utf-8'))).decode('ascii')
+
+    nfe = ET.Element(f'{{{NFE_NS}}}NFe')
+    nfe.append(inf)
+    ide = inf.find(f'{{{NFE_NS}}}ide')
+    supl = _sub(nfe, 'infNFeSupl')
+    _sub(supl, 'qrCode', qrcode_url(
+        chave, emitente, int(ide.findtext(f'{{{NFE_NS}}}tpEmis')),
+        dh_emi=ide.findtext(f'{{{NFE_NS}}}dhEmi'),
+        v_nf=inf.findtext(f'{{{NFE_NS}}}total/{{{NFE_NS}}}ICMSTot/{{{NFE_NS}}}vNF'),
+        digest_b64=digest_b64,
+    ))
+    _sub(supl, 'urlChave', emitente['url_consulta'])
+
+    # A Signature tem namespace próprio (default xmlns do XMLDSig), então entra como texto
+    xml = xml_text(nfe)
+    certificado_b64 = base64.b64encode(certificado.certificado_der).decode('ascii')
+    signed_info = signed_info.replace(f' xmlns="{DSIG_NS}"', '', 1)  # herda o xmlns da Signature
+    signature = (
+        f'<Signature xmlns="{DSIG_NS}">{signed_info}'
+        f'<SignatureValue>{assinatura}</SignatureValue>'
+        f'<KeyInfo><X509Data><X509Certificate>{certificado_b64}</X509Certificate></X509Data></KeyInfo>'
+        f'</Signature>'
+    )
+    return xml[:-len('</NFe>')] + signature + '</NFe>'
+
+
+# ----------------------------------------------------
+# --- VALIDAÇÃO (lado SEFAZ / testes) ---
+# ----------------------------------------------------
+
+def verify_nfce(xml_nfe) -> str:
+    """
+    Confere uma NFe assinada (texto ou elemento): chave e DV, Id, totais, digest e, com
+    'cryptography' instalado, a assinatura RSA. Retorna a chave; levanta NfceInvalidaError.
+    """
+    nfe = ET.fromstring(xml_nfe) if isinstance(xml_nfe, (str, bytes)) else xml_nfe
+    ns = {'nfe': NFE_NS, 'ds': DSIG_NS}
+    inf = nfe.find('nfe:infNFe', ns)
+    if inf is None or inf.get('Id', '')[:3] != 'NFe':
+        raise NfceInvalidaError("infNFe ausente ou sem Id", 225)
+    chave = inf.get('Id')[3:]
+    if not chave_valida(chave) or chave[-1] != inf.findtext('nfe:ide/nfe:cDV', namespaces=ns):
+        raise NfceInvalidaError(f"chave de acesso inválida: {chave}", 236)
+
+    tot = inf.find('nfe:total/nfe:ICMSTot', ns)
+    soma = sum(float(det.findtext('nfe:prod/nfe:vProd', namespaces=ns)) for det in inf.findall('nfe:det', ns))
+    v_nf = float(tot.findtext('nfe:vProd', namespaces=ns)) - float(tot.findtext('nfe:vDesc', namespaces=ns)) \
+        + float(tot.findtext('nfe:vOutro', namespaces=ns))
+    if abs(soma - float(tot.findtext('nfe:vProd', namespaces=ns))) > 0.005 \
+            or abs(v_nf - float(tot.findtext('nfe:vNF', namespaces=ns))) > 0.005:
+        raise NfceInvalidaError("total da NF difere do somatório dos itens", 610)
+
+    signature = nfe.find('ds:Signature', ns)
+    if signature is None:
+        raise NfceInvalidaError("NFe sem assinatura", 298)
+    signed_info = signature.find('ds:SignedInfo', ns)
+    if signed_info.find('ds:Reference', ns).get('URI') != '#' + inf.get('Id'):
+        raise NfceInvalidaError("assinatura não referencia o infNFe", 298)
+    digest = base64.b64encode(hashlib.sha1(_canonical(inf, NFE_NS)).digest()).decode('ascii')
+    if digest != signed_info.findtext('ds:Reference/ds:DigestValue', namespaces=ns):
+        raise NfceInvalidaError("digest não confere (documento alterado depois de assinado)", 297)
+
+    if x509 is not None:
+        der = base64.b64decode(signature.findtext('ds:KeyInfo/ds:X509Data/ds:X509Certificate', namespaces=ns))
+        try:
+            x509.load_der_x509_certificate(der).public_key().verify(
+                base64.b64decode(signature.findtext('ds:SignatureValue', namespaces=ns)),
+                _canonical(signed_info, DSIG_NS), padding.PKCS1v15(), hashes.SHA1()
+            )
+        except Exception as e:  # InvalidSignature e chaves malformadas
+            raise NfceInvalidaError(f"assinatura inválida: {e.__class__.__name__}", 297) from None
+    return chave
+
+
+def agora_fuso(fuso: str) -> str:
+    return datetime.now().strftime("%Y-%m-%dT%H:%M:%S") + fuso
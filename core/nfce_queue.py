@@ -0,0 +1,515 @@
+# core/nfce_queue.py
+"""
+Fila fiscal (tabela DocumentosFiscais): emissão de NFC-e sem travar o caixa.
+
+Pedir a nota de uma venda só grava "NFC-e da venda N" (um INSERT curto, com o número da
+nota já reservado) e o caixa segue. A thread NfceEmitter, com conexão própria, faz o resto:
+
+    Pendente  -> monta o XML a partir da venda gravada e assina        -> Assinada
+    Assinada  -> vai num lote (até LOTE_MAX notas) para a SEFAZ        -> Enviada (com nRec)
+    Enviada   -> consulta o recibo do lote                             -> Autorizada / Rejeitada
+
+SEFAZ fora do ar (erro de rede/HTTP): as notas ficam na fila, a thread tenta de novo com
+espera exponencial e entra em contingência offline: as notas montadas nesse meio tempo saem
+com tpEmis=9 (dhCont/xJust) e são transmitidas quando a SEFAZ voltar. Nota inválida
+(venda não encontrada, totais) vai para 'Erro' sem nova tentativa. Lote recusado inteiro
+pela SEFAZ é reenviado nota a nota, e só a(s) recusada(s) vão para 'Erro'; depois de
+corrigido o problema, requeue_failed devolve as notas com erro para a fila.
+
+Vários caixas podem usar o mesmo pdv.db: cada NfceEmitter só cuida das notas da sua
+série (a do emitente), que é a que entra na chave e no XML que ele monta.
+
+Duplicidade (204) não é rejeição: a nota já foi autorizada numa tentativa anterior cuja
+resposta se perdeu (timeout depois de a SEFAZ aceitar o lote, recibo expirado e lote
+reenviado). O protocolo original vem da consulta protocolo (ou do nProt do xMotivo) e a
+nota fica 'Autorizada'.
+
+O transporte é plugável: qualquer objeto com enviar_lote(id_lote, xmls) -> nRec,
+consultar_recibo(nRec) -> (cStat, xMotivo, [protocolos]) e consultar_protocolo(chave) ->
+(cStat, xMotivo, [protocolos]). HttpTransport fala com a URL de PDV_NFCE_SEFAZ (a SEFAZ de
+testes local é o core.sefaz_mock).
+
+Este módulo não importa core.database (o database.py cria a tabela com
+ensure_fiscal_table); quem cria o NfceEmitter passa a função de conexão.
+"""
+
+import os
+import random
+import re
+import sqlite3
+import ssl
+import threading
+import urllib.request
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+from core.nfce import (
+    NFE_NS, TP_EMIS_NORMAL, TP_EMIS_OFFLINE, CertificadoError,
+    agora_fuso, build_nfce, certificado_from_env, emitente_from_env, sign_nfce, xml_text
+)
+from core.print_spooler import VendaNaoEncontradaError, load_sale
+
+ENV_SEFAZ = 'PDV_NFCE_SEFAZ'
+
+STATUS_PENDENTE = 'Pendente'
+STATUS_ASSINADA = 'Assinada'
+STATUS_ENVIADA = 'Enviada'
+STATUS_AUTORIZADA = 'Autorizada'
+STATUS_REJEITADA = 'Rejeitada'
+STATUS_ERRO = 'Erro'
+
+CSTAT_LOTE_RECEBIDO = 103
+CSTAT_LOTE_PROCESSADO = 104
+CSTAT_LOTE_EM_PROCESSAMENTO = 105
+CSTAT_AUTORIZADA = 100
+CSTAT_AUTORIZADA_FORA_PRAZO = 150
+CSTAT_DUPLICIDADE = 204
+CSTATS_AUTORIZADA = (CSTAT_AUTORIZADA, CSTAT_AUTORIZADA_FORA_PRAZO)
+
+LOTE_MAX = 50            # limite da SEFAZ por lote
+IDLE_INTERVAL = 10.0     # segundos entre verificações com a fila vazia
+RECIBO_INTERVAL = 2.0    # espera antes de consultar um lote enviado
+BASE_BACKOFF = 5.0
+MAX_BACKOFF = 300.0
+HTTP_TIMEOUT = 30.0
+
+SOAP_NS = 'http://www.w3.org/2003/05/soap-envelope'
+WSDL_NS = 'http://www.portalfiscal.inf.br/nfe/wsdl/'
+SERVICO_AUTORIZACAO = 'NFeAutorizacao4'
+SERVICO_RET_AUTORIZACAO = 'NFeRetAutorizacao4'
+SERVICO_CONSULTA_PROTOCOLO = 'NFeConsultaProtocolo4'
+
+# "Rejeição: Duplicidade de NF-e [nProt:135250000000001][dhAut:...]"
+_NPROT_DUPLICIDADE = re.compile(r'nProt:\s*(\d+)')
+
+
+def ensure_fiscal_table(conn):
+    """Cria a tabela da fila fiscal (idempotente)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS DocumentosFiscais (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_venda INTEGER NOT NULL UNIQUE,
+            serie INTEGER NOT NULL,
+            numero INTEGER NOT NULL,        -- nNF, reservado na hora do pedido
+            chave TEXT,
+            tp_emis INTEGER,                -- 1 normal, 9 contingência offline
+            status TEXT NOT NULL DEFAULT 'Pendente',
+            xml TEXT,                       -- NFe assinada; depois de autorizada, o nfeProc
+            recibo TEXT,                    -- nRec do lote enviado
+            protocolo TEXT,
+            cstat INTEGER,
+            motivo TEXT,
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            criado_em TEXT NOT NULL,
+            autorizado_em TEXT,
+            UNIQUE (serie, numero)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_documentos_fiscais_status ON DocumentosFiscais(status, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_documentos_fiscais_serie ON DocumentosFiscais(serie, status, id)")
+    conn.commit()
+
+
+def _agora() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def enqueue_nfce(conn, id_venda: int, serie: int = 1) -> int:
+    """
+    Pede a NFC-e da venda e retorna o id do documento. Transação curta, própria; o
+    número da nota sai na mesma instrução. Pedir de novo a mesma venda não duplica.
+    """
+    try:
+        conn.execute("""
+            INSERT OR IGNORE INTO DocumentosFiscais (id_venda, serie, numero, status, criado_em)
+            SELECT ?, ?, COALESCE(MAX(numero), 0) + 1, ?, ? FROM DocumentosFiscais WHERE serie = ?
+        """, (id_venda, serie, STATUS_PENDENTE, _agora(), serie))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return conn.execute("SELECT id FROM DocumentosFiscais WHERE id_venda = ?", (id_venda,)).fetchone()[0]
+
+
+def requeue_failed(conn, id_venda: int = None) -> int:
+    """
+    Devolve para a fila (Pendente, remontada e assinada de novo com o mesmo número) as
+    notas com erro, todas ou só a da venda. Retorna quantas voltaram.
+    """
+    sql = "UPDATE DocumentosFiscais SET status = ?, motivo = NULL, recibo = NULL WHERE status = ?"
+    params = [STATUS_PENDENTE, STATUS_ERRO]
+    if id_venda is not None:
+        sql += " AND id_venda = ?"
+        params.append(id_venda)
+    try:
+        cursor = conn.execute(sql, params)
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro ao devolver NFC-e com erro para a fila: {e}")
+        return 0
+
+
+def fiscal_status(conn, id_venda: int):
+    """Situação da NFC-e da venda (dict) ou None se nunca foi pedida."""
+    row = conn.execute("""
+        SELECT id, numero, serie, chave, tp_emis, status, protocolo, cstat, motivo, autorizado_em
+        FROM DocumentosFiscais WHERE id_venda = ?
+    """, (id_venda,)).fetchone()
+    if row is None:
+        return None
+    keys = ('id', 'numero', 'serie', 'chave', 'tp_emis', 'status', 'protocolo', 'cstat', 'motivo', 'autorizado_em')
+    return dict(zip(keys, row))
+
+
+def _unidades(conn, codigos: list) -> dict:
+    """Unidade comercial pelo tipo de medição do cadastro (peso -> KG)."""
+    if not codigos:
+        return {}
+    placeholders = ','.join('?' * len(codigos))
+    rows = conn.execute(
+        f"SELECT codigo, tipo_medicao FROM Produtos WHERE codigo IN ({placeholders})", codigos
+    ).fetchall()
+    return {codigo: 'KG' if (tipo or '').lower().startswith(('peso', 'kg', 'quilo')) else 'UN' for codigo, tipo in rows}
+
+
+# ----------------------------------------------------
+# --- TRANSPORTE ---
+# ----------------------------------------------------
+
+def _soap(servico: str, corpo: str) -> bytes:
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>'
+        f'<soap12:Envelope xmlns:soap12="{SOAP_NS}"><soap12:Body>'
+        f'<nfeDadosMsg xmlns="{WSDL_NS}{servico}">{corpo}</nfeDadosMsg>'
+        f'</soap12:Body></soap12:Envelope>'
+    ).encode('utf-8')
+
+
+def _retorno(resposta: bytes, tag: str):
+    """Grupo de retorno do envelope SOAP. Resposta malformada conta como falha de comunicação (OSError)."""
+    try:
+        elemento = ET.fromstring(resposta).find(f'.//{{{NFE_NS}}}{tag}')
+    except ET.ParseError as e:
+        raise OSError(f"resposta inválida da SEFAZ: {e}") from e
+    if elemento is None:
+        raise OSError(f"resposta da SEFAZ sem {tag}")
+    return elemento
+
+
+def parse_protocolos(ret) -> list:
+    """[{chave, cstat, motivo, protocolo, recebido_em, xml}] dos protNFe de um retorno."""
+    protocolos = []
+    for prot in ret.findall(f'{{{NFE_NS}}}protNFe'):
+        inf = prot.find(f'{{{NFE_NS}}}infProt')
+        protocolos.append({
+            'chave': inf.findtext(f'{{{NFE_NS}}}chNFe'),
+            'cstat': int(inf.findtext(f'{{{NFE_NS}}}cStat')),
+            'motivo': inf.findtext(f'{{{NFE_NS}}}xMotivo'),
+            'protocolo': inf.findtext(f'{{{NFE_NS}}}nProt'),
+            'recebido_em': inf.findtext(f'{{{NFE_NS}}}dhRecbto'),
+            'xml': xml_text(prot),
+        })
+    return protocolos
+
+
+class HttpTransport:
+    """
+    Web services da SEFAZ (SOAP 1.2): NFeAutorizacao4 (lote assíncrono), NFeRetAutorizacao4
+    (consulta do recibo) e NFeConsultaProtocolo4 (situação de uma nota), em {url}/<serviço>.
+    Em https, certificado .pem faz a autenticação mútua (a SEFAZ real exige).
+    """
+
+    def __init__(self, url: str, tp_amb: str = '2', certificado_pem: str = None):
+        self.url = url.rstrip('/')
+        self.tp_amb = tp_amb
+        self.context = None
+        if self.url.startswith('https://') and certificado_pem:
+            self.context = ssl.create_default_context()
+            self.context.load_cert_chain(certificado_pem)
+
+    def _post(self, servico: str, corpo: str) -> bytes:
+        request = urllib.request.Request(f"{self.url}/{servico}", data=_soap(servico, corpo), method='POST', headers={
+            'Content-Type': 'application/soap+xml; charset=utf-8',
+        })
+        with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT, context=self.context) as response:
+            return response.read()
+
+    def enviar_lote(self, id_lote: int, xmls: list) -> str:
+        """Envia o lote; retorna o nRec (recibo) para consulta. ValueError se o lote for recusado."""
+        corpo = (
+            f'<enviNFe xmlns="{NFE_NS}" versao="4.00"><idLote>{id_lote}</idLote><indSinc>0</indSinc>'
+            + ''.join(xml.replace(f' xmlns="{NFE_NS}"', '', 1) for xml in xmls)
+            + '</enviNFe>'
+        )
+        ret = _retorno(self._post(SERVICO_AUTORIZACAO, corpo), 'retEnviNFe')
+        cstat = int(ret.findtext(f'{{{NFE_NS}}}cStat'))
+        if cstat != CSTAT_LOTE_RECEBIDO:
+            raise ValueError(f"lote recusado pela SEFAZ: {cstat} - {ret.findtext(f'{{{NFE_NS}}}xMotivo')}")
+        return ret.findtext(f'{{{NFE_NS}}}infRec/{{{NFE_NS}}}nRec')
+
+    def consultar_recibo(self, recibo: str) -> tuple:
+        corpo = (
+            f'<consReciNFe xmlns="{NFE_NS}" versao="4.00"><tpAmb>{self.tp_amb}</tpAmb>'
+            f'<nRec>{recibo}</nRec></consReciNFe>'
+        )
+        ret = _retorno(self._post(SERVICO_RET_AUTORIZACAO, corpo), 'retConsReciNFe')
+        return int(ret.findtext(f'{{{NFE_NS}}}cStat')), ret.findtext(f'{{{NFE_NS}}}xMotivo'), parse_protocolos(ret)
+
+    def consultar_protocolo(self, chave: str) -> tuple:
+        corpo = (
+            f'<consSitNFe xmlns="{NFE_NS}" versao="4.00"><tpAmb>{self.tp_amb}</tpAmb>'
+            f'<xServ>CONSULTAR</xServ><chNFe>{chave}</chNFe></consSitNFe>'
+        )
+        ret = _retorno(self._post(SERVICO_CONSULTA_PROTOCOLO, corpo), 'retConsSitNFe')
+        return int(ret.findtext(f'{{{NFE_NS}}}cStat')), ret.findtext(f'{{{NFE_NS}}}xMotivo'), parse_protocolos(ret)
+
+    def __str__(self):
+        return self.url
+
+
+# ----------------------------------------------------
+# --- EMISSÃO ---
+# ----------------------------------------------------
+
+def _nfe_proc(xml_nfe: str, xml_protocolo: str) -> str:
+    """NFe + protocolo de autorização (o arquivo que precisa ser guardado)."""
+    return (
+        f'<nfeProc xmlns="{NFE_NS}" versao="4.00">'
+        + xml_nfe.replace(f' xmlns="{NFE_NS}"', '', 1)
+        + xml_protocolo.replace(f' xmlns="{NFE_NS}"', '', 1)
+        + '</nfeProc>'
+    )
+
+
+class NfceEmitter(threading.Thread):
+    """
+    Thread que esvazia a DocumentosFiscais: monta/assina, envia em lotes e consulta os recibos.
+      connect():    abre a conexão própria da thread (ex: core.database.connect_db)
+      certificado:  CertificadoA1 (ou qualquer objeto com sign(bytes) e certificado_der)
+      transport:    enviar_lote / consultar_recibo (HttpTransport ou um falso nos testes)
+    """
+
+    def __init__(self, connect, certificado, transport, emitente: dict, idle_interval: float = IDLE_INTERVAL,
+                 lote_max: int = LOTE_MAX):
+        super().__init__(name="NfceEmitter", daemon=True)
+        self.connect = connect
+        self.certificado = certificado
+        self.transport = transport
+        self.emitente = emitente
+        self.idle_interval = idle_interval
+        self.lote_max = lote_max
+        self.contingencia = False
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+
+    def wake(self):
+        """Chamado depois de enfileirar: processa já em vez de esperar o intervalo."""
+        self._wake_event.set()
+
+    def stop(self, timeout: float = None):
+        self._stop_event.set()
+        self._wake_event.set()
+        if timeout is not None and self.is_alive():
+            self.join(timeout)
+
+    def _backoff(self, failures: int) -> float:
+        delay = min(BASE_BACKOFF * (2 ** (failures - 1)), MAX_BACKOFF)
+        return delay * random.uniform(0.8, 1.2)
+
+    def run(self):
+        conn = self.connect()
+        if conn is None:
+            print("Erro na emissão de NFC-e: não foi possível abrir o banco local.")
+            return
+
+        failures = 0
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    assinadas = self.sign_pending(conn)
+                    aguardando = self.check_receipts(conn)
+                    enviadas = self.send_batch(conn)
+                except OSError as e:  # inclui URLError/HTTPError e timeout
+                    if conn.in_transaction:
+                        conn.rollback()
+                    failures += 1
+                    if not self.contingencia:
+                        self.contingencia = True
+                        print("LOG: SEFAZ indisponível; NFC-e novas saem em contingência offline (tpEmis=9).")
+                    delay = self._backoff(failures)
+                    print(f"Erro ao transmitir NFC-e para {self.transport} (tentativa {failures}, nova em {delay:.0f}s): {e}")
+                    self._wait(delay)
+                    continue
+                except sqlite3.Error as e:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    print(f"Erro na fila fiscal: {e}")
+                    self._wait(self.idle_interval)
+                    continue
+
+                failures = 0
+                if enviadas == self.lote_max or assinadas == self.lote_max:
+                    continue  # atraso acumulado: próximo lote já
+                self._wait(RECIBO_INTERVAL if (aguardando or enviadas) else self.idle_interval)
+        finally:
+            conn.close()
+
+    def sign_pending(self, conn) -> int:
+        """Monta e assina as notas pendentes da série (em contingência, com tpEmis=9). Retorna quantas."""
+        rows = conn.execute(
+            "SELECT id, id_venda, numero FROM DocumentosFiscais WHERE serie = ? AND status = ? ORDER BY id LIMIT ?",
+            (self.emitente['serie'], STATUS_PENDENTE, self.lote_max)
+        ).fetchall()
+        for doc_id, id_venda, numero in rows:
+            tp_emis = TP_EMIS_OFFLINE if self.contingencia else TP_EMIS_NORMAL
+            try:
+                venda_data, itens, pagamentos = load_sale(conn, id_venda)
+                unidades = _unidades(conn, [item['codigo'] for item in itens])
+                for item in itens:
+                    item['unidade'] = unidades.get(item['codigo'], 'UN')
+                chave, inf = build_nfce(
+                    venda_data, itens, pagamentos, self.emitente, numero, tp_emis=tp_emis,
+                    dh_cont=agora_fuso(self.emitente['fuso']) if tp_emis == TP_EMIS_OFFLINE else None
+                )
+                xml = sign_nfce(inf, self.emitente, self.certificado)
+            except (VendaNaoEncontradaError, ValueError) as e:  # NfceInvalidaError é ValueError
+                self._update(conn, doc_id, status=STATUS_ERRO, motivo=str(e))
+                print(f"Erro ao montar a NFC-e da venda #{id_venda}: {e}")
+                continue
+            self._update(conn, doc_id, status=STATUS_ASSINADA, chave=chave, tp_emis=tp_emis, xml=xml)
+        return len(rows)
+
+    def send_batch(self, conn) -> int:
+        """
+        Envia o lote mais antigo de notas assinadas da série. Retorna quantas foram no lote.
+        Se a SEFAZ recusar o lote inteiro, manda as notas uma por lote: só as recusadas
+        vão para 'Erro' (uma nota ruim não segura as outras).
+        """
+        rows = conn.execute(
+            "SELECT id, xml FROM DocumentosFiscais WHERE serie = ? AND status = ? ORDER BY id LIMIT ?",
+            (self.emitente['serie'], STATUS_ASSINADA, self.lote_max)
+        ).fetchall()
+        if not rows:
+            return 0
+        try:
+            self._send(conn, rows)
+        except ValueError as e:  # lote recusado inteiro (não é falha de rede)
+            if len(rows) == 1:
+                self._fail(conn, rows[0][0], e)
+                return 1
+            print(f"Erro: {e}; reenviando as {len(rows)} notas uma por lote.")
+            for row in rows:
+                try:
+                    self._send(conn, [row])
+                except ValueError as erro:
+                    self._fail(conn, row[0], erro)
+        return len(rows)
+
+    def _fail(self, conn, doc_id: int, erro: Exception):
+        self._update(conn, doc_id, status=STATUS_ERRO, motivo=str(erro))
+        print(f"Erro: NFC-e #{doc_id} recusada no envio: {erro}")
+
+    def _send(self, conn, rows: list):
+        """Transmite as notas num lote e marca como Enviadas (ValueError se a SEFAZ recusar o lote)."""
+        ids = [doc_id for doc_id, _ in rows]
+        recibo = self.transport.enviar_lote(ids[0], [xml for _, xml in rows])
+
+        if self.contingencia:
+            self.contingencia = False
+            print("LOG: SEFAZ de volta; saindo da contingência offline.")
+        conn.executemany(
+            "UPDATE DocumentosFiscais SET status = ?, recibo = ?, tentativas = tentativas + 1 WHERE id = ?",
+            [(STATUS_ENVIADA, recibo, doc_id) for doc_id in ids]
+        )
+        conn.commit()
+
+    def check_receipts(self, conn) -> int:
+        """Consulta os recibos dos lotes enviados da série. Retorna quantas notas continuam aguardando."""
+        aguardando = 0
+        for (recibo,) in conn.execute(
+            "SELECT DISTINCT recibo FROM DocumentosFiscais WHERE serie = ? AND status = ? ORDER BY recibo",
+            (self.emitente['serie'], STATUS_ENVIADA)
+        ).fetchall():
+            cstat, motivo, protocolos = self.transport.consultar_recibo(recibo)
+            if cstat == CSTAT_LOTE_EM_PROCESSAMENTO:
+                aguardando += 1
+                continue
+            if cstat != CSTAT_LOTE_PROCESSADO:  # recibo perdido/expirado: manda o lote de novo
+                conn.execute(
+                    "UPDATE DocumentosFiscais SET status = ?, recibo = NULL, motivo = ? WHERE recibo = ? AND status = ?",
+                    (STATUS_ASSINADA, f"{cstat} - {motivo}", recibo, STATUS_ENVIADA)
+                )
+                conn.commit()
+                continue
+            self._apply_protocols(conn, protocolos)
+        return aguardando
+
+    def _duplicate_protocol(self, prot: dict) -> dict:
+        """
+        Protocolo original de uma nota recusada por duplicidade (já autorizada antes): pela
+        consulta protocolo; sem ela (ou sem resposta útil), o nProt que vem no xMotivo.
+        Erro de comunicação na consulta sobe (o recibo é consultado de novo depois).
+        """
+        consultar = getattr(self.transport, 'consultar_protocolo', None)
+        if consultar is not None:
+            cstat, _, protocolos = consultar(prot['chave'])
+            for original in protocolos:
+                if original['chave'] == prot['chave'] and original['cstat'] in CSTATS_AUTORIZADA:
+                    return original
+        encontrado = _NPROT_DUPLICIDADE.search(prot['motivo'] or '')
+        return dict(prot, protocolo=encontrado.group(1) if encontrado else None, xml=None)
+
+    def _apply_protocols(self, conn, protocolos: list):
+        for prot in protocolos:
+            row = conn.execute(
+                "SELECT id, id_venda, xml FROM DocumentosFiscais WHERE chave = ?", (prot['chave'],)
+            ).fetchone()
+            if row is None:
+                continue
+            doc_id, id_venda, xml = row
+            if prot['cstat'] == CSTAT_DUPLICIDADE:
+                prot = self._duplicate_protocol(prot)  # já autorizada numa tentativa anterior
+            if prot['cstat'] in CSTATS_AUTORIZADA or prot['cstat'] == CSTAT_DUPLICIDADE:
+                self._update(conn, doc_id, status=STATUS_AUTORIZADA, protocolo=prot['protocolo'],
+                             cstat=prot['cstat'], motivo=prot['motivo'],
+                             xml=_nfe_proc(xml, prot['xml']) if prot['xml'] else xml,
+                             autorizado_em=_agora(), commit=False)
+                print(f"LOG: NFC-e da venda #{id_venda} autorizada (protocolo {prot['protocolo']}).")
+            else:
+                self._update(conn, doc_id, status=STATUS_REJEITADA, cstat=prot['cstat'],
+                             motivo=prot['motivo'], commit=False)
+                print(f"Erro: NFC-e da venda #{id_venda} rejeitada: {prot['cstat']} - {prot['motivo']}")
+        conn.commit()
+
+    def _update(self, conn, doc_id: int, commit: bool = True, **campos):
+        sets = ', '.join(f"{campo} = ?" for campo in campos)
+        conn.execute(f"UPDATE DocumentosFiscais SET {sets} WHERE id = ?", (*campos.values(), doc_id))
+        if commit:
+            conn.commit()
+
+    def _wait(self, seconds: float):
+        self._wake_event.wait(seconds)
+        self._wake_event.clear()
+
+
+def start_nfce_emitter_from_env(connect):
+    """
+    Inicia a emissão se PDV_NFCE_SEFAZ estiver definido (e emitente/certificado válidos);
+    senão retorna None e a NFC-e fica desligada.
+    """
+    url = os.environ.get(ENV_SEFAZ)
+    if not url:
+        return None
+    try:
+        emitente = emitente_from_env()
+        certificado = certificado_from_env()
+    except (ValueError, CertificadoError) as e:
+        print(f"Erro na configuração da NFC-e (emissão desligada): {e}")
+        return None
+    pem = certificado.caminho if certificado.caminho.lower().endswith('.pem') else None
+    emitter = NfceEmitter(connect, certificado, HttpTransport(url, emitente['ambiente'], pem), emitente)
+    emitter.start()
+    print(f"LOG: Emissão de NFC-e ativa (SEFAZ: {url}, série {emitente['serie']}).")
+    return emitter
@@ -0,0 +1,223 @@
+# core/price_update.py
+"""
+Reajuste de preços em massa.
+
+Fluxo: monta-se um plano (lista de PriceChange) a partir de uma regra (percentual ou
+valor fixo, filtrando por categoria e/ou faixa de códigos) ou de um arquivo de preços;
+o plano serve de prévia (nada é gravado) e, se confirmado, é aplicado por
+apply_price_changes em uma única transação, com registro em HistoricoPrecos.
+"""
+
+import csv
+import sqlite3
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+
+from core.product_catalog import get_catalog
+
+MODO_PERCENTUAL = 'percentual'
+MODO_VALOR = 'valor'
+
+MIN_PRICE = Decimal('0.01')
+_CENTAVOS = Decimal('0.01')
+
+
+class PriceChange:
+    """Uma linha do plano de reajuste."""
+
+    __slots__ = ('codigo', 'nome', 'preco_anterior', 'preco_novo')
+
+    def __init__(self, codigo, nome, preco_anterior, preco_novo):
+        self.codigo = codigo
+        self.nome = nome
+        self.preco_anterior = preco_anterior
+        self.preco_novo = preco_novo
+
+    @property
+    def variacao_percentual(self) -> float:
+        if not self.preco_anterior:
+            return 0.0
+        return (self.preco_novo / self.preco_anterior - 1) * 100
+
+
+def _round_price(value: Decimal) -> float:
+    """Arredonda para centavos (meio para cima), nunca abaixo de R$ 0,01."""
+    return float(max(value.quantize(_CENTAVOS, rounding=ROUND_HALF_UP), MIN_PRICE))
+
+
+def _new_price(preco: float, mode: str, amount: Decimal) -> float:
+    atual = Decimal(str(preco))
+    if mode == MODO_PERCENTUAL:
+        return _round_price(atual * (1 + amount / 100))
+    return _round_price(atual + amount)
+
+
+# ----------------------------------------------------
+# --- PLANOS (PRÉVIA) ---
+# ----------------------------------------------------
+
+def plan_rule(conn, mode: str, amount, categoria: str = None,
+              codigo_de: str = None, codigo_ate: str = None) -> list:
+    """
+    Calcula, em memória, o reajuste dos produtos que atendem aos filtros.
+    A seleção é uma única consulta (índice de 'codigo' na faixa de códigos);
+    produtos cujo preço não muda ficam fora do plano.
+    """
+    if mode not in (MODO_PERCENTUAL, MODO_VALOR):
+        raise ValueError(f"Modo de reajuste inválido: {mode}")
+    amount = Decimal(str(amount))
+
+    conditions = []
+    params = []
+    if categoria:
+        conditions.append("categoria = ?")
+        params.append(categoria)
+    if codigo_de:
+        conditions.append("codigo >= ?")
+        params.append(codigo_de)
+    if codigo_ate:
+        conditions.append("codigo <= ?")
+        params.append(codigo_ate)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT codigo, nome, preco FROM Produtos {where} ORDER BY codigo", params)
+
+    changes = []
+    for codigo, nome, preco in cursor.fetchall():
+        novo = _new_price(preco, mode, amount)
+        if novo != preco:
+            changes.append(PriceChange(codigo, nome, preco, novo))
+    return changes
+
+
+def read_price_file(path: str, encoding: str = 'utf-8-sig'):
+    """
+    Lê um arquivo 'codigo;preco' (com ou sem cabeçalho, ';' ou ',' como separador).
+    Retorna (dict codigo -> Decimal, lista de erros (linha, mensagem)).
+    """
+    prices = {}
+    errors = []
+    with open(path, newline='', encoding=encoding) as f:
+        sample = f.read(4096)
+        f.seek(0)
+        # ';' primeiro: com vírgula decimal ('9,99') é o separador usual nas planilhas BR
+        delimiter = ';' if ';' in sample else ('\t' if '\t' in sample else ',')
+
+        for line_number, values in enumerate(csv.reader(f, delimiter=delimiter), start=1):
+            if len(values) < 2 or not values[0].strip():
+                continue
+            codigo, raw_price = values[0].strip(), values[1].strip()
+            text = raw_price.replace('R$', '').replace(' ', '')
+            if ',' in text:
+                text = text.replace('.', '').replace(',', '.')
+            try:
+                price = Decimal(text)
+            except InvalidOperation:
+                if line_number > 1:  # A primeira linha pode ser o cabeçalho
+                    errors.append((line_number, f"preço inválido '{raw_price}'"))
+                continue
+            if price < MIN_PRICE:
+                errors.append((line_number, f"produto {codigo}: preço deve ser maior que zero"))
+                continue
+            prices[codigo] = price
+    return prices, errors
+
+
+def plan_price_file(conn, path: str, encoding: str = 'utf-8-sig'):
+    """Monta o plano a partir de um arquivo de preços. Retorna (changes, erros)."""
+    prices, errors = read_price_file(path, encoding)
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT codigo, nome, preco FROM Produtos ORDER BY codigo")
+    changes = []
+    found = set()
+    for codigo, nome, preco in cursor.fetchall():
+        novo = prices.get(codigo)
+        if novo is None:
+            continue
+        found.add(codigo)
+        novo = _round_price(novo)
+        if novo != preco:
+            changes.append(PriceChange(codigo, nome, preco, novo))
+
+    for codigo in prices.keys() - found:
+        errors.append((0, f"produto {codigo} não cadastrado"))
+    return changes, errors
+
+
+# ----------------------------------------------------
+# --- APLICAÇÃO ---
+# ----------------------------------------------------
+
+def apply_price_changes(conn, changes: list, id_funcionario: int = None, motivo: str = "") -> int:
+    """
+    Aplica o plano em uma única transação:
+      1. carrega o plano numa tabela temporária (executemany);
+      2. grava a auditoria com um único INSERT ... SELECT;
+      3. atualiza os preços com um único UPDATE ... FROM.
+    Só altera produtos cujo preço ainda é o da prévia (se alguém editou no meio
+    tempo, aquele produto é ignorado). Retorna quantos preços foram alterados.
+    Depois do commit, o catálogo em memória do PDV é recarregado.
+    """
+    if not changes:
+        return 0
+
+    agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    lote = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    cursor = conn.cursor()
+
+    if conn.in_transaction:
+        conn.commit()
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS ReajustePrecos (
+                codigo TEXT PRIMARY KEY,
+                preco_anterior REAL NOT NULL,
+                preco_novo REAL NOT NULL
+            )
+        """)
+        cursor.execute("DELETE FROM temp.ReajustePrecos")
+        cursor.executemany(
+            "INSERT INTO temp.ReajustePrecos (codigo, preco_anterior, preco_novo) VALUES (?, ?, ?)",
+            [(c.codigo, c.preco_anterior, c.preco_novo) for c in changes]
+        )
+
+        cursor.execute("""
+            INSERT INTO HistoricoPrecos (codigo, preco_anterior, preco_novo, data_hora, lote, motivo, id_funcionario)
+            SELECT r.codigo, p.preco, r.preco_novo, ?, ?, ?, ?
+            FROM temp.ReajustePrecos r
+            JOIN Produtos p ON p.codigo = r.codigo AND p.preco = r.preco_anterior
+        """, (agora, lote, motivo, id_funcionario))
+
+        cursor.execute("""
+            UPDATE Produtos SET preco = r.preco_novo
+            FROM temp.ReajustePrecos r
+            WHERE Produtos.codigo = r.codigo AND Produtos.preco = r.preco_anterior
+        """)
+        updated = cursor.rowcount
+
+        cursor.execute("DELETE FROM temp.ReajustePrecos")
+        conn.commit()
+
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro ao aplicar reajuste de preços: {e}")
+        raise
+
+    print(f"LOG: Reajuste {lote} aplicado em {updated} produto(s).")
+    # Autocompletar, scanner, etiquetas de balança e lista de produtos leem do catálogo
+    get_catalog().catch_up(conn)
+    return updated
+
+
+def price_history(conn, codigo: str) -> list:
+    """Histórico de preços de um produto (mais recente primeiro)."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT data_hora, preco_anterior, preco_novo, motivo, lote
+        FROM HistoricoPrecos WHERE codigo = ? ORDER BY id DESC
+    """, (codigo,))
+    return cursor.fetchall()
@@ -0,0 +1,260 @@
+# core/print_spooler.py
+"""
+Spooler de impressão persistido (tabela FilaImpressao).
+
+A venda só grava um trabalho "imprimir o recibo da venda N" (um INSERT curto) e segue.
+A thread PrintSpooler lê os pendentes com conexão própria, remonta o recibo a partir de
+Vendas/ItensVenda/PagamentosVenda (nada depende da "última venda" em memória), entrega
+na impressora e marca como impresso. Impressora fora do ar: o trabalho fica pendente e a
+thread tenta de novo com espera crescente; depois de MAX_ATTEMPTS vira 'Erro'.
+Como a fila está no banco, trabalhos pendentes sobrevivem a um fechamento do PDV, e
+qualquer venda pode ser reimpressa depois pelo id (enqueue_receipt de novo).
+Vários caixas podem usar o mesmo pdv.db: cada trabalho leva a origem (o caixa que o
+pediu, PDV_TERMINAL ou o nome da máquina) e cada spooler só imprime os da sua origem.
+
+Este módulo não importa core.database (o database.py cria a tabela com
+ensure_print_spool_table); quem cria o PrintSpooler passa a função de conexão.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+from datetime import datetime
+
+ENV_TERMINAL = 'PDV_TERMINAL'
+
+TIPO_RECIBO = 'recibo'
+TIPO_TEXTO = 'texto'
+
+STATUS_PENDENTE = 'Pendente'
+STATUS_IMPRESSO = 'Impresso'
+STATUS_ERRO = 'Erro'
+
+MAX_ATTEMPTS = 8
+BASE_BACKOFF = 2.0
+MAX_BACKOFF = 60.0
+IDLE_INTERVAL = 30.0
+BATCH_SIZE = 20
+
+
+class VendaNaoEncontradaError(LookupError):
+    """Recibo pedido para uma venda que não existe (ou já foi arquivada)."""
+
+
+def spool_origin() -> str:
+    """Origem dos trabalhos deste caixa: PDV_TERMINAL ou o nome da máquina (fixo entre aberturas)."""
+    return os.environ.get(ENV_TERMINAL) or socket.gethostname()
+
+
+def ensure_print_spool_table(conn):
+    """Cria a tabela da fila de impressão (idempotente)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS FilaImpressao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,              -- 'recibo' (remontado da venda) ou 'texto' (conteudo pronto)
+            id_venda INTEGER,
+            conteudo TEXT,
+            status TEXT NOT NULL DEFAULT 'Pendente',
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            ultimo_erro TEXT,
+            criado_em TEXT NOT NULL,
+            impresso_em TEXT,
+            origem TEXT                      -- caixa que pediu (só o spooler dele imprime)
+        )
+    """)
+    colunas = [info[1] for info in conn.execute("PRAGMA table_info(FilaImpressao)")]
+    if 'origem' not in colunas:
+        conn.execute("ALTER TABLE FilaImpressao ADD COLUMN origem TEXT")
+        # Pendentes de antes da coluna ficam com o caixa que migrou (não saem em todos)
+        conn.execute("UPDATE FilaImpressao SET origem = ? WHERE status = ?", (spool_origin(), STATUS_PENDENTE))
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fila_impressao_status ON FilaImpressao(status, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fila_impressao_origem ON FilaImpressao(origem, status, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fila_impressao_venda ON FilaImpressao(id_venda)")
+    conn.commit()
+
+
+def _agora() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def enqueue_job(conn, tipo: str, id_venda: int = None, conteudo: str = None, origem: str = None) -> int:
+    """Grava um trabalho pendente (deste caixa, se 'origem' não vier) e retorna o id. Transação curta, própria."""
+    try:
+        cursor = conn.execute(
+            "INSERT INTO FilaImpressao (tipo, id_venda, conteudo, status, criado_em, origem) VALUES (?, ?, ?, ?, ?, ?)",
+            (tipo, id_venda, conteudo, STATUS_PENDENTE, _agora(), origem or spool_origin())
+        )
+        conn.commit()
+        return cursor.lastrowid
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+
+def enqueue_receipt(conn, id_venda: int) -> int:
+    """Recibo da venda (na finalização ou reimpressão)."""
+    return enqueue_job(conn, TIPO_RECIBO, id_venda=id_venda)
+
+
+def pending_jobs(conn, limite: int = BATCH_SIZE, origem: str = None) -> list:
+    """[(id, tipo, id_venda, conteudo, tentativas)] pendentes da origem (padrão: este caixa), na ordem de chegada."""
+    return conn.execute("""
+        SELECT id, tipo, id_venda, conteudo, tentativas FROM FilaImpressao
+        WHERE origem = ? AND status = ? ORDER BY id LIMIT ?
+    """, (origem or spool_origin(), STATUS_PENDENTE, limite)).fetchall()
+
+
+def list_jobs(conn, id_venda: int = None, limite: int = 50) -> list:
+    """Últimos trabalhos (todos ou de uma venda), do mais novo para o mais antigo."""
+    sql = "SELECT id, tipo, id_venda, status, tentativas, ultimo_erro, criado_em, impresso_em FROM FilaImpressao"
+    params = []
+    if id_venda is not None:
+        sql += " WHERE id_venda = ?"
+        params.append(id_venda)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limite)
+    return conn.execute(sql, params).fetchall()
+
+
+def _finish_job(conn, job_id: int, status: str, erro: str = None):
+    """Registra o resultado de uma tentativa de impressão."""
+    try:
+        conn.execute("""
+            UPDATE FilaImpressao
+            SET status = ?, ultimo_erro = ?, tentativas = tentativas + 1,
+                impresso_em = CASE WHEN ? = 'Impresso' THEN ? ELSE impresso_em END
+            WHERE id = ?
+        """, (status, erro, status, _agora(), job_id))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+
+def load_sale(conn, id_venda: int) -> tuple:
+    """
+    (venda_data, itens, pagamentos) da venda no formato que o PrinterManager usa
+    (as mesmas chaves da finalização). Levanta VendaNaoEncontradaError.
+    """
+    venda = conn.execute("""
+        SELECT venda_id, data_hora, total_venda, valor_recebido, troco, vendedor_nome,
+               COALESCE(valor_bruto, total_venda), COALESCE(desconto_aplicado, 0), COALESCE(taxa_servico, 0)
+        FROM Vendas WHERE venda_id = ?
+    """, (id_venda,)).fetchone()
+    if venda is None:
+        raise VendaNaoEncontradaError(f"venda #{id_venda} não encontrada")
+
+    venda_data = {
+        'id': venda[0], 'data_hora': venda[1], 'total_venda': venda[2],
+        'valor_recebido': venda[3] or 0.0, 'troco': venda[4] or 0.0, 'vendedor_nome': venda[5] or '',
+        'valor_bruto': venda[6], 'desconto_aplicado': venda[7], 'taxa_servico': venda[8],
+    }
+    itens = [
+        {'codigo': row[0], 'nome': row[1] or '', 'quantidade': row[2], 'preco_unitario': row[3],
+         'desconto_item': row[4], 'total_liquido_item': row[5]}
+        for row in conn.execute("""
+            SELECT produto_codigo, nome_produto, quantidade, preco_unitario, COALESCE(desconto_item, 0),
+                   COALESCE(total_liquido_item, quantidade * preco_unitario)
+            FROM ItensVenda WHERE venda_id = ? ORDER BY item_id
+        """, (id_venda,))
+    ]
+    pagamentos = [
+        {'method': row[0], 'value': row[1]}
+        for row in conn.execute("SELECT metodo, valor FROM PagamentosVenda WHERE venda_id = ?", (id_venda,))
+    ]
+    return venda_data, itens, pagamentos
+
+
+class PrintSpooler(threading.Thread):
+    """
+    Thread que esvazia a FilaImpressao em ordem.
+      connect():            abre a conexão própria da thread (ex: core.database.connect_db)
+      render(conn, job):    monta o conteúdo do trabalho (bytes/str)
+      deliver(conteudo):    entrega na impressora; OSError = impressora com problema (tenta de novo)
+    Só imprime os trabalhos da sua origem (padrão: este caixa).
+    """
+
+    def __init__(self, connect, render, deliver, idle_interval: float = IDLE_INTERVAL,
+                 max_attempts: int = MAX_ATTEMPTS, origem: str = None):
+        super().__init__(name="PrintSpooler", daemon=True)
+        self.origem = origem or spool_origin()
+        self.connect = connect
+        self.render = render
+        self.deliver = deliver
+        self.idle_interval = idle_interval
+        self.max_attempts = max_attempts
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+
+    def wake(self):
+        """Chamado depois de enfileirar: processa já em vez de esperar o intervalo."""
+        self._wake_event.set()
+
+    def stop(self, timeout: float = None):
+        self._stop_event.set()
+        self._wake_event.set()
+        if timeout is not None and self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        conn = self.connect()
+        if conn is None:
+            print("Erro no spooler de impressão: não foi possível abrir o banco local.")
+            return
+
+        failures = 0
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    jobs = pending_jobs(conn, origem=self.origem)
+                    for job in jobs:
+                        if self._stop_event.is_set():
+                            break
+                        self._process(conn, job)
+                    failures = 0
+                except OSError as e:
+                    failures += 1
+                    delay = min(BASE_BACKOFF * (2 ** (failures - 1)), MAX_BACKOFF)
+                    print(f"Erro na impressora (tentativa {failures}, nova em {delay:.0f}s): {e}")
+                    self._wait(delay)
+                    continue
+                except sqlite3.Error as e:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    print(f"Erro no spooler de impressão: {e}")
+                    self._wait(self.idle_interval)
+                    continue
+
+                if len(jobs) < BATCH_SIZE:
+                    self._wait(self.idle_interval)
+        finally:
+            conn.close()
+
+    def _process(self, conn, job):
+        job_id, _, id_venda, _, tentativas = job
+        try:
+            conteudo = self.render(conn, job)
+        except (VendaNaoEncontradaError, ValueError) as e:
+            # Não adianta tentar de novo: o trabalho em si é inválido
+            _finish_job(conn, job_id, STATUS_ERRO, str(e))
+            print(f"Erro ao montar o trabalho de impressão #{job_id}: {e}")
+            return
+
+        try:
+            self.deliver(conteudo)
+        except OSError as e:
+            if tentativas + 1 >= self.max_attempts:
+                _finish_job(conn, job_id, STATUS_ERRO, str(e))
+                print(f"Erro: trabalho de impressão #{job_id} desistido após {tentativas + 1} tentativa(s): {e}")
+                return
+            _finish_job(conn, job_id, STATUS_PENDENTE, str(e))
+            raise  # o laço principal espera antes de tentar a fila de novo (ordem preservada)
+
+        _finish_job(conn, job_id, STATUS_IMPRESSO)
+        if id_venda:
+            print(f"LOG: Recibo da venda #{id_venda} impresso (trabalho #{job_id}).")
+
+    def _wait(self, seconds: float):
+        self._wake_event.wait(seconds)
+        self._wake_event.clear()
@@ -1,34 +1,181 @@
 import datetime as dt
+import threading
 from typing import Dict, Any, List
-import locale
 
-# Tenta configurar o locale para moeda brasileira, se não conseguir, usa o padrão.
-try:
-    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-except locale.Error:
-    try:
-        locale.setlocale(locale.LC_ALL, 'Portuguese_Brazil.1252')
-    except locale.Error:
-        print("Aviso: Não foi possível configurar o locale PT-BR. Usando formatação manual.")
+from core.database import connect_db
+from core.escpos import ALIGN_CENTER, ALIGN_LEFT, EscPosBuilder, start_print_queue_from_env, text_to_escpos
+from core.nfce_queue import STATUS_AUTORIZADA, enqueue_nfce, fiscal_status, start_nfce_emitter_from_env
+from core.print_spooler import TIPO_RECIBO, TIPO_TEXTO, PrintSpooler, enqueue_job, enqueue_receipt, load_sale
+from core.receipt_template import (
+    Centro, Coluna, ReceiptTemplate, Repetir, Se, Separador, Tabela, Texto, Valor
+)
+from core.formatting import brl
+
+# --- Layouts (compilados uma vez, na importação) ---
+
+# Corpo do recibo: igual no texto (console) e no ESC/POS, que só troca cabeçalho e rodapé
+RECIBO_CORPO = ReceiptTemplate([
+    Texto("CUPOM: {id} - Data: {data}"),
+    Texto("VENDEDOR: {vendedor_nome}"),
+    Separador('-'),
+    Tabela('itens', [
+        Coluna('quantidade', 5, '<', 'numero', 'QTD'),
+        Coluna('nome', 17, '<', 'texto', 'ITEM'),
+        Coluna('preco_unitario', 7, '>', 'numero', 'VL UN'),
+        Coluna(lambda item: item.get('total_liquido_item', item['quantidade'] * item['preco_unitario']),
+               8, '>', 'numero', 'TOTAL'),
+    ]),
+    Separador('-'),
+    Valor("SUBTOTAL BRUTO:", 'valor_bruto'),
+    Valor("(-) DESCONTO:", 'desconto_aplicado'),
+    Valor("(+) TAXA SERV.:", 'taxa_servico'),
+    Valor("TOTAL LÍQUIDO:", 'total_venda'),
+    Separador('='),
+    Texto("PAGAMENTOS:"),
+    Repetir('pagamentos', [Valor(" {method}:", 'value')]),
+    Valor("RECEBIDO:", 'valor_recebido'),
+    Valor("TROCO:", 'troco'),
+    Separador('='),
+])
+
+RECIBO_TEXTO = ReceiptTemplate([
+    Separador('='),
+    Centro("NOME DA SUA EMPRESA S.A."),
+    Centro("Recibo Não Fiscal"),
+    Separador('='),
+    RECIBO_CORPO,
+    Centro("OBRIGADO E VOLTE SEMPRE!"),
+])
+
+FECHAMENTO = ReceiptTemplate([
+    Centro("=== COMPROVANTE DE FECHAMENTO ==="),
+    Separador('='),
+    Texto("CAIXA ID: {id_caixa} - VENDEDOR: {vendedor_nome}"),
+    Texto("ABERTURA: {data_abertura}"),
+    Texto("FECHAMENTO: {data_fechamento}"),
+    Separador('-'),
+    Valor("FUNDO DE TROCO:", 'valor_abertura'),
+    Valor("TOTAL DE VENDAS ({quantidade_vendas}x):", 'total_vendas'),
+    Separador('-'),
+    # Recebido por forma de pagamento (só o dinheiro fica na gaveta)
+    Repetir('metodos', [Valor("{metodo} ({quantidade}x):", 'valor')]),
+    Valor("(-) TROCO DADO:", 'troco_total', se='troco_total'),
+    Valor("DINHEIRO EM GAVETA (vendas):", 'dinheiro_liquido'),
+    Valor("(+) SUPRIMENTOS:", 'total_suprimentos', se='total_suprimentos'),
+    Valor("(-) SANGRIAS:", 'total_sangrias', se='total_sangrias'),
+    Separador('-'),
+    Valor("VALOR ESPERADO (Sistema):", 'valor_esperado'),
+    Valor("VALOR DECLARADO (Contado):", 'valor_declarado'),
+    Separador('-'),
+    Se('diferenca_zero', [Texto("DIFERENÇA: OK: R$ 0,00")],
+       senao=[Texto("DIFERENÇA: {status_diferenca}: {diferenca_abs}", {'diferenca_abs': 'moeda'})]),
+    Separador('='),
+    Texto("STATUS DO CAIXA: {status_texto}"),
+    Separador('='),
+])
+
+
+def _data_recibo(data_hora) -> str:
+    """Data/hora da venda para o recibo (reimpressão mostra a hora da venda, não a de agora)."""
+    for formato in ('%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M:%S'):  # banco / tela de vendas
+        try:
+            return dt.datetime.strptime(data_hora, formato).strftime('%d/%m/%Y %H:%M')
+        except (TypeError, ValueError):
+            continue
+    return dt.datetime.now().strftime('%d/%m/%Y %H:%M')
+
 
 class PrinterManager:
-    """Gerencia a formatação de recibos e a simulação de emissão fiscal."""
+    """Gerencia a formatação de recibos, a impressão e o pedido de emissão fiscal (NFC-e)."""
 
     def __init__(self):
-        # Você pode inicializar configurações de impressora aqui
-        pass
+        # Impressora ESC/POS (PDV_IMPRESSORA); sem ela, a impressão sai no console
+        self.print_queue = start_print_queue_from_env()
+        # Recibos de venda: fila persistida (FilaImpressao), impressa por uma thread própria
+        self.spooler = PrintSpooler(connect_db, self._render_spool_job, self._deliver_spool_job)
+        self.spooler.start()
+        # NFC-e: fila fiscal com autorização em segundo plano (PDV_NFCE_SEFAZ); sem ela, desligada
+        self.nfce = start_nfce_emitter_from_env(connect_db)
+
+    def close(self):
+        """Para o spooler, a fila de impressão e a emissão de NFC-e (o que estiver pendente continua na fila do banco)."""
+        if self.nfce is not None:
+            self.nfce.stop(timeout=5.0)
+            self.nfce = None
+        if self.spooler is not None:
+            self.spooler.stop(timeout=5.0)
+            self.spooler = None
+        if self.print_queue is not None:
+            self.print_queue.stop(timeout=5.0)
+            self.print_queue = None
+
+    # -----------------------------------------------------------------
+    # SPOOLER (recibos pelo id da venda)
+    # -----------------------------------------------------------------
+
+    def enqueue_sale_receipt(self, conn, id_venda: int) -> int:
+        """Põe o recibo da venda na fila persistida (finalização ou reimpressão) e volta na hora."""
+        job_id = enqueue_receipt(conn, id_venda)
+        if self.spooler is not None:
+            self.spooler.wake()
+        return job_id
+
+    def enqueue_text(self, conn, content: str) -> int:
+        """Texto pronto (ex: fechamento) na fila persistida."""
+        job_id = enqueue_job(conn, TIPO_TEXTO, conteudo=content)
+        if self.spooler is not None:
+            self.spooler.wake()
+        return job_id
+
+    def _render_spool_job(self, conn, job):
+        """Monta o trabalho da fila: bytes ESC/POS com impressora configurada, texto para o console sem."""
+        _, tipo, id_venda, conteudo, _ = job
+        if tipo == TIPO_RECIBO:
+            venda_data, itens, pagamentos = load_sale(conn, id_venda)
+            if self.print_queue is not None:
+                return self.build_receipt_escpos(venda_data, itens, pagamentos)
+            return self.generate_receipt_content(venda_data, itens, pagamentos)
+        if conteudo is None:
+            raise ValueError(f"trabalho de impressão do tipo {tipo!r} sem conteúdo")
+        return text_to_escpos(conteudo) if self.print_queue is not None else conteudo
+
+    def _deliver_spool_job(self, conteudo):
+        """
+        Entrega pela PrintQueue (a única thread que escreve na impressora) e espera o resultado;
+        OSError volta para o spooler tentar de novo.
+        """
+        if isinstance(conteudo, bytes):
+            entregue = threading.Event()
+            resultado = {}
+
+            def on_done(erro):
+                resultado['erro'] = erro
+                entregue.set()
+
+            self.print_queue.submit(conteudo, "trabalho do spooler", on_done=on_done)
+            while not entregue.wait(1.0):
+                if not self.print_queue.is_alive():
+                    raise OSError("fila de impressão parada")
+            if resultado['erro'] is not None:
+                raise resultado['erro']
+        else:
+            print("\n" + "=== INÍCIO IMPRESSÃO ===")
+            print(conteudo)
+            print("=== FIM IMPRESSÃO ===" + "\n")
         
     def _format_currency(self, value: float) -> str:
         """Formata um valor float para string de moeda brasileira (Ex: R$ 1.234,56)."""
-        # Utiliza formatação manual para garantir compatibilidade entre sistemas
-        return f"R$ {value:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+        return brl(value)
 
     # -----------------------------------------------------------------
     # Z. MÉTODO DE IMPRESSÃO SIMULADA
     # -----------------------------------------------------------------
 
     def print_text(self, content: str):
-        """Simula a impressão enviando o conteúdo para o console com wrappers."""
+        """Manda o texto para a impressora ESC/POS (em segundo plano) ou, sem impressora, para o console."""
+        if self.print_queue is not None:
+            self.print_queue.submit(text_to_escpos(content))
+            return
         print("\n" + "=== INÍCIO IMPRESSÃO ===")
         print(content)
         print("=== FIM IMPRESSÃO ===" + "\n")
@@ -42,69 +189,65 @@ class PrinterManager:
     # A. RECIBO (NÃO FISCAL)
     # -----------------------------------------------------------------
     
+    def _receipt_context(self, venda_data: Dict[str, Any], itens_carrinho: List[Dict[str, Any]], pagamentos: List[Dict[str, Any]]) -> dict:
+        ctx = dict(venda_data)
+        ctx['id'] = venda_data['id'] or 'N/A'
+        ctx['data'] = _data_recibo(venda_data.get('data_hora'))
+        ctx['itens'] = itens_carrinho
+        ctx['pagamentos'] = pagamentos
+        return ctx
+
     def generate_receipt_content(self, venda_data: Dict[str, Any], itens_carrinho: List[Dict[str, Any]], pagamentos: List[Dict[str, Any]]) -> str:
         """Gera o conteúdo de um recibo simples formatado em texto."""
-        
-        # Dados do cabeçalho
-        cabecalho = "========================================\n"
-        cabecalho += "         NOME DA SUA EMPRESA S.A.       \n"
-        cabecalho += "         Recibo Não Fiscal              \n"
-        cabecalho += "========================================\n"
-        cabecalho += f"CUPOM: {venda_data['id'] or 'N/A'} - Data: {dt.datetime.now().strftime('%d/%m/%Y %H:%M')}\n"
-        cabecalho += f"VENDEDOR: {venda_data['vendedor_nome']}\n"
-        cabecalho += "----------------------------------------\n"
-        
-        # Itens
-        itens_str = f"{'QTD':<5} {'ITEM':<20} {'VL UN':>8} {'TOTAL':>8}\n"
-        
-        for item in itens_carrinho:
-            nome = item['nome'][:18] # Limita o nome
-            total_item = item.get('total_liquido_item', item['quantidade'] * item['preco_unitario'])
-            
-            # Formatação de QTD e Valores para BR
-            qtd_str = f"{item['quantidade']:<5.2f}".replace('.', ',')
-            vl_un_str = f"{item['preco_unitario']:>8.2f}".replace('.', ',')
-            total_item_str = f"{total_item:>8.2f}".replace('.', ',')
-            
-            itens_str += f"{qtd_str} {nome:<20} {vl_un_str} {total_item_str}\n"
-
-        itens_str += "----------------------------------------\n"
-
-        # Totais
-        totais_str = f"SUBTOTAL BRUTO: {self._format_currency(venda_data['valor_bruto']):>19}\n"
-        totais_str += f"(-) DESCONTO:   {self._format_currency(venda_data['desconto_aplicado']):>19}\n"
-        totais_str += f"(+) TAXA SERV.:  {self._format_currency(venda_data['taxa_servico']):>19}\n"
-        totais_str += f"TOTAL LÍQUIDO:  {self._format_currency(venda_data['total_venda']):>19}\n"
-        totais_str += "========================================\n"
-        
-        # Pagamentos
-        pagamentos_str = "PAGAMENTOS:\n"
-        for p in pagamentos:
-            pagamentos_str += f" {p['method']:<15}: {self._format_currency(p['value']):>15}\n"
-
-        pagamentos_str += f"RECEBIDO:       {self._format_currency(venda_data['valor_recebido']):>19}\n"
-        pagamentos_str += f"TROCO:          {self._format_currency(venda_data['troco']):>19}\n"
-        pagamentos_str += "========================================\n"
-        
-        # Rodapé
-        rodape = "     OBRIGADO E VOLTE SEMPRE!           \n"
-        
-        return cabecalho + itens_str + totais_str + pagamentos_str + rodape
+        return RECIBO_TEXTO.render(self._receipt_context(venda_data, itens_carrinho, pagamentos))
+
+    def build_receipt_escpos(self, venda_data: Dict[str, Any], itens_carrinho: List[Dict[str, Any]], pagamentos: List[Dict[str, Any]]) -> bytes:
+        """Mesmo recibo de generate_receipt_content em bytes ESC/POS (cabeçalho em negrito, código de barras e corte)."""
+        b = EscPosBuilder()
+        b.align(ALIGN_CENTER).bold().double().line("NOME DA SUA EMPRESA S.A.").double(False).bold(False)
+        b.line("Recibo Não Fiscal").align(ALIGN_LEFT)
+        b.line("=" * 40)
+        b.lines(RECIBO_CORPO.render(self._receipt_context(venda_data, itens_carrinho, pagamentos)))
+
+        b.align(ALIGN_CENTER)
+        if venda_data.get('id'):
+            b.barcode(str(venda_data['id']))
+        b.line("OBRIGADO E VOLTE SEMPRE!").align(ALIGN_LEFT)
+        return b.cut().build()
+
+    def print_receipt(self, venda_data: Dict[str, Any], itens_carrinho: List[Dict[str, Any]], pagamentos: List[Dict[str, Any]]):
+        """Imprime o recibo: na impressora ESC/POS em segundo plano, ou no console se não houver impressora."""
+        if self.print_queue is not None:
+            self.print_queue.submit(
+                self.build_receipt_escpos(venda_data, itens_carrinho, pagamentos),
+                f"recibo da venda #{venda_data.get('id')}"
+            )
+        else:
+            self.print_text(self.generate_receipt_content(venda_data, itens_carrinho, pagamentos))
 
     # -----------------------------------------------------------------
-    # B. NOTA FISCAL (SIMULAÇÃO)
+    # B. NOTA FISCAL (NFC-e)
     # -----------------------------------------------------------------
 
-    def initiate_invoice_emission(self, venda_data: Dict[str, Any], itens_carrinho: List[Dict[str, Any]], pagamentos: List[Dict[str, Any]]) -> str:
-        """Simula a chamada de uma API externa para emissão de NF-e/NFC-e."""
-        
-        nf_log = f"--- INÍCIO DA EMISSÃO NF-e/NFC-e ---\n"
-        nf_log += f"Venda ID: {venda_data['id']}\n"
-        nf_log += f"Total: {self._format_currency(venda_data['total_venda'])}\n"
-        nf_log += f"Status: REQUISIÇÃO ENVIADA (SIMULAÇÃO)\n"
-        nf_log += f"Necessário: Certificado Digital, NCM dos produtos e API SEFAZ.\n"
-        nf_log += "--- FIM DA SIMULAÇÃO ---\n"
-        
+    def initiate_invoice_emission(self, conn, id_venda: int) -> str:
+        """
+        Pede a NFC-e da venda: grava na fila fiscal e volta na hora. Montagem, assinatura e
+        autorização saem em segundo plano (NfceEmitter). Retorna a mensagem para o operador.
+        """
+        if self.nfce is None:
+            return ("Emissão de NFC-e desligada.\n"
+                    "Configure PDV_NFCE_SEFAZ, PDV_NFCE_CNPJ, PDV_NFCE_CSC e o certificado (PDV_NFCE_CERTIFICADO).")
+
+        enqueue_nfce(conn, id_venda, self.nfce.emitente['serie'])
+        self.nfce.wake()
+        doc = fiscal_status(conn, id_venda)
+        if doc['status'] == STATUS_AUTORIZADA:
+            return f"NFC-e nº {doc['numero']} (série {doc['serie']}) já autorizada.\nProtocolo: {doc['protocolo']}"
+
+        nf_log = f"NFC-e nº {doc['numero']} (série {doc['serie']}) da venda #{id_venda} na fila de autorização.\n"
+        nf_log += "A autorização segue em segundo plano; o caixa pode continuar vendendo."
+        if self.nfce.contingencia:
+            nf_log += "\nSEFAZ indisponível: emitida em contingência offline, transmitida quando a SEFAZ voltar."
         return nf_log
 
     # -----------------------------------------------------------------
@@ -113,44 +256,25 @@ class PrinterManager:
 
     def format_fechamento(self, resumo: dict) -> str:
         """Formata o resumo de fechamento de caixa para impressão."""
-        
-        # Formatação de moeda (usando o método auxiliar)
-        esperado = self._format_currency(resumo['valor_esperado'])
-        declarado = self._format_currency(resumo['valor_declarado'])
-        
-        # Diferença absoluta para exibição
-        diferenca_abs = self._format_currency(abs(resumo['diferenca'])) 
-        
+        ctx = dict(resumo)
+        ctx.setdefault('quantidade_vendas', 0)
+        ctx.setdefault('dinheiro_liquido', 0.0)
+        ctx['metodos'] = [
+            {'metodo': metodo.upper(), **totais}
+            for metodo, totais in sorted(resumo.get('totais_por_metodo', {}).items())
+        ]
+
         # Determinar status e se é falta ou sobra
+        ctx['diferenca_abs'] = abs(resumo['diferenca'])
+        ctx['diferenca_zero'] = False
         if resumo['diferenca'] > 0.001:
-            status_line = f"SOBRA: {diferenca_abs}"
-            status_text = "SOBRA REGISTRADA"
+            ctx['status_diferenca'], ctx['status_texto'] = "SOBRA", "SOBRA REGISTRADA"
         elif resumo['diferenca'] < -0.001:
-            status_line = f"FALTA: {diferenca_abs}"
-            status_text = "FALTA REGISTRADA"
+            ctx['status_diferenca'], ctx['status_texto'] = "FALTA", "FALTA REGISTRADA"
         else:
-            status_line = "OK: R$ 0,00"
-            status_text = "FECHAMENTO PERFEITO"
-
-        saida = [
-            "=== COMPROVANTE DE FECHAMENTO ===",
-            "========================================",
-            f"CAIXA ID: {resumo['id_caixa']} - VENDEDOR: {resumo['vendedor_nome']}",
-            f"ABERTURA: {resumo['data_abertura']}",
-            f"FECHAMENTO: {resumo['data_fechamento']}",
-            "----------------------------------------",
-            f"FUNDO DE TROCO: {self._format_currency(resumo['valor_abertura'])}",
-            f"TOTAL DE VENDAS: {self._format_currency(resumo['total_vendas'])}",
-            "----------------------------------------",
-            f"VALOR ESPERADO (Sistema): {esperado}",
-            f"VALOR DECLARADO (Contado): {declarado}",
-            "----------------------------------------",
-            f"DIFERENÇA: {status_line}",
-            "========================================",
-            f"STATUS DO CAIXA: {status_text}",
-            "========================================",
-        ]
-        return "\n".join(saida)
+            ctx['diferenca_zero'], ctx['status_texto'] = True, "FECHAMENTO PERFEITO"
+
+        return FECHAMENTO.render(ctx)
 
     def print_caixa_fechamento(self, resumo: dict):
         """Gera e envia o recibo de fechamento para a impressora (simulado no console)."""
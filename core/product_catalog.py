@@ -0,0 +1,209 @@
+# core/product_catalog.py
+
+import sqlite3
+import threading
+from typing import Callable, List
+
+from core.change_feed import OP_DELETE, OP_INSERT, changed_rows, current_version
+from core.database import connect_db
+from core.text_search import normalize_search_text
+
+# Tupla padrão de produto usada pelo PDV: (codigo, nome, preco, tipo_medicao, categoria)
+CATALOG_QUERY = "SELECT codigo, nome, preco, tipo_medicao, categoria FROM Produtos"
+# Acima disso, catch_up recarrega o catálogo inteiro em vez de aplicar produto a produto
+CATCH_UP_LIMIT = 2000
+
+
+def fetch_catalog_rows(conn) -> List[tuple]:
+    """Lê todas as tuplas de produto do banco, ordenadas por código."""
+    if conn is None:
+        return []
+    cursor = conn.cursor()
+    cursor.execute(CATALOG_QUERY + " ORDER BY codigo")
+    return cursor.fetchall()
+
+
+def build_search_key(codigo, nome) -> str:
+    """Chave de busca de um produto: código e nome normalizados na mesma string."""
+    return normalize_search_text(f"{codigo} {nome}")
+
+
+class ProductCatalog:
+    """
+    Catálogo de produtos em memória, compartilhado pelas telas do PDV.
+    Guarda as tuplas de produto, um índice por código e a chave de busca normalizada
+    de cada linha. Cada mudança (carga completa, inclusão ou edição) é avisada aos
+    ouvintes registrados, que atualizam seus modelos sem recarregar a tabela inteira.
+
+    As mutações devem acontecer na thread da interface; a leitura do banco em segundo
+    plano (start_background_load) apenas entrega as linhas para quem for aplicá-las.
+    """
+
+    RESET = 'reset'
+    INSERT = 'insert'
+    UPDATE = 'update'
+
+    def __init__(self):
+        self.products: List[tuple] = []
+        self.search_keys: List[str] = []
+        self._row_by_code = {}
+        self._listeners: List[Callable[[str, int], None]] = []
+        self.loaded = False
+        # Versão do diário de alterações (core/change_feed) que o catálogo já reflete
+        self.versao = 0
+
+    def __len__(self):
+        return len(self.products)
+
+    # --- OUVINTES ---
+
+    def subscribe(self, callback: Callable[[str, int], None]):
+        """Registra um ouvinte chamado como callback(evento, linha)."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, event: str, row: int = -1):
+        for callback in list(self._listeners):
+            callback(event, row)
+
+    # --- CONSULTA ---
+
+    def get(self, codigo: str):
+        """Retorna a tupla do produto pelo código, ou None."""
+        row = self._row_by_code.get(codigo)
+        return self.products[row] if row is not None else None
+
+    def row_of(self, codigo: str) -> int:
+        """Posição do produto no catálogo (-1 se não existir)."""
+        return self._row_by_code.get(codigo, -1)
+
+    # --- ATUALIZAÇÃO ---
+
+    def replace_all(self, rows: List[tuple], versao: int = None):
+        """
+        Substitui o conteúdo do catálogo (carga inicial ou recarga completa).
+        'versao' é a versão do diário lida ANTES das linhas (base para catch_up).
+        """
+        if versao is not None:
+            self.versao = versao
+        self.products = [tuple(row) for row in rows]
+        self.search_keys = [build_search_key(row[0], row[1]) for row in self.products]
+        self._row_by_code = {row[0]: i for i, row in enumerate(self.products)}
+        self.loaded = True
+        self._notify(self.RESET)
+
+    def upsert(self, product: tuple):
+        """Inclui ou atualiza um único produto, avisando os ouvintes da linha afetada."""
+        product = tuple(product)
+        codigo = product[0]
+        row = self._row_by_code.get(codigo)
+
+        if row is None:
+            row = len(self.products)
+            self.products.append(product)
+            self.search_keys.append(build_search_key(codigo, product[1]))
+            self._row_by_code[codigo] = row
+            self._notify(self.INSERT, row)
+        else:
+            self.products[row] = product
+            self.search_keys[row] = build_search_key(codigo, product[1])
+            self._notify(self.UPDATE, row)
+
+    def refresh_product(self, conn, codigo: str):
+        """Relê um produto do banco (após INSERT/UPDATE) e aplica no catálogo."""
+        if conn is None:
+            return
+        try:
+            cursor = conn.cursor()
+            cursor.execute(CATALOG_QUERY + " WHERE codigo = ?", (codigo,))
+            product = cursor.fetchone()
+        except sqlite3.Error as e:
+            print(f"Erro ao atualizar produto no catálogo: {e}")
+            return
+
+        if product:
+            self.upsert(product)
+
+    def reload(self, conn):
+        """Recarrega o catálogo inteiro de forma síncrona."""
+        versao = current_version(conn)
+        self.replace_all(fetch_catalog_rows(conn), versao)
+
+    def catch_up(self, conn) -> int:
+        """
+        Aplica só os produtos alterados desde self.versao, pelo diário de alterações.
+        Exclusões, troca de código ou muitas alterações de uma vez (importação,
+        reajuste em massa) viram uma recarga completa. Retorna quantos produtos mudaram.
+        """
+        if conn is None or not self.loaded:
+            return 0
+        try:
+            versao, linhas = changed_rows(conn, 'Produtos', self.versao, CATCH_UP_LIMIT)
+            if linhas is None or OP_DELETE in linhas.values():
+                self.reload(conn)
+                return len(self.products)
+            if not linhas:
+                self.versao = versao
+                return 0
+
+            ids = list(linhas)
+            cursor = conn.cursor()
+            cursor.execute(
+                CATALOG_QUERY.replace("SELECT ", "SELECT id, ", 1)
+                + f" WHERE id IN ({','.join('?' * len(ids))}) ORDER BY codigo", ids
+            )
+            rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Erro ao atualizar o catálogo pelo diário de alterações: {e}")
+            return 0
+
+        # Produto alterado cujo código não está no catálogo: o código mudou (o antigo ficaria órfão)
+        if any(linhas[row[0]] != OP_INSERT and row[1] not in self._row_by_code for row in rows):
+            self.reload(conn)
+            return len(self.products)
+
+        self.versao = versao
+        for row in rows:
+            self.upsert(row[1:])
+        return len(rows)
+
+
+def start_background_load(on_loaded: Callable[[List[tuple], int], None]) -> threading.Thread:
+    """
+    Lê o catálogo em uma thread separada, com conexão própria (conexões sqlite3 não
+    podem ser compartilhadas entre threads), e entrega as linhas e a versão do diário
+    de alterações para on_loaded(rows, versao).
+    ATENÇÃO: on_loaded é chamado na thread de trabalho; a UI deve repassar as linhas
+    para a thread principal (ex: emitindo um Signal) antes de chamar replace_all.
+    """
+    def _worker():
+        conn = connect_db()
+        try:
+            versao = current_version(conn)
+            rows = fetch_catalog_rows(conn)
+        except sqlite3.Error as e:
+            print(f"Erro ao carregar catálogo de produtos: {e}")
+            rows = None
+        finally:
+            if conn:
+                conn.close()
+
+        if rows is not None:
+            on_loaded(rows, versao)
+
+    thread = threading.Thread(target=_worker, name="CatalogLoader", daemon=True)
+    thread.start()
+    return thread
+
+
+# Instância única usada por todas as telas (PDV, cadastro, consultas)
+_shared_catalog = ProductCatalog()
+
+
+def get_catalog() -> ProductCatalog:
+    """Retorna o catálogo de produtos compartilhado da aplicação."""
+    return _shared_catalog
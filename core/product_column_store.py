@@ -0,0 +1,131 @@
+# core/product_column_store.py
+
+from array import array
+from bisect import bisect_left
+
+from core.database import search_keys_for
+from core.text_search import normalize_search_text
+
+# Colunas lidas do banco para a lista de produtos (na ordem esperada por append_rows)
+COLUMN_STORE_FIELDS = "codigo, nome, preco, tipo_medicao, categoria, codigo_busca, nome_busca"
+
+
+class ProductColumnStore:
+    """
+    Armazenamento colunar compacto das linhas carregadas da lista de produtos.
+    Em vez de uma tupla (ou cinco QStandardItem) por produto, guarda uma lista por
+    coluna: códigos e nomes como str, preços num array('d') e medida/categoria como
+    índices (array('H')) para tabelas de valores distintos, que se repetem muito.
+    As linhas ficam ordenadas por código (mesma ordem da paginação por keyset).
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.codes = []
+        self.names = []
+        self.prices = array('d')
+        self.type_ids = array('H')
+        self.category_ids = array('H')
+        # Chave de filtro por linha: código, nome, medida e categoria normalizados
+        self.filter_keys = []
+
+        self._types = []
+        self._type_index = {}
+        self._categories = []
+        self._category_index = {}
+        self._normalized = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    # --- VALORES DISTINTOS (MEDIDA/CATEGORIA) ---
+
+    def _intern(self, value, values: list, index: dict) -> int:
+        value_id = index.get(value)
+        if value_id is None:
+            value_id = len(values)
+            values.append(value)
+            index[value] = value_id
+        return value_id
+
+    def _normalize_cached(self, value) -> str:
+        normalized = self._normalized.get(value)
+        if normalized is None:
+            normalized = self._normalized[value] = normalize_search_text(value)
+        return normalized
+
+    def _unpack(self, row):
+        """Converte uma linha do banco nos valores de cada coluna."""
+        codigo, nome, preco, tipo_medicao, categoria = row[:5]
+        codigo_busca, nome_busca = row[5:7] if len(row) >= 7 else (None, None)
+
+        if nome_busca is None or codigo_busca is None:
+            nome_busca, codigo_busca = search_keys_for(codigo, nome)
+
+        filter_key = (
+            f"{codigo_busca} {nome_busca} "
+            f"{self._normalize_cached(tipo_medicao)} {self._normalize_cached(categoria)}"
+        )
+        return (
+            codigo,
+            nome,
+            float(preco or 0.0),
+            self._intern(tipo_medicao, self._types, self._type_index),
+            self._intern(categoria, self._categories, self._category_index),
+            filter_key,
+        )
+
+    # --- ESCRITA ---
+
+    def append_rows(self, rows):
+        """Acrescenta linhas no final (próxima página da paginação)."""
+        for row in rows:
+            codigo, nome, preco, type_id, category_id, filter_key = self._unpack(row)
+            self.codes.append(codigo)
+            self.names.append(nome)
+            self.prices.append(preco)
+            self.type_ids.append(type_id)
+            self.category_ids.append(category_id)
+            self.filter_keys.append(filter_key)
+
+    def insert_row(self, position: int, row):
+        codigo, nome, preco, type_id, category_id, filter_key = self._unpack(row)
+        self.codes.insert(position, codigo)
+        self.names.insert(position, nome)
+        self.prices.insert(position, preco)
+        self.type_ids.insert(position, type_id)
+        self.category_ids.insert(position, category_id)
+        self.filter_keys.insert(position, filter_key)
+
+    def set_row(self, position: int, row):
+        codigo, nome, preco, type_id, category_id, filter_key = self._unpack(row)
+        self.codes[position] = codigo
+        self.names[position] = nome
+        self.prices[position] = preco
+        self.type_ids[position] = type_id
+        self.category_ids[position] = category_id
+        self.filter_keys[position] = filter_key
+
+    # --- LEITURA ---
+
+    def type_of(self, position: int) -> str:
+        return self._types[self.type_ids[position]]
+
+    def category_of(self, position: int) -> str:
+        return self._categories[self.category_ids[position]]
+
+    def position_of(self, codigo: str) -> int:
+        """Posição da linha com o código (busca binária), ou -1 se não estiver carregada."""
+        position = bisect_left(self.codes, codigo)
+        if position < len(self.codes) and self.codes[position] == codigo:
+            return position
+        return -1
+
+    def insertion_point(self, codigo: str) -> int:
+        return bisect_left(self.codes, codigo)
+
+    @property
+    def last_code(self):
+        return self.codes[-1] if self.codes else None
@@ -0,0 +1,373 @@
+# core/product_import.py
+"""
+Importação em massa de produtos (CSV ou JSON) para a tabela Produtos.
+
+Uso pela linha de comando (a partir da pasta do PDV, onde fica o pdv.db):
+
+    python -m core.product_import produtos.csv
+    python -m core.product_import produtos.json --lote 10000
+    python -m core.product_import produtos.csv --retomar 120001   (continua depois de uma falha)
+
+Colunas aceitas (cabeçalho sem diferenciar acentos/maiúsculas):
+    codigo, nome, preco               -> obrigatórias
+    quantidade, tipo_medicao, categoria -> opcionais
+Produtos com código já cadastrado são atualizados (upsert); se o arquivo não tiver a
+coluna 'quantidade', o estoque dos produtos existentes é mantido.
+Cada lote é gravado na sua própria transação; se a importação parar no meio, os lotes
+anteriores ficam gravados e ela pode ser retomada pela última linha gravada.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+from typing import Callable, Iterator
+
+from core.database import (
+    connect_db,
+    create_and_populate_tables,
+    create_search_indexes,
+    drop_search_indexes,
+    search_keys_for,
+)
+from core.stock_ledger import take_stock_snapshot
+from core.text_search import normalize_search_text
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 200
+DEFAULT_CATEGORY = "Outros"
+
+# Cabeçalhos normalizados aceitos -> coluna de Produtos
+_HEADER_ALIASES = {
+    'codigo': 'codigo', 'cod': 'codigo', 'ean': 'codigo', 'codigo de barras': 'codigo',
+    'nome': 'nome', 'descricao': 'nome', 'produto': 'nome',
+    'preco': 'preco', 'preco venda': 'preco', 'valor': 'preco',
+    'quantidade': 'quantidade', 'estoque': 'quantidade', 'qtd': 'quantidade',
+    'tipo medicao': 'tipo_medicao', 'tipomedicao': 'tipo_medicao', 'medida': 'tipo_medicao',
+    'unidade': 'tipo_medicao',
+    'categoria': 'categoria',
+}
+
+# ?1..?8 numerados: 'quantidade' (?4) é reaproveitado no DO UPDATE para manter o
+# estoque atual quando a linha não traz quantidade (NULL).
+UPSERT_SQL = """
+    INSERT INTO Produtos (codigo, nome, preco, quantidade, tipo_medicao, categoria, nome_busca, codigo_busca)
+    VALUES (?1, ?2, ?3, COALESCE(?4, 0), ?5, ?6, ?7, ?8)
+    ON CONFLICT(codigo) DO UPDATE SET
+        nome = excluded.nome,
+        preco = excluded.preco,
+        quantidade = COALESCE(?4, Produtos.quantidade),
+        tipo_medicao = excluded.tipo_medicao,
+        categoria = excluded.categoria,
+        nome_busca = excluded.nome_busca,
+        codigo_busca = excluded.codigo_busca
+"""
+
+
+# ----------------------------------------------------
+# --- LEITURA DO ARQUIVO (STREAMING) ---
+# ----------------------------------------------------
+
+class ImportSource:
+    """
+    Arquivo de importação lido em streaming (CSV, JSON em array ou JSON Lines).
+    rows() gera (numero_da_linha, dicionario) sem carregar o arquivo inteiro;
+    fraction() informa quanto do arquivo já foi lido (para a barra de progresso).
+    """
+
+    JSON_CHUNK = 64 * 1024
+
+    def __init__(self, path: str, encoding: str = 'utf-8-sig'):
+        self.path = path
+        self.encoding = encoding
+        self.size = os.path.getsize(path) or 1
+        self._raw = None
+
+    def fraction(self) -> float:
+        if self._raw is None:
+            return 0.0
+        if self._raw.closed:
+            return 1.0
+        return min(self._raw.tell() / self.size, 1.0)
+
+    def rows(self) -> Iterator[tuple]:
+        self._raw = open(self.path, 'rb')
+        try:
+            text = io.TextIOWrapper(self._raw, encoding=self.encoding, newline='')
+            if self.path.lower().endswith(('.json', '.jsonl', '.ndjson')):
+                yield from self._json_rows(text)
+            else:
+                yield from self._csv_rows(text)
+        finally:
+            self._raw.close()
+
+    def _csv_rows(self, text):
+        # Separador detectado pela amostra (planilhas BR costumam exportar com ';')
+        sample = text.read(4096)
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=';,\t').delimiter
+        except csv.Error:
+            delimiter = ';' if sample.count(';') > sample.count(',') else ','
+        text.seek(0)
+        reader = csv.reader(text, delimiter=delimiter)
+
+        header = next(reader, None)
+        if not header:
+            return
+        columns = [_HEADER_ALIASES.get(normalize_search_text(name)) for name in header]
+
+        for line_number, values in enumerate(reader, start=2):
+            if not any(values):
+                continue
+            yield line_number, {
+                column: value for column, value in zip(columns, values) if column is not None
+            }
+
+    def _json_rows(self, text):
+        """Decodifica os objetos um a um (array JSON ou um objeto por linha), em blocos."""
+        decoder = json.JSONDecoder()
+        buffer = ""
+        position = 0
+        item_number = 0
+        eof = False
+
+        while True:
+            # Pula espaços, vírgulas e os colchetes do array
+            while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+                position += 1
+
+            if position >= len(buffer):
+                if eof:
+                    return
+                buffer = text.read(self.JSON_CHUNK)
+                position = 0
+                eof = not buffer
+                continue
+
+            try:
+                obj, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                chunk = text.read(self.JSON_CHUNK)
+                if not chunk:
+                    raise ValueError(f"JSON inválido perto do item {item_number + 1}.")
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+
+            position = end
+            item_number += 1
+            if isinstance(obj, dict):
+                yield item_number, {
+                    _HEADER_ALIASES[key]: value for key, value in
+                    ((normalize_search_text(k), v) for k, v in obj.items())
+                    if key in _HEADER_ALIASES
+                }
+
+
+# ----------------------------------------------------
+# --- VALIDAÇÃO ---
+# ----------------------------------------------------
+
+def _parse_decimal(value):
+    """Aceita número ou texto em formato BR ('1.234,56') ou com ponto ('1234.56')."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace('R$', '').replace(' ', '')
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    return float(text)
+
+
+def validate_row(raw: dict):
+    """
+    Valida e converte um registro do arquivo.
+    Retorna (tupla_para_o_upsert, None) ou (None, mensagem_de_erro).
+    """
+    codigo = str(raw.get('codigo') or "").strip()
+    nome = str(raw.get('nome') or "").strip()
+    if not codigo:
+        return None, "código vazio"
+    if not nome:
+        return None, f"produto {codigo}: nome vazio"
+
+    try:
+        preco = _parse_decimal(raw.get('preco'))
+        quantidade = _parse_decimal(raw.get('quantidade'))
+    except ValueError:
+        return None, f"produto {codigo}: preço/quantidade inválidos"
+
+    if preco is None or preco <= 0:
+        return None, f"produto {codigo}: preço deve ser maior que zero"
+
+    tipo = normalize_search_text(raw.get('tipo_medicao') or 'unidade')
+    tipo_medicao = 'Peso' if tipo in ('peso', 'kg', 'granel') else 'Unidade'
+    categoria = str(raw.get('categoria') or "").strip() or DEFAULT_CATEGORY
+
+    nome_busca, codigo_busca = search_keys_for(codigo, nome)
+    return (codigo, nome, round(preco, 2), quantidade, tipo_medicao, categoria, nome_busca, codigo_busca), None
+
+
+class ImportResult:
+    """Resumo da importação: linhas lidas, gravadas, erros (linha, mensagem) e a última linha gravada."""
+
+    def __init__(self, last_line: int = 0):
+        self.processed = 0
+        self.imported = 0
+        self.errors = []
+        self.error_count = 0
+        self.last_line = last_line
+
+    def add_error(self, line_number: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+    def summary(self) -> str:
+        return (f"{self.imported} produto(s) importado(s) de {self.processed} linha(s); "
+                f"{self.error_count} linha(s) rejeitada(s).")
+
+
+class ImportInterrupted(Exception):
+    """A importação parou no meio; os lotes até result.last_line já estão gravados."""
+
+    def __init__(self, result: ImportResult, cause: Exception):
+        super().__init__(f"{cause} (gravado até a linha {result.last_line})")
+        self.result = result
+        self.last_line = result.last_line
+
+
+# ----------------------------------------------------
+# --- GRAVAÇÃO ---
+# ----------------------------------------------------
+
+def import_products(conn, rows, chunk_size: int = CHUNK_SIZE,
+                    progress: Callable[[ImportResult], None] = None, resume_after: int = 0) -> ImportResult:
+    """
+    Grava os registros (iterável de (linha, dict)) em lotes com executemany + UPSERT.
+    Cada lote é uma transação própria (BEGIN...COMMIT): o lock de escrita fica livre entre
+    um lote e outro (o caixa continua vendendo) e, se algo falhar, só o lote em andamento é
+    desfeito. A falha sobe como ImportInterrupted com a última linha gravada;
+    resume_after=essa linha retoma a importação dali (as linhas até ela são puladas).
+    Se houver mais de um lote, os índices de busca são removidos no primeiro e recriados
+    uma única vez no final (mais barato que atualizá-los linha a linha), mesmo se parar no meio.
+    """
+    result = ImportResult(resume_after)
+    cursor = conn.cursor()
+    indexes_dropped = False
+
+    if conn.in_transaction:
+        conn.commit()
+
+    def write_batch(batch, last_line, drop_indexes=False):
+        cursor.execute("BEGIN")
+        if drop_indexes:
+            drop_search_indexes(cursor)
+        cursor.executemany(UPSERT_SQL, batch)
+        conn.commit()
+        result.imported += len(batch)
+        result.last_line = last_line
+
+    try:
+        batch = []
+        line_number = resume_after
+        for line_number, raw in rows:
+            if line_number <= resume_after:
+                continue
+            result.processed += 1
+            values, error = validate_row(raw)
+            if error:
+                result.add_error(line_number, error)
+            else:
+                batch.append(values)
+
+            if len(batch) >= chunk_size:
+                write_batch(batch, line_number, drop_indexes=not indexes_dropped)
+                indexes_dropped = True
+                batch = []
+                if progress:
+                    progress(result)
+
+        if batch:
+            write_batch(batch, line_number)
+        result.last_line = line_number
+
+    except (sqlite3.Error, ValueError, UnicodeDecodeError, OSError) as e:
+        if conn.in_transaction:
+            conn.rollback()
+        print(f"Erro na importação de produtos (gravado até a linha {result.last_line}): {e}")
+        raise ImportInterrupted(result, e) from e
+
+    finally:
+        if indexes_dropped:
+            try:
+                create_search_indexes(cursor)
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"Erro ao recriar os índices de busca (recriados na próxima abertura do PDV): {e}")
+
+    # Estoque inicial/alterado pela importação entra no ledger como conciliação
+    take_stock_snapshot(conn)
+
+    if progress:
+        progress(result)
+    print(f"LOG: Importação concluída. {result.summary()}")
+    return result
+
+
+def import_file(conn, path: str, encoding: str = 'utf-8-sig', chunk_size: int = CHUNK_SIZE,
+                progress: Callable[[ImportResult, float], None] = None, resume_after: int = 0) -> ImportResult:
+    """
+    Importa um arquivo CSV/JSON; progress recebe (resultado_parcial, fração_do_arquivo_lida).
+    resume_after: última linha gravada numa importação interrompida (ImportInterrupted.last_line).
+    """
+    source = ImportSource(path, encoding)
+    on_chunk = (lambda result: progress(result, source.fraction())) if progress else None
+    return import_products(conn, source.rows(), chunk_size, on_chunk, resume_after)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa produtos em massa (CSV/JSON) para o PDV.")
+    parser.add_argument('arquivo', help="Arquivo .csv, .json ou .jsonl")
+    parser.add_argument('--lote', type=int, default=CHUNK_SIZE, help="Registros por executemany")
+    parser.add_argument('--encoding', default='utf-8-sig', help="Codificação do arquivo (ex: cp1252)")
+    parser.add_argument('--retomar', type=int, default=0, metavar='LINHA',
+                        help="Continua uma importação interrompida depois desta linha (já gravada)")
+    args = parser.parse_args(argv)
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    # Banco de uma versão antiga: cria colunas de busca e tabelas do ledger antes de importar
+    create_and_populate_tables(conn)
+
+    def report(result, fraction):
+        print(f"\r{fraction * 100:5.1f}%  {result.processed} linhas, {result.error_count} erros", end="", flush=True)
+
+    try:
+        result = import_file(conn, args.arquivo, args.encoding, args.lote, report, args.retomar)
+    except ImportInterrupted as e:
+        print(f"\nFalha na importação: {e}")
+        print(f"Para continuar de onde parou: python -m core.product_import {args.arquivo} --retomar {e.last_line}")
+        return 1
+    except (sqlite3.Error, ValueError, UnicodeDecodeError, OSError) as e:
+        print(f"\nFalha na importação: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    print()
+    for line_number, message in result.errors[:20]:
+        print(f"  linha {line_number}: {message}")
+    if result.error_count > 20:
+        print(f"  ... e mais {result.error_count - 20} erro(s).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# core/receipt_template.py
+"""
+Templates de cupom/relatório compilados.
+
+O layout (recibo, fechamento, Leitura X/Redução Z) é descrito uma vez como uma lista de
+elementos: Separador, Centro, Texto, Valor, Tabela, Repetir, Se. Na criação do
+ReceiptTemplate cada elemento vira uma função pronta: separadores e títulos fixos já
+saem como string, larguras/alinhamentos viram uma string de formato só, e o formatador
+de cada coluna (moeda BR, número BR, texto) é escolhido nessa hora. Renderizar é só
+chamar essas funções e fazer um "\n".join no fim; nada de concatenar string por linha.
+
+    RECIBO = ReceiptTemplate([Separador('='), Centro("MINHA LOJA"), Valor("TOTAL:", 'total_venda')])
+    texto = RECIBO.render({'total_venda': 10.5})
+"""
+
+from operator import itemgetter
+
+from core.formatting import brl, numero_br, peso_br
+
+LARGURA = 40
+
+FORMATADORES = {
+    'texto': str,
+    'moeda': brl,
+    'numero': numero_br,
+    'peso': peso_br,
+    'inteiro': lambda valor: str(int(valor)),
+}
+
+
+def _formatador(tipo: str):
+    try:
+        return FORMATADORES[tipo]
+    except KeyError:
+        raise ValueError(f"tipo de campo desconhecido no template: {tipo!r}") from None
+
+
+def _valor_campo(campo):
+    """Campo por nome (item[campo]) ou função (campo(item)), resolvido na compilação."""
+    if callable(campo):
+        return campo
+    return itemgetter(campo)
+
+
+class Separador:
+    def __init__(self, caractere: str = '-'):
+        self.caractere = caractere
+
+    def compilar(self, largura: int):
+        linha = self.caractere * largura
+        return lambda ctx, saida: saida.append(linha)
+
+
+class Centro:
+    """Texto centralizado; pode ter {campos} do contexto."""
+
+    def __init__(self, texto: str):
+        self.texto = texto
+
+    def compilar(self, largura: int):
+        if '{' not in self.texto:
+            linha = self.texto.center(largura)
+            return lambda ctx, saida: saida.append(linha)
+        texto = self.texto
+        return lambda ctx, saida: saida.append(texto.format_map(ctx).center(largura))
+
+
+class Texto:
+    """Linha livre com {campos}; 'campos' diz quais campos passam por um formatador (ex: {'total': 'moeda'})."""
+
+    def __init__(self, formato: str, campos: dict = None):
+        self.formato = formato
+        self.campos = campos or {}
+
+    def compilar(self, largura: int):
+        formato = self.formato
+        if '{' not in formato:
+            return lambda ctx, saida: saida.append(formato)
+        if not self.campos:
+            return lambda ctx, saida: saida.append(formato.format_map(ctx))
+        conversoes = [(campo, _formatador(tipo)) for campo, tipo in self.campos.items()]
+
+        def render(ctx, saida):
+            valores = dict(ctx)
+            for campo, conv in conversoes:
+                valores[campo] = conv(ctx[campo])
+            saida.append(formato.format_map(valores))
+        return render
+
+
+class Valor:
+    """
+    Rótulo à esquerda e valor alinhado à direita na largura da bobina.
+    O rótulo pode ter {campos}; se=campo pula a linha quando o campo é zero/vazio.
+    """
+
+    def __init__(self, rotulo: str, campo, tipo: str = 'moeda', se: str = None):
+        self.rotulo = rotulo
+        self.campo = campo
+        self.tipo = tipo
+        self.se = se
+
+    def compilar(self, largura: int):
+        conv = _formatador(self.tipo)
+        valor_de = _valor_campo(self.campo)
+        rotulo = self.rotulo
+        se = self.se
+
+        if '{' not in rotulo:
+            formato = rotulo + "{:>%d}" % max(1, largura - len(rotulo))
+
+            def render(ctx, saida):
+                if se is None or ctx.get(se):
+                    saida.append(formato.format(conv(valor_de(ctx))))
+        else:
+            def render(ctx, saida):
+                if se is None or ctx.get(se):
+                    texto = rotulo.format_map(ctx)
+                    saida.append(f"{texto}{conv(valor_de(ctx)):>{max(1, largura - len(texto))}}")
+        return render
+
+
+class Coluna:
+    """Coluna de Tabela: campo (nome ou função do item), largura, alinhamento '<'/'>'/'^', tipo e título."""
+
+    def __init__(self, campo, largura: int, alinhamento: str = '<', tipo: str = 'texto', titulo: str = ''):
+        self.campo = campo
+        self.largura = largura
+        self.alinhamento = alinhamento
+        self.tipo = tipo
+        self.titulo = titulo
+
+
+class Tabela:
+    """Uma linha por item da lista ctx[campo], colunas separadas por um espaço."""
+
+    def __init__(self, campo: str, colunas: list, cabecalho: bool = True):
+        self.campo = campo
+        self.colunas = colunas
+        self.cabecalho = cabecalho
+
+    def compilar(self, largura: int):
+        # Resolvido uma vez: a string de formato da linha e, por coluna, (pega o valor, converte).
+        # Renderizar é um format só por item, sem decidir tipo/alinhamento de novo.
+        # Texto é cortado na largura da coluna (precisão); números nunca (melhor estourar do que mentir).
+        partes = []
+        for c in self.colunas:
+            if c.tipo == 'texto':
+                partes.append("{:%s%d.%d}" % (c.alinhamento, c.largura, c.largura))
+            else:
+                partes.append("{:%s%d}" % (c.alinhamento, c.largura))
+        formato = " ".join(partes)
+        colunas = tuple((_valor_campo(c.campo), _formatador(c.tipo)) for c in self.colunas)
+
+        def linha(item):
+            return formato.format(*[converter(valor(item)) for valor, converter in colunas])
+
+        titulo = None
+        if self.cabecalho:
+            titulo = " ".join(
+                "{:%s%d.%d}" % (c.alinhamento, c.largura, c.largura) for c in self.colunas
+            ).format(*(c.titulo for c in self.colunas))
+        campo = self.campo
+
+        def render(ctx, saida):
+            if titulo is not None:
+                saida.append(titulo)
+            saida.extend(map(linha, ctx[campo]))
+        return render
+
+
+class Repetir:
+    """Repete os elementos para cada item (dict) de ctx[campo]; o item vira o contexto."""
+
+    def __init__(self, campo: str, elementos: list):
+        self.campo = campo
+        self.elementos = elementos
+
+    def compilar(self, largura: int):
+        funcoes = [elemento.compilar(largura) for elemento in self.elementos]
+        campo = self.campo
+
+        def render(ctx, saida):
+            for item in ctx[campo]:
+                for funcao in funcoes:
+                    funcao(item, saida)
+        return render
+
+
+class Se:
+    """Bloco condicional: 'elementos' se ctx[campo] for verdadeiro, 'senao' caso contrário."""
+
+    def __init__(self, campo: str, elementos: list, senao: list = ()):
+        self.campo = campo
+        self.elementos = elementos
+        self.senao = senao
+
+    def compilar(self, largura: int):
+        sim = [elemento.compilar(largura) for elemento in self.elementos]
+        nao = [elemento.compilar(largura) for elemento in self.senao]
+        campo = self.campo
+
+        def render(ctx, saida):
+            for funcao in (sim if ctx.get(campo) else nao):
+                funcao(ctx, saida)
+        return render
+
+
+class ReceiptTemplate:
+    """Layout compilado. Também pode ser usado como elemento de outro template (cabeçalho/rodapé comuns)."""
+
+    def __init__(self, elementos: list, largura: int = LARGURA):
+        self.largura = largura
+        self._funcoes = [elemento.compilar(largura) for elemento in elementos]
+
+    def compilar(self, largura: int):
+        if largura != self.largura:
+            raise ValueError(f"template de largura {self.largura} usado num layout de largura {largura}")
+        return self.render_into
+
+    def render_into(self, ctx, saida: list):
+        for funcao in self._funcoes:
+            funcao(ctx, saida)
+
+    def render_lines(self, ctx) -> list:
+        saida = []
+        self.render_into(ctx, saida)
+        return saida
+
+    def render(self, ctx) -> str:
+        return "\n".join(self.render_lines(ctx))
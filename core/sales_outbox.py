@@ -0,0 +1,283 @@
+# core/sales_outbox.py
+"""
+Outbox de vendas para replicação (relatórios centrais / retaguarda).
+
+Cada venda confirmada grava, na MESMA transação, uma linha em OutboxVendas com a venda
+completa em JSON e um UUID próprio. Uma thread (OutboxShipper) esvazia a outbox em
+lotes comprimidos (gzip, uma venda JSON por linha) para um destino configurável:
+
+    PDV_OUTBOX_DESTINO=/mnt/retaguarda/vendas        (pasta: um arquivo .jsonl.gz por lote)
+    PDV_OUTBOX_DESTINO=http://servidor:8765/vendas   (POST com Content-Encoding: gzip)
+
+Se o destino estiver fora do ar, o caixa continua vendendo normalmente: as vendas se
+acumulam na outbox e a thread tenta de novo com espera exponencial; quando o destino
+volta, o atraso é despachado em lotes grandes. Um lote só sai da outbox depois de
+aceito, e o UUID permite ao destino ignorar reenvios (entrega "pelo menos uma vez").
+Um lote RECUSADO pelo destino (HTTP 4xx, exceto 401/403/408/429) não melhora com novas
+tentativas: fica marcado na outbox (rejeitado_em/motivo) e a fila segue com os
+próximos; requeue_rejected o devolve para a fila depois de corrigido o problema.
+"""
+
+import gzip
+import json
+import os
+import random
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+
+from core.database import connect_db
+from core.sync_server import auth_headers
+
+ENV_OUTBOX_DESTINATION = 'PDV_OUTBOX_DESTINO'
+
+BATCH_SIZE = 500           # vendas por lote
+IDLE_INTERVAL = 5.0        # segundos entre verificações com a outbox vazia
+BASE_BACKOFF = 2.0
+MAX_BACKOFF = 600.0
+HTTP_TIMEOUT = 30.0
+# Respostas 4xx que não são culpa do lote: o destino pede para tentar de novo (408/429)
+# ou o token do caixa está errado (401/403, corrigido na configuração)
+HTTP_RETRY_STATUS = (401, 403, 408, 429)
+
+
+class OutboxRejected(Exception):
+    """O destino recusou o lote de forma definitiva (reenviar o mesmo lote não adianta)."""
+
+
+def outbox_destination():
+    """Destino configurado (pasta ou URL), ou None se a replicação estiver desligada."""
+    return os.environ.get(ENV_OUTBOX_DESTINATION) or None
+
+
+def ensure_outbox_table(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS OutboxVendas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            uuid TEXT NOT NULL UNIQUE,
+            venda_id INTEGER NOT NULL,
+            payload TEXT NOT NULL,       -- venda completa em JSON
+            criado_em TEXT NOT NULL,
+            rejeitado_em TEXT,           -- preenchido quando o destino recusou o lote
+            motivo TEXT
+        )
+    """)
+    cursor.execute("PRAGMA table_info(OutboxVendas)")
+    if 'rejeitado_em' not in [info[1] for info in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE OutboxVendas ADD COLUMN rejeitado_em TEXT")
+        cursor.execute("ALTER TABLE OutboxVendas ADD COLUMN motivo TEXT")
+    conn.commit()
+
+
+def new_sale_uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def enqueue_sale(cursor, venda_uuid: str, venda_id: int, payload: dict):
+    """Grava a venda na outbox, SEM commit (faz parte da transação da venda)."""
+    cursor.execute(
+        "INSERT INTO OutboxVendas (uuid, venda_id, payload, criado_em) VALUES (?, ?, ?, ?)",
+        (venda_uuid, venda_id, json.dumps(payload, ensure_ascii=False, default=str),
+         datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    )
+
+
+def encode_batch(payloads: list) -> bytes:
+    """Lote comprimido: gzip de uma venda JSON por linha (os payloads já estão em JSON)."""
+    return gzip.compress(("\n".join(payloads) + "\n").encode('utf-8'), compresslevel=6)
+
+
+def decode_batch(data: bytes) -> list:
+    return [json.loads(line) for line in gzip.decompress(data).decode('utf-8').splitlines() if line.strip()]
+
+
+# ----------------------------------------------------
+# --- DESTINOS ---
+# ----------------------------------------------------
+
+class DirectorySink:
+    """Grava cada lote como um arquivo .jsonl.gz na pasta (escrita atômica: .tmp + rename)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, data: bytes, primeiro_id: int, ultimo_id: int):
+        os.makedirs(self.path, exist_ok=True)
+        name = f"vendas-{datetime.now().strftime('%Y%m%d%H%M%S')}-{primeiro_id:09d}-{ultimo_id:09d}.jsonl.gz"
+        final_path = os.path.join(self.path, name)
+        tmp_path = final_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, final_path)
+
+    def __str__(self):
+        return self.path
+
+
+class HttpSink:
+    """
+    POST do lote comprimido (com o token PDV_SYNC_TOKEN, se configurado); qualquer
+    resposta 2xx confirma o lote. Um 4xx (fora 401/403/408/429)
+    vira OutboxRejected; 5xx e falhas de rede seguem como erro passageiro.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def send(self, data: bytes, primeiro_id: int, ultimo_id: int):
+        request = urllib.request.Request(self.url, data=data, method='POST', headers={
+            'Content-Type': 'application/x-ndjson',
+            'Content-Encoding': 'gzip',
+            **auth_headers(),
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500 and e.code not in HTTP_RETRY_STATUS:
+                try:
+                    detalhe = e.read().decode('utf-8', 'replace').strip()
+                except OSError:
+                    detalhe = ''
+                raise OutboxRejected(f"HTTP {e.code} {e.reason}" + (f": {detalhe}" if detalhe else "")) from e
+            raise
+
+    def __str__(self):
+        return self.url
+
+
+def create_sink(destination: str):
+    if destination.startswith(('http://', 'https://')):
+        return HttpSink(destination)
+    return DirectorySink(destination)
+
+
+# ----------------------------------------------------
+# --- DESPACHO ---
+# ----------------------------------------------------
+
+def ship_batch(conn, sink, limite: int = BATCH_SIZE) -> int:
+    """
+    Envia o lote mais antigo da outbox e, se o destino aceitar, apaga-o (um DELETE por
+    faixa de id). Retorna quantas vendas foram enviadas (0 = outbox vazia).
+    Se o destino recusar o lote, ele é marcado como rejeitado (sai da fila) e o
+    OutboxRejected sobe; os demais erros sobem com o lote ainda na fila.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT id, payload FROM OutboxVendas WHERE rejeitado_em IS NULL ORDER BY id LIMIT ?", (limite,)
+    )
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+
+    primeiro_id, ultimo_id = rows[0][0], rows[-1][0]
+    try:
+        sink.send(encode_batch([payload for _, payload in rows]), primeiro_id, ultimo_id)
+    except OutboxRejected as e:
+        cursor.execute("""
+            UPDATE OutboxVendas SET rejeitado_em = ?, motivo = ?
+            WHERE id BETWEEN ? AND ? AND rejeitado_em IS NULL
+        """, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), str(e), primeiro_id, ultimo_id))
+        conn.commit()
+        raise OutboxRejected(f"lote {primeiro_id}-{ultimo_id} ({len(rows)} venda(s)): {e}") from e
+
+    cursor.execute(
+        "DELETE FROM OutboxVendas WHERE id BETWEEN ? AND ? AND rejeitado_em IS NULL", (primeiro_id, ultimo_id)
+    )
+    conn.commit()
+    return len(rows)
+
+
+def requeue_rejected(conn) -> int:
+    """Devolve para a fila os lotes recusados pelo destino. Retorna quantas vendas voltaram."""
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE OutboxVendas SET rejeitado_em = NULL, motivo = NULL WHERE rejeitado_em IS NOT NULL"
+        )
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro ao devolver vendas recusadas para a outbox: {e}")
+        return 0
+
+
+class OutboxShipper(threading.Thread):
+    """Thread que esvazia a outbox (conexão própria ao pdv.db), com espera exponencial nas falhas."""
+
+    def __init__(self, sink, batch_size: int = BATCH_SIZE, idle_interval: float = IDLE_INTERVAL):
+        super().__init__(name="OutboxShipper", daemon=True)
+        self.sink = sink
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def _backoff(self, failures: int) -> float:
+        # Exponencial com variação aleatória, para os caixas não baterem juntos no destino
+        delay = min(BASE_BACKOFF * (2 ** (failures - 1)), MAX_BACKOFF)
+        return delay * random.uniform(0.8, 1.2)
+
+    def run(self):
+        conn = connect_db()
+        if conn is None:
+            print("Erro na outbox de vendas: não foi possível abrir o banco local.")
+            return
+        ensure_outbox_table(conn)
+
+        failures = 0
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    sent = ship_batch(conn, self.sink, self.batch_size)
+                except OutboxRejected as e:
+                    # Reenviar não adianta: o lote ficou separado na outbox e a fila segue
+                    print(f"Erro: {self.sink} recusou vendas da outbox (separadas, sem novas tentativas): {e}")
+                    failures = 0
+                    continue
+                except (OSError, urllib.error.URLError, sqlite3.Error) as e:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    failures += 1
+                    delay = self._backoff(failures)
+                    print(f"Erro ao enviar vendas para {self.sink} (tentativa {failures}, nova em {delay:.0f}s): {e}")
+                    self._wait(delay)
+                    continue
+
+                if failures:
+                    print(f"LOG: Destino {self.sink} voltou; reenviando as vendas acumuladas.")
+                failures = 0
+                if sent == self.batch_size:
+                    continue  # Atraso acumulado: próximo lote já
+                if sent:
+                    print(f"LOG: {sent} venda(s) replicada(s) para {self.sink}.")
+                self._wait(self.idle_interval)
+        finally:
+            conn.close()
+
+    def _wait(self, seconds: float):
+        self._wake_event.wait(seconds)
+        self._wake_event.clear()
+
+
+def start_outbox_shipper_from_env():
+    """Inicia o despacho se PDV_OUTBOX_DESTINO estiver definido; senão retorna None."""
+    destination = outbox_destination()
+    if not destination:
+        return None
+    shipper = OutboxShipper(create_sink(destination))
+    shipper.start()
+    print(f"LOG: Replicação de vendas ativa (destino: {destination}).")
+    return shipper
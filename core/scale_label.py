@@ -0,0 +1,173 @@
+# core/scale_label.py
+
+import os
+import re
+
+from core.product_catalog import ProductCatalog, get_catalog
+from core.scanner import is_valid_gtin
+
+# Tipos de valor gravados na etiqueta da balança
+VALOR_PRECO = 'preco'   # Etiqueta traz o preço total do item (R$)
+VALOR_PESO = 'peso'     # Etiqueta traz o peso (kg)
+
+# Layout configurado por variável de ambiente (como PDV_BALANCA_PORTA etc.):
+#   PDV_BALANCA_ETIQUETA=2PPPP0VVVVVVD   máscara: dígitos iniciais = prefixo, P = PLU,
+#                                        V = valor, D = verificador, demais = livres
+#   PDV_BALANCA_ETIQUETA_VALOR=preco|peso   PDV_BALANCA_ETIQUETA_DECIMAIS=2
+ENV_LABEL_MASK = 'PDV_BALANCA_ETIQUETA'
+ENV_LABEL_VALUE = 'PDV_BALANCA_ETIQUETA_VALOR'
+ENV_LABEL_DECIMALS = 'PDV_BALANCA_ETIQUETA_DECIMAIS'
+
+
+class ScaleLabelLayout:
+    """
+    Layout de uma etiqueta de balança (EAN-13 de uso interno, prefixo '2').
+    As posições são índices na string de 13 dígitos. O padrão corresponde ao formato
+    mais comum das balanças Toledo/Filizola no Brasil:
+
+        2 PPPP 0 VVVVVV D
+        | |    | |      +-- dígito verificador (pos. 12)
+        | |    | +--------- valor: preço em centavos ou peso em gramas (pos. 6-11)
+        | |    +----------- dígito livre (pos. 5)
+        | +---------------- PLU (código do produto na balança, pos. 1-4)
+        +------------------ prefixo de uso interno
+    """
+
+    def __init__(self, prefix='2', plu_start=1, plu_length=4,
+                 value_start=6, value_length=6, value_kind=VALOR_PRECO, decimals=None):
+        if value_kind not in (VALOR_PRECO, VALOR_PESO):
+            raise ValueError(f"Tipo de valor inválido na etiqueta: {value_kind}")
+        self.prefix = prefix
+        self.plu_start = plu_start
+        self.plu_length = plu_length
+        self.value_start = value_start
+        self.value_length = value_length
+        self.value_kind = value_kind
+        # Centavos para preço, gramas para peso (salvo configuração diferente da balança)
+        self.decimals = decimals if decimals is not None else (2 if value_kind == VALOR_PRECO else 3)
+
+    @classmethod
+    def from_mask(cls, mask: str, value_kind=VALOR_PRECO, decimals=None):
+        """
+        Layout a partir da máscara da etiqueta, no mesmo desenho do docstring
+        (ex: '2PPPP0VVVVVVD', ou '2PPPPPVVVVVVD' para PLU de 5 dígitos).
+        ValueError se a máscara não tiver 13 posições, prefixo, PLU, valor e verificador.
+        """
+        mask = (mask or '').strip().upper()
+        match = re.fullmatch(r'(\d+)([^PVD]*)(P+)([^PVD]*)(V+)([^PVD]*)D', mask)
+        if len(mask) != 13 or match is None:
+            raise ValueError(f"Máscara de etiqueta inválida: {mask!r} (ex: 2PPPP0VVVVVVD)")
+        return cls(prefix=match.group(1), plu_start=match.start(3), plu_length=len(match.group(3)),
+                   value_start=match.start(5), value_length=len(match.group(5)),
+                   value_kind=value_kind, decimals=decimals)
+
+
+DEFAULT_LAYOUT = ScaleLabelLayout()
+
+
+def scale_label_layout_from_env() -> ScaleLabelLayout:
+    """Layout das etiquetas pelas variáveis PDV_BALANCA_ETIQUETA*; sem elas, o DEFAULT_LAYOUT."""
+    mask = os.environ.get(ENV_LABEL_MASK)
+    value_kind = os.environ.get(ENV_LABEL_VALUE)
+    decimals = os.environ.get(ENV_LABEL_DECIMALS)
+    if not (mask or value_kind or decimals):
+        return DEFAULT_LAYOUT
+
+    value_kind = (value_kind or VALOR_PRECO).strip().lower()
+    decimals = int(decimals) if decimals else None
+    if mask:
+        return ScaleLabelLayout.from_mask(mask, value_kind, decimals)
+    return ScaleLabelLayout(value_kind=value_kind, decimals=decimals)
+
+
+class ScaleLabel:
+    """Conteúdo decodificado de uma etiqueta: PLU e valor (preço ou peso)."""
+
+    def __init__(self, plu: int, value: float, value_kind: str):
+        self.plu = plu
+        self.value = value
+        self.value_kind = value_kind
+
+    def __repr__(self):
+        return f"ScaleLabel(plu={self.plu}, {self.value_kind}={self.value})"
+
+
+class ScaleLabelDecoder:
+    """
+    Decodifica etiquetas de balança e resolve o produto de peso correspondente.
+    O PLU da etiqueta é comparado com o valor numérico do código dos produtos
+    tipo_medicao='Peso' (PLU 0004 -> produto '004' ou '4'). O mapa PLU -> produto fica
+    em memória e acompanha o catálogo compartilhado, como o BarcodeIndex do scanner.
+    """
+
+    def __init__(self, layout: ScaleLabelLayout = None, catalog: ProductCatalog = None):
+        self.layout = layout or DEFAULT_LAYOUT
+        self.catalog = catalog if catalog is not None else get_catalog()
+        self._products_by_plu = {}
+        self._rebuild()
+        self.catalog.subscribe(self._on_catalog_changed)
+
+    def detach(self):
+        self.catalog.unsubscribe(self._on_catalog_changed)
+
+    # --- MAPA PLU -> PRODUTO ---
+
+    def _add(self, product: tuple):
+        codigo, tipo_medicao = product[0], product[3]
+        if not codigo.isdigit():
+            return
+        plu = int(codigo)
+        if str(tipo_medicao).lower() == 'peso':
+            self._products_by_plu[plu] = product
+        elif self._products_by_plu.get(plu, (None,))[0] == codigo:
+            # Produto deixou de ser vendido por peso
+            del self._products_by_plu[plu]
+
+    def _rebuild(self):
+        self._products_by_plu = {}
+        for product in self.catalog.products:
+            self._add(product)
+
+    def _on_catalog_changed(self, event: str, row: int):
+        if event == ProductCatalog.RESET:
+            self._rebuild()
+        else:
+            self._add(self.catalog.products[row])
+
+    # --- DECODIFICAÇÃO ---
+
+    def decode(self, code: str):
+        """Retorna o ScaleLabel do código, ou None se não for uma etiqueta de balança válida."""
+        layout = self.layout
+        if not code or len(code) != 13 or not code.startswith(layout.prefix) or not is_valid_gtin(code):
+            return None
+
+        plu_digits = code[layout.plu_start:layout.plu_start + layout.plu_length]
+        value_digits = code[layout.value_start:layout.value_start + layout.value_length]
+        if len(plu_digits) != layout.plu_length or len(value_digits) != layout.value_length:
+            return None
+
+        value = int(value_digits) / (10 ** layout.decimals)
+        return ScaleLabel(int(plu_digits), value, layout.value_kind)
+
+    def resolve(self, code: str):
+        """
+        Decodifica a etiqueta e retorna (tupla_do_produto, quantidade_em_kg), ou None.
+        Em etiquetas de preço, a quantidade é o preço impresso dividido pelo preço/kg
+        (sem arredondar para 3 casas, para que preço x quantidade bata com a etiqueta).
+        """
+        label = self.decode(code)
+        if label is None or label.value <= 0:
+            return None
+
+        product = self._products_by_plu.get(label.plu)
+        if product is None:
+            return None
+
+        if label.value_kind == VALOR_PESO:
+            return product, label.value
+
+        unit_price = float(product[2] or 0.0)
+        if unit_price <= 0:
+            return None
+        return product, round(label.value / unit_price, 6)
@@ -0,0 +1,392 @@
+# core/scale_reader.py
+
+import os
+import select
+import threading
+import time
+from typing import Callable, List
+
+try:
+    import serial  # pyserial (opcional): usado quando instalado
+except ImportError:
+    serial = None
+
+try:
+    import termios
+    import tty
+    import pty
+except ImportError:  # Windows sem pyserial: só o caminho do pyserial funciona
+    termios = tty = pty = None
+
+STX = 0x02
+ETX = 0x03
+CR = 0x0D
+
+BAUD_RATES = {
+    2400: getattr(termios, 'B2400', None),
+    4800: getattr(termios, 'B4800', None),
+    9600: getattr(termios, 'B9600', None),
+    19200: getattr(termios, 'B19200', None),
+}
+
+
+class ScaleReading:
+    """Uma leitura da balança: peso em kg e se a balança indicou peso estável."""
+
+    def __init__(self, weight: float, stable: bool, overload: bool = False):
+        self.weight = weight
+        self.stable = stable
+        self.overload = overload
+
+    def __repr__(self):
+        return f"ScaleReading({self.weight:.3f} kg, {'estável' if self.stable else 'movimento'})"
+
+
+# ----------------------------------------------------
+# --- PROTOCOLOS ---
+# ----------------------------------------------------
+
+class ToledoContinuousParser:
+    """
+    Saída contínua estilo Toledo:
+        STX SWA SWB SWC PPPPPP TTTTTT CR
+    SWA bits 0-2: posição do ponto decimal (3 = XXXXX.X, 4 = XXXX.XX, 5 = XXX.XXX ...).
+    SWB bit 1: peso negativo; bit 2: sobrecarga; bit 3: em movimento.
+    PPPPPP: peso bruto/líquido em ASCII; TTTTTT: tara (ignorada aqui).
+    """
+
+    FRAME_LENGTH = 17  # STX + 3 status + 6 peso + 6 tara + CR
+    _DECIMALS = {0: -2, 1: -1, 2: 0, 3: 1, 4: 2, 5: 3, 6: 4}
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[ScaleReading]:
+        self._buffer.extend(data)
+        readings = []
+        while True:
+            start = self._buffer.find(STX)
+            if start < 0:
+                self._buffer.clear()
+                break
+            if len(self._buffer) - start < self.FRAME_LENGTH:
+                del self._buffer[:start]
+                break
+
+            frame = bytes(self._buffer[start:start + self.FRAME_LENGTH])
+            if frame[-1] != CR:
+                # Quadro corrompido: descarta o STX e procura o próximo
+                del self._buffer[:start + 1]
+                continue
+            del self._buffer[:start + self.FRAME_LENGTH]
+
+            reading = self._parse_frame(frame)
+            if reading is not None:
+                readings.append(reading)
+        return readings
+
+    def _parse_frame(self, frame: bytes):
+        swa, swb = frame[1], frame[2]
+        digits = frame[4:10]
+        if not digits.isdigit():
+            return None
+
+        decimals = self._DECIMALS.get(swa & 0x07, 3)
+        weight = int(digits) / (10 ** decimals)
+        if swb & 0x02:
+            weight = -weight
+        return ScaleReading(weight, stable=not (swb & 0x08), overload=bool(swb & 0x04))
+
+
+class FilizolaParser:
+    """
+    Saída contínua estilo Filizola:
+        STX PPPPP ETX
+    PPPPP: peso em gramas (ASCII). Indicações especiais no lugar do peso:
+    'IIIII' = instável, 'NNNNN' = negativo, 'SSSSS' = sobrecarga.
+    Esse protocolo não manda bit de estabilidade; o peso é considerado estável
+    sempre que vem numérico (a confirmação fica com o StabilityFilter).
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[ScaleReading]:
+        self._buffer.extend(data)
+        readings = []
+        while True:
+            start = self._buffer.find(STX)
+            if start < 0:
+                self._buffer.clear()
+                break
+            end = self._buffer.find(ETX, start + 1)
+            if end < 0:
+                del self._buffer[:start]
+                break
+
+            payload = bytes(self._buffer[start + 1:end])
+            del self._buffer[:end + 1]
+
+            if payload.isdigit():
+                readings.append(ScaleReading(int(payload) / 1000, stable=True))
+            elif payload.startswith(b'I'):
+                readings.append(ScaleReading(0.0, stable=False))
+            elif payload.startswith(b'S'):
+                readings.append(ScaleReading(0.0, stable=False, overload=True))
+            # 'NNNNN' (negativo) é ignorado: não há peso para lançar
+        return readings
+
+
+PROTOCOLS = {
+    'toledo': ToledoContinuousParser,
+    'filizola': FilizolaParser,
+}
+
+
+def create_parser(protocol: str):
+    parser_class = PROTOCOLS.get((protocol or 'toledo').lower())
+    if parser_class is None:
+        raise ValueError(f"Protocolo de balança desconhecido: {protocol}")
+    return parser_class()
+
+
+def build_toledo_frame(weight: float, stable: bool = True) -> bytes:
+    """Monta um quadro Toledo contínuo com 3 casas decimais (usado pelo simulador)."""
+    swa = 0x20 | 5                      # ponto decimal em XXX.XXX
+    swb = 0x20 | (0x00 if stable else 0x08) | (0x02 if weight < 0 else 0x00)
+    digits = f"{int(round(abs(weight) * 1000)):06d}".encode('ascii')
+    return bytes([STX, swa, swb, 0x20]) + digits + b"000000" + bytes([CR])
+
+
+def build_filizola_frame(weight: float, stable: bool = True) -> bytes:
+    payload = f"{int(round(weight * 1000)):05d}".encode('ascii') if stable else b"IIIII"
+    return bytes([STX]) + payload + bytes([ETX])
+
+
+FRAME_BUILDERS = {
+    'toledo': build_toledo_frame,
+    'filizola': build_filizola_frame,
+}
+
+
+# ----------------------------------------------------
+# --- ESTABILIDADE ---
+# ----------------------------------------------------
+
+class StabilityFilter:
+    """
+    Confirma o peso estável: exige STABLE_READINGS leituras seguidas marcadas como
+    estáveis e dentro de TOLERANCE_KG entre si. Cada peso é avisado uma única vez;
+    só volta a avisar depois que a balança muda (ex: produto retirado).
+    """
+
+    STABLE_READINGS = 3
+    TOLERANCE_KG = 0.002
+    MIN_WEIGHT_KG = 0.005
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._candidate = None
+        self._count = 0
+        self._last_reported = None
+
+    def feed(self, reading: ScaleReading):
+        """Retorna o peso confirmado (float) quando ele acabou de estabilizar, senão None."""
+        if not reading.stable or reading.overload:
+            self._candidate = None
+            self._count = 0
+            self._last_reported = None
+            return None
+
+        if self._candidate is not None and abs(reading.weight - self._candidate) <= self.TOLERANCE_KG:
+            self._count += 1
+        else:
+            self._candidate = reading.weight
+            self._count = 1
+            if self._last_reported is not None and abs(reading.weight - self._last_reported) > self.TOLERANCE_KG:
+                self._last_reported = None
+
+        if (self._count >= self.STABLE_READINGS
+                and self._last_reported is None
+                and reading.weight >= self.MIN_WEIGHT_KG):
+            self._last_reported = round(reading.weight, 3)
+            return self._last_reported
+        return None
+
+
+# ----------------------------------------------------
+# --- PORTA SERIAL ---
+# ----------------------------------------------------
+
+class _PosixPort:
+    """Porta serial/pty aberta com os.open + termios (quando o pyserial não está instalado)."""
+
+    def __init__(self, path: str, baudrate: int):
+        if termios is None:
+            raise OSError("Leitura serial sem pyserial só é suportada em sistemas POSIX.")
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        tty.setraw(self.fd)
+        speed = BAUD_RATES.get(baudrate)
+        if speed is not None:
+            attrs = termios.tcgetattr(self.fd)
+            attrs[4] = attrs[5] = speed
+            termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+
+    def read(self, timeout: float) -> bytes:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return b""
+        try:
+            return os.read(self.fd, 256)
+        except BlockingIOError:
+            return b""
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PySerialPort:
+    def __init__(self, path: str, baudrate: int):
+        self.port = serial.Serial(path, baudrate=baudrate, timeout=0.2)
+
+    def read(self, timeout: float) -> bytes:
+        return self.port.read(self.port.in_waiting or 1)
+
+    def close(self):
+        self.port.close()
+
+
+def open_port(path: str, baudrate: int = 9600):
+    """Abre a porta da balança com pyserial, se disponível, ou com termios."""
+    if serial is not None:
+        return _PySerialPort(path, baudrate)
+    return _PosixPort(path, baudrate)
+
+
+class ScaleReader(threading.Thread):
+    """
+    Thread de leitura contínua da balança.
+    Lê a porta, decodifica os quadros do protocolo e chama:
+      on_reading(ScaleReading)  -> a cada leitura (peso "ao vivo")
+      on_stable(peso_kg)        -> quando um peso acabou de estabilizar
+    Os callbacks rodam NESTA thread; a UI deve repassar por Signal (ver ui/scale_bridge.py).
+    Se a porta cair, tenta reabrir a cada RECONNECT_DELAY segundos.
+    """
+
+    RECONNECT_DELAY = 2.0
+    READ_TIMEOUT = 0.2
+
+    def __init__(self, port: str, protocol: str = 'toledo', baudrate: int = 9600,
+                 on_reading: Callable[[ScaleReading], None] = None,
+                 on_stable: Callable[[float], None] = None):
+        super().__init__(name="ScaleReader", daemon=True)
+        self.port_path = port
+        self.protocol = protocol
+        self.baudrate = baudrate
+        self.parser = create_parser(protocol)
+        self.stability = StabilityFilter()
+        self.on_reading = on_reading
+        self.on_stable = on_stable
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                port = open_port(self.port_path, self.baudrate)
+            except (OSError, ValueError) as e:
+                print(f"Erro ao abrir a balança em {self.port_path}: {e}")
+                self._stop_event.wait(self.RECONNECT_DELAY)
+                continue
+
+            print(f"LOG: Balança conectada em {self.port_path} ({self.protocol}).")
+            try:
+                while not self._stop_event.is_set():
+                    data = port.read(self.READ_TIMEOUT)
+                    if data:
+                        self._process(data)
+            except OSError as e:
+                print(f"Erro de leitura da balança: {e}")
+            finally:
+                port.close()
+                self.stability.reset()
+
+            self._stop_event.wait(self.RECONNECT_DELAY)
+
+    def _process(self, data: bytes):
+        for reading in self.parser.feed(data):
+            if self.on_reading:
+                self.on_reading(reading)
+            weight = self.stability.feed(reading)
+            if weight is not None and self.on_stable:
+                self.on_stable(weight)
+
+
+# ----------------------------------------------------
+# --- SIMULADOR (PTY) ---
+# ----------------------------------------------------
+
+class ScaleSimulator:
+    """
+    Balança simulada num pseudo-terminal, para testar sem hardware:
+
+        sim = ScaleSimulator('toledo'); sim.start()
+        reader = ScaleReader(sim.port_name, 'toledo', on_stable=print); reader.start()
+        sim.set_weight(0.785)   # oscila alguns quadros e depois estabiliza
+
+    Escreve quadros continuamente (a cada INTERVAL segundos), como uma balança real.
+    """
+
+    INTERVAL = 0.05
+    SETTLE_FRAMES = 4
+
+    def __init__(self, protocol: str = 'toledo'):
+        if pty is None:
+            raise OSError("O simulador de balança precisa de pseudo-terminais (POSIX).")
+        self.build_frame = FRAME_BUILDERS[protocol.lower()]
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.port_name = os.ttyname(self.slave_fd)
+        self._weight = 0.0
+        self._settle = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ScaleSimulator", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def set_weight(self, weight: float, settle_frames: int = None):
+        """Coloca um peso na balança; os primeiros quadros saem 'em movimento'."""
+        with self._lock:
+            self._weight = weight
+            self._settle = self.SETTLE_FRAMES if settle_frames is None else settle_frames
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._lock:
+                weight = self._weight
+                stable = self._settle <= 0
+                if not stable:
+                    self._settle -= 1
+                    # Peso oscilando em torno do valor final enquanto estabiliza
+                    weight += 0.01 * (self._settle % 3 - 1)
+            try:
+                os.write(self.master_fd, self.build_frame(max(weight, 0.0), stable))
+            except OSError:
+                break
+            self._stop_event.wait(self.INTERVAL)
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(timeout=1.0)
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
@@ -0,0 +1,123 @@
+# core/scanner.py
+
+from core.product_catalog import ProductCatalog, get_catalog
+
+# Comprimentos válidos de GTIN (EAN-8, UPC-A, EAN-13, GTIN-14)
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+
+def gtin_check_digit(body: str) -> int:
+    """Calcula o dígito verificador GTIN (módulo 10) dos dígitos sem o verificador."""
+    total = 0
+    # Da direita para a esquerda, os pesos alternam 3, 1, 3, 1...
+    for position, digit in enumerate(reversed(body)):
+        total += int(digit) * (3 if position % 2 == 0 else 1)
+    return (10 - total % 10) % 10
+
+
+def is_valid_gtin(code: str) -> bool:
+    """True se o código for um EAN-8/UPC-A/EAN-13/GTIN-14 com dígito verificador correto."""
+    if not code or not code.isdigit() or len(code) not in GTIN_LENGTHS:
+        return False
+    return gtin_check_digit(code[:-1]) == int(code[-1])
+
+
+def gtin_key(code: str) -> str:
+    """
+    Forma canônica de um GTIN (14 dígitos, com zeros à esquerda), para que o mesmo
+    produto seja achado lido como UPC-A (12) ou como EAN-13 ('0' + UPC-A).
+    Retorna None se o código não for um GTIN válido.
+    """
+    return code.zfill(14) if is_valid_gtin(code) else None
+
+
+class ScanBurstDetector:
+    """
+    Detecta rajadas de teclas típicas de leitor de código de barras.
+    O leitor "digita" o código inteiro e o Enter em poucos milissegundos; uma pessoa
+    leva bem mais que MAX_INTERVAL_MS entre uma tecla e outra. Os instantes (em ms)
+    vêm de fora, então a classe não depende do Qt.
+    """
+
+    MAX_INTERVAL_MS = 35   # Intervalo máximo entre teclas de uma mesma rajada
+    SUSPECT_KEYS = 3       # A partir daqui a digitação já é tratada como leitura (some o popup)
+    MIN_SCAN_LENGTH = 6    # Menor código aceito como leitura do scanner
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._last_ms = None
+        self.count = 0
+
+    def key(self, timestamp_ms: int) -> bool:
+        """
+        Registra uma tecla imprimível. Retorna True se ela começou uma nova sequência
+        (primeira tecla, ou depois de uma pausa de digitação humana).
+        """
+        started = self._last_ms is None or timestamp_ms - self._last_ms > self.MAX_INTERVAL_MS
+        self.count = 1 if started else self.count + 1
+        self._last_ms = timestamp_ms
+        return started
+
+    @property
+    def in_burst(self) -> bool:
+        return self.count >= self.SUSPECT_KEYS
+
+    def finish(self, timestamp_ms: int) -> bool:
+        """Chamado no Enter: True se a sequência digitada foi uma leitura do scanner."""
+        is_scan = (
+            self._last_ms is not None
+            and self.count >= self.MIN_SCAN_LENGTH
+            and timestamp_ms - self._last_ms <= self.MAX_INTERVAL_MS
+        )
+        self.reset()
+        return is_scan
+
+
+class BarcodeIndex:
+    """
+    Mapa em memória código de barras -> tupla do produto, usado pelo caminho rápido do
+    scanner (sem SQL, sem busca aproximada). Além do código exato, cada GTIN válido é
+    indexado também na forma canônica de 14 dígitos. Fica em dia com o catálogo
+    compartilhado pelos mesmos avisos que atualizam o autocompletar.
+    """
+
+    def __init__(self, catalog: ProductCatalog = None):
+        self.catalog = catalog if catalog is not None else get_catalog()
+        self._products = {}
+        self._rebuild()
+        self.catalog.subscribe(self._on_catalog_changed)
+
+    def detach(self):
+        self.catalog.unsubscribe(self._on_catalog_changed)
+
+    def __len__(self):
+        return len(self._products)
+
+    def _add(self, product: tuple):
+        codigo = product[0]
+        self._products[codigo] = product
+        key = gtin_key(codigo)
+        if key is not None:
+            self._products[key] = product
+
+    def _rebuild(self):
+        self._products = {}
+        for product in self.catalog.products:
+            self._add(product)
+
+    def _on_catalog_changed(self, event: str, row: int):
+        if event == ProductCatalog.RESET:
+            self._rebuild()
+        else:
+            self._add(self.catalog.products[row])
+
+    def lookup(self, code: str):
+        """Retorna a tupla (codigo, nome, preco, tipo_medicao, categoria) ou None."""
+        product = self._products.get(code)
+        if product is None:
+            key = gtin_key(code)
+            if key is not None:
+                product = self._products.get(key)
+        return product
@@ -0,0 +1,264 @@
+# core/sefaz_mock.py
+"""
+SEFAZ de testes local: os web services de autorização de NFC-e, sem internet nem certificado
+da SEFAZ, para testar a fila fiscal (core/nfce_queue.py) de ponta a ponta.
+
+    python -m core.sefaz_mock --porta 8099
+    PDV_NFCE_SEFAZ=http://127.0.0.1:8099 python main.py
+
+Rotas (SOAP 1.2, como a SEFAZ):
+    POST /NFeAutorizacao4      enviNFe (lote assíncrono)  -> retEnviNFe 103 + nRec
+    POST /NFeRetAutorizacao4   consReciNFe (nRec)         -> retConsReciNFe 104 + protNFe por nota
+    POST /NFeConsultaProtocolo4  consSitNFe (chNFe)       -> retConsSitNFe 100 + protNFe da autorização
+    POST /controle?fora_do_ar=1   simula queda (responde 503 até fora_do_ar=0)
+
+Cada NFe do lote passa por core.nfce.verify_nfce (chave/DV, totais, digest e, com
+'cryptography', a assinatura RSA): válida -> 100 Autorizado o uso; inválida -> código de
+rejeição; chave já autorizada -> 204 Duplicidade. O estado fica só em memória.
+"""
+
+import argparse
+import asyncio
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+
+from core.nfce import NFE_NS, NfceInvalidaError, verify_nfce
+
+DEFAULT_PORT = 8099
+MAX_BODY = 16 * 1024 * 1024
+LOTE_MAX = 50
+VER_APLIC = 'PDV-SEFAZ-MOCK'
+
+SOAP_NS = 'http://www.w3.org/2003/05/soap-envelope'
+WSDL_NS = 'http://www.portalfiscal.inf.br/nfe/wsdl/'
+
+_REASONS = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+            500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+def _agora() -> str:
+    return datetime.now().strftime("%Y-%m-%dT%H:%M:%S-03:00")
+
+
+class MockSefaz:
+    """Servidor asyncio; route() também pode ser chamado direto (sem rede) nos testes."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, tp_amb: str = '2'):
+        self.host = host
+        self.port = port
+        self.tp_amb = tp_amb
+        self.fora_do_ar = False
+        self.autorizadas = {}   # chave -> nProt
+        self.protocolos = {}    # chave -> protNFe da autorização (consulta protocolo)
+        self.recibos = {}       # nRec -> [protNFe]
+        self.lotes_recebidos = 0
+        self._seq_recibo = 0
+        self._seq_protocolo = 0
+        self._server = None
+        self._loop = None
+
+    # --- web services ---
+
+    def _soap(self, servico: str, retorno: str) -> bytes:
+        return (
+            f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<soap12:Envelope xmlns:soap12="{SOAP_NS}"><soap12:Body>'
+            f'<nfeResultMsg xmlns="{WSDL_NS}{servico}">{retorno}</nfeResultMsg>'
+            f'</soap12:Body></soap12:Envelope>'
+        ).encode('utf-8')
+
+    def _ret_envi(self, cstat: int, motivo: str, recibo: str = None) -> str:
+        inf_rec = f'<infRec><nRec>{recibo}</nRec><tMed>1</tMed></infRec>' if recibo else ''
+        return (
+            f'<retEnviNFe xmlns="{NFE_NS}" versao="4.00"><tpAmb>{self.tp_amb}</tpAmb>'
+            f'<verAplic>{VER_APLIC}</verAplic><cStat>{cstat}</cStat><xMotivo>{motivo}</xMotivo>'
+            f'<cUF>35</cUF><dhRecbto>{_agora()}</dhRecbto>{inf_rec}</retEnviNFe>'
+        )
+
+    def _protocolo(self, nfe) -> str:
+        inf = nfe.find(f'{{{NFE_NS}}}infNFe')
+        chave = inf.get('Id', '')[3:] if inf is not None else ''
+        protocolo = dig_val = ''
+        try:
+            chave = verify_nfce(nfe)
+            dig_val = nfe.findtext('.//{http://www.w3.org/2000/09/xmldsig#}DigestValue')
+            if chave in self.autorizadas:
+                cstat, motivo = 204, f"Rejeição: Duplicidade de NF-e [nProt:{self.autorizadas[chave]}]"
+            else:
+                self._seq_protocolo += 1
+                protocolo = f"135{datetime.now():%y}{self._seq_protocolo:010d}"
+                self.autorizadas[chave] = protocolo
+                cstat, motivo = 100, "Autorizado o uso da NF-e"
+        except NfceInvalidaError as e:
+            cstat, motivo = e.cstat, f"Rejeição: {e}"
+        except (AttributeError, TypeError, ValueError) as e:
+            cstat, motivo = 225, f"Rejeição: Falha no Schema XML da NFe ({e})"
+        n_prot = f'<nProt>{protocolo}</nProt>' if protocolo else ''
+        dig = f'<digVal>{dig_val}</digVal>' if dig_val else ''
+        prot_nfe = (
+            f'<protNFe versao="4.00"><infProt><tpAmb>{self.tp_amb}</tpAmb><verAplic>{VER_APLIC}</verAplic>'
+            f'<chNFe>{chave}</chNFe><dhRecbto>{_agora()}</dhRecbto>{n_prot}{dig}'
+            f'<cStat>{cstat}</cStat><xMotivo>{motivo}</xMotivo></infProt></protNFe>'
+        )
+        if cstat == 100:
+            self.protocolos[chave] = prot_nfe
+        return prot_nfe
+
+    def autorizacao(self, body: bytes) -> bytes:
+        envi = ET.fromstring(body).find(f'.//{{{NFE_NS}}}enviNFe')
+        if envi is None:
+            return self._soap('NFeAutorizacao4', self._ret_envi(225, "Rejeição: Falha no Schema XML do lote"))
+        notas = envi.findall(f'{{{NFE_NS}}}NFe')
+        if not notas or len(notas) > LOTE_MAX:
+            return self._soap('NFeAutorizacao4', self._ret_envi(
+                225, f"Rejeição: lote com {len(notas)} NF-e (1 a {LOTE_MAX})"))
+
+        self.lotes_recebidos += 1
+        self._seq_recibo += 1
+        recibo = f"35{self._seq_recibo:013d}"
+        # Processa já: a consulta do recibo sempre encontra o lote pronto (104)
+        self.recibos[recibo] = [self._protocolo(nfe) for nfe in notas]
+        return self._soap('NFeAutorizacao4', self._ret_envi(103, "Lote recebido com sucesso", recibo))
+
+    def ret_autorizacao(self, body: bytes) -> bytes:
+        recibo = ET.fromstring(body).findtext(f'.//{{{NFE_NS}}}nRec')
+        protocolos = self.recibos.get(recibo)
+        if protocolos is None:
+            cstat, motivo, corpo = 106, "Lote não localizado", ''
+        else:
+            cstat, motivo, corpo = 104, "Lote processado", ''.join(protocolos)
+        return self._soap('NFeRetAutorizacao4', (
+            f'<retConsReciNFe xmlns="{NFE_NS}" versao="4.00"><tpAmb>{self.tp_amb}</tpAmb>'
+            f'<verAplic>{VER_APLIC}</verAplic><nRec>{recibo}</nRec><cStat>{cstat}</cStat>'
+            f'<xMotivo>{motivo}</xMotivo><cUF>35</cUF><dhRecbto>{_agora()}</dhRecbto>{corpo}</retConsReciNFe>'
+        ))
+
+    def consulta_protocolo(self, body: bytes) -> bytes:
+        chave = ET.fromstring(body).findtext(f'.//{{{NFE_NS}}}chNFe')
+        prot_nfe = self.protocolos.get(chave)
+        if prot_nfe is None:
+            cstat, motivo, prot_nfe = 217, "Rejeição: NF-e não consta na base de dados da SEFAZ", ''
+        else:
+            cstat, motivo = 100, "Autorizado o uso da NF-e"
+        return self._soap('NFeConsultaProtocolo4', (
+            f'<retConsSitNFe xmlns="{NFE_NS}" versao="4.00"><tpAmb>{self.tp_amb}</tpAmb>'
+            f'<verAplic>{VER_APLIC}</verAplic><cStat>{cstat}</cStat><xMotivo>{motivo}</xMotivo>'
+            f'<cUF>35</cUF><dhRecbto>{_agora()}</dhRecbto><chNFe>{chave}</chNFe>{prot_nfe}</retConsSitNFe>'
+        ))
+
+    def route(self, method: str, path: str, query: dict, body: bytes):
+        """Retorna (status, bytes da resposta)."""
+        if path == '/controle':
+            if 'fora_do_ar' in query:
+                self.fora_do_ar = query['fora_do_ar'][0] == '1'
+            return 200, f"fora_do_ar={int(self.fora_do_ar)}\n".encode('utf-8')
+        if self.fora_do_ar:
+            return 503, b'servico paralisado momentaneamente'
+        if method != 'POST':
+            return 405, b'use POST'
+        if path.endswith('/NFeAutorizacao4'):
+            return 200, self.autorizacao(body)
+        if path.endswith('/NFeRetAutorizacao4'):
+            return 200, self.ret_autorizacao(body)
+        if path.endswith('/NFeConsultaProtocolo4'):
+            return 200, self.consulta_protocolo(body)
+        return 404, f'servico desconhecido: {path}'.encode('utf-8')
+
+    # --- HTTP ---
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        status, data = 500, b'falha interna'
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            if not request_line:
+                return
+            method, target, _ = request_line.split(' ', 2)
+
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ('\r\n', '\n', ''):
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get('content-length', 0))
+            if length > MAX_BODY:
+                status, data = 413, b'lote grande demais'
+            else:
+                body = await reader.readexactly(length) if length else b''
+                url = urlsplit(target)
+                status, data = self.route(method.upper(), url.path, parse_qs(url.query), body)
+        except ET.ParseError as e:
+            status, data = 500, f'XML malformado: {e}'.encode('utf-8')
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+
+        content_type = 'application/soap+xml' if data.startswith(b'<?xml') else 'text/plain'
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"LOG: SEFAZ de testes ouvindo em http://{self.host}:{self.port}")
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    def start_background(self) -> str:
+        """Sobe o servidor numa thread (testes) e retorna a URL base (porta 0 = qualquer livre)."""
+        pronto = threading.Event()
+
+        def rodar():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            pronto.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=rodar, name="MockSefaz", daemon=True).start()
+        pronto.wait(10)
+        return f"http://{self.host}:{self.port}"
+
+    def close(self):
+        if self._server is not None:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._server.close)
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            else:
+                self._server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SEFAZ de testes (autorização de NFC-e) local.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--producao', action='store_true', help="responde com tpAmb=1 (padrão: homologação)")
+    args = parser.parse_args(argv)
+
+    server = MockSefaz(args.host, args.porta, '1' if args.producao else '2')
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,252 @@
+# core/stock_ledger.py
+"""
+Razão (ledger) de estoque.
+
+Toda mudança de estoque feita pelo PDV grava, na MESMA transação do UPDATE em
+Produtos.quantidade, uma linha em MovimentosEstoque (só inserção, nunca alterada).
+De tempos em tempos (ver maybe_take_stock_snapshot) o saldo dos produtos que se
+movimentaram é fotografado em SaldosEstoque. O saldo numa data passada é então:
+
+    último saldo fotografado até a data + soma dos movimentos depois dele
+
+em vez de somar o histórico inteiro do produto.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+TIPO_VENDA = 'venda'
+TIPO_AJUSTE = 'ajuste'
+TIPO_ENTRADA = 'entrada'
+TIPO_PERDA = 'perda'
+
+TIPOS_MOVIMENTO = (TIPO_VENDA, TIPO_AJUSTE, TIPO_ENTRADA, TIPO_PERDA)
+
+# Motivo dos ajustes gravados pela conciliação (não são movimentos reais do caixa)
+MOTIVO_CONCILIACAO = "Conciliação automática do saldo"
+
+# Intervalo mínimo entre duas fotografias de saldo
+SNAPSHOT_INTERVAL = timedelta(hours=24)
+# Diferenças menores que isso são ruído de ponto flutuante (pesos com 3 casas)
+_TOLERANCIA = 1e-6
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def ensure_stock_ledger_tables(conn):
+    """Cria MovimentosEstoque e SaldosEstoque (e seus índices) se não existirem."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS MovimentosEstoque (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codigo TEXT NOT NULL,
+            tipo TEXT NOT NULL,              -- venda, ajuste, entrada, perda
+            quantidade REAL NOT NULL,        -- com sinal: negativo = saída
+            data_hora TEXT NOT NULL,
+            referencia TEXT,                 -- ex: 'venda:123'
+            motivo TEXT,
+            id_funcionario INTEGER,
+            FOREIGN KEY (codigo) REFERENCES Produtos(codigo)
+        )
+    """)
+    # (codigo, id): cauda de movimentos de um produto depois de uma fotografia
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movimentos_codigo_id ON MovimentosEstoque(codigo, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movimentos_data ON MovimentosEstoque(data_hora)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SaldosEstoque (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codigo TEXT NOT NULL,
+            data_hora TEXT NOT NULL,
+            saldo REAL NOT NULL,
+            id_movimento_ate INTEGER NOT NULL,   -- último movimento já incluído no saldo
+            FOREIGN KEY (codigo) REFERENCES Produtos(codigo)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_saldos_codigo_data ON SaldosEstoque(codigo, data_hora)")
+    conn.commit()
+
+
+# ----------------------------------------------------
+# --- GRAVAÇÃO (dentro da transação de quem chama) ---
+# ----------------------------------------------------
+
+def record_stock_movements(cursor, movimentos, tipo: str, referencia: str = None,
+                           motivo: str = None, id_funcionario: int = None):
+    """
+    Aplica e registra movimentos de estoque em lote, SEM commit (a transação é de quem
+    chama, ex: a venda). movimentos: lista de (codigo, quantidade_com_sinal).
+    Um executemany atualiza Produtos e outro grava o ledger.
+    """
+    if tipo not in TIPOS_MOVIMENTO:
+        raise ValueError(f"Tipo de movimento de estoque inválido: {tipo}")
+    if not movimentos:
+        return
+
+    data_hora = _now()
+    cursor.executemany(
+        "UPDATE Produtos SET quantidade = quantidade + ? WHERE codigo = ?",
+        [(quantidade, codigo) for codigo, quantidade in movimentos]
+    )
+    cursor.executemany("""
+        INSERT INTO MovimentosEstoque (codigo, tipo, quantidade, data_hora, referencia, motivo, id_funcionario)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [(codigo, tipo, quantidade, data_hora, referencia, motivo, id_funcionario)
+          for codigo, quantidade in movimentos])
+
+
+# ----------------------------------------------------
+# --- FOTOGRAFIAS DE SALDO ---
+# ----------------------------------------------------
+
+# Última fotografia e cauda de movimentos posteriores de cada produto (NULL = não há).
+# Subconsultas correlacionadas por produto: a fotografia sai do índice (codigo, data_hora)
+# e a cauda é uma busca por faixa no índice (codigo, id), sem varrer MovimentosEstoque inteira.
+_EXPECTED_BALANCES_SQL = """
+    SELECT p.codigo, p.quantidade, s.saldo,
+           (SELECT SUM(m.quantidade) FROM MovimentosEstoque m
+            WHERE m.codigo = p.codigo AND m.id > COALESCE(s.id_movimento_ate, 0)) AS delta
+    FROM Produtos p
+    LEFT JOIN SaldosEstoque s ON s.id = (
+        SELECT id FROM SaldosEstoque WHERE codigo = p.codigo
+        ORDER BY data_hora DESC, id DESC LIMIT 1
+    )
+"""
+
+
+def take_stock_snapshot(conn) -> int:
+    """
+    Fotografa o saldo dos produtos que se movimentaram desde a última fotografia.
+    Antes, concilia: se Produtos.quantidade diverge do que o ledger explica (estoque
+    inicial, edição direta na tabela, importação), grava um movimento de 'ajuste'
+    com a diferença, para que o ledger continue fechando com o estoque real.
+    Retorna quantos saldos foram gravados.
+    """
+    cursor = conn.cursor()
+    if conn.in_transaction:
+        conn.commit()
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(_EXPECTED_BALANCES_SQL)
+        # (codigo, quantidade, saldo esperado, movimentou desde a última fotografia)
+        rows = [
+            (codigo, quantidade, (saldo or 0.0) + (delta or 0.0), saldo is None or delta is not None)
+            for codigo, quantidade, saldo, delta in cursor.fetchall()
+        ]
+
+        divergencias = [
+            (codigo, quantidade - esperado)
+            for codigo, quantidade, esperado, _ in rows
+            if abs(quantidade - esperado) > _TOLERANCIA
+        ]
+        if divergencias:
+            data_hora = _now()
+            cursor.executemany("""
+                INSERT INTO MovimentosEstoque (codigo, tipo, quantidade, data_hora, motivo)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(codigo, TIPO_AJUSTE, delta, data_hora, MOTIVO_CONCILIACAO)
+                  for codigo, delta in divergencias])
+
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM MovimentosEstoque")
+        ultimo_movimento = cursor.fetchone()[0]
+
+        divergentes = {codigo for codigo, _ in divergencias}
+        data_hora = _now()
+        saldos = [
+            (codigo, data_hora, quantidade, ultimo_movimento)
+            for codigo, quantidade, _, movimentou in rows
+            if movimentou or codigo in divergentes
+        ]
+        cursor.executemany("""
+            INSERT INTO SaldosEstoque (codigo, data_hora, saldo, id_movimento_ate)
+            VALUES (?, ?, ?, ?)
+        """, saldos)
+        conn.commit()
+
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro ao fotografar saldos de estoque: {e}")
+        return 0
+
+    print(f"LOG: Saldos de estoque fotografados ({len(saldos)} produto(s), {len(divergencias)} conciliação(ões)).")
+    return len(saldos)
+
+
+def maybe_take_stock_snapshot(conn, interval: timedelta = SNAPSHOT_INTERVAL) -> int:
+    """Fotografa os saldos se a última fotografia tiver mais de 'interval' (ou se não houver nenhuma)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(data_hora) FROM SaldosEstoque")
+    ultima = cursor.fetchone()[0]
+    if ultima is not None:
+        if datetime.now() - datetime.strptime(ultima, "%Y-%m-%d %H:%M:%S") < interval:
+            return 0
+    return take_stock_snapshot(conn)
+
+
+# ----------------------------------------------------
+# --- CONSULTAS ---
+# ----------------------------------------------------
+
+def stock_at(conn, codigo: str, data_hora: str) -> float:
+    """
+    Saldo de um produto em 'data_hora' ('AAAA-MM-DD HH:MM:SS'): fotografia mais recente
+    até a data (índice codigo+data_hora) + cauda de movimentos até a data.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT saldo, id_movimento_ate FROM SaldosEstoque
+        WHERE codigo = ? AND data_hora <= ?
+        ORDER BY data_hora DESC, id DESC LIMIT 1
+    """, (codigo, data_hora))
+    snapshot = cursor.fetchone()
+    saldo, ultimo_movimento = snapshot if snapshot else (0.0, 0)
+
+    cursor.execute("""
+        SELECT COALESCE(SUM(quantidade), 0) FROM MovimentosEstoque
+        WHERE codigo = ? AND id > ? AND data_hora <= ?
+    """, (codigo, ultimo_movimento, data_hora))
+    return saldo + cursor.fetchone()[0]
+
+
+def stock_report_at(conn, data_hora: str) -> list:
+    """
+    Saldo de todos os produtos em 'data_hora': lista de (codigo, nome, saldo).
+    Mesma conta do stock_at, produto a produto (fotografia e cauda pelos índices).
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT p.codigo, p.nome,
+               COALESCE(s.saldo, 0) + COALESCE((
+                   SELECT SUM(m.quantidade) FROM MovimentosEstoque m
+                   WHERE m.codigo = p.codigo AND m.id > COALESCE(s.id_movimento_ate, 0) AND m.data_hora <= ?1
+               ), 0)
+        FROM Produtos p
+        LEFT JOIN SaldosEstoque s ON s.id = (
+            SELECT id FROM SaldosEstoque WHERE codigo = p.codigo AND data_hora <= ?1
+            ORDER BY data_hora DESC, id DESC LIMIT 1
+        )
+        ORDER BY p.codigo
+    """, (data_hora,))
+    return cursor.fetchall()
+
+
+def movements_for(conn, codigo: str, inicio: str = None, fim: str = None) -> list:
+    """Movimentos de um produto (auditoria), do mais antigo para o mais recente."""
+    conditions = ["codigo = ?"]
+    params = [codigo]
+    if inicio:
+        conditions.append("data_hora >= ?")
+        params.append(inicio)
+    if fim:
+        conditions.append("data_hora <= ?")
+        params.append(fim)
+
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT data_hora, tipo, quantidade, referencia, motivo, id_funcionario
+        FROM MovimentosEstoque WHERE {' AND '.join(conditions)} ORDER BY id
+    """, params)
+    return cursor.fetchall()
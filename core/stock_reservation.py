@@ -0,0 +1,221 @@
+# core/stock_reservation.py
+"""
+Reserva de estoque entre vários caixas (terminais) usando o mesmo pdv.db.
+
+No modo reserva, cada item incluído no carrinho grava uma "concessão" (lease) em
+ReservasEstoque com prazo de validade. O saldo disponível de um produto é:
+
+    Produtos.quantidade - soma das reservas ainda válidas de OUTROS terminais
+
+Cada operação é uma transação curta (um INSERT ... SELECT condicional + commit), então
+nenhum caixa segura o lock de escrita enquanto o operador passa os produtos.
+Na finalização, convert_reservations troca as reservas do terminal pela baixa real,
+dentro da transação da venda. Reservas vencidas são ignoradas nas contas e apagadas
+em lote por expire_reservations.
+"""
+
+import os
+import socket
+import sqlite3
+from datetime import datetime, timedelta
+
+RESERVATION_TTL = timedelta(minutes=15)
+ENV_RESERVATION_MODE = 'PDV_RESERVA_ESTOQUE'
+ENV_TERMINAL = 'PDV_TERMINAL'
+
+_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+class EstoqueIndisponivelError(Exception):
+    """Venda com item acima do saldo disponível (considerando reservas de outros caixas)."""
+
+
+def _now() -> str:
+    return datetime.now().strftime(_FMT)
+
+
+def reservation_mode_enabled() -> bool:
+    """O modo reserva é ligado por PDV_RESERVA_ESTOQUE=1 (ex: lojas com vários caixas)."""
+    return os.environ.get(ENV_RESERVATION_MODE, '').strip().lower() in ('1', 'sim', 'true', 'on')
+
+
+def default_terminal_id() -> str:
+    """Identificação do caixa: PDV_TERMINAL ou 'máquina:processo'."""
+    return os.environ.get(ENV_TERMINAL) or f"{socket.gethostname()}:{os.getpid()}"
+
+
+def ensure_reservation_table(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ReservasEstoque (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codigo TEXT NOT NULL,
+            quantidade REAL NOT NULL,
+            terminal TEXT NOT NULL,
+            id_funcionario INTEGER,
+            criado_em TEXT NOT NULL,
+            expira_em TEXT NOT NULL,
+            FOREIGN KEY (codigo) REFERENCES Produtos(codigo)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservas_codigo ON ReservasEstoque(codigo, expira_em)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservas_terminal ON ReservasEstoque(terminal)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservas_expira ON ReservasEstoque(expira_em)")
+    conn.commit()
+
+
+# Saldo disponível para um terminal: estoque - reservas válidas dos outros terminais
+_AVAILABLE_SQL = """
+    SELECT p.quantidade - COALESCE((
+        SELECT SUM(r.quantidade) FROM ReservasEstoque r
+        WHERE r.codigo = p.codigo AND r.expira_em > ? AND r.terminal <> ?
+    ), 0)
+    FROM Produtos p WHERE p.codigo = ?
+"""
+
+
+def available_stock(conn, codigo: str, terminal: str = '') -> float:
+    cursor = conn.cursor()
+    cursor.execute(_AVAILABLE_SQL, (_now(), terminal, codigo))
+    row = cursor.fetchone()
+    return row[0] if row else 0.0
+
+
+def expire_reservations(conn) -> int:
+    """Apaga, em um único DELETE, todas as reservas vencidas (de qualquer terminal)."""
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM ReservasEstoque WHERE expira_em <= ?", (_now(),))
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro ao expirar reservas de estoque: {e}")
+        return 0
+
+
+class StockReservations:
+    """Reservas de estoque do carrinho de um terminal."""
+
+    def __init__(self, conn, terminal: str = None, id_funcionario: int = None, ttl: timedelta = RESERVATION_TTL):
+        self.conn = conn
+        self.terminal = terminal or default_terminal_id()
+        self.id_funcionario = id_funcionario
+        self.ttl = ttl
+
+    def _expires_at(self) -> str:
+        return (datetime.now() + self.ttl).strftime(_FMT)
+
+    def _reserve(self, cursor, codigo: str, quantidade: float, agora: str, expira_em: str) -> bool:
+        # INSERT condicional: só grava se, dentro do próprio comando, o saldo disponível
+        # (descontando também as reservas deste terminal) cobrir a nova quantidade.
+        cursor.execute("""
+            INSERT INTO ReservasEstoque (codigo, quantidade, terminal, id_funcionario, criado_em, expira_em)
+            SELECT ?1, ?2, ?3, ?4, ?5, ?6
+            FROM Produtos p
+            WHERE p.codigo = ?1
+              AND p.quantidade - COALESCE((
+                    SELECT SUM(r.quantidade) FROM ReservasEstoque r
+                    WHERE r.codigo = ?1 AND r.expira_em > ?5
+                  ), 0) >= ?2
+        """, (codigo, quantidade, self.terminal, self.id_funcionario, agora, expira_em))
+        return cursor.rowcount == 1
+
+    def _finish(self, cursor, codigo: str, ok: bool, expira_em: str, replacing: bool):
+        if ok:
+            # Cada operação bem-sucedida renova o prazo do carrinho inteiro
+            cursor.execute("UPDATE ReservasEstoque SET expira_em = ? WHERE terminal = ?", (expira_em, self.terminal))
+            self.conn.commit()
+            return True, None
+        self.conn.rollback()
+        disponivel = available_stock(self.conn, codigo, self.terminal)
+        # Numa troca, o saldo inteiro está disponível; num acréscimo, só o que sobra além do já reservado
+        return False, disponivel if replacing else disponivel - self.reserved(codigo)
+
+    def reserve(self, codigo: str, quantidade: float):
+        """
+        Reserva 'quantidade' do produto para este terminal.
+        Retorna (True, None) ou (False, quanto ainda dá para reservar além do já reservado).
+        """
+        agora, expira_em = _now(), self._expires_at()
+        try:
+            cursor = self.conn.cursor()
+            ok = self._reserve(cursor, codigo, quantidade, agora, expira_em)
+            return self._finish(cursor, codigo, ok, expira_em, replacing=False)
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"Erro ao reservar estoque de {codigo}: {e}")
+            return False, 0.0
+
+    def set_quantity(self, codigo: str, quantidade: float):
+        """
+        Troca a reserva do produto pela nova quantidade (edição no carrinho), atomicamente.
+        Retorna (True, None) ou (False, saldo disponível para este terminal).
+        """
+        agora, expira_em = _now(), self._expires_at()
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("DELETE FROM ReservasEstoque WHERE terminal = ? AND codigo = ?", (self.terminal, codigo))
+            ok = quantidade <= 0 or self._reserve(cursor, codigo, quantidade, agora, expira_em)
+            return self._finish(cursor, codigo, ok, expira_em, replacing=True)
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"Erro ao alterar reserva de {codigo}: {e}")
+            return False, 0.0
+
+    def release(self, codigo: str = None):
+        """Libera as reservas de um produto (ou de todo o carrinho, se codigo=None)."""
+        try:
+            cursor = self.conn.cursor()
+            if codigo is None:
+                cursor.execute("DELETE FROM ReservasEstoque WHERE terminal = ?", (self.terminal,))
+            else:
+                cursor.execute("DELETE FROM ReservasEstoque WHERE terminal = ? AND codigo = ?", (self.terminal, codigo))
+            self.conn.commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"Erro ao liberar reservas de estoque: {e}")
+
+    def reserved(self, codigo: str) -> float:
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT COALESCE(SUM(quantidade), 0) FROM ReservasEstoque WHERE terminal = ? AND codigo = ? AND expira_em > ?",
+            (self.terminal, codigo, _now())
+        )
+        return cursor.fetchone()[0]
+
+
+def convert_reservations(cursor, terminal: str, itens: list):
+    """
+    Converte as reservas do terminal na venda, DENTRO da transação da venda (sem commit):
+    apaga as reservas do terminal e confere, com um único SELECT, se o estoque menos as
+    reservas válidas dos outros caixas cobre cada item. Como a transação da venda já
+    detém o lock de escrita, nada muda entre a conferência e a baixa.
+    Levanta EstoqueIndisponivelError se algum item não couber (a venda é desfeita).
+    """
+    cursor.execute("DELETE FROM ReservasEstoque WHERE terminal = ?", (terminal,))
+
+    vendido = {}
+    nomes = {}
+    for item in itens:
+        vendido[item['codigo']] = vendido.get(item['codigo'], 0.0) + item['quantidade']
+        nomes[item['codigo']] = item.get('nome', item['codigo'])
+    if not vendido:
+        return
+
+    codes = list(vendido)
+    cursor.execute(f"""
+        SELECT p.codigo, p.quantidade - COALESCE((
+            SELECT SUM(r.quantidade) FROM ReservasEstoque r
+            WHERE r.codigo = p.codigo AND r.expira_em > ?
+        ), 0)
+        FROM Produtos p WHERE p.codigo IN ({','.join('?' * len(codes))})
+    """, [_now()] + codes)
+
+    faltas = [
+        f"{nomes[codigo]}: vendido {vendido[codigo]:g}, disponível {disponivel:g}"
+        for codigo, disponivel in cursor.fetchall()
+        if vendido[codigo] > disponivel + 1e-9
+    ]
+    if faltas:
+        raise EstoqueIndisponivelError("Estoque insuficiente: " + "; ".join(faltas))
@@ -0,0 +1,294 @@
+# core/sync_client.py
+"""
+Cliente de sincronização do caixa (modo multi-caixa com servidor da loja).
+
+O caixa continua 100% local: vende, abre/fecha caixa e baixa estoque no próprio pdv.db,
+sem esperar a rede. Uma thread (SyncClient) faz, a cada poucos segundos:
+
+  1. ENVIO: lê o que é novo desde a última marca (venda_id, id do movimento de estoque,
+     sessões de caixa ainda abertas) e manda ao servidor em lotes. A marca só avança
+     depois da confirmação, e o servidor ignora o que já recebeu, então uma falha no meio
+     apenas faz o lote ser reenviado.
+  2. CATÁLOGO: baixa os produtos alterados desde a última versão conhecida e grava no
+     Produtos local (cadastro e preço; o estoque local continua sendo o do caixa).
+
+As marcas ficam na tabela SyncEstado do pdv.db.
+Configuração: PDV_SYNC_URL=http://servidor-da-loja:8765  PDV_TERMINAL=CAIXA01
+              PDV_SYNC_TOKEN=<token da loja> (o mesmo do servidor)
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Callable, List
+
+from core.database import connect_db, search_keys_for
+from core.stock_ledger import MOTIVO_CONCILIACAO
+from core.sync_server import auth_headers
+
+ENV_SYNC_URL = 'PDV_SYNC_URL'
+ENV_TERMINAL = 'PDV_TERMINAL'
+
+SYNC_INTERVAL = 10.0     # segundos entre ciclos
+MAX_BACKOFF = 300.0      # espera máxima com o servidor fora do ar
+BATCH_SIZE = 200         # vendas/movimentos por lote
+HTTP_TIMEOUT = 15.0
+
+# Chaves da tabela SyncEstado
+MARCA_VENDA = 'ultima_venda_enviada'
+MARCA_MOVIMENTO = 'ultimo_movimento_enviado'
+MARCA_CAIXA = 'caixa_pendente_desde'
+MARCA_CATALOGO = 'versao_catalogo'
+
+
+class SyncError(Exception):
+    """Falha de comunicação com o servidor da loja (o ciclo é repetido mais tarde)."""
+
+
+def sync_terminal_id() -> str:
+    """Identificação fixa do caixa para o servidor: PDV_TERMINAL ou o nome da máquina."""
+    return os.environ.get(ENV_TERMINAL) or socket.gethostname()
+
+
+def ensure_sync_tables(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SyncEstado (
+            chave TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def _get_mark(conn, chave: str, default: int = 0) -> int:
+    cursor = conn.cursor()
+    cursor.execute("SELECT valor FROM SyncEstado WHERE chave = ?", (chave,))
+    row = cursor.fetchone()
+    return row[0] if row else default
+
+
+def _set_marks(conn, marcas: dict):
+    conn.cursor().executemany(
+        "INSERT INTO SyncEstado (chave, valor) VALUES (?, ?) "
+        "ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+        list(marcas.items())
+    )
+    conn.commit()
+
+
+def _rows_as_dicts(cursor) -> List[dict]:
+    names = [column[0] for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+# ----------------------------------------------------
+# --- HTTP ---
+# ----------------------------------------------------
+
+def _request(base_url: str, path: str, payload: dict = None, query: dict = None) -> dict:
+    url = base_url.rstrip('/') + path
+    if query:
+        url += '?' + urllib.parse.urlencode(query)
+    data = None
+    headers = auth_headers()
+    if payload is not None:
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        headers['Content-Type'] = 'application/json; charset=utf-8'
+
+    request = urllib.request.Request(url, data=data, headers=headers, method='POST' if data is not None else 'GET')
+    try:
+        with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        raise SyncError(f"servidor respondeu {e.code}: {e.read().decode('utf-8', 'replace')}") from e
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise SyncError(str(e)) from e
+
+
+# ----------------------------------------------------
+# --- ENVIO (vendas, caixas, movimentos de estoque) ---
+# ----------------------------------------------------
+
+def collect_pending(conn, limite: int = BATCH_SIZE) -> tuple:
+    """
+    Monta o próximo lote a enviar. Retorna (lote, novas_marcas); lote é None se não
+    houver nada novo. Itens e pagamentos vêm em uma consulta cada (IN nos ids do lote).
+    """
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT * FROM Vendas WHERE venda_id > ? ORDER BY venda_id LIMIT ?",
+                   (_get_mark(conn, MARCA_VENDA), limite))
+    vendas = _rows_as_dicts(cursor)
+    if vendas:
+        ids = [v['venda_id'] for v in vendas]
+        marks = ','.join('?' * len(ids))
+        por_venda = {venda_id: v for venda_id, v in zip(ids, vendas)}
+        for v in vendas:
+            v['itens'], v['pagamentos'] = [], []
+
+        cursor.execute(f"""
+            SELECT venda_id, produto_codigo, nome_produto, quantidade, preco_unitario,
+                   desconto_item, total_liquido_item
+            FROM ItensVenda WHERE venda_id IN ({marks}) ORDER BY item_id
+        """, ids)
+        for item in _rows_as_dicts(cursor):
+            por_venda[item.pop('venda_id')]['itens'].append(item)
+
+        cursor.execute(f"SELECT venda_id, metodo, valor FROM PagamentosVenda WHERE venda_id IN ({marks})", ids)
+        for pagamento in _rows_as_dicts(cursor):
+            por_venda[pagamento.pop('venda_id')]['pagamentos'].append(pagamento)
+
+    # Conciliações são acertos do saldo LOCAL (ex: estoque inicial do caixa), não movimentos da loja
+    cursor.execute("""
+        SELECT id, codigo, tipo, quantidade, data_hora, referencia FROM MovimentosEstoque
+        WHERE id > ? AND motivo IS NOT ? ORDER BY id LIMIT ?
+    """, (_get_mark(conn, MARCA_MOVIMENTO), MOTIVO_CONCILIACAO, limite))
+    movimentos = _rows_as_dicts(cursor)
+
+    # Sessões de caixa: desde a mais antiga que ainda estava aberta no último envio
+    cursor.execute("SELECT * FROM Caixa WHERE id >= ? ORDER BY id", (_get_mark(conn, MARCA_CAIXA, 1),))
+    caixas = _rows_as_dicts(cursor)
+
+    marcas = {}
+    if vendas:
+        marcas[MARCA_VENDA] = vendas[-1]['venda_id']
+    if movimentos:
+        marcas[MARCA_MOVIMENTO] = movimentos[-1]['id']
+    if caixas:
+        abertos = [c['id'] for c in caixas if c['status'] == 'Aberto']
+        marcas[MARCA_CAIXA] = min(abertos) if abertos else caixas[-1]['id'] + 1
+
+    if not (vendas or movimentos or caixas):
+        return None, marcas
+    return {'vendas': vendas, 'caixas': caixas, 'movimentos': movimentos}, marcas
+
+
+def push_pending(conn, base_url: str, terminal: str) -> int:
+    """Envia lotes até não haver pendências. Retorna quantas vendas foram enviadas."""
+    enviadas = 0
+    while True:
+        lote, marcas = collect_pending(conn)
+        if lote is None:
+            return enviadas
+        lote['terminal'] = terminal
+        _request(base_url, '/enviar', lote)
+        _set_marks(conn, marcas)
+        enviadas += len(lote['vendas'])
+        # Caixas abertos voltam em todo lote; só continua se ainda houver vendas/movimentos
+        if len(lote['vendas']) < BATCH_SIZE and len(lote['movimentos']) < BATCH_SIZE:
+            return enviadas
+
+
+# ----------------------------------------------------
+# --- CATÁLOGO (servidor -> caixa) ---
+# ----------------------------------------------------
+
+def apply_catalog_page(conn, produtos: list) -> List[str]:
+    """
+    Grava uma página do catálogo da loja no Produtos local (uma transação).
+    Produto novo entra com estoque zero; produto existente mantém o estoque do caixa.
+    """
+    if not produtos:
+        return []
+    rows = [
+        (p['codigo'], p['nome'], p['preco'], p['tipo_medicao'], p['categoria'], p['ativo'])
+        + search_keys_for(p['codigo'], p['nome'])
+        for p in produtos
+    ]
+    try:
+        conn.cursor().executemany("""
+            INSERT INTO Produtos (codigo, nome, preco, tipo_medicao, categoria, ativo, nome_busca, codigo_busca)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(codigo) DO UPDATE SET
+                nome = excluded.nome, preco = excluded.preco, tipo_medicao = excluded.tipo_medicao,
+                categoria = excluded.categoria, ativo = excluded.ativo,
+                nome_busca = excluded.nome_busca, codigo_busca = excluded.codigo_busca
+        """, rows)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return [p['codigo'] for p in produtos]
+
+
+def pull_catalog(conn, base_url: str) -> List[str]:
+    """Baixa as alterações do catálogo desde a versão local. Retorna os códigos alterados."""
+    desde = _get_mark(conn, MARCA_CATALOGO)
+    query = {'desde': desde}
+    alterados = []
+    while True:
+        pagina = _request(base_url, '/catalogo', query=query)
+        alterados.extend(apply_catalog_page(conn, pagina['produtos']))
+        if not pagina['mais']:
+            break
+        query = {'desde': desde, 'apos_versao': pagina['proximo'][0], 'apos_codigo': pagina['proximo'][1]}
+
+    # A versão só avança depois de todas as páginas gravadas
+    if pagina['versao'] > desde:
+        _set_marks(conn, {MARCA_CATALOGO: pagina['versao']})
+    return alterados
+
+
+def sync_once(conn, base_url: str, terminal: str) -> tuple:
+    """Um ciclo completo: envia pendências e baixa o catálogo. Retorna (vendas_enviadas, códigos_alterados)."""
+    return push_pending(conn, base_url, terminal), pull_catalog(conn, base_url)
+
+
+class SyncClient(threading.Thread):
+    """
+    Thread de sincronização com conexão própria ao pdv.db. Com o servidor fora do ar,
+    espera cada vez mais (até MAX_BACKOFF) e tenta de novo; as vendas seguem locais.
+    on_catalog_changed(codigos) é chamado NA THREAD DE SINCRONIZAÇÃO.
+    """
+
+    def __init__(self, base_url: str, terminal: str = None, interval: float = SYNC_INTERVAL,
+                 on_catalog_changed: Callable[[List[str]], None] = None):
+        super().__init__(name="SyncClient", daemon=True)
+        self.base_url = base_url
+        self.terminal = terminal or sync_terminal_id()
+        self.interval = interval
+        self.on_catalog_changed = on_catalog_changed
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def sync_now(self):
+        """Antecipa o próximo ciclo (ex: logo depois de uma venda)."""
+        self._wake_event.set()
+
+    def run(self):
+        conn = connect_db()
+        if conn is None:
+            print("Erro na sincronização: não foi possível abrir o banco local.")
+            return
+        ensure_sync_tables(conn)
+
+        delay = self.interval
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    enviadas, alterados = sync_once(conn, self.base_url, self.terminal)
+                    if enviadas:
+                        print(f"LOG: {enviadas} venda(s) enviada(s) ao servidor da loja.")
+                    if alterados and self.on_catalog_changed is not None:
+                        self.on_catalog_changed(alterados)
+                    delay = self.interval
+                except (SyncError, sqlite3.Error, KeyError) as e:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    delay = min(delay * 2, MAX_BACKOFF)
+                    print(f"Erro na sincronização com a loja (nova tentativa em {delay:.0f}s): {e}")
+
+                self._wake_event.wait(delay)
+                self._wake_event.clear()
+        finally:
+            conn.close()
@@ -0,0 +1,504 @@
+# core/sync_server.py
+"""
+Servidor de sincronização da loja (um processo por loja, na rede local).
+
+Cada caixa continua vendendo no seu pdv.db local; de tempos em tempos o SyncClient
+(core/sync_client.py) envia para cá as vendas, as sessões de caixa e os movimentos de
+estoque novos, e baixa as alterações do catálogo pelo número de versão.
+
+    PDV_SYNC_TOKEN=segredo python -m core.sync_server --host 0.0.0.0 --porta 8765 --banco loja.db
+    python -m core.sync_server --banco loja.db --publicar-de pdv.db   (carrega/atualiza o catálogo)
+
+Rotas (JSON):
+    POST /enviar              {terminal, vendas, caixas, movimentos}  -> quantos eram novos
+    GET  /catalogo?desde=N    produtos com versao > N (em ordem de versão, paginado por
+                              apos_versao/apos_codigo)
+    POST /catalogo            {produtos: [...]} publica produtos/preços (nova versão)
+    POST /vendas              lote da outbox de vendas (core/sales_outbox.py): uma venda
+                              JSON por linha, gzip; vendas repetidas (mesmo uuid) são ignoradas
+    GET  /resumo?data=AAAA-MM-DD   visão consolidada da loja (vendas por caixa, caixas abertos)
+    GET  /estoque             estoque consolidado da loja
+
+Toda rota exige o token compartilhado da loja (PDV_SYNC_TOKEN, o mesmo nos caixas) no
+cabeçalho "Authorization: Bearer <token>"; sem ele a resposta é 401. Por padrão o servidor
+só ouve em 127.0.0.1, e ouvir na rede (--host 0.0.0.0) exige o token configurado.
+
+O envio é idempotente: vendas, caixas e movimentos são identificados por
+(terminal, id local), então reenviar um lote depois de uma falha de rede não duplica nada.
+"""
+
+import argparse
+import asyncio
+import gzip
+import hmac
+import json
+import os
+import sqlite3
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+
+ENV_SYNC_TOKEN = 'PDV_SYNC_TOKEN'
+AUTH_HEADER = 'Authorization'
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+DEFAULT_PORT = 8765
+DEFAULT_DB = 'loja.db'
+# Tamanho máximo de uma página do catálogo
+CATALOG_PAGE = 500
+MAX_BODY = 32 * 1024 * 1024
+
+CATALOG_FIELDS = ('codigo', 'nome', 'preco', 'tipo_medicao', 'categoria', 'ativo')
+
+
+def sync_token():
+    """Token compartilhado da loja (PDV_SYNC_TOKEN), ou None se não estiver configurado."""
+    return os.environ.get(ENV_SYNC_TOKEN) or None
+
+
+def auth_headers(token: str = None) -> dict:
+    """Cabeçalho de autenticação para as requisições ao servidor (vazio sem token)."""
+    token = token or sync_token()
+    return {AUTH_HEADER: f"Bearer {token}"} if token else {}
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def ensure_store_tables(conn):
+    """Cria as tabelas consolidadas da loja (no banco do servidor)."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS CatalogoLoja (
+            codigo TEXT PRIMARY KEY,
+            nome TEXT NOT NULL,
+            preco REAL NOT NULL,
+            tipo_medicao TEXT NOT NULL DEFAULT 'Unidade',
+            categoria TEXT NOT NULL DEFAULT '',
+            ativo INTEGER NOT NULL DEFAULT 1,
+            quantidade REAL NOT NULL DEFAULT 0,   -- estoque consolidado (movimentos de todos os caixas)
+            versao INTEGER NOT NULL               -- versão da última alteração de cadastro/preço
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_catalogo_loja_versao ON CatalogoLoja(versao, codigo)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS VendasLoja (
+            terminal TEXT NOT NULL,
+            venda_id INTEGER NOT NULL,
+            data_hora TEXT NOT NULL,
+            total_venda REAL NOT NULL,
+            id_caixa INTEGER,
+            id_funcionario INTEGER,
+            vendedor_nome TEXT,
+            dados TEXT NOT NULL,        -- venda completa (itens e pagamentos) em JSON
+            recebido_em TEXT NOT NULL,
+            uuid TEXT,                  -- UUID da venda (outbox)
+            PRIMARY KEY (terminal, venda_id)
+        )
+    """)
+    cursor.execute("PRAGMA table_info(VendasLoja)")
+    if 'uuid' not in [info[1] for info in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE VendasLoja ADD COLUMN uuid TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vendas_loja_data ON VendasLoja(data_hora)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_vendas_loja_uuid ON VendasLoja(uuid)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS CaixasLoja (
+            terminal TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            id_funcionario INTEGER,
+            data_abertura TEXT,
+            valor_abertura REAL,
+            data_fechamento TEXT,
+            valor_fechamento_declarado REAL,
+            diferenca REAL,
+            status TEXT,
+            PRIMARY KEY (terminal, id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS MovimentosLoja (
+            terminal TEXT NOT NULL,
+            id_local INTEGER NOT NULL,
+            codigo TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            quantidade REAL NOT NULL,
+            data_hora TEXT NOT NULL,
+            referencia TEXT,
+            PRIMARY KEY (terminal, id_local)
+        )
+    """)
+    conn.commit()
+
+
+def current_version(conn) -> int:
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(versao), 0) FROM CatalogoLoja")
+    return cursor.fetchone()[0]
+
+
+# ----------------------------------------------------
+# --- OPERAÇÕES (usadas pelas rotas e pela linha de comando) ---
+# ----------------------------------------------------
+
+def publish_products(conn, produtos: list) -> int:
+    """
+    Publica produtos no catálogo da loja. Todos os produtos que realmente mudaram
+    (cadastro ou preço) recebem a MESMA nova versão; os inalterados ficam como estão.
+    produtos: dicts com CATALOG_FIELDS (quantidade opcional, só usada em produto novo).
+    Retorna quantos produtos mudaram.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        versao = current_version(conn) + 1
+        rows = [
+            (p['codigo'], p['nome'], float(p['preco']), p.get('tipo_medicao') or 'Unidade',
+             p.get('categoria') or '', int(p.get('ativo', 1)), float(p.get('quantidade') or 0), versao)
+            for p in produtos
+        ]
+        cursor.executemany("""
+            INSERT INTO CatalogoLoja (codigo, nome, preco, tipo_medicao, categoria, ativo, quantidade, versao)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(codigo) DO UPDATE SET
+                nome = excluded.nome, preco = excluded.preco, tipo_medicao = excluded.tipo_medicao,
+                categoria = excluded.categoria, ativo = excluded.ativo, versao = excluded.versao
+            WHERE (CatalogoLoja.nome, CatalogoLoja.preco, CatalogoLoja.tipo_medicao,
+                   CatalogoLoja.categoria, CatalogoLoja.ativo)
+               IS NOT (excluded.nome, excluded.preco, excluded.tipo_medicao,
+                       excluded.categoria, excluded.ativo)
+        """, rows)
+        cursor.execute("SELECT COUNT(*) FROM CatalogoLoja WHERE versao = ?", (versao,))
+        changed = cursor.fetchone()[0]
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+    print(f"LOG: Catálogo da loja: {changed} produto(s) publicado(s) na versão {versao}.")
+    return changed
+
+
+def publish_from_lane_db(conn, path: str) -> int:
+    """Publica o catálogo a partir do pdv.db de um caixa (ex: o do escritório)."""
+    lane = sqlite3.connect(path)
+    try:
+        lane.row_factory = sqlite3.Row
+        cursor = lane.cursor()
+        cursor.execute(f"SELECT {', '.join(CATALOG_FIELDS)}, quantidade FROM Produtos")
+        produtos = [dict(row) for row in cursor.fetchall()]
+    finally:
+        lane.close()
+    return publish_products(conn, produtos)
+
+
+def catalog_since(conn, desde: int, apos: tuple = None, limite: int = CATALOG_PAGE) -> dict:
+    """
+    Produtos alterados depois da versão 'desde', em ordem de (versao, codigo), numa
+    página (índice de versao). Para a página seguinte, passe em 'apos' o par
+    (versao, codigo) devolvido em 'proximo'; 'mais' indica se ainda há páginas.
+    """
+    apos_versao, apos_codigo = apos if apos else (desde, '')
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {', '.join(CATALOG_FIELDS)}, versao FROM CatalogoLoja
+        WHERE versao > ? AND (versao, codigo) > (?, ?)
+        ORDER BY versao, codigo LIMIT ?
+    """, (desde, apos_versao, apos_codigo, limite + 1))
+    rows = cursor.fetchall()
+    mais = len(rows) > limite
+    rows = rows[:limite]
+
+    return {
+        'versao': max([desde] + [row[-1] for row in rows]),
+        'versao_atual': current_version(conn),
+        'mais': mais,
+        'proximo': [rows[-1][-1], rows[-1][0]] if rows else None,
+        'produtos': [dict(zip(CATALOG_FIELDS, row[:-1])) for row in rows],
+    }
+
+
+def receive_batch(conn, lote: dict) -> dict:
+    """
+    Grava um lote enviado por um caixa, numa única transação.
+    Vendas e movimentos já recebidos são ignorados (INSERT OR IGNORE pela chave
+    terminal + id local); só movimentos NOVOS alteram o estoque consolidado.
+    Caixas são regravados (a sessão muda de 'Aberto' para 'Fechado').
+    """
+    terminal = str(lote.get('terminal') or '').strip()
+    if not terminal:
+        raise ValueError("Lote sem identificação do terminal.")
+
+    agora = _now()
+    vendas = lote.get('vendas') or []
+    caixas = lote.get('caixas') or []
+    movimentos = lote.get('movimentos') or []
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        novas_vendas = 0
+        for venda in vendas:
+            cursor.execute("""
+                INSERT OR IGNORE INTO VendasLoja (terminal, venda_id, data_hora, total_venda, id_caixa,
+                                                  id_funcionario, vendedor_nome, dados, recebido_em, uuid)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (terminal, venda['venda_id'], venda['data_hora'], venda['total_venda'], venda.get('id_caixa'),
+                  venda.get('id_funcionario'), venda.get('vendedor_nome'),
+                  json.dumps(venda, ensure_ascii=False), agora, venda.get('uuid')))
+            novas_vendas += cursor.rowcount
+
+        cursor.executemany("""
+            INSERT OR REPLACE INTO CaixasLoja (terminal, id, id_funcionario, data_abertura, valor_abertura,
+                                               data_fechamento, valor_fechamento_declarado, diferenca, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(terminal, c['id'], c.get('id_funcionario'), c.get('data_abertura'), c.get('valor_abertura'),
+               c.get('data_fechamento'), c.get('valor_fechamento_declarado'), c.get('diferenca'), c.get('status'))
+              for c in caixas])
+
+        novos_movimentos = 0
+        for mov in movimentos:
+            cursor.execute("""
+                INSERT OR IGNORE INTO MovimentosLoja (terminal, id_local, codigo, tipo, quantidade, data_hora, referencia)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (terminal, mov['id'], mov['codigo'], mov['tipo'], mov['quantidade'], mov['data_hora'], mov.get('referencia')))
+            if cursor.rowcount:
+                novos_movimentos += 1
+                cursor.execute("UPDATE CatalogoLoja SET quantidade = quantidade + ? WHERE codigo = ?",
+                               (mov['quantidade'], mov['codigo']))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+    return {'vendas': novas_vendas, 'caixas': len(caixas), 'movimentos': novos_movimentos}
+
+
+def receive_sales(conn, vendas: list) -> int:
+    """
+    Grava um lote da outbox de vendas (cada venda traz uuid, terminal e venda_id).
+    Reenvios são ignorados pela chave (terminal, venda_id) e pelo índice único de uuid.
+    Retorna quantas vendas eram novas.
+    """
+    agora = _now()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.executemany("""
+            INSERT OR IGNORE INTO VendasLoja (terminal, venda_id, data_hora, total_venda, id_caixa,
+                                              id_funcionario, vendedor_nome, dados, recebido_em, uuid)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(v['terminal'], v['venda_id'], v['data_hora'], v['total_venda'], v.get('id_caixa'),
+               v.get('id_funcionario'), v.get('vendedor_nome'), json.dumps(v, ensure_ascii=False), agora, v['uuid'])
+              for v in vendas])
+        novas = cursor.rowcount
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return novas
+
+
+def store_summary(conn, data: str) -> dict:
+    """Visão consolidada do dia: vendas por caixa e sessões abertas."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT terminal, COUNT(*), COALESCE(SUM(total_venda), 0), MAX(data_hora)
+        FROM VendasLoja WHERE data_hora >= ? AND data_hora < date(?, '+1 day')
+        GROUP BY terminal ORDER BY terminal
+    """, (data, data))
+    terminais = [
+        {'terminal': t, 'vendas': n, 'total': round(total, 2), 'ultima_venda': ultima}
+        for t, n, total, ultima in cursor.fetchall()
+    ]
+    cursor.execute("SELECT terminal, id, id_funcionario, data_abertura FROM CaixasLoja WHERE status = 'Aberto' ORDER BY terminal")
+    abertos = [dict(zip(('terminal', 'id', 'id_funcionario', 'data_abertura'), row)) for row in cursor.fetchall()]
+    return {
+        'data': data,
+        'vendas': sum(t['vendas'] for t in terminais),
+        'total': round(sum(t['total'] for t in terminais), 2),
+        'terminais': terminais,
+        'caixas_abertos': abertos,
+    }
+
+
+def store_stock(conn) -> list:
+    cursor = conn.cursor()
+    cursor.execute("SELECT codigo, nome, quantidade FROM CatalogoLoja ORDER BY codigo")
+    return [{'codigo': c, 'nome': n, 'quantidade': q} for c, n, q in cursor.fetchall()]
+
+
+# ----------------------------------------------------
+# --- SERVIDOR HTTP (asyncio, só biblioteca padrão) ---
+# ----------------------------------------------------
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class SyncServer:
+    """
+    Servidor HTTP mínimo sobre asyncio.start_server.
+    O banco é acessado direto no loop: cada requisição é uma transação curta num
+    arquivo local, e uma loja tem poucos caixas enviando lotes a cada poucos segundos.
+    Com token (padrão: PDV_SYNC_TOKEN), toda requisição precisa dele; sem token, o
+    servidor só aceita ouvir no próprio computador (127.0.0.1).
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 token: str = None):
+        self.token = token or sync_token()
+        if not self.token and host not in LOOPBACK_HOSTS:
+            raise ValueError(f"defina {ENV_SYNC_TOKEN} para ouvir na rede ({host}); sem token, só em 127.0.0.1")
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.conn = sqlite3.connect(db_path)
+        ensure_store_tables(self.conn)
+        self._server = None
+
+    def authorized(self, headers: dict) -> bool:
+        """Confere o token do cabeçalho Authorization (comparação em tempo constante)."""
+        if not self.token:
+            return True
+        scheme, _, token = headers.get(AUTH_HEADER.lower(), '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), self.token.encode())
+
+    def route(self, method: str, path: str, query: dict, body: bytes):
+        """Retorna (status, objeto_json)."""
+        def param(name, default=None):
+            return query.get(name, [default])[0]
+
+        if path == '/enviar':
+            if method != 'POST':
+                return 405, {'erro': 'use POST'}
+            return 200, receive_batch(self.conn, json.loads(body or b'{}'))
+
+        if path == '/catalogo':
+            if method == 'GET':
+                limite = min(int(param('limite', CATALOG_PAGE)), CATALOG_PAGE)
+                apos = (int(param('apos_versao')), param('apos_codigo', '')) if param('apos_versao') else None
+                return 200, catalog_since(self.conn, int(param('desde', 0)), apos, limite)
+            if method == 'POST':
+                payload = json.loads(body or b'{}')
+                changed = publish_products(self.conn, payload.get('produtos') or [])
+                return 200, {'alterados': changed, 'versao_atual': current_version(self.conn)}
+            return 405, {'erro': 'use GET ou POST'}
+
+        if path == '/vendas':
+            if method != 'POST':
+                return 405, {'erro': 'use POST'}
+            vendas = [json.loads(line) for line in body.decode('utf-8').splitlines() if line.strip()]
+            return 200, {'recebidas': len(vendas), 'novas': receive_sales(self.conn, vendas)}
+
+        if path == '/resumo' and method == 'GET':
+            return 200, store_summary(self.conn, param('data') or datetime.now().strftime("%Y-%m-%d"))
+
+        if path == '/estoque' and method == 'GET':
+            return 200, store_stock(self.conn)
+
+        return 404, {'erro': f'rota desconhecida: {path}'}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        status, payload = 500, {'erro': 'falha interna'}
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            if not request_line:
+                return
+            method, target, _ = request_line.split(' ', 2)
+
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ('\r\n', '\n', ''):
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get('content-length', 0))
+            if not self.authorized(headers):
+                status, payload = 401, {'erro': 'token ausente ou inválido'}
+            elif length > MAX_BODY:
+                status, payload = 413, {'erro': 'lote grande demais'}
+            else:
+                body = await reader.readexactly(length) if length else b''
+                if headers.get('content-encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                url = urlsplit(target)
+                status, payload = self.route(method.upper(), url.path, parse_qs(url.query), body)
+
+        except (ValueError, KeyError, TypeError, gzip.BadGzipFile, EOFError) as e:
+            status, payload = 400, {'erro': str(e)}
+        except sqlite3.Error as e:
+            print(f"Erro no banco da loja: {e}")
+            status, payload = 500, {'erro': f'banco: {e}'}
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"LOG: Servidor de sincronização ouvindo em {self.host}:{self.port} (banco {self.db_path}).")
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de sincronização da loja (vários caixas).")
+    parser.add_argument('--banco', default=DEFAULT_DB, help="arquivo SQLite consolidado da loja")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help=f"endereço de escuta (0.0.0.0 para a rede da loja; exige {ENV_SYNC_TOKEN})")
+    parser.add_argument('--porta', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--publicar-de', metavar='PDV_DB',
+                        help="publica o catálogo a partir do pdv.db informado e sai")
+    args = parser.parse_args(argv)
+
+    if args.publicar_de:
+        conn = sqlite3.connect(args.banco)
+        try:
+            ensure_store_tables(conn)
+            publish_from_lane_db(conn, args.publicar_de)
+        finally:
+            conn.close()
+        return 0
+
+    try:
+        server = SyncServer(args.banco, args.host, args.porta)
+    except ValueError as e:
+        print(f"Erro: {e}")
+        return 1
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
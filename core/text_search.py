@@ -0,0 +1,25 @@
+# core/text_search.py
+
+import re
+import unicodedata
+
+# Tudo que não for letra/dígito ASCII ou espaço é descartado da chave de busca
+_CARACTERES_INVALIDOS = re.compile(r'[^a-z0-9\s]')
+_ESPACOS = re.compile(r'\s+')
+
+
+def normalize_search_text(text) -> str:
+    """
+    Gera a chave de busca normalizada de um texto: minúsculas, sem acentos/cedilhas,
+    sem pontuação e com espaços colapsados. Ex: 'Pão Francês (kg)' -> 'pao frances kg'.
+    Usa apenas a biblioteca padrão (unicodedata), então pode rodar em qualquer thread.
+    """
+    if text is None:
+        return ""
+
+    # NFKD separa a letra do acento ('ã' -> 'a' + '~'); o encode ascii descarta o acento
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    ascii_text = decomposed.encode('ascii', 'ignore').decode('ascii').lower()
+
+    ascii_text = _CARACTERES_INVALIDOS.sub('', ascii_text)
+    return _ESPACOS.sub(' ', ascii_text).strip()
@@ -6,10 +6,14 @@ from typing import List, Dict, Any, Tuple
 from PySide6.QtWidgets import QMessageBox
 
 # Importa as funções de conexão e estoque do seu core/database.py
-from core.database import connect_db, update_stock_after_sale, finalizar_venda 
+from core.database import connect_db, connect_readonly, update_stock_after_sale, finalizar_venda 
 
 # ⭐️ NOVO IMPORT: Gerenciador de Caixa ⭐️
-from core.caixa_manager import CaixaManager
+from core.caixa_manager import CaixaManager, add_sale_to_caixa_totals
+from core.stock_reservation import convert_reservations
+from core.sales_outbox import ensure_outbox_table, outbox_destination, new_sale_uuid, enqueue_sale
+from core.sync_client import sync_terminal_id
+from core.archive import ArchiveError, report_sources
 
 class VendasController:
     """
@@ -17,9 +21,11 @@ class VendasController:
     e adiciona a lógica de negócios (desconto, taxa, pagamentos mistos e CONTROLE DE CAIXA).
     """
     
-    def __init__(self, vendedor_id):
+    def __init__(self, vendedor_id, reservation_terminal=None):
         self.get_db_connection = connect_db 
         self.vendedor_id = vendedor_id # ⭐️ ARMAZENA O ID ⭐️
+        # Modo reserva de estoque: terminal cujas reservas são convertidas na venda
+        self.reservation_terminal = reservation_terminal
         self._check_and_update_tables() # Garante que as tabelas têm os novos campos
         # Variáveis para armazenar os dados da última venda (necessário para impressão)
         self.last_venda_data = {}
@@ -52,6 +58,10 @@ class VendasController:
             # ⭐️ NOVO CAMPO: ID do Caixa ⭐️
             if 'id_caixa' not in columns:
                 cursor.execute("ALTER TABLE Vendas ADD COLUMN id_caixa INTEGER")
+
+            # UUID da venda: identifica a venda fora deste caixa (replicação idempotente)
+            if 'uuid' not in columns:
+                cursor.execute("ALTER TABLE Vendas ADD COLUMN uuid TEXT")
             
             # --- MIGRACAO ITENSVENDA ---
             cursor.execute("PRAGMA table_info(ItensVenda)")
@@ -75,6 +85,7 @@ class VendasController:
             """)
             
             conn.commit()
+            ensure_outbox_table(conn)
             print("LOG: Estrutura de Vendas atualizada com sucesso (incluindo id_caixa).")
             
         except sqlite3.Error as e:
@@ -110,6 +121,8 @@ class VendasController:
         # ----------------------------------------
         
         estoque_alerts = []
+        venda_uuid = new_sale_uuid()
+        data_hora = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         try:
             cursor = conn.cursor()
@@ -118,10 +131,10 @@ class VendasController:
             cursor.execute("""
                 INSERT INTO Vendas (
                     data_hora, total_venda, valor_recebido, troco, id_funcionario, vendedor_nome,
-                    valor_bruto, desconto_aplicado, taxa_servico, id_caixa 
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    valor_bruto, desconto_aplicado, taxa_servico, id_caixa, uuid 
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
-                dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 
+                data_hora, 
                 venda_data['total_venda'],
                 venda_data['valor_recebido'], 
                 venda_data['troco'], 
@@ -130,7 +143,8 @@ class VendasController:
                 venda_data['valor_bruto'],
                 venda_data['desconto_aplicado'],
                 venda_data['taxa_servico'],
-                id_caixa # ⭐️ VALOR INSERIDO ⭐️
+                id_caixa, # ⭐️ VALOR INSERIDO ⭐️
+                venda_uuid
             ))
             
             venda_id = cursor.lastrowid 
@@ -169,9 +183,42 @@ class VendasController:
                 VALUES (?, ?, ?)
             """, pagamentos_to_insert)
 
-            # 2. DAR BAIXA NO ESTOQUE 
-            estoque_alerts = update_stock_after_sale(conn, itens_carrinho)
+            # --- 1.4. Totais acumulados da sessão de caixa (fechamento/leitura X sem varrer vendas) ---
+            add_sale_to_caixa_totals(
+                cursor, id_caixa, venda_data['total_venda'], venda_data['troco'],
+                [(metodo, valor) for _, metodo, valor in pagamentos_to_insert]
+            )
+
+            # 2. CONVERTER AS RESERVAS DO CAIXA (modo reserva): confere o saldo contra as
+            # reservas dos outros caixas; se faltar, levanta erro e a venda inteira é desfeita
+            if self.reservation_terminal:
+                convert_reservations(cursor, self.reservation_terminal, itens_carrinho)
+
+            # 2.1. DAR BAIXA NO ESTOQUE 
+            estoque_alerts = update_stock_after_sale(
+                conn, itens_carrinho, venda_id=venda_id, id_funcionario=venda_data['id_funcionario']
+            )
             
+            # 2.2. OUTBOX (replicação para a retaguarda): entra na mesma transação,
+            # então só existe na outbox venda que foi de fato confirmada
+            if outbox_destination():
+                enqueue_sale(cursor, venda_uuid, venda_id, {
+                    'uuid': venda_uuid,
+                    'terminal': sync_terminal_id(),
+                    'venda_id': venda_id,
+                    'data_hora': data_hora,
+                    'id_caixa': id_caixa,
+                    **{k: venda_data.get(k) for k in (
+                        'total_venda', 'valor_recebido', 'troco', 'id_funcionario', 'vendedor_nome',
+                        'valor_bruto', 'desconto_aplicado', 'taxa_servico')},
+                    'itens': [
+                        {'produto_codigo': codigo, 'nome_produto': nome, 'quantidade': quantidade,
+                         'preco_unitario': preco, 'desconto_item': desconto, 'total_liquido_item': total}
+                        for _, codigo, nome, quantidade, preco, desconto, total in itens_venda_data
+                    ],
+                    'pagamentos': [{'metodo': metodo, 'valor': valor} for _, metodo, valor in pagamentos_to_insert],
+                })
+
             # 3. COMMIT DA TRANSAÇÃO
             conn.commit()
             
@@ -197,13 +244,16 @@ class VendasController:
 
     def buscar_vendas_detalhadas(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
         """Busca vendas e seus pagamentos, agrupadas por venda (para Relatórios)."""
-        conn = self.get_db_connection()
+        # Só leitura: o relatório nunca disputa o lock de escrita com a venda
+        conn = connect_readonly()
         if conn is None: return []
         
         try:
+            # Períodos arquivados entram por UNION ALL só com as partições necessárias
+            sources = report_sources(conn, start_date, f"{end_date} 23:59:59")
             cursor = conn.cursor()
             
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT 
                     v.venda_id,
                     v.data_hora,
@@ -214,8 +264,8 @@ class VendasController:
                     v.total_venda, 
                     pv.metodo,
                     pv.valor
-                FROM Vendas v
-                JOIN PagamentosVenda pv ON v.venda_id = pv.venda_id
+                FROM {sources['Vendas']} v
+                JOIN {sources['PagamentosVenda']} pv ON v.venda_id = pv.venda_id
                 WHERE DATE(v.data_hora) BETWEEN ? AND ?
                 ORDER BY v.data_hora DESC
             """, (start_date, end_date))
@@ -242,7 +292,7 @@ class VendasController:
                 
             return list(vendas_agrupadas.values())
 
-        except sqlite3.Error as e:
+        except (sqlite3.Error, ArchiveError) as e:
             print(f"Erro ao buscar relatórios de venda: {e}")
             return []
         finally:
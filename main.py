@@ -6,6 +6,9 @@ from ui.main_window import PDVWindow
 from core.database import connect_db, create_and_populate_tables 
 from ui.login_dialog import LoginDialog 
 from core.cart_logic import CartManager 
+from ui.sync_bridge import create_sync_bridge_from_env
+from core.sales_outbox import start_outbox_shipper_from_env
+from core.backup import lock_database, start_backup_scheduler_from_env
 
 def main():
     app = QApplication(sys.argv)
@@ -40,6 +43,16 @@ def main():
 
 
     # ======== BANCO DE DADOS ========
+    # Trava "PDV aberto" (compartilhada entre caixas): a restauração de backup recusa enquanto existir
+    try:
+        db_lock = lock_database()
+    except OSError as e:
+        print(f"Erro ao criar a trava do banco ({e}); a restauração de backup não vai detectar este PDV.")
+        db_lock = False
+    if db_lock is None:
+        QMessageBox.critical(None, "Erro Fatal", "O banco está sendo restaurado de um backup. Tente de novo em instantes.")
+        sys.exit(-1)
+
     conn = connect_db(None) 
     if conn is None:
         QMessageBox.critical(None, "Erro Fatal", "Erro fatal ao conectar no banco de dados.")
@@ -47,6 +60,13 @@ def main():
 
     create_and_populate_tables(conn)
 
+    # Modo multi-caixa (opcional): sincroniza com o servidor da loja se PDV_SYNC_URL estiver definida
+    sync_bridge = create_sync_bridge_from_env(conn)
+    # Replicação das vendas para a retaguarda (opcional): PDV_OUTBOX_DESTINO=pasta ou URL
+    outbox_shipper = start_outbox_shipper_from_env()
+    # Backup a quente do pdv.db (opcional): PDV_BACKUP_DIR=pasta dos backups
+    backup_scheduler = start_backup_scheduler_from_env()
+
 
     # ======== LOOP DE SESSÃO / LOGIN ========
     while True:
@@ -100,7 +120,15 @@ def main():
             break
             
     # ======== FIM DO LOOP ========
+    if sync_bridge is not None:
+        sync_bridge.stop()
+    if outbox_shipper is not None:
+        outbox_shipper.stop()
+    if backup_scheduler is not None:
+        backup_scheduler.stop()
     conn.close()
+    if db_lock:
+        db_lock.close()
     
     # Executa o loop de eventos principal da aplicação UMA VEZ (se ainda não tiver sido chamado)
     # Se você está no PySide6/PyQt6, o sys.exit(app.exec()) é a forma padrão.
@@ -0,0 +1,85 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """pdv.db novo num diretório temporário (connect_db passa a abrir este arquivo)."""
+    monkeypatch.setattr(database, 'DB_NAME', str(tmp_path / 'pdv.db'))
+    conn = database.connect_db()
+    # Tabelas base de vendas como no banco de um caixa já instalado (a migração as altera)
+    conn.execute("""CREATE TABLE Vendas (venda_id INTEGER PRIMARY KEY AUTOINCREMENT, data_hora TEXT NOT NULL,
+                    total_venda REAL NOT NULL, valor_recebido REAL, troco REAL, vendedor_nome TEXT,
+                    id_funcionario INTEGER, id_caixa INTEGER)""")
+    conn.execute("""CREATE TABLE ItensVenda (item_id INTEGER PRIMARY KEY AUTOINCREMENT, venda_id INTEGER,
+                    produto_codigo TEXT, nome_produto TEXT, quantidade REAL NOT NULL, preco_unitario REAL NOT NULL)""")
+    database.create_and_populate_tables(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def vender(db):
+    """Função que registra uma venda de um item (caixa 1 aberto) e retorna o id da venda."""
+    from core.caixa_manager import CaixaManager
+    from data.vendas_controller import VendasController
+
+    CaixaManager(db).abrir_caixa(1, 100.0)
+    controller = VendasController(1)
+
+    def venda(total: float, pagamentos=(('Dinheiro', None),), troco: float = 0.0, codigo: str = '001'):
+        pagamentos = [{'method': m, 'value': total + troco if v is None else v} for m, v in pagamentos]
+        ok, alertas, id_venda = controller.finalizar_venda_transacao(
+            {'total_venda': total, 'valor_recebido': sum(p['value'] for p in pagamentos), 'troco': troco,
+             'valor_bruto': total, 'desconto_aplicado': 0, 'taxa_servico': 0,
+             'id_funcionario': 1, 'vendedor_nome': 'admin'},
+            [{'codigo': codigo, 'nome': 'Item', 'quantidade': 1, 'preco_unitario': total,
+              'desconto_item': 0, 'total_liquido_item': total}],
+            pagamentos
+        )
+        assert ok, alertas
+        return id_venda
+    return venda
+
+
+@pytest.fixture
+def certificado(tmp_path):
+    """Certificado A1 autoassinado (.pem com chave e certificado) para assinar NFC-e."""
+    pytest.importorskip('cryptography')
+    import datetime as dt
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+    from core.nfce import CertificadoA1
+
+    chave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    nome = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'PDV TESTE:12345678000195')])
+    agora = dt.datetime.now(dt.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(nome).issuer_name(nome).public_key(chave.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(agora).not_valid_after(agora + dt.timedelta(days=30))
+            .sign(chave, hashes.SHA256()))
+    caminho = tmp_path / 'certificado.pem'
+    caminho.write_bytes(
+        chave.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption())
+        + cert.public_bytes(serialization.Encoding.PEM)
+    )
+    return CertificadoA1(str(caminho))
+
+
+@pytest.fixture
+def emitente(monkeypatch):
+    """Emitente de homologação mínimo (só CNPJ e CSC são obrigatórios)."""
+    from core.nfce import emitente_from_env
+    monkeypatch.setenv('PDV_NFCE_CNPJ', '12.345.678/0001-95')
+    monkeypatch.setenv('PDV_NFCE_CSC', 'CSC-TESTE')
+    return emitente_from_env()
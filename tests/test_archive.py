@@ -0,0 +1,49 @@
+# tests/test_archive.py
+import sqlite3
+
+from core.archive import ensure_archive_tables, report_sources, upgrade_partitions
+
+
+def _particao_antiga(db, pasta):
+    """Partição 2023 gerada antes das colunas de desconto/pagamento existirem no pdv.db."""
+    caminho = pasta / 'vendas-2023.db'
+    arquivo = sqlite3.connect(caminho)
+    arquivo.executescript("""
+        CREATE TABLE Vendas (venda_id INTEGER PRIMARY KEY, data_hora TEXT, total_venda REAL);
+        CREATE TABLE ItensVenda (item_id INTEGER PRIMARY KEY, venda_id INTEGER, quantidade REAL);
+        CREATE TABLE PagamentosVenda (id INTEGER PRIMARY KEY, venda_id INTEGER);
+        INSERT INTO Vendas VALUES (1, '2023-06-01 10:00:00', 25.0);
+    """)
+    arquivo.close()
+    ensure_archive_tables(db)
+    db.execute("INSERT INTO ParticoesVendas VALUES ('2023', 'vendas-2023.db', '2023-01-01', '2024-01-01', 1, '2024-02-01')")
+    db.commit()
+    return caminho
+
+
+def _colunas(caminho):
+    arquivo = sqlite3.connect(caminho)
+    try:
+        return [row[1] for row in arquivo.execute("PRAGMA table_info(Vendas)")]
+    finally:
+        arquivo.close()
+
+
+def test_relatorio_nao_altera_particao_antiga(db, tmp_path, monkeypatch):
+    monkeypatch.setenv('PDV_ARQUIVO_DIR', str(tmp_path))
+    caminho = _particao_antiga(db, tmp_path)
+    antes = caminho.read_bytes()
+
+    fontes = report_sources(db, '2023-01-01', '2023-12-31 23:59:59')
+    linhas = db.execute(f"SELECT venda_id, total_venda, valor_recebido FROM {fontes['Vendas']} AS V").fetchall()
+
+    assert linhas == [(1, 25.0, None)]
+    assert caminho.read_bytes() == antes
+
+
+def test_atualizar_leva_as_colunas_novas_para_a_particao(db, tmp_path, monkeypatch):
+    monkeypatch.setenv('PDV_ARQUIVO_DIR', str(tmp_path))
+    caminho = _particao_antiga(db, tmp_path)
+
+    assert upgrade_partitions(db) == 1
+    assert 'valor_recebido' in _colunas(caminho)
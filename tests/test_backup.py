@@ -0,0 +1,116 @@
+# tests/test_backup.py
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from core import backup
+from core.backup import BackupBusy, BackupError, create_backup, lock_database, restore_backup, verify_backup
+
+
+@pytest.fixture(autouse=True)
+def sem_espera(monkeypatch):
+    """Backups dos testes começam na hora (sem esperar pausa nas gravações)."""
+    monkeypatch.setattr(backup, 'QUIET_PERIOD', 0)
+
+
+@pytest.fixture
+def banco(tmp_path):
+    caminho = str(tmp_path / 'pdv.db')
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE TABLE Vendas (id INTEGER PRIMARY KEY, dados BLOB)")
+    conn.executemany("INSERT INTO Vendas (dados) VALUES (?)", [(b'x' * 2000,) for _ in range(300)])
+    conn.commit()
+    conn.close()
+    return caminho
+
+
+def test_backup_e_restauracao(banco, tmp_path):
+    gz = create_backup(str(tmp_path / 'backups'), banco)
+    assert verify_backup(gz) == 'ok'
+
+    conn = sqlite3.connect(banco)
+    conn.execute("DELETE FROM Vendas")
+    conn.commit()
+    conn.close()
+
+    anterior = restore_backup(gz, banco)
+    conn = sqlite3.connect(banco)
+    assert conn.execute("SELECT COUNT(*) FROM Vendas").fetchone()[0] == 300
+    conn.close()
+    assert sqlite3.connect(anterior).execute("SELECT COUNT(*) FROM Vendas").fetchone()[0] == 0
+
+
+def test_caixa_movimentado_adia_o_backup(banco, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, 'BACKUP_PAGES_PER_STEP', 1)
+    monkeypatch.setattr(backup, 'BACKUP_STEP_SLEEP', 0)
+    caixa = sqlite3.connect(banco, timeout=0)
+    create_snapshot = backup.create_snapshot
+    chamadas = []
+
+    def com_vendas(source, dest_path, pages=-1, progress=None, sleep=0.25):
+        chamadas.append(pages)
+        passos = [0]
+
+        def progresso(status, remaining, total):
+            progress(status, remaining, total)
+            passos[0] += 1
+            if passos[0] % 5 == 0:  # uma venda a cada 5 passos; timeout=0: falharia se travada
+                caixa.execute("INSERT INTO Vendas (dados) VALUES (x'00')")
+                caixa.commit()
+        return create_snapshot(source, dest_path, pages=pages, progress=progresso, sleep=sleep)
+
+    monkeypatch.setattr(backup, 'create_snapshot', com_vendas)
+    pasta = tmp_path / 'backups'
+    with pytest.raises(BackupBusy):
+        create_backup(str(pasta), banco)
+    caixa.close()
+    # Só a cópia em passos (nada de cópia num passo só) e nenhum arquivo deixado para trás
+    assert chamadas == [1]
+    assert list(pasta.iterdir()) == []
+
+
+def test_espera_pausa_nas_gravacoes(banco, monkeypatch):
+    monkeypatch.setattr(backup, 'QUIET_POLL', 0.01)
+    assert backup.wait_for_quiet(banco, quiet=0.05, max_wait=1)
+
+    parar = threading.Event()
+
+    def vendendo():
+        caixa = sqlite3.connect(banco)
+        while not parar.is_set():
+            caixa.execute("INSERT INTO Vendas (dados) VALUES (x'00')")
+            caixa.commit()
+            time.sleep(0.01)
+        caixa.close()
+    thread = threading.Thread(target=vendendo)
+    thread.start()
+    try:
+        assert not backup.wait_for_quiet(banco, quiet=0.2, max_wait=0.5)
+    finally:
+        parar.set()
+        thread.join()
+
+
+def test_restauracao_recusa_com_pdv_aberto(banco, tmp_path):
+    gz = create_backup(str(tmp_path / 'backups'), banco)
+    caixa1 = lock_database(banco)
+    caixa2 = lock_database(banco)  # vários caixas no mesmo banco
+    assert caixa1 is not None and caixa2 is not None
+    with pytest.raises(BackupError, match="aberto num PDV"):
+        restore_backup(gz, banco)
+    caixa1.close()
+    with pytest.raises(BackupError):
+        restore_backup(gz, banco)
+    caixa2.close()
+    assert restore_backup(gz, banco)
+
+
+def test_pdv_nao_abre_durante_a_restauracao(banco):
+    restaurando = lock_database(banco, exclusiva=True)
+    try:
+        assert lock_database(banco) is None
+    finally:
+        restaurando.close()
+    assert lock_database(banco) is not None
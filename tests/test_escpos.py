@@ -0,0 +1,89 @@
+# tests/test_escpos.py
+import pytest
+
+from core.escpos import (CODEPAGE_SELECT, INIT, DeviceSink, EscPosBuilder, FileSink, PrintQueue, TcpSink,
+                         create_sink, text_to_escpos)
+
+
+def test_builder_comeca_com_init_e_pagina_de_codigo():
+    dados = EscPosBuilder().bold().line('Pão de queijo').bold(False).cut().build()
+    assert dados.startswith(INIT + CODEPAGE_SELECT)
+    assert b'\x1bE\x01' + 'Pão de queijo'.encode('cp860') + b'\n\x1bE\x00' in dados
+    assert dados.endswith(b'\x1dVB\x03')
+
+
+def test_texto_fora_da_pagina_de_codigo_vira_interrogacao():
+    assert EscPosBuilder().text('R$ 5 €').build().endswith(b'R$ 5 ?')
+
+
+def test_text_to_escpos_corta_no_fim():
+    dados = text_to_escpos('linha 1\nlinha 2')
+    assert dados == INIT + CODEPAGE_SELECT + b'linha 1\nlinha 2\n\x1dVB\x03'
+    assert not text_to_escpos('x\n', cortar=False).endswith(b'\x1dVB\x03')
+
+
+def test_codigo_de_barras_e_qrcode():
+    dados = EscPosBuilder().barcode('12345').qrcode('https://nfce.fazenda.sp.gov.br/qr?p=1').build()
+    assert b'\x1dk\x49\x07{B12345' in dados
+    url = b'https://nfce.fazenda.sp.gov.br/qr?p=1'
+    tamanho = len(url) + 4
+    assert b'\x1d(k' + bytes((tamanho & 0xFF, tamanho >> 8, 49, 80, 0x30)) + url in dados
+    with pytest.raises(ValueError):
+        EscPosBuilder().barcode('9' * 300)
+
+
+def test_create_sink():
+    assert isinstance(create_sink('arquivo:/tmp/cupom.bin'), FileSink)
+    assert isinstance(create_sink('dev:/dev/usb/lp0'), DeviceSink)
+    sink = create_sink('tcp:192.168.0.50')
+    assert isinstance(sink, TcpSink) and sink.port == 9100
+    for invalido in ('tcp', 'serial:/dev/ttyS0'):
+        with pytest.raises(ValueError):
+            create_sink(invalido)
+
+
+def test_fila_entrega_em_ordem_no_arquivo(tmp_path):
+    destino = tmp_path / 'cupom.bin'
+    fila = PrintQueue(FileSink(str(destino)))
+    fila.start()
+    for n in range(3):
+        fila.submit(text_to_escpos(f'cupom {n}'), f'cupom {n}')
+    fila.stop(timeout=5)
+    assert not fila.is_alive()
+    assert destino.read_bytes() == b''.join(text_to_escpos(f'cupom {n}') for n in range(3))
+
+
+class ImpressoraSemPapel:
+    def __init__(self, falhas: int):
+        self.falhas = falhas
+        self.recebido = []
+
+    def write(self, data: bytes):
+        if self.falhas:
+            self.falhas -= 1
+            raise OSError('sem papel')
+        self.recebido.append(data)
+
+
+def test_fila_tenta_de_novo_e_desiste():
+    impressora = ImpressoraSemPapel(falhas=2)
+    fila = PrintQueue(impressora, max_attempts=3, retry_delay=0)
+    assert fila._deliver(b'cupom', 'cupom')
+    assert impressora.recebido == [b'cupom']
+
+    impressora = ImpressoraSemPapel(falhas=3)
+    fila = PrintQueue(impressora, max_attempts=3, retry_delay=0)
+    assert not fila._deliver(b'cupom', 'cupom')
+    assert impressora.recebido == []
+
+
+def test_on_done_recebe_o_resultado_de_uma_tentativa_so():
+    impressora = ImpressoraSemPapel(falhas=1)
+    fila = PrintQueue(impressora, max_attempts=5, retry_delay=0)
+    fila.start()
+    resultados = []
+    fila.submit(b'a', on_done=resultados.append)
+    fila.submit(b'b', on_done=resultados.append)
+    fila.stop(timeout=5)
+    assert isinstance(resultados[0], OSError) and resultados[1] is None
+    assert impressora.recebido == [b'b']  # quem passou on_done decide se tenta de novo
@@ -0,0 +1,67 @@
+# tests/test_formatting.py
+import pytest
+
+from core import formatting
+from core.formatting import brl, brl_many, numero_br, numero_br_many, parse_br, peso_br, peso_br_many
+
+VALORES = [0, 0.5, 1.005, 12.3, 999.999, 1234.5, -1234.56, 1234567.891, 10 ** 9, -0.004]
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo():
+    formatting.clear_cache()
+    yield
+    formatting.clear_cache()
+
+
+def _idioma_antigo(valor, casas=2):
+    return f"{valor:,.{casas}f}".replace('.', '#').replace(',', '.').replace('#', ',')
+
+
+def test_valores_iguais_ao_idioma_antigo():
+    for valor in VALORES:
+        assert brl(valor) == 'R$ ' + _idioma_antigo(valor)
+        assert numero_br(valor) == _idioma_antigo(valor)
+        assert peso_br(valor) == _idioma_antigo(valor, 3)
+    assert brl(1234.5) == 'R$ 1.234,50'
+    assert peso_br(1.5) == '1,500'
+
+
+def test_zero_negativo():
+    assert brl(-0.0) == brl(0.0) == 'R$ 0,00'
+    assert brl_many([-0.0, 0.0]) == ['R$ 0,00', 'R$ 0,00']
+
+
+@pytest.mark.parametrize('um, varios', [(brl, brl_many), (numero_br, numero_br_many), (peso_br, peso_br_many)])
+def test_lote_igual_a_um_por_um(um, varios):
+    valores = VALORES * 3 + [v * 7 for v in VALORES]
+    esperado = [um(v) for v in valores]
+    formatting.clear_cache()
+    assert varios(valores) == esperado
+    assert varios(iter(valores)) == esperado  # aceita qualquer iterável
+    assert varios([]) == []
+
+
+def test_cache_respeita_o_limite(monkeypatch):
+    monkeypatch.setattr(formatting, 'CACHE_MAX', 10)
+    valores = [i + 0.25 for i in range(25)]
+    assert brl_many(valores) == [brl(v) for v in valores]
+    for v in valores:
+        brl(v)
+    assert len(brl.cache) <= 10
+
+
+def test_parse_br():
+    assert parse_br('R$ 1.234,56') == 1234.56
+    assert parse_br('1234,5') == 1234.5
+    assert parse_br(brl(-987654.32)) == -987654.32
+    with pytest.raises(ValueError):
+        parse_br('R$ abc')
+
+
+def test_benchmark_confere_e_mede():
+    resultado = formatting.benchmark(n=200, distintos=20, repeticoes=1)
+    assert set(resultado) == {'idioma_antigo', 'brl_cache_frio', 'brl_cache_quente',
+                              'brl_many_cache_frio', 'brl_many_cache_quente'}
+    assert all(us > 0 for us in resultado.values())
+    assert not brl.cache
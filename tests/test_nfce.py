@@ -0,0 +1,79 @@
+# tests/test_nfce.py
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from core.nfce import (NFE_NS, TP_EMIS_OFFLINE, NfceInvalidaError, _ratear, build_nfce, chave_acesso,
+                       chave_valida, digito_modulo11, sign_nfce, verify_nfce)
+
+NS = {'nfe': NFE_NS}
+
+VENDA = {'id': 7, 'data_hora': '2024-03-15 10:30:00', 'total_venda': 31.5, 'desconto_aplicado': 1.0,
+         'taxa_servico': 0.0, 'troco': 8.5}
+ITENS = [
+    {'codigo': '001', 'nome': 'Refri', 'quantidade': 2, 'preco_unitario': 5.0},
+    {'codigo': '002', 'nome': 'Queijo', 'quantidade': 0.75, 'preco_unitario': 30.0, 'unidade': 'KG'},
+]
+PAGAMENTOS = [{'method': 'Dinheiro', 'value': 40.0}]
+
+
+def test_digito_modulo11_chave_do_manual():
+    # Exemplo do Manual de Orientação do Contribuinte (chave 52060433009911002506550120000007800267301615)
+    assert digito_modulo11('5206043300991100250655012000000780026730161') == 5
+
+
+def test_chave_acesso_tem_44_digitos_e_dv_valido():
+    chave = chave_acesso('35', '2403', '12345678000195', 1, 42, 1, 12345678)
+    assert len(chave) == 44 and chave_valida(chave)
+    assert not chave_valida(chave[:-1] + str((int(chave[-1]) + 1) % 10))
+
+
+@pytest.mark.parametrize('total, bases', [
+    (1.0, [1, 1, 1]), (0.1, [3.33, 3.33, 3.34]), (2.5, [10.0, 0.01, 7.77]), (0.0, [1, 2]), (3.0, [0, 0]),
+])
+def test_ratear_soma_exatamente_o_total(total, bases):
+    partes = _ratear(total, bases)
+    assert len(partes) == len(bases)
+    assert round(sum(partes), 2) == round(total, 2) or not sum(bases)
+
+
+def _nfce_assinada(emitente, certificado, **kwargs):
+    chave, inf = build_nfce(VENDA, ITENS, PAGAMENTOS, emitente, 42, **kwargs)
+    return chave, sign_nfce(inf, emitente, certificado)
+
+
+def test_build_sign_verify_ida_e_volta(emitente, certificado):
+    chave, xml = _nfce_assinada(emitente, certificado)
+    assert verify_nfce(xml) == chave
+
+    nfe = ET.fromstring(xml)
+    inf = nfe.find('nfe:infNFe', NS)
+    assert inf.findtext('nfe:total/nfe:ICMSTot/nfe:vNF', namespaces=NS) == '31.50'
+    descontos = [float(d.findtext('nfe:prod/nfe:vDesc', '0', namespaces=NS)) for d in inf.findall('nfe:det', NS)]
+    assert round(sum(descontos), 2) == 1.0
+    assert nfe.findtext('nfe:infNFeSupl/nfe:qrCode', namespaces=NS).count('|') == 4
+
+
+def test_contingencia_offline_gera_qrcode_com_digest(emitente, certificado):
+    chave, xml = _nfce_assinada(emitente, certificado, tp_emis=TP_EMIS_OFFLINE, dh_cont='2024-03-15T10:30:00-03:00')
+    assert chave[34] == str(TP_EMIS_OFFLINE)
+    nfe = ET.fromstring(xml)
+    assert nfe.findtext('nfe:infNFe/nfe:ide/nfe:tpEmis', namespaces=NS) == '9'
+    assert nfe.findtext('nfe:infNFeSupl/nfe:qrCode', namespaces=NS).count('|') == 7
+    assert verify_nfce(nfe) == chave
+
+
+def test_documento_alterado_depois_de_assinado_e_rejeitado(emitente, certificado):
+    _, xml = _nfce_assinada(emitente, certificado)
+    with pytest.raises(NfceInvalidaError) as erro:
+        verify_nfce(xml.replace('<xProd>Refri', '<xProd>Refrx'))
+    assert erro.value.cstat == 297
+
+
+def test_nfe_sem_assinatura_e_rejeitada(emitente):
+    _, inf = build_nfce(VENDA, ITENS, PAGAMENTOS, emitente, 42)
+    nfe = ET.Element(f'{{{NFE_NS}}}NFe')
+    nfe.append(inf)
+    with pytest.raises(NfceInvalidaError) as erro:
+        verify_nfce(nfe)
+    assert erro.value.cstat == 298
@@ -0,0 +1,173 @@
+# tests/test_nfce_queue.py
+import time
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from core import database, nfce_queue
+from core.nfce import NFE_NS, TP_EMIS_NORMAL, TP_EMIS_OFFLINE, verify_nfce
+from core.nfce_queue import (STATUS_ASSINADA, STATUS_AUTORIZADA, STATUS_ERRO, STATUS_PENDENTE, HttpTransport,
+                             NfceEmitter, enqueue_nfce, fiscal_status, requeue_failed)
+from core.sefaz_mock import MockSefaz
+
+
+@pytest.fixture
+def sefaz():
+    servidor = MockSefaz(port=0)
+    url = servidor.start_background()
+    servidor.url = url
+    yield servidor
+    servidor.close()
+
+
+@pytest.fixture
+def emissor(db, sefaz, certificado, emitente):
+    return NfceEmitter(database.connect_db, certificado, HttpTransport(sefaz.url), emitente, lote_max=3)
+
+
+def _ate(condicao, timeout: float = 10.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicao():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_autoriza_em_lotes(db, vender, sefaz, emissor):
+    vendas = [vender(10.0 + n) for n in range(5)]
+    for id_venda in vendas:
+        enqueue_nfce(db, id_venda)
+    assert enqueue_nfce(db, vendas[0]) == fiscal_status(db, vendas[0])['id']  # pedir de novo não duplica
+
+    while emissor.sign_pending(db):
+        while emissor.send_batch(db):
+            pass
+    assert emissor.check_receipts(db) == 0
+
+    assert sefaz.lotes_recebidos == 2  # lote_max=3: 3 + 2
+    for id_venda in vendas:
+        status = fiscal_status(db, id_venda)
+        assert status['status'] == STATUS_AUTORIZADA and status['cstat'] == 100
+        assert status['tp_emis'] == TP_EMIS_NORMAL and status['protocolo']
+    xml = db.execute("SELECT xml FROM DocumentosFiscais WHERE id_venda = ?", (vendas[0],)).fetchone()[0]
+    assert xml.startswith('<nfeProc') and '<protNFe' in xml
+    numeros = [fiscal_status(db, v)['numero'] for v in vendas]
+    assert len(set(numeros)) == len(numeros)
+
+
+def test_sefaz_fora_do_ar_entra_em_contingencia_e_transmite_depois(db, vender, sefaz, emissor, monkeypatch):
+    monkeypatch.setattr(nfce_queue, 'BASE_BACKOFF', 0.05)
+    monkeypatch.setattr(nfce_queue, 'MAX_BACKOFF', 0.2)
+    monkeypatch.setattr(nfce_queue, 'RECIBO_INTERVAL', 0.05)
+    emissor.idle_interval = 0.1
+    sefaz.fora_do_ar = True
+    emissor.start()
+    try:
+        antes = vender(20.0)
+        enqueue_nfce(db, antes)
+        emissor.wake()
+        assert _ate(lambda: emissor.contingencia)
+
+        durante = vender(15.0)
+        enqueue_nfce(db, durante)
+        emissor.wake()
+        assert _ate(lambda: (fiscal_status(db, durante) or {}).get('status') == STATUS_ASSINADA)
+        assert fiscal_status(db, durante)['tp_emis'] == TP_EMIS_OFFLINE
+        assert fiscal_status(db, durante)['chave'][34] == str(TP_EMIS_OFFLINE)
+
+        sefaz.fora_do_ar = False
+        emissor.wake()
+        assert _ate(lambda: all(fiscal_status(db, v)['status'] == STATUS_AUTORIZADA for v in (antes, durante)))
+        assert not emissor.contingencia
+    finally:
+        emissor.stop(5)
+
+    xml = db.execute("SELECT xml FROM DocumentosFiscais WHERE id_venda = ?", (durante,)).fetchone()[0]
+    assert '<tpEmis>9</tpEmis>' in xml and '<dhCont>' in xml
+
+
+class TransporteQueCaiNaResposta(HttpTransport):
+    """O lote chega à SEFAZ mas a resposta se perde (timeout) na primeira vez."""
+    falhas = 1
+
+    def enviar_lote(self, id_lote, xmls):
+        recibo = super().enviar_lote(id_lote, xmls)
+        if self.falhas:
+            self.falhas -= 1
+            raise TimeoutError("read timeout")
+        return recibo
+
+
+@pytest.mark.parametrize('com_consulta', [True, False])
+def test_duplicidade_204_conta_como_autorizada(db, vender, sefaz, certificado, emitente, monkeypatch, com_consulta):
+    transporte = TransporteQueCaiNaResposta(sefaz.url)
+    if not com_consulta:  # SEFAZ sem consulta protocolo: vale o nProt do xMotivo
+        monkeypatch.setattr(TransporteQueCaiNaResposta, 'consultar_protocolo', None, raising=False)
+    emissor = NfceEmitter(database.connect_db, certificado, transporte, emitente)
+    id_venda = vender(25.0)
+    enqueue_nfce(db, id_venda)
+    emissor.sign_pending(db)
+    with pytest.raises(OSError):
+        emissor.send_batch(db)
+    chave = fiscal_status(db, id_venda)['chave']
+    assert chave in sefaz.autorizadas  # a primeira tentativa foi autorizada lá
+
+    emissor.send_batch(db)  # reenvio: a SEFAZ responde 204
+    emissor.check_receipts(db)
+
+    status = fiscal_status(db, id_venda)
+    assert status['status'] == STATUS_AUTORIZADA
+    assert status['protocolo'] == sefaz.autorizadas[chave]
+    xml = db.execute("SELECT xml FROM DocumentosFiscais WHERE id_venda = ?", (id_venda,)).fetchone()[0]
+    assert ('<nfeProc' in xml) == com_consulta
+    nfe = ET.fromstring(xml)
+    assert verify_nfce(nfe if nfe.tag == f'{{{NFE_NS}}}NFe' else nfe.find(f'{{{NFE_NS}}}NFe')) == chave
+
+
+class TransporteQueRecusaUmaNota(HttpTransport):
+    """SEFAZ que recusa o lote inteiro se ele tiver a nota 'recusar'."""
+    recusar = None
+
+    def enviar_lote(self, id_lote, xmls):
+        if self.recusar and any(self.recusar in xml for xml in xmls):
+            raise ValueError("lote recusado pela SEFAZ: 225 - Falha no Schema XML")
+        return super().enviar_lote(id_lote, xmls)
+
+
+def test_lote_recusado_so_separa_a_nota_ruim(db, vender, sefaz, certificado, emitente):
+    transporte = TransporteQueRecusaUmaNota(sefaz.url)
+    emissor = NfceEmitter(database.connect_db, certificado, transporte, emitente, lote_max=3)
+    vendas = [vender(10.0 + n) for n in range(3)]
+    for id_venda in vendas:
+        enqueue_nfce(db, id_venda)
+    emissor.sign_pending(db)
+    transporte.recusar = fiscal_status(db, vendas[1])['chave']
+
+    assert emissor.send_batch(db) == 3
+    emissor.check_receipts(db)
+    assert [fiscal_status(db, v)['status'] for v in vendas] == [STATUS_AUTORIZADA, STATUS_ERRO, STATUS_AUTORIZADA]
+    assert '225' in fiscal_status(db, vendas[1])['motivo']
+
+    # Corrigido o problema, a nota volta para a fila com o mesmo número
+    numero = fiscal_status(db, vendas[1])['numero']
+    transporte.recusar = None
+    assert requeue_failed(db) == 1
+    assert fiscal_status(db, vendas[1])['status'] == STATUS_PENDENTE
+    emissor.sign_pending(db)
+    emissor.send_batch(db)
+    emissor.check_receipts(db)
+    assert fiscal_status(db, vendas[1])['status'] == STATUS_AUTORIZADA
+    assert fiscal_status(db, vendas[1])['numero'] == numero
+
+
+def test_cada_caixa_so_emite_a_sua_serie(db, vender, emissor, emitente):
+    outra_serie = vender(12.0)
+    enqueue_nfce(db, outra_serie, serie=emitente['serie'] + 1)
+    assert emissor.sign_pending(db) == 0
+    assert fiscal_status(db, outra_serie)['status'] == STATUS_PENDENTE
+
+    propria = vender(13.0)
+    enqueue_nfce(db, propria, serie=emitente['serie'])
+    assert emissor.sign_pending(db) == 1
+    assert fiscal_status(db, propria)['status'] == STATUS_ASSINADA
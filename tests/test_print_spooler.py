@@ -0,0 +1,37 @@
+# tests/test_print_spooler.py
+import sqlite3
+
+from core.print_spooler import (
+    ENV_TERMINAL, STATUS_PENDENTE, TIPO_TEXTO, enqueue_job, ensure_print_spool_table, pending_jobs,
+)
+
+
+def test_cada_caixa_so_ve_os_seus_trabalhos(tmp_path, monkeypatch):
+    conn = sqlite3.connect(str(tmp_path / 'pdv.db'))
+    ensure_print_spool_table(conn)
+
+    monkeypatch.setenv(ENV_TERMINAL, 'CAIXA01')
+    primeiro = enqueue_job(conn, TIPO_TEXTO, conteudo='um')
+    monkeypatch.setenv(ENV_TERMINAL, 'CAIXA02')
+    segundo = enqueue_job(conn, TIPO_TEXTO, conteudo='dois')
+
+    assert [job[0] for job in pending_jobs(conn)] == [segundo]
+    assert [job[0] for job in pending_jobs(conn, origem='CAIXA01')] == [primeiro]
+    conn.close()
+
+
+def test_pendentes_antigos_ficam_com_o_caixa_que_migrou(tmp_path, monkeypatch):
+    conn = sqlite3.connect(str(tmp_path / 'pdv.db'))
+    conn.execute("""CREATE TABLE FilaImpressao (id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT NOT NULL,
+                    id_venda INTEGER, conteudo TEXT, status TEXT NOT NULL DEFAULT 'Pendente',
+                    tentativas INTEGER NOT NULL DEFAULT 0, ultimo_erro TEXT, criado_em TEXT NOT NULL,
+                    impresso_em TEXT)""")
+    conn.execute("INSERT INTO FilaImpressao (tipo, conteudo, status, criado_em) VALUES (?, 'x', ?, '2025-01-01')",
+                 (TIPO_TEXTO, STATUS_PENDENTE))
+    conn.commit()
+
+    monkeypatch.setenv(ENV_TERMINAL, 'CAIXA01')
+    ensure_print_spool_table(conn)
+    assert len(pending_jobs(conn)) == 1
+    assert pending_jobs(conn, origem='CAIXA02') == []
+    conn.close()
@@ -0,0 +1,52 @@
+# tests/test_printer_manager.py
+import time
+
+import pytest
+
+from core.escpos import text_to_escpos
+from core.print_spooler import STATUS_IMPRESSO, list_jobs, load_sale
+from core.printer_manager import PrinterManager
+
+
+@pytest.fixture
+def impressora(tmp_path, monkeypatch, db):
+    destino = tmp_path / 'cupom.bin'
+    monkeypatch.setenv('PDV_IMPRESSORA', f'arquivo:{destino}')
+    monkeypatch.delenv('PDV_NFCE_SEFAZ', raising=False)
+    pm = PrinterManager()
+    yield pm, destino
+    pm.close()
+
+
+def _impresso(conn, id_venda, timeout=10.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if list_jobs(conn, id_venda)[0][3] == STATUS_IMPRESSO:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_spooler_e_impressao_direta_nao_intercalam(db, vender, impressora):
+    pm, destino = impressora
+    vendas = [vender(10.0 + n) for n in range(3)]
+    textos = [f"relatorio {n}\n" * 50 for n in range(3)]
+    for id_venda, texto in zip(vendas, textos):
+        pm.enqueue_sale_receipt(db, id_venda)
+        pm.print_text(texto)
+    assert all(_impresso(db, id_venda) for id_venda in vendas)
+    pm.close()
+
+    conteudo = destino.read_bytes()
+    cupons = [pm.build_receipt_escpos(*load_sale(db, v)) for v in vendas] + [text_to_escpos(t) for t in textos]
+    assert len(conteudo) == sum(len(c) for c in cupons)
+    assert all(cupom in conteudo for cupom in cupons)  # cada cupom inteiro, sem nada no meio
+
+
+def test_reimpressao_mostra_a_hora_da_venda(db, vender, impressora):
+    pm, _ = impressora
+    id_venda = vender(12.0)
+    db.execute("UPDATE Vendas SET data_hora = '2024-03-15 10:30:00' WHERE venda_id = ?", (id_venda,))
+    db.commit()
+    recibo = pm.generate_receipt_content(*load_sale(db, id_venda))
+    assert '15/03/2024 10:30' in recibo
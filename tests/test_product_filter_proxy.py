@@ -0,0 +1,137 @@
+# tests/test_product_filter_proxy.py
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PySide6.QtWidgets')
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from core.database import search_keys_for  # noqa: E402
+from core.product_catalog import ProductCatalog  # noqa: E402
+from ui.product_table_model import ProductFilterProxyModel, ProductTableModel  # noqa: E402
+
+
+@pytest.fixture
+def lista(db):
+    """Modelo de origem (todas as páginas carregadas) + proxy de filtro."""
+    app = QApplication.instance() or QApplication([])  # noqa: F841
+    catalog = ProductCatalog()
+    model = ProductTableModel(db, catalog=catalog)
+    proxy = ProductFilterProxyModel()
+    proxy.setSourceModel(model)
+    model.reload()
+    while model.canFetchMore():
+        model.fetchMore()
+    yield db, catalog, model, proxy
+    model.detach()
+
+
+def codigos(proxy):
+    return [proxy.index(row, 0).data() for row in range(proxy.rowCount())]
+
+
+def test_filtro_por_texto_e_categoria(lista):
+    db, catalog, model, proxy = lista
+    assert proxy.rowCount() == model.rowCount()
+
+    proxy.set_filter('agua')
+    assert codigos(proxy) == ['005']
+
+    proxy.set_filter('', 'Frios')
+    assert codigos(proxy) == ['004', '006']
+
+    proxy.set_filter('', 'Todos')
+    assert proxy.rowCount() == model.rowCount()
+
+
+def test_estreitar_termo(lista):
+    db, catalog, model, proxy = lista
+    proxy.set_filter('c')
+    antes = set(codigos(proxy))
+    proxy.set_filter('cola')
+    assert set(codigos(proxy)) <= antes
+    assert codigos(proxy) == ['001', '003']
+    # Apagar letras volta a considerar todas as linhas
+    proxy.set_filter('co')
+    assert set(codigos(proxy)) >= {'001', '003'}
+
+
+def test_pagina_nova_entra_no_fim(db):
+    QApplication.instance() or QApplication([])
+    db.executemany(
+        "INSERT INTO Produtos (codigo, nome, preco, tipo_medicao, categoria, nome_busca, codigo_busca) "
+        "VALUES (?, ?, 1.0, 'Unidade', 'Bebidas', ?, ?)",
+        [(f"9{i:04d}", f"Suco {i}", *search_keys_for(f"9{i:04d}", f"Suco {i}")) for i in range(300)]
+    )
+    db.commit()
+    model = ProductTableModel(db, catalog=ProductCatalog())
+    proxy = ProductFilterProxyModel()
+    proxy.setSourceModel(model)
+    model.reload()
+    primeira = proxy.rowCount()
+    assert primeira == ProductTableModel.PAGE_SIZE and model.canFetchMore()
+
+    model.fetchMore()
+    assert proxy.rowCount() == model.rowCount() > primeira
+    assert proxy.mapToSource(proxy.index(proxy.rowCount() - 1, 1)).data() == 'Suco 299'
+    model.detach()
+
+
+def test_edicao_entra_e_sai_do_filtro(lista):
+    db, catalog, model, proxy = lista
+    catalog.replace_all([])  # RESET recarrega a origem; o catálogo passa a avisar as edições
+    while model.canFetchMore():
+        model.fetchMore()
+    proxy.set_filter('queijo')
+    assert codigos(proxy) == ['004']
+
+    db.execute("UPDATE Produtos SET nome = 'Queijo Prato' WHERE codigo = '006'")
+    db.commit()
+    catalog.refresh_product(db, '006')
+    assert codigos(proxy) == ['004', '006']
+
+    db.execute("UPDATE Produtos SET nome = 'Mussarela' WHERE codigo = '004'")
+    db.commit()
+    catalog.refresh_product(db, '004')
+    assert codigos(proxy) == ['006']
+    assert proxy.mapFromSource(model.index(3, 0)).isValid() is False
+
+
+def test_filtro_alcanca_produtos_ainda_nao_carregados(db):
+    QApplication.instance() or QApplication([])
+    quantidade = ProductTableModel.PAGE_SIZE * 3 + 100
+    produtos = [(f"A{i:05d}", f"Produto {i}") for i in range(quantidade)] + [("Z999", "Picanha Bovina")]
+    db.executemany(
+        "INSERT INTO Produtos (codigo, nome, preco, tipo_medicao, categoria, nome_busca, codigo_busca) "
+        "VALUES (?, ?, 1.0, 'Peso', 'Carnes', ?, ?)",
+        [(codigo, nome, *search_keys_for(codigo, nome)) for codigo, nome in produtos]
+    )
+    db.commit()
+    catalog = ProductCatalog()
+    model = ProductTableModel(db, catalog=catalog)
+    proxy = ProductFilterProxyModel()
+    proxy.setSourceModel(model)
+    model.reload()
+    assert model.rowCount() == ProductTableModel.PAGE_SIZE
+
+    proxy.set_filter('picanha')
+    assert codigos(proxy) == ['Z999']
+    assert not model.canFetchMore()
+
+    proxy.set_filter('', 'Carnes')
+    assert proxy.rowCount() == quantidade + 1
+
+    # Recarga em massa com o filtro ativo também traz o catálogo inteiro
+    proxy.set_filter('picanha', 'Todos')
+    catalog.replace_all([])
+    assert codigos(proxy) == ['Z999']
+
+    # Produto novo depois do último código, com tudo carregado, entra na lista
+    db.execute("INSERT INTO Produtos (codigo, nome, preco, tipo_medicao, categoria) "
+               "VALUES ('ZZ01', 'Picanha Suina', 1.0, 'Peso', 'Carnes')")
+    db.commit()
+    catalog.refresh_product(db, 'ZZ01')
+    assert codigos(proxy) == ['Z999', 'ZZ01']
+    model.detach()
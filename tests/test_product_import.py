@@ -0,0 +1,90 @@
+# tests/test_product_import.py
+import json
+import sqlite3
+
+import pytest
+
+from core import database
+from core.database import SEARCH_INDEXES
+from core.product_import import ImportInterrupted, import_file, main
+
+
+def _produtos(n, inicio=1):
+    return [{'codigo': f'IMP{i:04d}', 'nome': f'Produto {i}', 'preco': '1,50', 'quantidade': i}
+            for i in range(inicio, inicio + n)]
+
+
+def _indices(conn):
+    return {nome for (nome,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_csv_upsert_mantem_estoque_sem_coluna_quantidade(db, tmp_path):
+    arquivo = tmp_path / 'produtos.csv'
+    arquivo.write_text("Código;Descrição;Preço;Estoque\nIMP1;Café 500g;12,90;10\nIMP2;;3,00;1\n", encoding='utf-8')
+    resultado = import_file(db, str(arquivo))
+    assert (resultado.imported, resultado.error_count, resultado.last_line) == (1, 1, 3)
+
+    arquivo.write_text("codigo,nome,preco\nIMP1,Café 1kg,22.50\n", encoding='utf-8')
+    import_file(db, str(arquivo))
+    assert db.execute("SELECT nome, preco, quantidade, nome_busca FROM Produtos WHERE codigo = 'IMP1'").fetchone() \
+        == ('Café 1kg', 22.5, 10.0, 'cafe 1kg')
+
+
+def test_cada_lote_e_uma_transacao(db, tmp_path):
+    arquivo = tmp_path / 'produtos.json'
+    arquivo.write_text(json.dumps(_produtos(6)), encoding='utf-8')
+    caixa = sqlite3.connect(database.DB_NAME, timeout=0)  # o caixa não espera pelo lock
+    vendas = []
+
+    def entre_lotes(resultado):
+        caixa.execute("UPDATE Produtos SET quantidade = quantidade - 1 WHERE codigo = '001'")
+        caixa.commit()
+        vendas.append(resultado.last_line)
+
+    import_file(db, str(arquivo), chunk_size=2, progress=lambda resultado, _: entre_lotes(resultado))
+    caixa.close()
+    assert vendas[:3] == [2, 4, 6]
+
+
+def test_falha_no_meio_guarda_os_lotes_e_retoma(db, tmp_path):
+    arquivo = tmp_path / 'produtos.jsonl'
+    linhas = [json.dumps(p) for p in _produtos(5)]
+    arquivo.write_text("\n".join(linhas) + "\n{quebrado", encoding='utf-8')
+
+    with pytest.raises(ImportInterrupted) as erro:
+        import_file(db, str(arquivo), chunk_size=2)
+    assert erro.value.last_line == 4
+    codigos = [c for (c,) in db.execute("SELECT codigo FROM Produtos WHERE codigo LIKE 'IMP%' ORDER BY codigo")]
+    assert codigos == ['IMP0001', 'IMP0002', 'IMP0003', 'IMP0004']
+    assert set(SEARCH_INDEXES) <= _indices(db)  # índices recriados mesmo com a falha
+
+    arquivo.write_text("\n".join(linhas + [json.dumps(p) for p in _produtos(2, inicio=6)]), encoding='utf-8')
+    resultado = import_file(db, str(arquivo), chunk_size=2, resume_after=erro.value.last_line)
+    assert (resultado.processed, resultado.imported, resultado.last_line) == (3, 3, 7)
+    assert db.execute("SELECT COUNT(*) FROM Produtos WHERE codigo LIKE 'IMP%'").fetchone()[0] == 7
+
+
+def test_cli_migra_banco_antigo_antes_de_importar(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_NAME', str(tmp_path / 'pdv.db'))
+    antigo = sqlite3.connect(database.DB_NAME)
+    # pdv.db de antes das colunas de busca e do ledger de estoque
+    antigo.executescript("""
+        CREATE TABLE Produtos (id INTEGER PRIMARY KEY AUTOINCREMENT, codigo TEXT UNIQUE NOT NULL, nome TEXT NOT NULL,
+                               preco REAL NOT NULL, quantidade REAL NOT NULL DEFAULT 0,
+                               tipo_medicao TEXT NOT NULL DEFAULT 'Unidade', categoria TEXT NOT NULL);
+        CREATE TABLE Vendas (venda_id INTEGER PRIMARY KEY AUTOINCREMENT, data_hora TEXT NOT NULL,
+                             total_venda REAL NOT NULL, valor_recebido REAL, troco REAL, vendedor_nome TEXT,
+                             id_funcionario INTEGER, id_caixa INTEGER);
+        CREATE TABLE ItensVenda (item_id INTEGER PRIMARY KEY AUTOINCREMENT, venda_id INTEGER, produto_codigo TEXT,
+                                 nome_produto TEXT, quantidade REAL NOT NULL, preco_unitario REAL NOT NULL);
+    """)
+    antigo.close()
+    arquivo = tmp_path / 'produtos.csv'
+    arquivo.write_text("codigo;nome;preco;quantidade\nIMP1;Café 500g;12,90;10\n", encoding='utf-8')
+
+    assert main([str(arquivo)]) == 0
+
+    conn = sqlite3.connect(database.DB_NAME)
+    assert conn.execute("SELECT nome_busca, quantidade FROM Produtos WHERE codigo = 'IMP1'").fetchone() \
+        == ('cafe 500g', 10.0)
+    conn.close()
@@ -0,0 +1,50 @@
+# tests/test_product_registration.py
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PySide6.QtWidgets')
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from ui.product_registration import ProductRegistrationWindow  # noqa: E402
+
+
+def _movimentos(db, codigo, depois_de=0):
+    return db.execute(
+        "SELECT tipo, quantidade, id_funcionario FROM MovimentosEstoque"
+        " WHERE codigo = ? AND id > ? ORDER BY id",
+        (codigo, depois_de)).fetchall()
+
+
+def _ultimo_movimento(db):
+    return db.execute("SELECT COALESCE(MAX(id), 0) FROM MovimentosEstoque").fetchone()[0]
+
+
+def test_edicao_grava_a_diferenca_de_estoque_no_ledger(db):
+    app = QApplication.instance() or QApplication([])  # noqa: F841
+    antes = db.execute("SELECT quantidade FROM Produtos WHERE codigo = '001'").fetchone()[0]
+    marco = _ultimo_movimento(db)  # a carga inicial já concilia os saldos
+    janela = ProductRegistrationWindow(db, product_id='001', id_funcionario=7)
+
+    assert janela._update_product("Refrigerante Cola 2L", 9.5, antes + 4, "UN", "Bebidas")
+
+    assert db.execute("SELECT quantidade FROM Produtos WHERE codigo = '001'").fetchone()[0] == antes + 4
+    assert _movimentos(db, '001', marco) == [('ajuste', 4, 7)]
+
+    # Sem mudar a quantidade, nenhum movimento novo
+    assert janela._update_product("Refrigerante Cola 2L", 9.9, antes + 4, "UN", "Bebidas")
+    assert len(_movimentos(db, '001', marco)) == 1
+    janela.deleteLater()
+
+
+def test_cadastro_grava_o_estoque_inicial_no_ledger(db):
+    app = QApplication.instance() or QApplication([])  # noqa: F841
+    janela = ProductRegistrationWindow(db, id_funcionario=3)
+
+    assert janela._insert_product("X100", "Café Torrado 500g", 18.9, 12, "UN", "Mercearia")
+
+    assert db.execute("SELECT quantidade FROM Produtos WHERE codigo = 'X100'").fetchone()[0] == 12
+    assert _movimentos(db, 'X100') == [('ajuste', 12, 3)]
+    janela.deleteLater()
@@ -0,0 +1,38 @@
+# tests/test_receipt_template.py
+import pytest
+
+from core.receipt_template import Coluna, ReceiptTemplate, Separador, Tabela, Valor
+
+
+def _tabela(**kwargs):
+    return ReceiptTemplate([Tabela('itens', [
+        Coluna('quantidade', 5, tipo='numero', titulo='QTD'),
+        Coluna('nome', 10, titulo='ITEM'),
+        Coluna(lambda item: item['quantidade'] * item['preco'], 12, '>', 'moeda', 'TOTAL'),
+    ], **kwargs)], largura=29)
+
+
+def test_tabela_formata_corta_texto_e_nunca_numero():
+    linhas = _tabela().render_lines({'itens': [
+        {'quantidade': 2, 'nome': 'Refrigerante Cola', 'preco': 4.5},
+        {'quantidade': 1000, 'nome': 42, 'preco': 1000.0},
+    ]})
+    assert linhas == [
+        'QTD   ITEM              TOTAL',
+        '2,00  Refrigeran      R$ 9,00',
+        '1.000,00 42         R$ 1.000.000,00',
+    ]
+
+
+def test_tabela_sem_cabecalho_e_lista_vazia():
+    assert _tabela(cabecalho=False).render_lines({'itens': []}) == []
+
+
+def test_tipo_desconhecido_falha_na_compilacao():
+    with pytest.raises(ValueError):
+        ReceiptTemplate([Tabela('itens', [Coluna('x', 5, tipo='data')])])
+
+
+def test_valor_e_separador_na_largura():
+    linhas = ReceiptTemplate([Separador('='), Valor("TOTAL:", 'total')], largura=20).render_lines({'total': 10.5})
+    assert linhas == ['=' * 20, 'TOTAL:      R$ 10,50']
@@ -0,0 +1,99 @@
+# tests/test_sales_outbox.py
+import sqlite3
+import threading
+import urllib.error
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from core.sales_outbox import (
+    HttpSink, OutboxRejected, decode_batch, enqueue_sale, ensure_outbox_table, new_sale_uuid,
+    requeue_rejected, ship_batch,
+)
+
+
+@pytest.fixture
+def outbox():
+    conn = sqlite3.connect(':memory:')
+    ensure_outbox_table(conn)
+    yield conn
+    conn.close()
+
+
+def enfileirar(conn, *vendas):
+    for venda_id in vendas:
+        enqueue_sale(conn.cursor(), new_sale_uuid(), venda_id, {'venda_id': venda_id})
+    conn.commit()
+
+
+@pytest.fixture
+def destino():
+    """Servidor HTTP local que responde com o status da vez (lista 'respostas') e guarda os lotes."""
+    estado = {'respostas': [], 'lotes': []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            dados = self.rfile.read(int(self.headers['Content-Length']))
+            status = estado['respostas'].pop(0) if estado['respostas'] else 200
+            if status == 200:
+                estado['lotes'].append([v['venda_id'] for v in decode_batch(dados)])
+            corpo = b'{"erro": "lote invalido"}'
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    estado['sink'] = HttpSink(f"http://127.0.0.1:{server.server_port}/vendas")
+    yield estado
+    server.shutdown()
+    server.server_close()
+
+
+def pendentes(conn):
+    return [r[0] for r in conn.execute("SELECT venda_id FROM OutboxVendas WHERE rejeitado_em IS NULL ORDER BY id")]
+
+
+def test_lote_aceito_sai_da_outbox(outbox, destino):
+    enfileirar(outbox, 1, 2)
+    assert ship_batch(outbox, destino['sink']) == 2
+    assert destino['lotes'] == [[1, 2]]
+    assert pendentes(outbox) == []
+
+
+def test_4xx_separa_o_lote_e_a_fila_segue(outbox, destino):
+    enfileirar(outbox, 1, 2)
+    destino['respostas'] = [400]
+    with pytest.raises(OutboxRejected, match='HTTP 400.*lote invalido'):
+        ship_batch(outbox, destino['sink'])
+
+    motivo = outbox.execute("SELECT motivo FROM OutboxVendas WHERE venda_id = 1").fetchone()[0]
+    assert 'HTTP 400' in motivo
+    assert pendentes(outbox) == []
+
+    enfileirar(outbox, 3)
+    assert ship_batch(outbox, destino['sink']) == 1
+    assert destino['lotes'] == [[3]]
+    # O lote recusado continua guardado (não foi apagado pelo envio seguinte)
+    assert outbox.execute("SELECT COUNT(*) FROM OutboxVendas").fetchone()[0] == 2
+
+    assert requeue_rejected(outbox) == 2
+    assert ship_batch(outbox, destino['sink']) == 2
+    assert destino['lotes'] == [[3], [1, 2]]
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_erro_passageiro_mantem_o_lote(outbox, destino, status):
+    enfileirar(outbox, 1)
+    destino['respostas'] = [status]
+    with pytest.raises(urllib.error.HTTPError):
+        ship_batch(outbox, destino['sink'])
+    assert pendentes(outbox) == [1]
+
+    assert ship_batch(outbox, destino['sink']) == 1
+    assert destino['lotes'] == [[1]]
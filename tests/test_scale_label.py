@@ -0,0 +1,44 @@
+# tests/test_scale_label.py
+import pytest
+
+from core.product_catalog import ProductCatalog
+from core.scale_label import (
+    DEFAULT_LAYOUT, ENV_LABEL_DECIMALS, ENV_LABEL_MASK, ENV_LABEL_VALUE, VALOR_PESO, ScaleLabelDecoder,
+    ScaleLabelLayout, scale_label_layout_from_env,
+)
+from core.scanner import gtin_check_digit
+
+
+def etiqueta(corpo12: str) -> str:
+    return corpo12 + str(gtin_check_digit(corpo12))
+
+
+def test_mascara_padrao_equivale_ao_layout_padrao():
+    layout = ScaleLabelLayout.from_mask('2PPPP0VVVVVVD')
+    assert (layout.prefix, layout.plu_start, layout.plu_length, layout.value_start, layout.value_length) == \
+        (DEFAULT_LAYOUT.prefix, DEFAULT_LAYOUT.plu_start, DEFAULT_LAYOUT.plu_length,
+         DEFAULT_LAYOUT.value_start, DEFAULT_LAYOUT.value_length)
+
+
+@pytest.mark.parametrize('mascara', ['2PPPP0VVVVVV', 'PPPPP0VVVVVVD', '2PPPPVVVVVVVX', ''])
+def test_mascara_invalida(mascara):
+    with pytest.raises(ValueError):
+        ScaleLabelLayout.from_mask(mascara)
+
+
+def test_layout_pelo_ambiente(monkeypatch):
+    for env in (ENV_LABEL_MASK, ENV_LABEL_VALUE, ENV_LABEL_DECIMALS):
+        monkeypatch.delenv(env, raising=False)
+    assert scale_label_layout_from_env() is DEFAULT_LAYOUT
+
+    monkeypatch.setenv(ENV_LABEL_MASK, '20PPPPPVVVVVD')
+    monkeypatch.setenv(ENV_LABEL_VALUE, 'peso')
+    layout = scale_label_layout_from_env()
+
+    catalog = ProductCatalog()
+    catalog.replace_all([('00012', 'Queijo', 40.0, 'Peso', 'Frios')])
+    decoder = ScaleLabelDecoder(layout, catalog)
+    produto, quantidade = decoder.resolve(etiqueta('200001201250'))  # PLU 12, 1,250 kg
+    assert produto[0] == '00012' and layout.value_kind == VALOR_PESO
+    assert quantidade == pytest.approx(1.25)
+    decoder.detach()
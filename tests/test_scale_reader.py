@@ -0,0 +1,72 @@
+# tests/test_scale_reader.py
+import threading
+
+import pytest
+
+from core import scale_reader
+from core.scale_reader import (FilizolaParser, ScaleReader, ScaleReading, ScaleSimulator, StabilityFilter,
+                               ToledoContinuousParser, build_filizola_frame, build_toledo_frame, create_parser)
+
+
+def test_toledo_ida_e_volta_com_quadros_picados():
+    dados = b'lixo' + build_toledo_frame(0.785, stable=False) + build_toledo_frame(1.25) + build_toledo_frame(12.5)
+    parser = ToledoContinuousParser()
+    leituras = []
+    for i in range(0, len(dados), 5):  # a serial entrega pedaços de quadro
+        leituras += parser.feed(dados[i:i + 5])
+    assert [(r.weight, r.stable) for r in leituras] == [(0.785, False), (1.25, True), (12.5, True)]
+
+
+def test_toledo_descarta_quadro_corrompido():
+    quadro = build_toledo_frame(0.5)
+    leituras = ToledoContinuousParser().feed(quadro[:-1] + b'X' + quadro)
+    assert [r.weight for r in leituras] == [0.5]
+
+
+def test_filizola_instavel_e_sobrecarga():
+    parser = FilizolaParser()
+    leituras = parser.feed(build_filizola_frame(0.35) + build_filizola_frame(0.4, stable=False)
+                           + b'\x02SSSSS\x03' + b'\x02NNNNN\x03' + b'\x0200')
+    assert [(r.weight, r.stable, r.overload) for r in leituras] == [
+        (0.35, True, False), (0.0, False, False), (0.0, False, True)]
+    assert parser.feed(b'123\x03')[0].weight == 0.123  # quadro completado na leitura seguinte
+
+
+def test_protocolo_desconhecido():
+    assert isinstance(create_parser(None), ToledoContinuousParser)
+    with pytest.raises(ValueError):
+        create_parser('urano')
+
+
+def test_estabilidade_avisa_uma_vez_por_peso():
+    filtro = StabilityFilter()
+    pesos = [filtro.feed(ScaleReading(p, e)) for p, e in [
+        (0.80, False), (0.785, True), (0.786, True), (0.785, True), (0.785, True),  # estabiliza
+        (0.0, False), (0.785, True), (0.785, True), (0.785, True),                   # retirou e pôs de novo
+        (1.2, True), (1.2, True), (1.2, True),                                       # trocou o produto
+        (0.003, True), (0.003, True), (0.003, True),                                 # abaixo do mínimo
+    ]]
+    assert [p for p in pesos if p is not None] == [0.785, 0.785, 1.2]
+
+
+@pytest.mark.skipif(scale_reader.pty is None, reason="simulador precisa de pseudo-terminais (POSIX)")
+@pytest.mark.parametrize('protocolo', ['toledo', 'filizola'])
+def test_simulador_com_leitor(protocolo):
+    simulador = ScaleSimulator(protocolo).start()
+    estaveis = []
+    chegou = threading.Event()
+
+    def ao_estabilizar(peso):
+        estaveis.append(peso)
+        chegou.set()
+
+    leitor = ScaleReader(simulador.port_name, protocolo, on_stable=ao_estabilizar)
+    leitor.start()
+    try:
+        simulador.set_weight(0.785)
+        assert chegou.wait(5), "o leitor não recebeu peso estável do simulador"
+    finally:
+        leitor.stop()
+        leitor.join(2)
+        simulador.stop()
+    assert estaveis[0] == 0.785
@@ -0,0 +1,49 @@
+# tests/test_search_products.py
+from core.database import refresh_search_keys, search_keys_for, search_products
+
+
+def nomes(resultados):
+    return [r[1] for r in resultados]
+
+
+def test_prefixo_sem_acento(db):
+    assert nomes(search_products(db, 'agua')) == ['Água Mineral 500ml']
+    assert nomes(search_products(db, 'PAO fr')) == ['Pão Francês']
+
+
+def test_prefixo_por_codigo(db):
+    assert [r[0] for r in search_products(db, '10')] == ['101']
+
+
+def test_prefixo_primeiro_depois_os_que_contem(db):
+    assert nomes(search_products(db, 'cola')) == ['Chocolate Barra 90g', 'Refrigerante Cola 2L']
+    assert search_products(db, 'inexistente') == []
+
+    db.executemany(
+        "INSERT INTO Produtos (codigo, nome, preco, tipo_medicao, categoria, nome_busca, codigo_busca) "
+        "VALUES (?, ?, 1.0, 'Unidade', 'Laticinios', ?, ?)",
+        [(c, n, *search_keys_for(c, n)) for c, n in [('201', 'Leite Integral'), ('202', 'Doce de Leite')]]
+    )
+    db.commit()
+    # O prefixo não esconde quem só contém o termo (e ninguém aparece duas vezes)
+    assert nomes(search_products(db, 'leite')) == ['Leite Integral', 'Doce de Leite']
+
+
+def test_busca_por_prefixo_usa_indices(db):
+    plano = ' '.join(str(linha[-1]) for linha in db.execute("""
+        EXPLAIN QUERY PLAN SELECT codigo FROM Produtos
+        WHERE (codigo_busca >= ? AND codigo_busca < ?) OR (nome_busca >= ? AND nome_busca < ?)
+    """, ('a', 'a~', 'a', 'a~')))
+    assert 'idx_produtos_nome_busca' in plano
+    assert 'idx_produtos_codigo_busca' in plano
+
+
+def test_busca_nao_grava(db):
+    db.execute("UPDATE Produtos SET nome = 'Água Tônica' WHERE codigo = '005'")
+    db.commit()
+    # O gatilho zerou as chaves; a busca não as recalcula
+    assert search_products(db, 'agua tonica') == []
+    assert db.execute("SELECT nome_busca FROM Produtos WHERE codigo = '005'").fetchone()[0] is None
+
+    assert refresh_search_keys(db) == 1
+    assert nomes(search_products(db, 'agua tonica')) == ['Água Tônica']
@@ -0,0 +1,44 @@
+# tests/test_stock_ledger.py
+import itertools
+
+from core import stock_ledger
+from core.stock_ledger import (TIPO_ENTRADA, TIPO_VENDA, record_stock_movements, stock_at, stock_report_at,
+                               take_stock_snapshot)
+
+
+def _historico_completo(conn, data_hora):
+    """Saldo somando o ledger inteiro (o que as fotografias evitam)."""
+    return dict(conn.execute(
+        "SELECT codigo, COALESCE(SUM(quantidade), 0) FROM MovimentosEstoque WHERE data_hora <= ? GROUP BY codigo",
+        (data_hora,)
+    ).fetchall())
+
+
+def _movimentar(conn, movimentos, tipo):
+    record_stock_movements(conn.cursor(), movimentos, tipo)  # atualiza Produtos e grava o ledger
+    conn.commit()
+
+
+def test_relatorio_bate_com_o_historico_e_com_stock_at(db, monkeypatch):
+    relogio = (f"2030-01-{dia:02d} 12:00:00" for dia in itertools.count(1))
+    monkeypatch.setattr(stock_ledger, '_now', lambda: next(relogio))
+    take_stock_snapshot(db)  # fotografia inicial (01)
+
+    _movimentar(db, [('001', -2), ('002', -1.5)], TIPO_VENDA)         # 02
+    _movimentar(db, [('001', 10)], TIPO_ENTRADA)                       # 03
+    db.execute("UPDATE Produtos SET quantidade = quantidade + 5 WHERE codigo = '003'")  # fora do ledger
+    db.commit()
+    assert take_stock_snapshot(db) == 3  # 001 e 002 movimentaram, 003 foi conciliado (04, 05)
+    _movimentar(db, [('001', -1), ('004', -0.25)], TIPO_VENDA)         # 06
+
+    for data_hora in ('2030-01-02 12:00:00', '2030-01-03 23:00:00', '2030-01-05 12:00:00', '2030-12-31 00:00:00'):
+        esperado = _historico_completo(db, data_hora)
+        relatorio = stock_report_at(db, data_hora)
+        assert {codigo: saldo for codigo, _, saldo in relatorio} == {
+            codigo: esperado.get(codigo, 0.0) for codigo, _, _ in relatorio}
+        for codigo, _, saldo in relatorio:
+            assert stock_at(db, codigo, data_hora) == saldo
+
+    atual = dict(db.execute("SELECT codigo, quantidade FROM Produtos").fetchall())
+    assert {codigo: saldo for codigo, _, saldo in stock_report_at(db, '2031-01-01 00:00:00')} == atual
+    assert take_stock_snapshot(db) == 2  # só 001 e 004 desde a última fotografia, nada a conciliar
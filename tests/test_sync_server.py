@@ -0,0 +1,66 @@
+# tests/test_sync_server.py
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from core import sync_client
+from core.sync_server import ENV_SYNC_TOKEN, SyncServer, main
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    """SyncServer com token numa porta livre, rodando num loop asyncio em outra thread."""
+    loop = asyncio.new_event_loop()
+    pronto = threading.Event()
+    servidores = []
+
+    def rodar():
+        asyncio.set_event_loop(loop)
+        server = SyncServer(str(tmp_path / 'loja.db'), port=0, token='segredo')
+        servidores.append(server)
+        loop.run_until_complete(server.start())
+        pronto.set()
+        loop.run_forever()
+        server.close()
+    thread = threading.Thread(target=rodar, daemon=True)
+    thread.start()
+    pronto.wait(5)
+    yield f"http://127.0.0.1:{servidores[0].port}"
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def status(url, headers=None, data=None):
+    request = urllib.request.Request(url, data=data, headers=headers or {}, method='POST' if data else 'GET')
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_rotas_exigem_token(servidor):
+    publicar = json.dumps({'produtos': [{'codigo': '1', 'nome': 'X', 'preco': 0.01}]}).encode()
+    assert status(servidor + '/catalogo', data=publicar) == 401
+    assert status(servidor + '/estoque', {'Authorization': 'Bearer errado'}) == 401
+    assert status(servidor + '/estoque', {'Authorization': 'Bearer segredo'}) == 200
+
+
+def test_cliente_envia_o_token(servidor, monkeypatch):
+    monkeypatch.delenv(ENV_SYNC_TOKEN, raising=False)
+    with pytest.raises(sync_client.SyncError, match='401'):
+        sync_client._request(servidor, '/estoque')
+    monkeypatch.setenv(ENV_SYNC_TOKEN, 'segredo')
+    assert sync_client._request(servidor, '/estoque') == []
+
+
+def test_rede_so_com_token(tmp_path, monkeypatch):
+    monkeypatch.delenv(ENV_SYNC_TOKEN, raising=False)
+    assert SyncServer(str(tmp_path / 'a.db')).host == '127.0.0.1'
+    with pytest.raises(ValueError, match=ENV_SYNC_TOKEN):
+        SyncServer(str(tmp_path / 'b.db'), host='0.0.0.0')
+    assert main(['--banco', str(tmp_path / 'c.db'), '--host', '0.0.0.0']) == 1
@@ -1,8 +1,18 @@
 # ui/adjust_stock_dialog.py
 
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QDoubleSpinBox, QPushButton, QMessageBox
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QDoubleSpinBox, QPushButton, QMessageBox, QComboBox, QLineEdit
 from PySide6.QtCore import Qt
 
+from core.formatting import numero_br
+from core.stock_ledger import TIPO_AJUSTE, TIPO_ENTRADA, TIPO_PERDA
+
+# Tipos de movimento oferecidos no ajuste manual (a 'venda' é gravada só pelo PDV)
+MOVEMENT_TYPES = [
+    ("Ajuste de inventário", TIPO_AJUSTE),
+    ("Entrada (compra/recebimento)", TIPO_ENTRADA),
+    ("Perda/Quebra/Vencimento", TIPO_PERDA),
+]
+
 class AdjustStockDialog(QDialog):
     """Diálogo para ajustar (adicionar ou remover) estoque de um produto."""
     
@@ -27,7 +37,7 @@ class AdjustStockDialog(QDialog):
         
         # Estoque Atual
         # Formatação de número melhorada para o display
-        current_qty_str = f"{self.current_qty:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        current_qty_str = numero_br(self.current_qty)
         qty_label = QLabel(f"Estoque Atual: <strong>{current_qty_str}</strong>")
         qty_label.setTextFormat(Qt.TextFormat.RichText)
         main_layout.addWidget(qty_label)
@@ -44,6 +54,22 @@ class AdjustStockDialog(QDialog):
         
         qty_layout.addWidget(self.adjustment_input)
         main_layout.addLayout(qty_layout)
+
+        # ⭐️ Tipo do movimento (vai para o ledger de estoque)
+        type_layout = QHBoxLayout()
+        type_layout.addWidget(QLabel("Tipo de Movimento:"))
+        self.type_input = QComboBox()
+        for label, tipo in MOVEMENT_TYPES:
+            self.type_input.addItem(label, tipo)
+        type_layout.addWidget(self.type_input)
+        main_layout.addLayout(type_layout)
+
+        reason_layout = QHBoxLayout()
+        reason_layout.addWidget(QLabel("Motivo:"))
+        self.reason_input = QLineEdit()
+        self.reason_input.setPlaceholderText("Opcional (ex: NF 1234, contagem mensal)")
+        reason_layout.addWidget(self.reason_input)
+        main_layout.addLayout(reason_layout)
         
         # Botões
         button_layout = QHBoxLayout()
@@ -59,6 +85,13 @@ class AdjustStockDialog(QDialog):
     def accept_adjustment(self):
         """Valida e aceita o ajuste, retornando o valor."""
         self.new_adjustment = self.adjustment_input.value()
+        tipo = self.type_input.currentData()
+
+        # Entrada só soma e perda só subtrai
+        if (tipo == TIPO_ENTRADA and self.new_adjustment < 0) or (tipo == TIPO_PERDA and self.new_adjustment > 0):
+            QMessageBox.warning(self, "Tipo de Movimento",
+                                "Entrada deve ser uma quantidade positiva e perda, negativa.")
+            return
         
         # Verifica se o ajuste negativo é maior que o estoque atual
         if self.new_adjustment < 0 and abs(self.new_adjustment) > self.current_qty:
@@ -69,4 +102,10 @@ class AdjustStockDialog(QDialog):
         self.accept()
 
     def get_adjustment(self):
-        return self.new_adjustment
\ No newline at end of file
+        return self.new_adjustment
+
+    def get_movement_type(self) -> str:
+        return self.type_input.currentData()
+
+    def get_reason(self) -> str:
+        return self.reason_input.text().strip()
\ No newline at end of file
@@ -7,6 +7,8 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, QLocale
 from PySide6.QtGui import QDoubleValidator, QFont
 
+from core.formatting import brl, numero_br
+
 # Importa o CaixaManager para a lógica de negócios (manter import no topo)
 # from core.caixa_manager import CaixaManager 
 
@@ -60,7 +62,20 @@ class CaixaFechamentoDialog(QDialog):
         
         form_layout.addRow(QLabel("ID do Caixa:"), QLabel(f"<b>{self.caixa_aberto_data['id']}</b>"))
         form_layout.addRow(QLabel("Aberto em:"), QLabel(self.caixa_aberto_data.get('data_abertura', 'N/D')))
-        form_layout.addRow(QLabel("Fundo de Troco (R$):"), QLabel(f"<b>{self.valor_abertura:,.2f}</b>"))
+        form_layout.addRow(QLabel("Fundo de Troco (R$):"), QLabel(f"<b>{numero_br(self.valor_abertura)}</b>"))
+        
+        # Vendas da sessão por forma de pagamento (totais acumulados, leitura imediata).
+        # O valor esperado na gaveta não é exibido: a contagem é feita às cegas.
+        resumo = self.caixa_manager.resumo_caixa(self.caixa_aberto_data['id'])
+        if resumo:
+            form_layout.addRow(QLabel("Vendas na Sessão:"),
+                               QLabel(f"{resumo['quantidade_vendas']} venda(s) - {brl(resumo['total_vendas'])}"))
+            for metodo, totais in sorted(resumo['totais_por_metodo'].items()):
+                form_layout.addRow(QLabel(f"  {metodo} (R$):"), QLabel(numero_br(totais['valor'])))
+            for tipo, movimento in resumo['movimentos'].items():
+                if movimento['quantidade']:
+                    form_layout.addRow(QLabel(f"{tipo}s (R$):"),
+                                       QLabel(f"{numero_br(movimento['valor'])} ({movimento['quantidade']}x)"))
         
         # INPUT DO VALOR DECLARADO
         self.valor_fechamento_input = QLineEdit() # NOME CORRETO DA VARIÁVEL
@@ -73,7 +88,7 @@ class CaixaFechamentoDialog(QDialog):
         self.valor_fechamento_input.setValidator(validator)
         
         # Sugerir o fundo de troco (formatado corretamente para exibição)
-        formatted_value = f"{self.valor_abertura:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+        formatted_value = numero_br(self.valor_abertura)
         self.valor_fechamento_input.setText(formatted_value) 
         self.valor_fechamento_input.selectAll()
         
@@ -134,11 +149,11 @@ class CaixaFechamentoDialog(QDialog):
                 icone = QMessageBox.Information
                 status_text = 'EXATO'
             elif diferenca > 0:
-                msg_diferenca = f"O caixa está **sobrando** R$ {diferenca_abs:,.2f}."
+                msg_diferenca = f"O caixa está **sobrando** {brl(diferenca_abs)}."
                 icone = QMessageBox.Warning
                 status_text = 'SOBRANDO'
             else: # diferenca < 0
-                msg_diferenca = f"O caixa está **faltando** R$ {diferenca_abs:,.2f}."
+                msg_diferenca = f"O caixa está **faltando** {brl(diferenca_abs)}."
                 icone = QMessageBox.Warning
                 status_text = 'FALTANDO'
             
@@ -147,8 +162,8 @@ class CaixaFechamentoDialog(QDialog):
                 icone,
                 "Caixa Fechado com Sucesso", 
                 f"Sessão ID: {id_caixa}\n"
-                f"Valor Esperado: R$ {resumo['valor_esperado']:,.2f}\n"
-                f"Valor Declarado: R$ {resumo['valor_declarado']:,.2f}\n"
+                f"Valor Esperado: {brl(resumo['valor_esperado'])}\n"
+                f"Valor Declarado: {brl(resumo['valor_declarado'])}\n"
                 f"Diferença: {msg_diferenca}",
                 QMessageBox.StandardButton.Ok
             ).exec()
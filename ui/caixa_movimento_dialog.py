@@ -6,6 +6,8 @@ from PySide6.QtCore import Qt, QLocale
 from PySide6.QtGui import QDoubleValidator, QFont
 from typing import Literal
 
+from core.formatting import brl
+
 # O tipo de movimento será estritamente 'Sangria' ou 'Suprimento'
 MovimentoTipo = Literal['Sangria', 'Suprimento']
 
@@ -110,7 +112,7 @@ class CaixaMovimentoDialog(QDialog):
         confirm = QMessageBox.question(
             self, 
             "Confirmação", 
-            f"Deseja realmente registrar um(a) **{self.tipo}** de R$ **{valor:,.2f}**?",
+            f"Deseja realmente registrar um(a) **{self.tipo}** de **{brl(valor)}**?",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         
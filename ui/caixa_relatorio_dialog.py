@@ -0,0 +1,36 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QPushButton
+)
+from PySide6.QtGui import QFont
+
+
+class CaixaRelatorioDialog(QDialog):
+    """Mostra o texto da Leitura X / Redução Z e permite mandar para a impressora."""
+
+    def __init__(self, titulo: str, texto: str, printer_manager=None, parent=None):
+        super().__init__(parent)
+        self.texto = texto
+        self.printer_manager = printer_manager
+
+        self.setWindowTitle(titulo)
+        self.resize(420, 600)
+
+        layout = QVBoxLayout(self)
+
+        visualizacao = QPlainTextEdit(texto)
+        visualizacao.setReadOnly(True)
+        visualizacao.setFont(QFont("Courier New", 10))  # monoespaçada: mesma coluna da bobina
+        layout.addWidget(visualizacao)
+
+        botoes = QHBoxLayout()
+        imprimir_button = QPushButton("🖨️ Imprimir")
+        imprimir_button.setEnabled(printer_manager is not None)
+        imprimir_button.clicked.connect(self._imprimir)
+        fechar_button = QPushButton("Fechar")
+        fechar_button.clicked.connect(self.accept)
+        botoes.addWidget(imprimir_button)
+        botoes.addWidget(fechar_button)
+        layout.addLayout(botoes)
+
+    def _imprimir(self):
+        self.printer_manager.print_text(self.texto)
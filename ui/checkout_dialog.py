@@ -7,6 +7,8 @@ from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
 from PySide6.QtGui import QFont
 from typing import List, Dict, Any
 
+from core.formatting import brl, numero_br
+
 # ====================================================================
 # MODELO DE DADOS PARA PAGAMENTOS MISTOS
 # ====================================================================
@@ -63,7 +65,7 @@ class PaymentTableModel(QAbstractTableModel):
     def _format_currency_display(self, value: float) -> str:
         """Formata um valor float para string de moeda brasileira."""
         # Note: Esta função é duplicada do CheckoutDialog, mas é necessária aqui para o QAbstractTableModel
-        return f"{value:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+        return numero_br(value)
 
 # ====================================================================
 # CLASSE PRINCIPAL: CHECKOUT DIALOG
@@ -206,7 +208,7 @@ class CheckoutDialog(QDialog):
 
     def _format_currency(self, value: float) -> str:
         """Formata um valor float para string de moeda brasileira."""
-        return f"R$ {value:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+        return brl(value)
 
     # ==================== LÓGICA DE PAGAMENTO ====================
     
@@ -3,10 +3,12 @@ import os
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, QMessageBox, QHeaderView
 )
-from PySide6.QtSql import QSqlTableModel, QSqlDatabase
+from PySide6.QtSql import QSqlTableModel
 from PySide6.QtCore import Qt
 # Importação da tela de cadastro/edição
 from ui.cadastro_funcionario_dialog import CadastroFuncionarioDialog 
+from ui.qt_db import open_qt_database
+from core.database import database_path
 
 class GerenciarFuncionariosDialog(QDialog):
     """Diálogo para listar, editar e excluir funcionários."""
@@ -52,28 +54,12 @@ class GerenciarFuncionariosDialog(QDialog):
         """Carrega os dados da tabela Funcionarios usando QSqlTableModel."""
         
         # 1. CONFIGURANDO A PONTE DE CONEXÃO QT
-        
-        # FIX DEFINITIVO: Obtendo o caminho exato do arquivo do banco de dados a partir da conexão sqlite3
-        cursor = self.db_connection.cursor()
-        cursor.execute("PRAGMA database_list")
-        # O caminho do arquivo é o terceiro elemento (índice 2) do resultado
-        db_path = cursor.fetchone()[2] 
-        
-        connection_name = "employee_model_conn" # Nome único para esta conexão Qt
-
-        # Verifica se a conexão já existe no sistema Qt (para evitar erros de nome duplicado)
-        if QSqlDatabase.contains(connection_name):
-            self.qt_db = QSqlDatabase.database(connection_name)
-        else:
-            self.qt_db = QSqlDatabase.addDatabase("QSQLITE", connection_name)
-            self.qt_db.setDatabaseName(db_path) # Usando o caminho obtido via PRAGMA
-        
-        # Abre a conexão Qt
+        # Mesmo arquivo da conexão sqlite3; gravável (o modelo edita/exclui), com espera pelo lock da venda
+        self.qt_db = open_qt_database("employee_model_conn", database_path(self.db_connection))
         if not self.qt_db.isOpen():
-            if not self.qt_db.open():
-                QMessageBox.critical(self, "Erro de Conexão Qt", 
-                                     f"Não foi possível abrir a conexão Qt para o modelo: {self.qt_db.lastError().text()}")
-                return
+            QMessageBox.critical(self, "Erro de Conexão Qt", 
+                                 f"Não foi possível abrir a conexão Qt para o modelo: {self.qt_db.lastError().text()}")
+            return
         
         # 2. Inicializar o QSqlTableModel
         self.model = QSqlTableModel(self, self.qt_db)
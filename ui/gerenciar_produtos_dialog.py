@@ -3,11 +3,43 @@ import sqlite3
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, QMessageBox, QHeaderView, QLabel
 )
-from PySide6.QtSql import QSqlTableModel, QSqlDatabase
+from PySide6.QtSql import QSqlTableModel
 from PySide6.QtCore import Qt
 from PySide6.QtSql import QSqlError 
 from ui.product_registration import ProductRegistrationWindow 
 from ui.adjust_stock_dialog import AdjustStockDialog
+from ui.price_update_dialog import PriceUpdateDialog
+from core.stock_ledger import record_stock_movements, TIPO_AJUSTE
+from core.change_feed import OP_UPDATE, changed_rows, current_version
+from core.database import database_path, refresh_search_keys
+from ui.qt_db import open_qt_database
+
+# Acima disso, refresh_products refaz o select em vez de reler linha a linha
+REFRESH_ROW_LIMIT = 200
+
+
+class _ProdutosTableModel(QSqlTableModel):
+    """
+    QSqlTableModel que recalcula as chaves de busca depois de gravar. A edição direta
+    na tabela passa pela conexão Qt (sem as funções Python), então o gatilho só zera
+    nome_busca/codigo_busca; aqui elas são preenchidas de novo logo após o submit.
+    """
+
+    def __init__(self, parent, qt_db, db_connection):
+        super().__init__(parent, qt_db)
+        self._db_connection = db_connection
+
+    def submit(self):
+        ok = super().submit()
+        if ok:
+            refresh_search_keys(self._db_connection)
+        return ok
+
+    def submitAll(self):
+        ok = super().submitAll()
+        if ok:
+            refresh_search_keys(self._db_connection)
+        return ok
 
 class GerenciarProdutosDialog(QDialog):
     """Diálogo para listar, editar e excluir produtos, com restrição de acesso."""
@@ -48,6 +80,10 @@ class GerenciarProdutosDialog(QDialog):
         self.delete_button = QPushButton("❌ Excluir Selecionado")
         self.delete_button.setStyleSheet("background-color: #D32F2F; color: white; padding: 10px 15px;")
         self.delete_button.clicked.connect(self.delete_product)
+
+        self.price_update_button = QPushButton("💲 Reajuste em Massa")
+        self.price_update_button.setStyleSheet("background-color: #6A1B9A; color: white; padding: 10px 15px;")
+        self.price_update_button.clicked.connect(self.open_price_update)
         
         # Lógica de Visibilidade:
         
@@ -57,6 +93,7 @@ class GerenciarProdutosDialog(QDialog):
         
         # Edição e Exclusão são apenas para Admin
         if self.is_admin:
+            button_layout.addWidget(self.price_update_button)
             button_layout.addWidget(self.edit_button)
             button_layout.addWidget(self.delete_button)
         else:
@@ -67,27 +104,22 @@ class GerenciarProdutosDialog(QDialog):
         
     def load_products(self):
         """Carrega os dados da tabela Produtos usando QSqlTableModel."""
-        
-        cursor = self.db_connection.cursor()
-        cursor.execute("PRAGMA database_list")
-        db_path = cursor.fetchone()[2] 
-        
-        connection_name = "product_model_conn" 
 
-        if QSqlDatabase.contains(connection_name):
-            self.qt_db = QSqlDatabase.database(connection_name)
-        else:
-            self.qt_db = QSqlDatabase.addDatabase("QSQLITE", connection_name)
-            self.qt_db.setDatabaseName(db_path) 
+        # Versão do diário de alterações lida ANTES do select (base do refresh_products)
+        self._versao = current_version(self.db_connection)
+        if getattr(self, 'model', None) is not None:
+            self.model.select()
+            return
         
+        # Conexão Qt gravável (o modelo edita/exclui direto), com espera pelo lock da venda
+        self.qt_db = open_qt_database("product_model_conn", database_path(self.db_connection))
         if not self.qt_db.isOpen():
-            if not self.qt_db.open():
-                QMessageBox.critical(self, "Erro de Conexão Qt", 
-                                     f"Não foi possível abrir a conexão Qt para o modelo: {self.qt_db.lastError().text()}")
-                return
+            QMessageBox.critical(self, "Erro de Conexão Qt", 
+                                 f"Não foi possível abrir a conexão Qt para o modelo: {self.qt_db.lastError().text()}")
+            return
         
         # Inicializar o QSqlTableModel para a tabela Produtos
-        self.model = QSqlTableModel(self, self.qt_db)
+        self.model = _ProdutosTableModel(self, self.qt_db, self.db_connection)
         self.model.setTable("Produtos")
         self.model.select()
 
@@ -118,7 +150,24 @@ class GerenciarProdutosDialog(QDialog):
         
         self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
         self.table_view.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch) # Garante que o Nome estique
-        
+
+    def refresh_products(self):
+        """
+        Atualiza só as linhas alteradas desde a última leitura, pelo diário de alterações
+        (selectRow relê uma linha). Inclusões, exclusões ou muitas alterações refazem o select.
+        """
+        versao, linhas = changed_rows(self.db_connection, 'Produtos', self._versao, REFRESH_ROW_LIMIT)
+        if linhas is None or any(op != OP_UPDATE for op in linhas.values()):
+            self.load_products()
+            return
+
+        self._versao = versao
+        if not linhas:
+            return
+        # Só as linhas já buscadas pelo modelo; as demais virão atualizadas quando forem buscadas
+        for row in range(self.model.rowCount()):
+            if self.model.data(self.model.index(row, 0)) in linhas:
+                self.model.selectRow(row)
         
     def edit_product(self):
         """Abre o diálogo de cadastro no modo edição para o produto selecionado."""
@@ -138,12 +187,19 @@ class GerenciarProdutosDialog(QDialog):
         dialog = ProductRegistrationWindow(
             db_connection=self.db_connection, 
             product_id=product_id, 
-            parent=self
+            parent=self,
+            id_funcionario=self.logged_user.get('id')
         )
         
         # 3. Recarregar se o diálogo for aceito
         if dialog.exec() == QDialog.Accepted:
-            self.load_products()
+            self.refresh_products()
+
+    def open_price_update(self):
+        """Abre o reajuste de preços em massa e recarrega a tabela se algo foi aplicado."""
+        dialog = PriceUpdateDialog(self.db_connection, self.logged_user, parent=self)
+        if dialog.exec() == QDialog.Accepted:
+            self.refresh_products()
 
     def delete_product(self):
         """Exclui o produto selecionado após confirmação."""
@@ -172,7 +228,7 @@ class GerenciarProdutosDialog(QDialog):
                 QMessageBox.critical(self, "Erro", f"Não foi possível excluir o produto: {self.model.lastError().text()}", QMessageBox.Ok)
             
             # 5. Recarregar a lista
-            self.load_products()
+            self.refresh_products()
             
     
     def adjust_stock(self):
@@ -208,26 +264,30 @@ class GerenciarProdutosDialog(QDialog):
             
             if adjustment != 0:
                 # 2. Chamar função do DB para aplicar o ajuste
-                success = self._apply_stock_adjustment(product_code, adjustment)
+                success = self._apply_stock_adjustment(
+                    product_code, adjustment, dialog.get_movement_type(), dialog.get_reason()
+                )
                 
                 if success:
                     QMessageBox.information(self, "Sucesso", f"Estoque de '{product_name}' ajustado em {adjustment:+.2f}.")
-                    self.load_products() # Recarrega a tabela para mostrar o novo valor
+                    self.refresh_products() # Relê só a linha ajustada
                 else:
                     QMessageBox.critical(self, "Erro DB", "Falha ao atualizar o estoque no banco de dados.")
 
-    def _apply_stock_adjustment(self, product_code, adjustment):
-        """Função interna para aplicar o ajuste de estoque no banco de dados."""
+    def _apply_stock_adjustment(self, product_code, adjustment, tipo=TIPO_AJUSTE, motivo=None):
+        """Função interna para aplicar o ajuste de estoque no banco de dados (com registro no ledger)."""
         if not self.db_connection: return False
         
         try:
             cursor = self.db_connection.cursor()
-            # Adiciona o ajuste ao valor atual do estoque
-            query = "UPDATE Produtos SET quantidade = quantidade + ? WHERE codigo = ?"
-            cursor.execute(query, (adjustment, product_code))
+            # Soma o ajuste ao estoque e grava o movimento na mesma transação
+            record_stock_movements(
+                cursor, [(product_code, adjustment)], tipo,
+                motivo=motivo or None, id_funcionario=self.logged_user.get('id')
+            )
             self.db_connection.commit()
             return True
         except sqlite3.Error as e:
             print(f"Erro ao aplicar ajuste de estoque: {e}")
             self.db_connection.rollback()
-            return False
\ No newline at end of file
+            return False
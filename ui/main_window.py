@@ -3,6 +3,7 @@
 import sqlite3
 import datetime 
 import os 
+import time
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
     QLabel, QLineEdit, QTableView, QMessageBox, QCompleter, 
@@ -12,7 +13,9 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import (
     Qt, 
-    QLocale # ⭐️ Adicionado/Confirmado: Essencial para formatação BR
+    QLocale, # ⭐️ Adicionado/Confirmado: Essencial para formatação BR
+    QTimer,
+    QEvent  # ⭐️ Filtro de teclas do scanner
 )
 from PySide6.QtGui import (
     QFont, QStandardItemModel, QStandardItem, 
@@ -20,16 +23,14 @@ from PySide6.QtGui import (
     QShortcut # ⭐️ Adicionado/Confirmado: Para atalhos F3, F4, F12
 )
 
-# IMPORTS PARA NORMALIZAÇÃO/BUSCA SEM ACENTOS
-from unidecode import unidecode
-import re
-
 # --- Importa a lógica (core) ---
 from core.database import (
-    connect_db, 
-    create_and_populate_tables, 
+    connect_db,
+    connect_readonly,
+    create_and_populate_tables,
     finalizar_venda,           # Confirmado
-    update_stock_after_sale    # Confirmado
+    update_stock_after_sale,   # Confirmado
+    search_products            # Busca pelas chaves normalizadas (nome_busca/codigo_busca)
 )
 from core.cart_logic import CartManager
 from core.printer_manager import PrinterManager 
@@ -42,50 +43,66 @@ from ui.checkout_dialog import CheckoutDialog
 from ui.cadastro_funcionario_dialog import CadastroFuncionarioDialog 
 from ui.gerenciar_funcionarios_dialog import GerenciarFuncionariosDialog
 from ui.gerenciar_produtos_dialog import GerenciarProdutosDialog
+from ui.product_import_dialog import ProductImportDialog
 from ui.relatorios_vendas_dialog import RelatoriosVendasDialog 
 from ui.weight_input_product_dialog import WeightInputProductDialog 
 from ui.product_selection_dialog import ProductSelectionDialog
 from ui.total_discount_dialog import TotalDiscountDialog # ⭐️ Confirmado: Usado para o atalho F3
 from ui.post_sale_dialog import PostSaleDialog
+from ui.product_completer import ProductCatalogModel, ProductCompleter
+from core.scanner import BarcodeIndex, ScanBurstDetector
+from core.scale_label import ScaleLabelDecoder, scale_label_layout_from_env
+from ui.scale_bridge import create_scale_bridge_from_env
+from core.stock_reservation import StockReservations, reservation_mode_enabled, expire_reservations
 # Importa as classes que você criou:
-from core.caixa_manager import CaixaManager  # Assumindo que o caminho é core/caixa_manager.py
-from ui.caixa_abertura_dialog import CaixaAberturaDialog 
+from core.caixa_manager import CaixaManager, TIPO_SANGRIA, TIPO_SUPRIMENTO  # Assumindo que o caminho é core/caixa_manager.py
+from core.caixa_reports import report_x, report_z, render_report
+from core.archive import ArchiveError
+from core.receipt_template import Coluna, ReceiptTemplate, Separador, Tabela, Texto, Valor
+from core.formatting import brl, numero_br, peso_br
+from ui.caixa_abertura_dialog import CaixaAberturaDialog
 from core.cart_logic import CartManager
 from core.vendas_manager import VendasManager
 from data.vendas_controller import VendasController
 
 # ----------------------------------------------------
-# --- FUNÇÕES DE NORMALIZAÇÃO PARA BUSCA (PDV) ---
+# --- CLASSE PRINCIPAL PDVWindow ---
 # ----------------------------------------------------
 
-def normalize_text(text):
-    """
-    Converte o texto para minúsculas e remove acentos/cedilhas 
-    usando unidecode para uma busca robusta.
-    """
-    if text is None:
-        return ""
-    text_str = str(text).strip()
-    normalized = unidecode(text_str)
-    return normalized.lower()
-
-def clean_for_comparison(text):
-    """Remove acentos, pontuações e converte para minúsculas."""
-    import re
-    if text is None: return ""
-    text = text.lower()
-    text = re.sub(r'[^\w\s]', '', text) # Remove pontuação
-    text = re.sub(r'[áàãâä]', 'a', text)
-    text = re.sub(r'[éèêë]', 'e', text)
-    text = re.sub(r'[íìîï]', 'i', text)
-    text = re.sub(r'[óòõôö]', 'o', text)
-    text = re.sub(r'[úùûü]', 'u', text)
-    text = re.sub(r'[ç]', 'c', text)
-    return text.strip()
+# Intervalo da limpeza das reservas de estoque vencidas (modo reserva)
+RESERVATION_CLEANUP_INTERVAL_MS = 60_000
+
+
+def _qtd_recibo(item) -> str:
+    """Quantidade do item do recibo: 3 casas e 'kg' para produtos por peso."""
+    _, _, qtd, _, tipo_medicao = item
+    if tipo_medicao.lower() == 'peso':
+        return peso_br(qtd) + " kg"
+    return numero_br(qtd)
+
+
+# Recibo mostrado ao fim da venda (layout compilado uma vez; ver core/receipt_template.py)
+RECIBO_VENDA = ReceiptTemplate([
+    Separador('='),
+    Texto("RECIBO DE VENDA - PDV"),
+    Separador('='),
+    Texto("Venda ID: {venda_id}"),
+    Texto("Data/Hora: {data_hora}"),
+    Texto("Vendedor: {vendedor}"),
+    Separador('-'),
+    Tabela('itens', [
+        Coluna(lambda item: item[1], 13, '<', 'texto', 'PRODUTO'),
+        Coluna(_qtd_recibo, 9, '>', 'texto', 'QTD'),
+        Coluna(lambda item: item[3], 7, '>', 'numero', 'PREÇO'),
+        Coluna(lambda item: item[2] * item[3], 8, '>', 'numero', 'SUBTOTAL'),
+    ]),
+    Separador('-'),
+    Valor("TOTAL:", 'total'),
+    Valor("RECEBIDO:", 'recebido'),
+    Valor("TROCO:", 'troco'),
+    Separador('='),
+])
 
-# ----------------------------------------------------
-# --- CLASSE PRINCIPAL PDVWindow ---
-# ----------------------------------------------------
 
 class PDVWindow(QMainWindow):
     # C:\Users\sival\Ponto de Venda\ui\main_window.py (Dentro da classe PDVWindow)
@@ -118,6 +135,24 @@ class PDVWindow(QMainWindow):
         self.total_discount_value = 0.0  
         self.service_fee_value = 0.0     
 
+        # Autocompletar: o catálogo é carregado só depois que a janela é exibida
+        self.product_completer = None
+        self._catalog_load_scheduled = False
+
+        # Balança (opcional): lida numa thread própria se PDV_BALANCA_PORTA estiver definida
+        self.scale_bridge = create_scale_bridge_from_env(self)
+
+        # Reserva de estoque entre caixas (opcional, PDV_RESERVA_ESTOQUE=1): cada item do
+        # carrinho reserva o saldo; a venda converte as reservas na baixa do estoque
+        self.stock_reservations = None
+        if reservation_mode_enabled():
+            self.stock_reservations = StockReservations(db_connection, id_funcionario=self.logged_user.get('id'))
+            self.vendas_controller.reservation_terminal = self.stock_reservations.terminal
+            # Limpeza periódica (um DELETE em lote) das reservas vencidas de todos os caixas
+            self.reservation_timer = QTimer(self)
+            self.reservation_timer.timeout.connect(lambda: expire_reservations(self.db_connection))
+            self.reservation_timer.start(RESERVATION_CLEANUP_INTERVAL_MS)
+
         # --- 2. CONFIGURAÇÃO DA JANELA (Posicionamento e Título) ---
         self.setWindowTitle(f"PDV - Usuário: {self.logged_user['nome']} ({self.logged_user['cargo'].upper()})")
         self.setGeometry(100, 100, 1000, 700) 
@@ -154,14 +189,13 @@ class PDVWindow(QMainWindow):
         """
         if value is None:
             value = 0.0
-            
-        # Formatação que substitui o ponto decimal por vírgula e adiciona separador de milhar.
-        # Ex: 1234.56 -> R$ 1.234,56
-        return f"R$ {value:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+        return brl(value)
 
     def _reset_cart(self):
         """Função auxiliar para limpar e resetar a interface após a venda."""
         self.cart_manager.clear_cart()
+        if self.stock_reservations is not None:
+            self.stock_reservations.release()
         self._update_cart_table() # Atualiza a tabela do carrinho
         self._update_total_display(0.0) # Zera o total
         self.search_input.setFocus()
@@ -174,57 +208,32 @@ class PDVWindow(QMainWindow):
     # ui/main_window.py (Dentro de class PDVWindow:)
 
     def _print_receipt(self, sale_id: int):
-        """Gera o recibo e simula a impressão (console/log)."""
-        
-        # ⭐️ CORREÇÃO: Usar o nome correto das variáveis inicializadas ⭐️
-        venda_data = self.vendas_controller.last_venda_data 
-        itens_carrinho = self.vendas_controller.last_itens_carrinho
-        pagamentos = self.vendas_controller.last_pagamentos
-        
-        # CORREÇÃO ADICIONAL: Garante que o ID da venda esteja nos dados para o recibo
-        venda_data['id'] = sale_id
-        
-        if not venda_data:
-            QMessageBox.warning(self, "Erro de Impressão", "Dados da última venda não foram encontrados. Tente novamente.")
+        """Põe o recibo da venda na fila de impressão (o spooler imprime em segundo plano)."""
+        try:
+            self.printer_manager.enqueue_sale_receipt(self.db_connection, sale_id)
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Erro de Impressão", f"Não foi possível enfileirar o recibo da venda #{sale_id}: {e}")
+
+    def _handle_reprint_receipt(self):
+        """Reimpressão do recibo de qualquer venda pelo número (remontado do banco)."""
+        sale_id, ok = QInputDialog.getInt(self, "Reimprimir Recibo", "Número da venda:", 1, 1)
+        if not ok:
             return
-
-        # 2. Geração do Conteúdo
-        receipt_content = self.printer_manager.generate_receipt_content(
-            venda_data, itens_carrinho, pagamentos
-        )
-        
-        # 3. Impressão (Simulada no console)
-        self.printer_manager.print_to_console(receipt_content)
-        
-        QMessageBox.information(
-            self, 
-            "Impressão", 
-            f"Recibo da Venda #{sale_id} formatado e enviado (Verifique o console)."
-        )
+        if self.db_connection.execute("SELECT 1 FROM Vendas WHERE venda_id = ?", (sale_id,)).fetchone() is None:
+            QMessageBox.warning(self, "Reimprimir Recibo", f"Venda #{sale_id} não encontrada.")
+            return
+        self._print_receipt(sale_id)
+        QMessageBox.information(self, "Reimprimir Recibo", f"Recibo da venda #{sale_id} enviado para a fila de impressão.")
 
 
     def _print_invoice(self, sale_id: int):
-        """Chama a rotina de emissão de NF-e/NFC-e (Simulação de API)."""
-        
-        # 1. Obter Dados (Idem ao recibo, precisa dos dados da venda por ID)
-        venda_data = self.vendas_controller.last_venda_data 
-        itens_carrinho = self.vendas_controller.last_itens_carrinho
-        pagamentos = self.vendas_controller.last_pagamentos
-        
-        venda_data['id'] = sale_id
-            
-        # 2. Iniciar a Rotina Fiscal
-        nf_log = self.printer_manager.initiate_invoice_emission(
-            venda_data, itens_carrinho, pagamentos
-        )
-        
-        # 3. Exibir Status
-        QMessageBox.warning(
-            self, 
-            "Emissão NF", 
-            f"Simulação de Emissão Fiscal para Venda #{sale_id} concluída.\nDetalhes no log:\n{nf_log}"
-        )
-        # Lógica real de integração fiscal vai aqui
+        """Pede a NFC-e da venda; a autorização na SEFAZ segue em segundo plano (fila fiscal)."""
+        try:
+            nf_log = self.printer_manager.initiate_invoice_emission(self.db_connection, sale_id)
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Emissão NF", f"Não foi possível pedir a NFC-e da venda #{sale_id}: {e}")
+            return
+        QMessageBox.information(self, "Emissão NF", nf_log)
 
     def _show_employee_registration(self):
         # Usamos argumentos nomeados para garantir que 'self' seja o 'parent'
@@ -252,6 +261,15 @@ class PDVWindow(QMainWindow):
         )
         dialog.exec()
 
+    def _show_product_import(self):
+        """Abre a importação em massa de produtos (somente admin)."""
+        if self.logged_user.get('cargo') != 'admin':
+            QMessageBox.warning(self, "Acesso Negado", "Apenas administradores podem importar produtos.")
+            return
+
+        dialog = ProductImportDialog(self.db_connection, parent=self)
+        dialog.exec()
+
     # ----------------------------------------------------
     # --- MÉTODOS DE CONTROLE DE TEMA E ESTILO ---
     # ----------------------------------------------------
@@ -303,94 +321,200 @@ class PDVWindow(QMainWindow):
     
     def _update_total_display(self, total: float):
         """Atualiza o display de total formatando corretamente."""
-        formatted_total = f"R$ {total:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+        formatted_total = brl(total)
         self.total_display.setText(formatted_total)
 
+    def _build_cart_row(self, item: dict) -> list:
+        """Monta os QStandardItem de uma linha do carrinho a partir do item do CartManager."""
+        row = []
+        total_item = item['preco'] * item['quantidade']
+        
+        # 1. Código
+        item_codigo = QStandardItem(item['codigo'])
+        item_codigo.setTextAlignment(Qt.AlignCenter)
+        row.append(item_codigo)
+        
+        # 2. Nome
+        row.append(QStandardItem(item['nome']))
+        
+        # 3. Preço Unitário (Formatado)
+        item_preco = QStandardItem(numero_br(item['preco']))
+        item_preco.setTextAlignment(Qt.AlignRight)
+        row.append(item_preco)
+        
+        # 4. Quantidade (Formatada para peso ou unidade)
+        tipo = item.get('tipo_medicao', item.get('tipo', 'Unidade')).lower()
+        if tipo == 'peso':
+            # Mostra 3 casas decimais para peso
+            quant_str = peso_br(item['quantidade'])
+        else:
+            # Mostra 0 ou 2 casas decimais para unidade/outros
+            quant_str = f"{item['quantidade']:.0f}" if item['quantidade'].is_integer() else numero_br(item['quantidade'])
+            
+        item_quant = QStandardItem(quant_str)
+        item_quant.setTextAlignment(Qt.AlignCenter)
+        row.append(item_quant)
+
+        # 5. Total por Item (Formatado)
+        item_total = QStandardItem(numero_br(total_item))
+        item_total.setTextAlignment(Qt.AlignRight)
+        row.append(item_total)
+        
+        return row
+
     def _update_cart_table(self):
         """Atualiza a QTableView com os dados do CartManager."""
         self.cart_model.setRowCount(0) 
         
         for item in self.cart_manager.cart_items:
-            row = []
-            total_item = item['preco'] * item['quantidade']
-            
-            # 1. Código
-            item_codigo = QStandardItem(item['codigo'])
-            item_codigo.setTextAlignment(Qt.AlignCenter)
-            row.append(item_codigo)
-            
-            # 2. Nome
-            row.append(QStandardItem(item['nome']))
-            
-            # 3. Preço Unitário (Formatado)
-            item_preco = QStandardItem(f"{item['preco']:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-            item_preco.setTextAlignment(Qt.AlignRight)
-            row.append(item_preco)
-            
-            # 4. Quantidade (Formatada para peso ou unidade)
-            tipo = item.get('tipo', 'Unidade').lower()
-            if tipo == 'peso':
-                # Mostra 3 casas decimais para peso
-                quant_str = f"{item['quantidade']:,.3f}".replace('.', '#').replace(',', '.').replace('#', ',')
-            else:
-                # Mostra 0 ou 2 casas decimais para unidade/outros
-                quant_str = f"{item['quantidade']:.0f}" if item['quantidade'].is_integer() else f"{item['quantidade']:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-                
-            item_quant = QStandardItem(quant_str)
-            item_quant.setTextAlignment(Qt.AlignCenter)
-            row.append(item_quant)
-
-            # 5. Total por Item (Formatado)
-            item_total = QStandardItem(f"{total_item:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-            item_total.setTextAlignment(Qt.AlignRight)
-            row.append(item_total)
-            
-            self.cart_model.appendRow(row)
+            self.cart_model.appendRow(self._build_cart_row(item))
         
         self.cart_table.scrollToBottom()
 
+    def _sync_cart_row(self, position: int):
+        """
+        Atualiza só a linha 'position' do carrinho (item somado ou recém-incluído),
+        sem remontar a tabela inteira. Usado pelo caminho rápido do scanner.
+        """
+        row = self._build_cart_row(self.cart_manager.cart_items[position])
+        if position < self.cart_model.rowCount():
+            for column, cell in enumerate(row):
+                self.cart_model.setItem(position, column, cell)
+        else:
+            self.cart_model.appendRow(row)
+        self.cart_table.scrollToBottom()
+
 
     def _setup_autocompleter(self):
-        """Busca todos os nomes/códigos de produtos e configura o QCompleter no campo de busca."""
-        if not self.db_connection:
+        """
+        Configura o QCompleter do campo de busca sobre o catálogo compartilhado.
+        O modelo começa vazio e é preenchido em segundo plano depois que a janela aparece
+        (ver showEvent); inclusões/edições de produtos atualizam as sugestões na hora.
+        """
+        if not self.db_connection or getattr(self, 'product_completer', None) is not None:
             return
-            
-        cursor = self.db_connection.cursor()
-        cursor.execute("SELECT codigo, nome FROM Produtos")
-        
-        product_suggestions = []
-        for codigo, nome in cursor.fetchall():
-            product_suggestions.append(nome)
-            product_suggestions.append(codigo) 
-            
-        completer = QCompleter(product_suggestions, self)
-        
-        # ⭐️ CORREÇÃO CHAVE: Usar MatchContains permite que a busca encontre o termo digitado em qualquer lugar da string.
-        completer.setFilterMode(Qt.MatchStartsWith)
-        
-        completer.setCaseSensitivity(Qt.CaseInsensitive)
-        
+
+        self.completer_model = ProductCatalogModel(parent=self)
+        self.product_completer = ProductCompleter(self.completer_model, self)
+
         # Conecta o completer ao campo de entrada
-        self.search_input.setCompleter(completer)
+        self.search_input.setCompleter(self.product_completer)
+
+        # ⭐️ Leitor de código de barras: mapa código -> produto + detector de rajada.
+        # O filtro também fica no popup, que recebe as teclas enquanto está visível.
+        self.barcode_index = BarcodeIndex()
+        try:
+            scale_label_layout = scale_label_layout_from_env()
+        except ValueError as e:
+            print(f"Erro na configuração da etiqueta de balança (usando o layout padrão): {e}")
+            scale_label_layout = None
+        self.scale_label_decoder = ScaleLabelDecoder(scale_label_layout)
+        self.scan_detector = ScanBurstDetector()
+        self._scan_start = 0
+        self.search_input.installEventFilter(self)
+        self.product_completer.popup().installEventFilter(self)
+
+    def showEvent(self, event):
+        """Na primeira exibição, agenda a carga do catálogo para depois da pintura da janela."""
+        super().showEvent(event)
+        if not self._catalog_load_scheduled and getattr(self, 'completer_model', None) is not None:
+            self._catalog_load_scheduled = True
+            QTimer.singleShot(0, self.completer_model.load_async)
+
+    def closeEvent(self, event):
+        """Ao sair (logout), libera a porta da balança, as reservas do carrinho e a fila da impressora."""
+        if getattr(self, 'scale_bridge', None) is not None:
+            self.scale_bridge.stop()
+        if getattr(self, 'stock_reservations', None) is not None:
+            self.stock_reservations.release()
+        self.printer_manager.close()
+        super().closeEvent(event)
+
+
+    def eventFilter(self, watched, event):
+        """
+        Observa as teclas do campo de busca para separar leitura do scanner de digitação.
+        Numa rajada, o popup do autocompletar é suspenso; no Enter de uma leitura o
+        código vai direto para _handle_scanned_code (sem busca por nome nem diálogos).
+        """
+        if event.type() == QEvent.KeyPress and watched in (self.search_input, self.product_completer.popup()):
+            timestamp = event.timestamp() or int(time.monotonic() * 1000)
+            key = event.key()
+
+            if key in (Qt.Key_Return, Qt.Key_Enter):
+                was_burst = self.scan_detector.in_burst
+                is_scan = self.scan_detector.finish(timestamp)
+                if was_burst:
+                    self._set_completer_suspended(False)
+                if is_scan and self._handle_scanned_code(self.search_input.text()[self._scan_start:].strip()):
+                    return True
+
+            elif event.text() and event.text().isprintable():
+                if self.scan_detector.key(timestamp):
+                    # Início de uma nova sequência: o código lido começa daqui
+                    self._scan_start = len(self.search_input.text())
+                elif self.scan_detector.count == ScanBurstDetector.SUSPECT_KEYS:
+                    self._set_completer_suspended(True)
+
+        return super().eventFilter(watched, event)
+
+    def _set_completer_suspended(self, suspended: bool):
+        """Tira (ou devolve) o autocompletar do campo de busca durante uma leitura."""
+        if suspended:
+            self.product_completer.popup().hide()
+            self.search_input.setCompleter(None)
+        else:
+            self.search_input.setCompleter(self.product_completer)
+
+    def _handle_scanned_code(self, code: str) -> bool:
+        """
+        Caminho rápido do scanner: resolve o código no BarcodeIndex e adiciona itens de
+        unidade direto no carrinho, atualizando só a linha afetada.
+        Retorna False quando o código precisa do fluxo normal (produto de peso, código
+        desconhecido ou catálogo ainda carregando).
+        """
+        product_data = self.barcode_index.lookup(code)
+        if product_data is None:
+            # Etiqueta de balança (prefixo '2') também entra sem diálogo
+            return self._add_scale_label_item(code)
+        if product_data[3].lower() == 'peso':
+            return False  # Produto de peso cadastrado com esse código: diálogo de peso
 
+        self._add_item_without_dialog(product_data, 1.0)
+        return True
+
+    def _add_scale_label_item(self, code: str) -> bool:
+        """Adiciona o item de uma etiqueta de balança (PLU + preço/peso). False se não for etiqueta."""
+        decoder = getattr(self, 'scale_label_decoder', None)
+        resolved = decoder.resolve(code) if decoder is not None else None
+        if resolved is None:
+            return False
 
-    from PySide6.QtWidgets import QDialog # Import necessário
+        product_data, quantity = resolved
+        self._add_item_without_dialog(product_data, quantity)
+        return True
 
-    # Função auxiliar para normalização (fora da classe)
-    def clean_for_comparison(text):
-        """Remove acentos, pontuações e converte para minúsculas."""
-        import re
-        if text is None: return ""
-        text = text.lower()
-        text = re.sub(r'[^\w\s]', '', text) # Remove pontuação
-        text = re.sub(r'[áàãâä]', 'a', text)
-        text = re.sub(r'[éèêë]', 'e', text)
-        text = re.sub(r'[íìîï]', 'i', text)
-        text = re.sub(r'[óòõôö]', 'o', text)
-        text = re.sub(r'[úùûü]', 'u', text)
-        text = re.sub(r'[ç]', 'c', text)
-        return text.strip()
+    def _reserve_stock(self, product_data: tuple, quantity: float) -> bool:
+        """Modo reserva: reserva a quantidade antes de incluir no carrinho. False se faltar saldo."""
+        if self.stock_reservations is None:
+            return True
+        ok, disponivel = self.stock_reservations.reserve(product_data[0], quantity)
+        if not ok:
+            QMessageBox.warning(
+                self, "Estoque Insuficiente",
+                f"'{product_data[1]}': disponível {max(disponivel, 0):g} (já descontadas as reservas dos outros caixas)."
+            )
+        return ok
 
+    def _add_item_without_dialog(self, product_data: tuple, quantity: float):
+        """Inclui o item no carrinho e atualiza só a linha afetada e o total."""
+        if not self._reserve_stock(product_data, quantity):
+            self.search_input.clear()
+            return
+        position = self.cart_manager.add_item(product_data, quantity=quantity)
+        self._sync_cart_row(position)
+        self._update_total_display(self.cart_manager.calculate_total())
+        self.search_input.clear()
 
     def _show_selection_dialog(self, matching_products: list):
         """Chama o diálogo de seleção de produto para resolver a ambiguidade."""
@@ -413,7 +537,8 @@ class PDVWindow(QMainWindow):
             dialog = WeightInputProductDialog(
                 product_name=product_data[1],  # nome
                 product_price=product_data[2], # preco
-                parent=self
+                parent=self,
+                scale_bridge=self.scale_bridge
             )
             
             if dialog.exec() == QDialog.Accepted:
@@ -445,33 +570,25 @@ class PDVWindow(QMainWindow):
             return
 
         product_data = None
-        
-        # 1. NORMALIZAÇÃO DA BUSCA
-        normalized_search = clean_for_comparison(search_text) 
-        
+
         if self.db_connection:
-            cursor = self.db_connection.cursor()
-            
-            # 2. Busca por Código Exato (Prioridade Máxima)
+            # 1. Busca por Código Exato (Prioridade Máxima)
             # Tupla: (codigo, nome, preco, tipo_medicao, categoria)
+            cursor = self.db_connection.cursor()
             cursor.execute("SELECT codigo, nome, preco, tipo_medicao, categoria FROM Produtos WHERE codigo = ?", (search_text,))
             product_data = cursor.fetchone()
 
-            # 3. Busca Parcial (se não encontrou por código exato)
+        # 1.1. Etiqueta de balança digitada/lida (só se não for o código de um produto
+        # cadastrado, como no scanner): produto de peso entra sem o diálogo de peso
+        if product_data is None and self._add_scale_label_item(search_text):
+            self.search_input.setFocus()
+            return
+        
+        if self.db_connection:
+            # 2. Busca Parcial (se não encontrou por código exato)
+            # Compara o termo normalizado com as colunas nome_busca/codigo_busca no próprio SQL
             if not product_data:
-                cursor.execute("SELECT codigo, nome, preco, tipo_medicao, categoria FROM Produtos")
-                all_products = cursor.fetchall()
-                
-                matching_products = []
-                
-                for row in all_products:
-                    codigo, nome, preco, tipo_medicao, categoria = row
-                    
-                    normalized_name_db = clean_for_comparison(nome)
-                    normalized_codigo_db = clean_for_comparison(codigo)
-                    
-                    if normalized_search in normalized_codigo_db or normalized_search in normalized_name_db:
-                        matching_products.append(row)
+                matching_products = search_products(self.db_connection, search_text)
 
                 # Analisa os matches parciais
                 if len(matching_products) == 1:
@@ -490,7 +607,7 @@ class PDVWindow(QMainWindow):
                         self.search_input.setFocus()
                         return # Sai da função
 
-            # 4. Lógica de Adição (executada APENAS se product_data for encontrado)
+            # 3. Lógica de Adição (executada APENAS se product_data for encontrado)
             if product_data:
                 
                 # ⭐️ INÍCIO DA NOVA LÓGICA DE PESO/UNIDADE ⭐️
@@ -502,7 +619,8 @@ class PDVWindow(QMainWindow):
                     # Chama o diálogo de entrada de peso
                     dialog = WeightInputProductDialog(
                         product_name=nome, 
-                        product_price=preco
+                        product_price=preco,
+                        scale_bridge=self.scale_bridge
                     )
                     
                     if dialog.exec() == QDialog.Accepted:
@@ -516,6 +634,12 @@ class PDVWindow(QMainWindow):
                 
                 # Se for unidade, a quantity continua 1.0. Se for peso, quantity é o peso inserido.
                 
+                # 4. MODO RESERVA: garante o saldo antes de incluir (outros caixas podem estar vendendo)
+                if not self._reserve_stock(product_data, quantity):
+                    self.search_input.clear()
+                    self.search_input.setFocus()
+                    return
+
                 # 5. ADICIONA O ITEM AO CARRINHO
                 # O CartManager deve ser adaptado para CALCULAR O TOTAL (preco * quantity)
                 self.cart_manager.add_item(
@@ -542,6 +666,8 @@ class PDVWindow(QMainWindow):
             return
 
         self.cart_manager.remove_item(code) 
+        if self.stock_reservations is not None:
+            self.stock_reservations.release(code)
         
         total = self.cart_manager.calculate_total()
         self._update_total_display(total)
@@ -711,7 +837,8 @@ class PDVWindow(QMainWindow):
             else:
                 # O Controller já registrou o erro no console/log.
                 QMessageBox.critical(self, "Erro de Transação", 
-                                    "Falha ao registrar a venda. A transação foi desfeita. Verifique o log e tente novamente.")
+                                    "Falha ao registrar a venda. A transação foi desfeita. Verifique o log e tente novamente."
+                                    + ("\n\n" + "\n".join(estoque_alerts) if estoque_alerts else ""))
             
     
     def _handle_total_discount_dialog(self):
@@ -776,6 +903,19 @@ class PDVWindow(QMainWindow):
             )
 
         if ok and new_quantity is not None:
+            if self.stock_reservations is not None and new_quantity > 0:
+                # Reserva o total do código no carrinho já com a nova quantidade desta linha
+                cart_total = sum(i['quantidade'] for i in self.cart_manager.cart_items if i['codigo'] == codigo)
+                reserved, disponivel = self.stock_reservations.set_quantity(
+                    codigo, cart_total - current_quantity + float(new_quantity)
+                )
+                if not reserved:
+                    QMessageBox.warning(
+                        self, "Estoque Insuficiente",
+                        f"'{current_item['nome']}': disponível {max(disponivel, 0):g} (já descontadas as reservas dos outros caixas)."
+                    )
+                    return
+
             if new_quantity <= 0:
                 msg_box = QMessageBox(self)
                 msg_box.setWindowTitle("Remover Item")
@@ -786,6 +926,8 @@ class PDVWindow(QMainWindow):
                 if msg_box.exec() == QMessageBox.Yes:
                     # update_quantity com 0 remove
                     self.cart_manager.update_quantity(codigo, 0) 
+                    if self.stock_reservations is not None:
+                        self.stock_reservations.release(codigo)
                 else:
                     return 
             else:
@@ -841,7 +983,7 @@ class PDVWindow(QMainWindow):
 
     def _handle_open_registration(self):
         """Abre a janela de cadastro de produtos."""
-        self.registration_window = ProductRegistrationWindow(self.db_connection)
+        self.registration_window = ProductRegistrationWindow(self.db_connection, id_funcionario=self.logged_user.get('id'))
         self.registration_window.exec()
 
     def _handle_open_product_list(self):
@@ -947,6 +1089,13 @@ class PDVWindow(QMainWindow):
         self.manage_products_button.setStyleSheet("background-color: #607D8B; color: white; padding: 10px; border-radius: 5px;") 
         self.manage_products_button.clicked.connect(self._show_product_management)
         checkout_layout.addWidget(self.manage_products_button) 
+
+        # Botão: Importar Produtos (CSV/JSON em massa)
+        self.import_products_button = QPushButton("📥 Importar Produtos")
+        self.import_products_button.setFont(QFont("Arial", 12))
+        self.import_products_button.setStyleSheet("background-color: #795548; color: white; padding: 10px; border-radius: 5px;") 
+        self.import_products_button.clicked.connect(self._show_product_import)
+        checkout_layout.addWidget(self.import_products_button) 
         
         # Botão: Cadastrar Funcionário
         self.register_employee_button = QPushButton("👨‍💼 Cadastrar Funcionário")
@@ -986,6 +1135,8 @@ class PDVWindow(QMainWindow):
             register_button.setEnabled(False)
             self.manage_products_button.setVisible(False)
             self.manage_products_button.setEnabled(False)
+            self.import_products_button.setVisible(False)
+            self.import_products_button.setEnabled(False)
             
             # 3. BLOQUEIO DE RELATÓRIOS GERAIS
             # (Mantido visível para vendedor, filtragem interna)
@@ -997,7 +1148,35 @@ class PDVWindow(QMainWindow):
         self.fechar_caixa_button.setStyleSheet("background-color: #D32F2F; color: white; padding: 10px; border-radius: 5px;") 
         self.fechar_caixa_button.clicked.connect(self.handle_fechar_caixa)
         checkout_layout.addWidget(self.fechar_caixa_button)
-            
+
+        # Sangria / Suprimento da gaveta (sessão de caixa aberta)
+        movimento_layout = QHBoxLayout()
+        for tipo in (TIPO_SANGRIA, TIPO_SUPRIMENTO):
+            movimento_button = QPushButton(tipo)
+            movimento_button.setFont(QFont("Arial", 11))
+            movimento_button.clicked.connect(lambda _=False, t=tipo: self.handle_movimento_caixa(t))
+            movimento_layout.addWidget(movimento_button)
+        checkout_layout.addLayout(movimento_layout)
+
+        # Leitura X (todos) / Redução Z do dia (só admin)
+        relatorio_layout = QHBoxLayout()
+        leitura_x_button = QPushButton("Leitura X")
+        leitura_x_button.setFont(QFont("Arial", 11))
+        leitura_x_button.clicked.connect(self.handle_leitura_x)
+        relatorio_layout.addWidget(leitura_x_button)
+        if is_admin:
+            reducao_z_button = QPushButton("Redução Z")
+            reducao_z_button.setFont(QFont("Arial", 11))
+            reducao_z_button.clicked.connect(self.handle_reducao_z)
+            relatorio_layout.addWidget(reducao_z_button)
+        checkout_layout.addLayout(relatorio_layout)
+
+        # Reimpressão de recibo pelo número da venda
+        reprint_button = QPushButton("🖨️ Reimprimir Recibo")
+        reprint_button.setFont(QFont("Arial", 11))
+        reprint_button.clicked.connect(self._handle_reprint_receipt)
+        checkout_layout.addWidget(reprint_button)
+
         # 4. Botão Finalizar (VISÍVEL para todos)
         finalize_button = QPushButton("FINALIZAR VENDA (F12)")
         finalize_button.setFont(QFont("Arial", 18, QFont.Bold))
@@ -1086,7 +1265,7 @@ class PDVWindow(QMainWindow):
         Mostra um diálogo perguntando se o usuário deseja imprimir o recibo.
         Se Sim, chama o método de geração/impressão.
         """
-        formatted_troco = f"R$ {troco:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+        formatted_troco = brl(troco)
         
         # 1. Mostrar o Troco e a pergunta
         msg_box = QMessageBox(self)
@@ -1115,58 +1294,16 @@ class PDVWindow(QMainWindow):
         """
         Gera o texto do recibo, incluindo a formatação 'kg' para produtos por peso.
         """
-        
-        vendedor = self.logged_user['nome']
-        data_hora = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-
-        # Garante que os floats sejam formatados corretamente para o padrão brasileiro no final
-        def format_br(value):
-            # Corrigido: usa o padrão de formatação de moeda brasileira (R$ 1.000,00)
-            return f"{value:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-
-        recibo_texto = f"""
-    ========================================
-        RECIBO DE VENDA - PDV
-    ========================================
-    Venda ID: {venda_id}
-    Data/Hora: {data_hora}
-    Vendedor: {vendedor}
-    ----------------------------------------
-    PRODUTO            QTD    PREÇO UN.   SUBTOTAL
-    ----------------------------------------"""
-
-        # ⭐️ CORREÇÃO ESSENCIAL: Desempacotamento da tupla de 5 elementos ⭐️
-        # O 'itens_venda' agora é uma lista de (codigo, nome, qtd, preco, tipo_medicao)
-        for codigo, nome, qtd, preco, tipo_medicao in itens_venda: 
-            
-            subtotal = qtd * preco
-            
-            # 2. Lógica para formatar a Quantidade (QTD)
-            if tipo_medicao.lower() == 'peso':
-                # Usa 3 casas decimais e anexa " kg" para peso
-                qtd_formatada = f"{qtd:7.3f} kg" 
-            else:
-                # Usa 2 casas decimais para unidades
-                qtd_formatada = f"{qtd:10.2f}" 
-
-            # 3. Formatação da Linha
-            # Nome (largura 17), QTD (largura 12, que agora inclui o 'kg'), PREÇO (largura 10), SUBTOTAL (largura 10)
-            recibo_texto += (
-                f"\n{nome[:17].ljust(17)} "
-                f"{qtd_formatada.ljust(12)}" 
-                f"{preco:10.2f} "
-                f"{subtotal:10.2f}"
-            )
-
-        # ----------------------------------------
-
-        recibo_texto += f"""
-    ----------------------------------------
-    TOTAL: R$ {format_br(total)}
-    RECEBIDO: R$ {format_br(recebido)}
-    TROCO: R$ {format_br(troco)}
-    ========================================
-    """
+        # 'itens_venda' é uma lista de (codigo, nome, qtd, preco, tipo_medicao)
+        recibo_texto = RECIBO_VENDA.render({
+            'venda_id': venda_id,
+            'data_hora': datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+            'vendedor': self.logged_user['nome'],
+            'itens': itens_venda,
+            'total': total,
+            'recebido': recebido,
+            'troco': troco,
+        })
 
         QMessageBox.information(self, "Impressão (Simulada)", f"Recibo gerado com sucesso. O texto abaixo seria enviado para a impressora:\n\n{recibo_texto}")
 # No seu MainWindow ou onde você chama o relatório:
@@ -1228,6 +1365,60 @@ class PDVWindow(QMainWindow):
             return False
 
 
+    def handle_movimento_caixa(self, tipo):
+        """Abre o diálogo de sangria/suprimento para a sessão de caixa aberta do usuário."""
+        from ui.caixa_movimento_dialog import CaixaMovimentoDialog
+
+        caixa = self.caixa_manager.get_caixa_aberto(self.logged_user.get('id'))
+        if not caixa:
+            QMessageBox.information(self, "Caixa Fechado", "Não há caixa aberto para este funcionário.")
+            return
+
+        dialog = CaixaMovimentoDialog(
+            caixa_manager=self.caixa_manager,
+            id_caixa_aberto=caixa['id'],
+            id_funcionario=self.logged_user.get('id'),
+            tipo=tipo,
+            parent=self
+        )
+        dialog.exec()
+
+    def _show_caixa_report(self, gerar):
+        """Gera o relatório X/Z numa conexão só de leitura (não segura a venda) e mostra."""
+        from ui.caixa_relatorio_dialog import CaixaRelatorioDialog
+
+        conn = None
+        try:
+            conn = connect_readonly()
+            if conn is None:
+                QMessageBox.critical(self, "Erro de BD", "Não foi possível abrir o banco de dados para o relatório.")
+                return
+            relatorio = gerar(conn)
+        except (sqlite3.Error, ArchiveError) as e:
+            QMessageBox.critical(self, "Erro no Relatório", f"Não foi possível gerar o relatório: {e}")
+            return
+        finally:
+            if conn:
+                conn.close()
+
+        if relatorio is None:
+            QMessageBox.information(self, "Caixa Fechado", "Não há caixa aberto para este funcionário.")
+            return
+
+        CaixaRelatorioDialog(relatorio['titulo'], render_report(relatorio), self.printer_manager, self).exec()
+
+    def handle_leitura_x(self):
+        """Leitura X da sessão de caixa aberta do usuário (não fecha nada)."""
+        caixa = self.caixa_manager.get_caixa_aberto(self.logged_user.get('id'))
+        if not caixa:
+            QMessageBox.information(self, "Caixa Fechado", "Não há caixa aberto para este funcionário.")
+            return
+        self._show_caixa_report(lambda conn: report_x(conn, caixa['id']))
+
+    def handle_reducao_z(self):
+        """Redução Z do dia: todas as sessões de caixa abertas hoje."""
+        self._show_caixa_report(report_z)
+
     def handle_fechar_caixa(self):
         # Garante que o diálogo de fechamento é importado (Import in-line é incomum, mas mantido se for sua prática)
         from ui.caixa_fechamento_dialog import CaixaFechamentoDialog 
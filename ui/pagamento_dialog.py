@@ -4,9 +4,12 @@ from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, 
     QLabel, QComboBox, QFormLayout, QGridLayout, QMessageBox
 )
-from PySide6.QtCore import Qt, QLocale
+from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
 
+from core.formatting import numero_br
+
+
 class PagamentoDialog(QDialog):
     
     def __init__(self, total_venda: float, parent=None):
@@ -92,8 +95,7 @@ class PagamentoDialog(QDialog):
         
     def _format_currency(self, value: float) -> str:
         """Formata um float para string de moeda brasileira."""
-        locale = QLocale(QLocale.Portuguese, QLocale.Brazil)
-        return locale.toString(value, 'f', 2)
+        return numero_br(value)
 
     def _unformat_currency(self, text: str) -> float:
         """Converte string de moeda (virgula) para float (ponto)."""
@@ -127,7 +129,7 @@ class PagamentoDialog(QDialog):
             self.btn_adicionar.setEnabled(False)
         else:
             self.input_recebido.clear()
-            QMessageBox.information(self, "Pagamento Adicionado", f"R$ {self._format_currency(valor)} em {metodo} adicionado. Faltam R$ {self._format_currency(self.total_venda - self.valor_recebido):.2f}")
+            QMessageBox.information(self, "Pagamento Adicionado", f"R$ {self._format_currency(valor)} em {metodo} adicionado. Faltam R$ {self._format_currency(self.total_venda - self.valor_recebido)}")
 
 
     def _recalcular(self):
@@ -7,6 +7,9 @@ from PySide6.QtGui import QFont  # ⭐️ ADICIONE ESTA LINHA ⭐️
 # ou importe QFont e QFont.Weight
 from PySide6.QtGui import QFont, QFont, QFont
 
+from core.formatting import brl
+
+
 class PostSaleDialog(QDialog):
     """
     Diálogo exibido após a finalização de uma venda para confirmar
@@ -70,7 +73,7 @@ class PostSaleDialog(QDialog):
 
     def _format_currency(self, value: float) -> str:
         """Formata um valor float para string de moeda brasileira."""
-        return f"R$ {value:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+        return brl(value)
 
     def _handle_receipt(self):
         """Define a ação como Recibo e fecha com aceitação."""
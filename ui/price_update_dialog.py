@@ -0,0 +1,222 @@
+# ui/price_update_dialog.py
+
+import sqlite3
+
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QPushButton, QComboBox,
+    QDoubleSpinBox, QLineEdit, QTableWidget, QTableWidgetItem, QHeaderView,
+    QMessageBox, QFileDialog, QRadioButton, QButtonGroup
+)
+from PySide6.QtCore import Qt
+
+from core.database import get_all_categories
+from core.formatting import brl_many
+from core.price_update import (
+    MODO_PERCENTUAL, MODO_VALOR,
+    plan_rule, plan_price_file, apply_price_changes
+)
+
+ALL_CATEGORIES = "Todas"
+# A prévia mostra só as primeiras linhas; o plano completo fica em memória
+PREVIEW_LIMIT = 500
+
+
+class PriceUpdateDialog(QDialog):
+    """
+    Reajuste de preços em massa: por regra (percentual/valor, categoria, faixa de
+    códigos) ou por arquivo 'codigo;preco'. "Pré-visualizar" calcula o plano sem gravar
+    nada; "Aplicar" grava o plano numa única transação, com auditoria em HistoricoPrecos.
+    """
+
+    def __init__(self, db_connection, logged_user: dict, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Reajuste de Preços em Massa")
+        self.resize(800, 600)
+        self.db_connection = db_connection
+        self.logged_user = logged_user
+        self.changes = []
+        self.file_path = None
+
+        self._setup_ui()
+
+    def _setup_ui(self):
+        main_layout = QVBoxLayout(self)
+
+        # --- Origem: regra ou arquivo ---
+        source_layout = QHBoxLayout()
+        self.rule_radio = QRadioButton("Por regra")
+        self.file_radio = QRadioButton("Por arquivo de preços")
+        self.rule_radio.setChecked(True)
+        self.source_group = QButtonGroup(self)
+        self.source_group.addButton(self.rule_radio)
+        self.source_group.addButton(self.file_radio)
+        self.source_group.buttonToggled.connect(self._on_source_changed)
+        source_layout.addWidget(self.rule_radio)
+        source_layout.addWidget(self.file_radio)
+        source_layout.addStretch(1)
+        main_layout.addLayout(source_layout)
+
+        # --- Regra ---
+        form = QFormLayout()
+        self.mode_input = QComboBox()
+        self.mode_input.addItem("Percentual (%)", MODO_PERCENTUAL)
+        self.mode_input.addItem("Valor fixo (R$)", MODO_VALOR)
+        form.addRow("Tipo de reajuste:", self.mode_input)
+
+        self.amount_input = QDoubleSpinBox()
+        self.amount_input.setDecimals(2)
+        self.amount_input.setRange(-99999.99, 99999.99)
+        self.amount_input.setValue(0.0)
+        form.addRow("Reajuste (negativo = redução):", self.amount_input)
+
+        self.category_input = QComboBox()
+        self.category_input.addItem(ALL_CATEGORIES)
+        self.category_input.addItems(get_all_categories(self.db_connection))
+        form.addRow("Categoria:", self.category_input)
+
+        range_layout = QHBoxLayout()
+        self.code_from_input = QLineEdit()
+        self.code_from_input.setPlaceholderText("do código")
+        self.code_to_input = QLineEdit()
+        self.code_to_input.setPlaceholderText("até o código")
+        range_layout.addWidget(self.code_from_input)
+        range_layout.addWidget(self.code_to_input)
+        form.addRow("Faixa de códigos:", range_layout)
+
+        file_layout = QHBoxLayout()
+        self.file_label = QLabel("Nenhum arquivo selecionado")
+        self.file_button = QPushButton("📂 Escolher arquivo")
+        self.file_button.clicked.connect(self._choose_file)
+        file_layout.addWidget(self.file_label, 1)
+        file_layout.addWidget(self.file_button)
+        form.addRow("Arquivo (codigo;preco):", file_layout)
+
+        self.reason_input = QLineEdit()
+        self.reason_input.setPlaceholderText("Ex: Reajuste fornecedor janeiro")
+        form.addRow("Motivo:", self.reason_input)
+        main_layout.addLayout(form)
+
+        # --- Prévia ---
+        self.preview_table = QTableWidget(0, 5)
+        self.preview_table.setHorizontalHeaderLabels(["CÓDIGO", "NOME", "PREÇO ATUAL", "PREÇO NOVO", "VARIAÇÃO"])
+        self.preview_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.preview_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        main_layout.addWidget(self.preview_table)
+
+        self.summary_label = QLabel("")
+        main_layout.addWidget(self.summary_label)
+
+        button_layout = QHBoxLayout()
+        preview_button = QPushButton("🔍 Pré-visualizar")
+        preview_button.clicked.connect(self._preview)
+        self.apply_button = QPushButton("✅ Aplicar Reajuste")
+        self.apply_button.setStyleSheet("background-color: #4CAF50; color: white; padding: 8px;")
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(self._apply)
+        close_button = QPushButton("Fechar")
+        close_button.clicked.connect(self.reject)
+        button_layout.addWidget(preview_button)
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.apply_button)
+        button_layout.addWidget(close_button)
+        main_layout.addLayout(button_layout)
+
+        self._on_source_changed()
+
+    def _on_source_changed(self, *args):
+        by_rule = self.rule_radio.isChecked()
+        for widget in (self.mode_input, self.amount_input, self.category_input,
+                       self.code_from_input, self.code_to_input):
+            widget.setEnabled(by_rule)
+        self.file_button.setEnabled(not by_rule)
+        self._clear_preview()
+
+    def _choose_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Arquivo de Preços", "", "CSV/Texto (*.csv *.txt);;Todos (*)")
+        if path:
+            self.file_path = path
+            self.file_label.setText(path)
+            self._clear_preview()
+
+    def _clear_preview(self):
+        self.changes = []
+        self.preview_table.setRowCount(0)
+        self.summary_label.setText("")
+        self.apply_button.setEnabled(False)
+
+    def _preview(self):
+        """Calcula o plano (nada é gravado) e mostra as primeiras linhas."""
+        errors = []
+        try:
+            if self.rule_radio.isChecked():
+                category = self.category_input.currentText()
+                self.changes = plan_rule(
+                    self.db_connection,
+                    self.mode_input.currentData(),
+                    self.amount_input.value(),
+                    categoria=None if category == ALL_CATEGORIES else category,
+                    codigo_de=self.code_from_input.text().strip() or None,
+                    codigo_ate=self.code_to_input.text().strip() or None,
+                )
+            else:
+                if not self.file_path:
+                    QMessageBox.warning(self, "Aviso", "Escolha o arquivo de preços.")
+                    return
+                self.changes, errors = plan_price_file(self.db_connection, self.file_path)
+        except (sqlite3.Error, OSError, UnicodeDecodeError, ValueError) as e:
+            QMessageBox.critical(self, "Erro", f"Não foi possível calcular o reajuste: {e}")
+            self._clear_preview()
+            return
+
+        shown = self.changes[:PREVIEW_LIMIT]
+        self.preview_table.setRowCount(len(shown))
+        # Colunas de preço formatadas em lote
+        anteriores = brl_many([change.preco_anterior for change in shown])
+        novos = brl_many([change.preco_novo for change in shown])
+        for row, change in enumerate(shown):
+            values = (
+                change.codigo, change.nome, anteriores[row], novos[row],
+                f"{change.variacao_percentual:+.2f}%".replace('.', ',')
+            )
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column >= 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.preview_table.setItem(row, column, item)
+
+        summary = f"{len(self.changes)} produto(s) terão o preço alterado."
+        if len(self.changes) > PREVIEW_LIMIT:
+            summary += f" (mostrando os primeiros {PREVIEW_LIMIT})"
+        if errors:
+            summary += f"  {len(errors)} linha(s) do arquivo ignorada(s): " + "; ".join(m for _, m in errors[:3])
+        self.summary_label.setText(summary)
+        self.apply_button.setEnabled(bool(self.changes))
+
+    def _apply(self):
+        if not self.changes:
+            return
+
+        reply = QMessageBox.question(
+            self, "Confirmar Reajuste",
+            f"Aplicar o novo preço em {len(self.changes)} produto(s)?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        try:
+            updated = apply_price_changes(
+                self.db_connection, self.changes,
+                id_funcionario=self.logged_user.get('id'),
+                motivo=self.reason_input.text().strip()
+            )
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Erro DB", f"Falha ao aplicar o reajuste (nada foi alterado): {e}")
+            return
+
+        skipped = len(self.changes) - updated
+        message = f"{updated} preço(s) atualizado(s)."
+        if skipped:
+            message += f"\n{skipped} produto(s) foram alterados por outra tela depois da prévia e não foram reajustados."
+        QMessageBox.information(self, "Reajuste Aplicado", message)
+        self.accept()
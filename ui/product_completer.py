@@ -0,0 +1,106 @@
+# ui/product_completer.py
+
+from PySide6.QtWidgets import QCompleter
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, Signal, Slot
+
+from core.product_catalog import ProductCatalog, get_catalog, start_background_load
+from core.text_search import normalize_search_text
+
+# Papel com a chave normalizada (código + nome) usada pelo QCompleter na comparação
+SEARCH_KEY_ROLE = Qt.UserRole + 1
+# Papel com o código do produto (texto inserido no campo ao escolher uma sugestão)
+CODE_ROLE = Qt.UserRole + 2
+
+
+class ProductCatalogModel(QAbstractListModel):
+    """
+    Modelo leve (uma linha por produto) sobre o catálogo compartilhado.
+    Não copia dados: lê direto das listas do ProductCatalog e reage aos avisos de
+    carga/inclusão/edição com reset, beginInsertRows ou dataChanged.
+    """
+
+    # Linhas lidas em segundo plano; o Signal entrega na thread da interface
+    rows_loaded = Signal(list, int)
+
+    def __init__(self, catalog: ProductCatalog = None, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog if catalog is not None else get_catalog()
+        self.catalog.subscribe(self._on_catalog_changed)
+        self.rows_loaded.connect(self._apply_loaded_rows)
+        self._loading = False
+
+    def load_async(self):
+        """Dispara a carga do catálogo em segundo plano (não bloqueia a janela)."""
+        if self._loading:
+            return
+        self._loading = True
+        start_background_load(self.rows_loaded.emit)
+
+    @Slot(list, int)
+    def _apply_loaded_rows(self, rows, versao):
+        # Executado na thread da interface (conexão enfileirada do rows_loaded)
+        self.catalog.replace_all(rows, versao)
+
+    def detach(self):
+        """Desliga o modelo do catálogo (chamar ao fechar a janela dona do modelo)."""
+        self.catalog.unsubscribe(self._on_catalog_changed)
+
+    # --- AVISOS DO CATÁLOGO ---
+
+    def _on_catalog_changed(self, event: str, row: int):
+        if event == ProductCatalog.RESET:
+            self.beginResetModel()
+            self.endResetModel()
+            self._loading = False
+        elif event == ProductCatalog.INSERT:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.endInsertRows()
+        elif event == ProductCatalog.UPDATE:
+            index = self.index(row, 0)
+            self.dataChanged.emit(index, index)
+
+    # --- INTERFACE DO MODELO ---
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.catalog)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = index.row()
+        if role == SEARCH_KEY_ROLE:
+            return self.catalog.search_keys[row]
+
+        codigo, nome = self.catalog.products[row][:2]
+        if role == Qt.DisplayRole:
+            return f"{nome}  [{codigo}]"
+        if role == CODE_ROLE:
+            return codigo
+        return None
+
+
+class ProductCompleter(QCompleter):
+    """
+    QCompleter de produtos com busca 'contém' sem acentos.
+    O texto digitado é normalizado (splitPath) e comparado com a chave normalizada
+    de cada produto; ao escolher uma sugestão, o campo recebe o código do produto,
+    que resolve direto na busca por código exato.
+    """
+
+    def __init__(self, model: ProductCatalogModel, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setCompletionRole(SEARCH_KEY_ROLE)
+        self.setFilterMode(Qt.MatchContains)
+        self.setCaseSensitivity(Qt.CaseInsensitive)
+        self.setModelSorting(QCompleter.UnsortedModel)
+        self.setMaxVisibleItems(12)
+
+    def splitPath(self, path):
+        return [normalize_search_text(path)]
+
+    def pathFromIndex(self, index):
+        return index.data(CODE_ROLE) or ""
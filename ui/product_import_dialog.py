@@ -0,0 +1,165 @@
+# ui/product_import_dialog.py
+
+import sqlite3
+import threading
+
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QProgressBar, QFileDialog, QMessageBox, QLineEdit
+)
+from PySide6.QtCore import Signal, Slot
+
+from core.database import connect_db
+from core.product_catalog import get_catalog
+from core.product_import import ImportInterrupted, import_file
+
+
+class ProductImportDialog(QDialog):
+    """
+    Importação em massa de produtos a partir de CSV/JSON.
+    A leitura e a gravação rodam numa thread com conexão própria (conexões sqlite3
+    não podem ser compartilhadas entre threads); o progresso volta por Signal.
+    Ao terminar, o catálogo compartilhado é recarregado uma vez.
+    Se a importação parar no meio, os lotes gravados ficam; importar o mesmo arquivo de
+    novo continua depois da última linha gravada.
+    """
+
+    import_progress = Signal(int, int, int)   # percentual, linhas lidas, erros
+    import_finished = Signal(object, str)     # ImportResult (ou None), mensagem de erro
+
+    def __init__(self, db_connection, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Importar Produtos (CSV/JSON)")
+        self.setMinimumWidth(520)
+        self.db_connection = db_connection
+        self._worker = None
+        # (arquivo, última linha gravada) da importação interrompida
+        self._resume = (None, 0)
+
+        self.import_progress.connect(self._on_progress)
+        self.import_finished.connect(self._on_finished)
+
+        self._setup_ui()
+
+    def _setup_ui(self):
+        main_layout = QVBoxLayout(self)
+
+        main_layout.addWidget(QLabel(
+            "Colunas: codigo, nome, preco (obrigatórias); quantidade, tipo_medicao, categoria (opcionais).\n"
+            "Produtos com código já cadastrado são atualizados."
+        ))
+
+        file_layout = QHBoxLayout()
+        self.path_input = QLineEdit()
+        self.path_input.setPlaceholderText("Selecione o arquivo...")
+        self.path_input.setReadOnly(True)
+        browse_button = QPushButton("📂 Procurar")
+        browse_button.clicked.connect(self._choose_file)
+        file_layout.addWidget(self.path_input)
+        file_layout.addWidget(browse_button)
+        main_layout.addLayout(file_layout)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        main_layout.addWidget(self.progress_bar)
+
+        self.status_label = QLabel("")
+        main_layout.addWidget(self.status_label)
+
+        button_layout = QHBoxLayout()
+        self.import_button = QPushButton("📥 Importar")
+        self.import_button.setStyleSheet("background-color: #4CAF50; color: white; padding: 8px;")
+        self.import_button.clicked.connect(self._start_import)
+        self.close_button = QPushButton("Fechar")
+        self.close_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.import_button)
+        button_layout.addWidget(self.close_button)
+        main_layout.addLayout(button_layout)
+
+    def _choose_file(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Arquivo de Produtos", "", "Planilhas/JSON (*.csv *.txt *.json *.jsonl);;Todos (*)"
+        )
+        if path:
+            self.path_input.setText(path)
+
+    def _start_import(self):
+        path = self.path_input.text()
+        if not path:
+            QMessageBox.warning(self, "Aviso", "Selecione o arquivo a importar.")
+            return
+        if self._worker is not None:
+            return
+
+        resume_after = self._resume[1] if self._resume[0] == path else 0
+        self.import_button.setEnabled(False)
+        self.close_button.setEnabled(False)
+        self.status_label.setText(f"Continuando depois da linha {resume_after}..." if resume_after else "Importando...")
+        self._worker = threading.Thread(
+            target=self._run_import, args=(path, resume_after), name="ProductImport", daemon=True
+        )
+        self._worker.start()
+
+    def _run_import(self, path: str, resume_after: int = 0):
+        # Executado na thread de importação
+        conn = connect_db()
+        if conn is None:
+            self.import_finished.emit(None, "Não foi possível abrir o banco de dados.")
+            return
+        try:
+            result = import_file(
+                conn, path,
+                progress=lambda partial, fraction: self.import_progress.emit(
+                    int(fraction * 100), partial.processed, partial.error_count
+                ),
+                resume_after=resume_after
+            )
+            self._resume = (None, 0)
+            self.import_finished.emit(result, "")
+        except ImportInterrupted as e:
+            self._resume = (path, e.last_line)
+            self.import_finished.emit(None, str(e))
+        except (sqlite3.Error, ValueError, UnicodeDecodeError, OSError) as e:
+            self.import_finished.emit(None, str(e))
+        finally:
+            conn.close()
+
+    @Slot(int, int, int)
+    def _on_progress(self, percent: int, processed: int, errors: int):
+        self.progress_bar.setValue(percent)
+        self.status_label.setText(f"{processed} linha(s) lida(s), {errors} erro(s)...")
+
+    @Slot(object, str)
+    def _on_finished(self, result, error_message: str):
+        self._worker = None
+        self.import_button.setEnabled(True)
+        self.close_button.setEnabled(True)
+
+        if result is None:
+            if self._resume[0] is not None:
+                self.status_label.setText(
+                    f"Importação interrompida: gravado até a linha {self._resume[1]}. "
+                    "Clique em Importar para continuar dali."
+                )
+            else:
+                self.status_label.setText("Importação cancelada: nenhuma alteração foi gravada.")
+            QMessageBox.critical(self, "Erro na Importação", f"Falha ao importar o arquivo: {error_message}")
+            return
+
+        self.progress_bar.setValue(100)
+        self.status_label.setText(result.summary())
+
+        # Uma única recarga do catálogo (autocompletar, scanner, lista de produtos)
+        get_catalog().catch_up(self.db_connection)
+
+        details = "\n".join(f"Linha {line}: {message}" for line, message in result.errors[:15])
+        if result.error_count > 15:
+            details += f"\n... e mais {result.error_count - 15} erro(s)."
+        QMessageBox.information(self, "Importação Concluída", result.summary() + ("\n\n" + details if details else ""))
+
+    def reject(self):
+        # Não fecha no meio da importação (um lote ainda pode estar gravando na outra thread)
+        if self._worker is not None:
+            return
+        super().reject()
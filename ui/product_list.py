@@ -1,30 +1,18 @@
 # ui/product_list.py - CORRIGIDO PARA 5 COLUNAS E CATEGORIAS DINÂMICAS
 
 import sqlite3
-from unidecode import unidecode
-import re
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
     QLineEdit, QPushButton, QTableView, QMessageBox, QComboBox
 )
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QFont, QStandardItemModel, QStandardItem
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QFont
 
+from core.product_catalog import get_catalog
+from ui.product_table_model import ProductTableModel, ProductFilterProxyModel
 
-# Funções de normalização de texto (Mantidas)
-def normalize_text(text):
-    """Converte o texto para minúsculas e remove acentos/cedilhas."""
-    if text is None:
-        return ""
-    text_str = str(text).strip()
-    normalized = unidecode(text_str)
-    return normalized.lower()
-
-def clean_for_comparison(text):
-    """Remove caracteres especiais, espaços e pontuações do texto normalizado."""
-    normalized = normalize_text(text)
-    cleaned = re.sub(r'[^a-z0-9]', '', normalized)
-    return cleaned
+# Intervalo de espera após a última tecla antes de refiltrar a lista (ms)
+FILTER_DEBOUNCE_MS = 150
 
 
 class ProductListWindow(QDialog):
@@ -34,10 +22,21 @@ class ProductListWindow(QDialog):
         self.setGeometry(150, 150, 900, 600) # Aumentado para caber 5 colunas
         self.db_connection = db_connection
         
-        self.model = None # Inicializa o modelo
+        # Modelo de origem (paginado do BD) + proxy que aplica os filtros
+        self.model = ProductTableModel(db_connection, parent=self)
+        self.proxy_model = ProductFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+
+        # Debounce do filtro de texto: só refiltra quando o usuário pausa a digitação
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self.filter_timer.timeout.connect(self.filter_products)
         
         self._setup_ui()
         self._load_categories_and_populate_combo() # ⭐️ NOVO: Carrega as categorias antes de tudo
+
+        # Carrega só a primeira página; as próximas vêm conforme a tabela rola
         self.load_products()
 
     def _setup_ui(self):
@@ -61,7 +60,9 @@ class ProductListWindow(QDialog):
         self.search_input.setPlaceholderText("Buscar por Código, Nome ou Tipo de Medida...")
         self.search_input.setFont(QFont("Arial", 12))
         
-        self.search_input.editingFinished.connect(self.filter_products) 
+        # Filtra enquanto digita, com debounce (o timer é reiniciado a cada tecla)
+        self.search_input.textChanged.connect(self.filter_timer.start)
+        self.search_input.returnPressed.connect(self.filter_products)
         
         header_layout.addWidget(self.search_input)
         
@@ -69,13 +70,23 @@ class ProductListWindow(QDialog):
         
         # --- 2. Tabela de Produtos (QTableView) ---
         self.product_table = QTableView()
+        self.product_table.setModel(self.proxy_model)
+        self.product_table.setSelectionBehavior(QTableView.SelectRows)
+        self.product_table.setEditTriggers(QTableView.NoEditTriggers)
+
+        # Configuração de Colunas (Índices 0 a 4)
+        self.product_table.setColumnWidth(0, 100) 
+        self.product_table.setColumnWidth(1, 220)
+        self.product_table.setColumnWidth(2, 100)
+        self.product_table.setColumnWidth(3, 100)
+        self.product_table.setColumnWidth(4, 150)
         main_layout.addWidget(self.product_table)
         
         # --- 3. Botões de Ação ---
         button_layout = QHBoxLayout()
         
         refresh_button = QPushButton("🔄 Atualizar Lista")
-        refresh_button.clicked.connect(self.load_products)
+        refresh_button.clicked.connect(self.refresh_products)
         button_layout.addWidget(refresh_button)
         
         close_button = QPushButton("Fechar")
@@ -100,124 +111,43 @@ class ProductListWindow(QDialog):
             self.category_filter_input.addItem("Todos")
             self.category_filter_input.addItems(categories)
             
-            # Conecta o sinal após a população inicial
-            self.category_filter_input.currentTextChanged.connect(self.load_products)
+            # Conecta o sinal após a população inicial (a categoria é filtrada no proxy, sem ir ao BD)
+            self.category_filter_input.currentTextChanged.connect(self.filter_products)
             
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Erro de BD", f"Erro ao carregar categorias: {e}")
             
     def load_products(self):
-        """Busca produtos no BD, aplicando o filtro de Categoria via SQL."""
+        """Recarrega a lista a partir da primeira página do BD (o filtro é reaplicado sozinho)."""
         if not self.db_connection:
             QMessageBox.critical(self, "Erro de BD", "Conexão com o banco de dados indisponível.")
             return
 
-        selected_category = self.category_filter_input.currentText()
-        
-        # ⭐️ CORREÇÃO CRÍTICA: Selecionando as 5 colunas
-        sql_query = "SELECT codigo, nome, preco, tipo_medicao, categoria FROM Produtos" 
-        params = []
-        
-        if selected_category and selected_category != "Todos":
-            # ⭐️ Filtrando pela coluna 'categoria'
-            sql_query += " WHERE categoria = ?"
-            params.append(selected_category)
-            
-        sql_query += " ORDER BY codigo"
-
-        try:
-            cursor = self.db_connection.cursor()
-            cursor.execute(sql_query, tuple(params))
-            products = cursor.fetchall()
+        self.model.reload()
 
-            # --- SETUP DO MODELO ---
-            # ⭐️ CORREÇÃO CRÍTICA: O modelo agora tem 5 colunas
-            self.model = QStandardItemModel(0, 5) 
-            self.model.setHorizontalHeaderLabels(["CÓDIGO", "NOME", "PREÇO", "MEDIDA", "CATEGORIA"]) # ⭐️ NOVOS NOMES
-            
-            for row_data in products:
-                # ⭐️ CORREÇÃO CRÍTICA: Desempacotando 5 valores
-                codigo, nome, preco, tipo_medicao, categoria = row_data 
-                
-                row = []
-                
-                # 0. Código
-                item_code = QStandardItem(codigo)
-                item_code.setTextAlignment(Qt.AlignCenter)
-                row.append(item_code)
-                
-                # 1. Nome
-                row.append(QStandardItem(nome))
-                
-                # 2. Preço
-                item_price = QStandardItem(f"R$ {preco:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-                item_price.setTextAlignment(Qt.AlignRight)
-                row.append(item_price)
-                
-                # 3. Tipo de Medida (Peso/Unidade) - Índice 3
-                item_medida = QStandardItem(tipo_medicao)
-                item_medida.setTextAlignment(Qt.AlignCenter)
-                row.append(item_medida)
-                
-                # 4. Categoria - Índice 4
-                item_category = QStandardItem(categoria)
-                item_category.setTextAlignment(Qt.AlignCenter)
-                row.append(item_category)
-                
-                self.model.appendRow(row)
-
-            self.product_table.setModel(self.model)
-            
-            # Configuração de Colunas (Índices 0 a 4)
-            self.product_table.setColumnWidth(0, 100) 
-            self.product_table.setColumnWidth(1, 220)
-            self.product_table.setColumnWidth(2, 100)
-            self.product_table.setColumnWidth(3, 100)
-            self.product_table.setColumnWidth(4, 150)
-            
-            # Re-aplica o filtro de texto
-            self.filter_products(self.search_input.text())
-            
-        except sqlite3.Error as e:
-            QMessageBox.critical(self, "Erro de BD", f"Erro ao carregar produtos: {e}")
-
-    def filter_products(self, text):
+    def refresh_products(self):
         """
-        Filtra os produtos visíveis na tabela, buscando em Código, Nome, Tipo de Medida e Categoria.
+        Botão Atualizar: com o catálogo carregado, aplica só o que mudou desde a última
+        leitura (diário de alterações); as linhas exibidas são atualizadas pelos avisos do catálogo.
         """
-        
-        if not hasattr(self, 'model') or not self.model:
-            return
+        catalog = get_catalog()
+        if catalog.loaded:
+            catalog.catch_up(self.db_connection)
+        else:
+            self.load_products()
 
-        search_text = clean_for_comparison(text)
-        
-        for row in range(self.model.rowCount()):
-            
-            if self.model.columnCount() < 5:
-                # Se o modelo não foi carregado corretamente (menos de 5 colunas), pula o filtro.
-                self.product_table.setRowHidden(row, False)
-                continue
-            
-            # 2. Obtém os dados das colunas (agora 5 índices)
-            item_code_text = self.model.item(row, 0).text()
-            item_name_text = self.model.item(row, 1).text()
-            # ⭐️ NOVO: Índice 3 e 4
-            item_medida_text = self.model.item(row, 3).text() 
-            item_categoria_text = self.model.item(row, 4).text()
-            
-            # TRATAMENTO CRÍTICO: Limpa o texto da tabela
-            item_name_text = item_name_text.replace('\n', '').replace('\r', '').strip()
+    def filter_products(self, *args):
+        """
+        Aplica os filtros atuais (texto em Código, Nome, Tipo de Medida e Categoria,
+        mais a categoria do ComboBox) no proxy, comparando com as chaves pré-normalizadas.
+        """
+        self.filter_timer.stop()
+        self.proxy_model.set_filter(
+            self.search_input.text(),
+            self.category_filter_input.currentText()
+        )
 
-            # 3. Limpa e normaliza os dados da tabela
-            code = clean_for_comparison(item_code_text)
-            name = clean_for_comparison(item_name_text)
-            medida_clean = clean_for_comparison(item_medida_text) # NOVO
-            categoria_clean = clean_for_comparison(item_categoria_text) # NOVO
-            
-            # 4. Compara a string totalmente limpa em CÓDIGO, NOME, MEDIDA ou CATEGORIA
-            is_visible = (search_text in code or 
-                          search_text in name or
-                          search_text in medida_clean or
-                          search_text in categoria_clean) 
-            
-            self.product_table.setRowHidden(row, not is_visible)
\ No newline at end of file
+    def done(self, result):
+        """Desliga o modelo do catálogo compartilhado ao fechar a janela."""
+        self.model.detach()
+        super().done(result)
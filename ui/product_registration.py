@@ -5,6 +5,13 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
+from core.product_catalog import get_catalog
+from core.database import search_keys_for
+from core.stock_ledger import record_stock_movements, TIPO_AJUSTE
+
+# Motivos dos movimentos de estoque gravados pelo cadastro
+MOTIVO_CADASTRO = "Estoque inicial do cadastro"
+MOTIVO_EDICAO = "Estoque alterado na edição do produto"
 
 # Mapeamento de prefixos para categorias (Mantido para geração de código)
 CATEGORY_PREFIXES = {
@@ -18,12 +25,13 @@ CATEGORY_PREFIXES = {
 
 class ProductRegistrationWindow(QDialog):
     
-    def __init__(self, db_connection, product_id=None, parent=None): 
+    def __init__(self, db_connection, product_id=None, parent=None, id_funcionario=None): 
         super().__init__(parent) 
         self.setWindowTitle("Cadastro de Produtos")
         self.setGeometry(200, 200, 450, 400) # Aumentei a altura para o novo campo
         self.db_connection = db_connection
         self.product_id = product_id 
+        self.id_funcionario = id_funcionario # Quem alterou o estoque (ledger)
         
         self._setup_ui()
         
@@ -137,12 +145,15 @@ class ProductRegistrationWindow(QDialog):
 
         try:
             cursor = self.db_connection.cursor()
+            # Faixa [prefixo, próximo prefixo): usa o índice único de 'codigo' e lê uma
+            # única entrada do fim da faixa (o LIKE percorria a tabela inteira)
+            upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
             cursor.execute("""
                 SELECT codigo FROM Produtos 
-                WHERE codigo LIKE ? 
+                WHERE codigo >= ? AND codigo < ? 
                 ORDER BY codigo DESC 
                 LIMIT 1
-            """, (f'{prefix}%',))
+            """, (prefix, upper_bound))
             
             last_code = cursor.fetchone()
 
@@ -170,17 +181,27 @@ class ProductRegistrationWindow(QDialog):
         try:
             cursor = self.db_connection.cursor()
             # ⭐️ CORREÇÃO: Adicionando a coluna 'quantidade' ao INSERT ⭐️
+            # nome_busca/codigo_busca: chaves normalizadas usadas pelas buscas (sem regex por linha)
+            nome_busca, codigo_busca = search_keys_for(codigo, nome)
+            # O estoque inicial entra pelo ledger (MovimentosEstoque), na mesma transação
             cursor.execute(
-                "INSERT INTO Produtos (codigo, nome, preco, quantidade, tipo_medicao, categoria) VALUES (?, ?, ?, ?, ?, ?)",
-                (codigo, nome, preco, quantidade, tipo_medicao, categoria) 
+                "INSERT INTO Produtos (codigo, nome, preco, quantidade, tipo_medicao, categoria, nome_busca, codigo_busca) VALUES (?, ?, ?, 0, ?, ?, ?, ?)",
+                (codigo, nome, preco, tipo_medicao, categoria, nome_busca, codigo_busca) 
             )
+            if quantidade:
+                record_stock_movements(cursor, [(codigo, quantidade)], TIPO_AJUSTE,
+                                       motivo=MOTIVO_CADASTRO, id_funcionario=self.id_funcionario)
             self.db_connection.commit()
+            # Atualiza o catálogo compartilhado (autocompletar do PDV) sem recarga completa
+            get_catalog().refresh_product(self.db_connection, codigo)
             return True
             
         except sqlite3.IntegrityError:
+            self.db_connection.rollback()
             QMessageBox.critical(self, "Erro de BD", f"O código '{codigo}' já existe no sistema. Use um código único.")
             return False
         except sqlite3.Error as e:
+            self.db_connection.rollback()
             QMessageBox.critical(self, "Erro de BD", f"Erro ao inserir produto: {e}")
             return False
 
@@ -258,28 +279,40 @@ class ProductRegistrationWindow(QDialog):
 
     def _update_product(self, nome, preco, quantidade, tipo_medicao, categoria):
         """
-        Executa a query parametrizada UPDATE na tabela Produtos, incluindo a quantidade.
+        Executa a query parametrizada UPDATE na tabela Produtos. A quantidade não é
+        gravada direto: a diferença para o saldo atual vira um movimento de ajuste no
+        ledger (record_stock_movements), na mesma transação.
         Retorna True em caso de sucesso, False em caso de falha.
         """
         if self.product_id is None:
             QMessageBox.critical(self, "Erro Fatal", "ID do produto ausente para operação UPDATE.")
             return False
 
-        # ⭐️ CORREÇÃO: Adicionando a coluna 'quantidade' ao UPDATE ⭐️
         query = """
             UPDATE Produtos 
-            SET nome = ?, preco = ?, quantidade = ?, tipo_medicao = ?, categoria = ? 
+            SET nome = ?, preco = ?, tipo_medicao = ?, categoria = ?,
+                nome_busca = ?, codigo_busca = ?
             WHERE codigo = ?
         """
+        nome_busca, codigo_busca = search_keys_for(self.product_id, nome)
         # A ordem dos parâmetros deve corresponder à ordem dos '?' na query
-        params = (nome, preco, quantidade, tipo_medicao, categoria, self.product_id)
+        params = (nome, preco, tipo_medicao, categoria, nome_busca, codigo_busca, self.product_id)
         
         if not self.db_connection: return False
 
         try:
             cursor = self.db_connection.cursor()
+            # O UPDATE abre a transação de escrita antes de ler o saldo: uma venda de
+            # outro caixa não entra entre a leitura e o ajuste
             cursor.execute(query, params)
+            cursor.execute("SELECT quantidade FROM Produtos WHERE codigo = ?", (self.product_id,))
+            row = cursor.fetchone()
+            diferenca = round(quantidade - row[0], 3) if row else 0
+            if diferenca:
+                record_stock_movements(cursor, [(self.product_id, diferenca)], TIPO_AJUSTE,
+                                       motivo=MOTIVO_EDICAO, id_funcionario=self.id_funcionario)
             self.db_connection.commit()
+            get_catalog().refresh_product(self.db_connection, self.product_id)
             return True
         
         except sqlite3.Error as e:
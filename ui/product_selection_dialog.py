@@ -4,6 +4,8 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt
 
+from core.formatting import brl_many
+
 class ProductSelectionDialog(QDialog):
     """
     Diálogo para resolver ambiguidade na busca, permitindo ao usuário 
@@ -59,6 +61,7 @@ class ProductSelectionDialog(QDialog):
         """Preenche a tabela com os produtos que deram match."""
         self.table.setRowCount(len(self.products))
         
+        precos = brl_many([product[2] for product in self.products])  # coluna de preço em lote
         for row_index, product in enumerate(self.products):
             codigo, nome, preco, tipo_medicao, categoria = product
             
@@ -66,7 +69,7 @@ class ProductSelectionDialog(QDialog):
             self.table.setItem(row_index, 1, QTableWidgetItem(nome))
             
             # Formata o preço para exibição
-            price_item = QTableWidgetItem(f"R$ {preco:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
+            price_item = QTableWidgetItem(precos[row_index])
             price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
             self.table.setItem(row_index, 2, price_item)
             
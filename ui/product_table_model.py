@@ -0,0 +1,357 @@
+# ui/product_table_model.py
+
+import sqlite3
+from bisect import bisect_left
+
+from PySide6.QtCore import Qt, QAbstractProxyModel, QAbstractTableModel, QModelIndex, QObject
+
+from core.product_catalog import ProductCatalog, get_catalog
+from core.formatting import brl
+from core.product_column_store import ProductColumnStore, COLUMN_STORE_FIELDS
+from core.text_search import normalize_search_text
+
+PRODUCT_LIST_HEADERS = ["CÓDIGO", "NOME", "PREÇO", "MEDIDA", "CATEGORIA"]
+
+# Alinhamento por coluna (mesmo layout da antiga lista com QStandardItem)
+_ALIGNMENTS = {
+    0: Qt.AlignCenter,
+    2: Qt.AlignRight | Qt.AlignVCenter,
+    3: Qt.AlignCenter,
+    4: Qt.AlignCenter,
+}
+
+
+class ProductTableModel(QAbstractTableModel):
+    """
+    Modelo virtualizado da lista de produtos.
+    As linhas são lidas do banco sob demanda, em páginas (canFetchMore/fetchMore),
+    com paginação por keyset no índice único de 'codigo', e guardadas num
+    ProductColumnStore compacto. O texto de cada célula (ex: preço em R$) só é
+    montado quando a view pede, em data(). Assim, abrir a lista custa memória
+    proporcional às linhas já exibidas, não ao catálogo inteiro.
+    Edições feitas pelo cadastro chegam pelo catálogo compartilhado.
+    """
+
+    PAGE_SIZE = 256
+
+    def __init__(self, db_connection, catalog: ProductCatalog = None, parent=None):
+        super().__init__(parent)
+        self.db_connection = db_connection
+        self.store = ProductColumnStore()
+        self._exhausted = db_connection is None
+        self._fetch_all = False  # Com filtro ativo, carrega o catálogo inteiro (ver set_fetch_all)
+
+        self.catalog = catalog if catalog is not None else get_catalog()
+        self.catalog.subscribe(self._on_catalog_changed)
+
+    def detach(self):
+        """Desliga o modelo do catálogo (chamar ao fechar a janela)."""
+        self.catalog.unsubscribe(self._on_catalog_changed)
+
+    def reload(self):
+        """Descarta as linhas carregadas e volta para a primeira página."""
+        self.beginResetModel()
+        self.store.clear()
+        self._exhausted = self.db_connection is None
+        self.endResetModel()
+        if self._fetch_all:
+            self.fetch_all()
+        elif self.canFetchMore():
+            self.fetchMore()
+
+    def set_fetch_all(self, enabled: bool):
+        """
+        Liga/desliga o carregamento completo. O filtro do proxy só enxerga as linhas já
+        carregadas, então enquanto houver termo ou categoria o modelo traz todas as
+        páginas restantes (e volta a trazer tudo após um reload). Desligar não descarta
+        o que já foi carregado.
+        """
+        self._fetch_all = enabled
+        if enabled:
+            self.fetch_all()
+
+    def fetch_all(self):
+        """Carrega, numa consulta só, todas as páginas que ainda faltam."""
+        self._insert_fetched(-1)
+
+    def filter_keys(self) -> list:
+        """Chaves de filtro (pré-normalizadas) das linhas carregadas."""
+        return self.store.filter_keys
+
+    # --- PAGINAÇÃO ---
+
+    def _fetch_page(self, limit: int) -> list:
+        """Próximas 'limit' linhas por keyset em 'codigo' (LIMIT -1 = todas as restantes)."""
+        cursor = self.db_connection.cursor()
+        last_code = self.store.last_code
+        if last_code is None:
+            cursor.execute(
+                f"SELECT {COLUMN_STORE_FIELDS} FROM Produtos ORDER BY codigo LIMIT ?",
+                (limit,)
+            )
+        else:
+            cursor.execute(
+                f"SELECT {COLUMN_STORE_FIELDS} FROM Produtos WHERE codigo > ? ORDER BY codigo LIMIT ?",
+                (last_code, limit)
+            )
+        return cursor.fetchall()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        self._insert_fetched(self.PAGE_SIZE)
+
+    def _insert_fetched(self, limit: int):
+        if self._exhausted:
+            return
+        try:
+            rows = self._fetch_page(limit)
+        except sqlite3.Error as e:
+            print(f"Erro ao carregar página de produtos: {e}")
+            rows = []
+
+        if limit < 0 or len(rows) < limit:
+            self._exhausted = True
+        if not rows:
+            return
+
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.store.append_rows(rows)
+        self.endInsertRows()
+
+    # --- AVISOS DO CATÁLOGO (cadastro/edição) ---
+
+    def _on_catalog_changed(self, event: str, row: int):
+        if event == ProductCatalog.RESET:
+            # Mudança em massa (importação, reajuste): volta para a primeira página
+            self.reload()
+            return
+
+        product = self.catalog.products[row]
+        codigo = product[0]
+        position = self.store.position_of(codigo)
+
+        if position >= 0:
+            self.store.set_row(position, product)
+            self.dataChanged.emit(self.index(position, 0), self.index(position, len(PRODUCT_LIST_HEADERS) - 1))
+            return
+
+        # Produto novo: só entra agora se cair dentro do trecho já carregado (ou se já
+        # não há mais páginas); depois do último código carregado ele virá
+        # naturalmente na próxima página.
+        last_code = self.store.last_code
+        if self._exhausted or (last_code is not None and codigo < last_code):
+            position = self.store.insertion_point(codigo)
+            self.beginInsertRows(QModelIndex(), position, position)
+            self.store.insert_row(position, product)
+            self.endInsertRows()
+
+    # --- INTERFACE DO MODELO ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(PRODUCT_LIST_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return PRODUCT_LIST_HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        column = index.column()
+        if role == Qt.DisplayRole:
+            row = index.row()
+            store = self.store
+            if column == 0:
+                return store.codes[row]
+            if column == 1:
+                return store.names[row]
+            if column == 2:
+                # Formatado só na exibição (nada de strings pré-montadas por linha)
+                return brl(store.prices[row])
+            if column == 3:
+                return store.type_of(row)
+            return store.category_of(row)
+        if role == Qt.TextAlignmentRole:
+            return _ALIGNMENTS.get(column)
+        return None
+
+
+class ProductFilterProxyModel(QAbstractProxyModel):
+    """
+    Proxy de filtro da lista de produtos (texto + categoria).
+    A cada mudança de filtro, as linhas aceitas são calculadas numa única passada
+    sobre as chaves pré-normalizadas do modelo de origem e guardadas em ordem numa
+    lista; o proxy mapeia linha -> linha de origem direto por ela. Diferente do
+    QSortFilterProxyModel, o Qt não chama nenhuma função Python por linha da origem:
+    refiltrar custa a passada nas chaves mais um reset barato (a view só pede as
+    linhas visíveis). Quando o novo termo contém o anterior (usuário continuou
+    digitando), a passada percorre só as linhas que já eram aceitas. Com termo ou
+    categoria, a origem carrega o catálogo inteiro (set_fetch_all), já que a
+    paginação deixaria produtos ainda não buscados fora do filtro. Linhas novas da
+    origem são avaliadas e acrescentadas sem reavaliar as linhas antigas.
+    """
+
+    ALL_CATEGORIES = "Todos"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._term = ""
+        self._category = self.ALL_CATEGORIES
+        self._rows = []          # Linhas de origem aceitas, em ordem crescente
+        self._source_rows = 0    # Linhas da origem já avaliadas
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        super().setSourceModel(model)
+        model.modelReset.connect(self._on_source_reset)
+        model.rowsInserted.connect(self._on_source_rows_inserted)
+        model.dataChanged.connect(self._on_source_data_changed)
+        self._rows = self._evaluate(range(model.rowCount()))
+        self._source_rows = model.rowCount()
+        self.endResetModel()
+
+    # --- FILTRO ---
+
+    def _filtering(self) -> bool:
+        return bool(self._term) or self._category != self.ALL_CATEGORIES
+
+    def _evaluate(self, candidates) -> list:
+        """Passada única sobre as chaves: devolve as linhas de 'candidates' aceitas."""
+        if not self._filtering():
+            return list(candidates)
+
+        source = self.sourceModel()
+        keys = source.filter_keys()
+        store = source.store
+        term = self._term
+        category = self._category
+
+        if category == self.ALL_CATEGORIES:
+            return [row for row in candidates if term in keys[row]]
+        return [
+            row for row in candidates
+            if store.category_of(row) == category and term in keys[row]
+        ]
+
+    def set_filter(self, text: str, category: str = None):
+        """Aplica o termo de busca (e opcionalmente a categoria) e refiltra."""
+        term = normalize_search_text(text)
+        category = self._category if category is None else (category or self.ALL_CATEGORIES)
+
+        if term == self._term and category == self._category:
+            return
+
+        source = self.sourceModel()
+        if source is not None:
+            # Linhas que ainda não foram buscadas não entrariam no filtro: com termo ou
+            # categoria, a origem carrega o resto agora (avaliado ainda com o filtro
+            # anterior pelo _on_source_rows_inserted, então self._rows continua coerente)
+            source.set_fetch_all(bool(term) or category != self.ALL_CATEGORIES)
+
+        narrowing = category == self._category and self._term in term
+        self._term = term
+        self._category = category
+
+        if source is None:
+            return
+        candidates = self._rows if narrowing else range(self._source_rows)
+        self.beginResetModel()
+        self._rows = self._evaluate(candidates)
+        self.endResetModel()
+
+    # --- AVISOS DA ORIGEM ---
+
+    def _on_source_reset(self):
+        self.beginResetModel()
+        self._source_rows = self.sourceModel().rowCount()
+        self._rows = self._evaluate(range(self._source_rows))
+        self.endResetModel()
+
+    def _on_source_rows_inserted(self, parent, first, last):
+        if parent.isValid():
+            return
+        if first < self._source_rows:
+            # Inserção no meio desloca as posições de origem: refaz a lista
+            self._on_source_reset()
+            return
+
+        # Página nova no fim (fetchMore): avalia só as linhas novas
+        self._source_rows = last + 1
+        novas = self._evaluate(range(first, last + 1))
+        if novas:
+            position = len(self._rows)
+            self.beginInsertRows(QModelIndex(), position, position + len(novas) - 1)
+            self._rows.extend(novas)
+            self.endInsertRows()
+
+    def _on_source_data_changed(self, top_left, bottom_right, roles=()):
+        # A linha editada pode passar a entrar ou sair do filtro
+        for source_row in range(top_left.row(), bottom_right.row() + 1):
+            position = bisect_left(self._rows, source_row)
+            was_accepted = position < len(self._rows) and self._rows[position] == source_row
+            accepted = bool(self._evaluate((source_row,)))
+
+            if accepted and was_accepted:
+                self.dataChanged.emit(
+                    self.index(position, top_left.column()), self.index(position, bottom_right.column())
+                )
+            elif accepted:
+                self.beginInsertRows(QModelIndex(), position, position)
+                self._rows.insert(position, source_row)
+                self.endInsertRows()
+            elif was_accepted:
+                self.beginRemoveRows(QModelIndex(), position, position)
+                del self._rows[position]
+                self.endRemoveRows()
+
+    # --- MAPEAMENTO ---
+
+    def mapToSource(self, proxy_index):
+        source = self.sourceModel()
+        if source is None or not proxy_index.isValid():
+            return QModelIndex()
+        return source.index(self._rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        position = bisect_left(self._rows, source_index.row())
+        if position < len(self._rows) and self._rows[position] == source_index.row():
+            return self.index(position, source_index.column())
+        return QModelIndex()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._rows)) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None:
+            # Chamada sem argumentos: o pai QObject
+            return QObject.parent(self)
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        source = self.sourceModel()
+        return 0 if parent.isValid() or source is None else source.columnCount()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        # O cabeçalho vertical numera as linhas do proxy (sem mapear cada uma para a origem)
+        if orientation == Qt.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        if role == Qt.DisplayRole:
+            return section + 1
+        return None
@@ -0,0 +1,110 @@
+# ui/qt_db.py
+
+import os
+import sqlite3
+
+from PySide6.QtSql import QSqlDatabase, QSqlQuery
+
+from core.archive import ArchiveError, partitions_for_range, union_sources
+from core.database import (
+    DB_BUSY_TIMEOUT,
+    create_snapshot,
+    database_path,
+    report_snapshot_enabled,
+)
+
+
+def open_qt_database(connection_name: str, db_path: str, read_only: bool = False):
+    """
+    Abre (ou reaproveita) a conexão QSQLITE nomeada apontando para db_path.
+    read_only=True usa SQLITE_OPEN_READONLY: a conexão não grava nem disputa o lock
+    de escrita com a venda. Retorna a QSqlDatabase; se isOpen() for False, o erro está em lastError().
+    """
+    options = f"QSQLITE_BUSY_TIMEOUT={int(DB_BUSY_TIMEOUT * 1000)}"
+    if read_only:
+        options += ";QSQLITE_OPEN_READONLY"
+
+    if QSqlDatabase.contains(connection_name):
+        qt_db = QSqlDatabase.database(connection_name, open=False)
+        # Arquivo ou modo diferente (ex: novo snapshot): reabre com a configuração nova
+        if qt_db.databaseName() != db_path or qt_db.connectOptions() != options:
+            qt_db.close()
+            qt_db.setDatabaseName(db_path)
+            qt_db.setConnectOptions(options)
+    else:
+        qt_db = QSqlDatabase.addDatabase("QSQLITE", connection_name)
+        qt_db.setDatabaseName(db_path)
+        qt_db.setConnectOptions(options)
+
+    if not qt_db.isOpen() and not qt_db.open():
+        print(f"Erro ao abrir a conexão Qt '{connection_name}': {qt_db.lastError().text()}")
+    return qt_db
+
+
+def open_report_database(connection_name: str, db_connection):
+    """
+    Conexão Qt só de leitura para relatórios. Com PDV_RELATORIO_SNAPSHOT=1 lê de uma
+    cópia do banco feita na abertura (a consulta pesada não segura lock nenhum no pdv.db).
+    Retorna (qt_db, caminho_do_snapshot); o snapshot deve ser apagado com release_report_database.
+    """
+    db_path = database_path(db_connection)
+    snapshot_path = None
+
+    if report_snapshot_enabled():
+        try:
+            snapshot_path = create_snapshot(db_connection)
+            db_path = snapshot_path
+            print(f"LOG: Relatório lendo do snapshot {snapshot_path}.")
+        except (sqlite3.Error, OSError) as e:
+            print(f"Erro ao criar snapshot para relatório (usando o banco ao vivo): {e}")
+
+    return open_qt_database(connection_name, db_path, read_only=True), snapshot_path
+
+
+def release_report_database(connection_name: str, snapshot_path: str = None):
+    """Fecha a conexão do relatório e apaga o snapshot (se houver)."""
+    if QSqlDatabase.contains(connection_name):
+        QSqlDatabase.database(connection_name, open=False).close()
+    if snapshot_path:
+        try:
+            os.remove(snapshot_path)
+        except OSError as e:
+            print(f"Erro ao apagar snapshot do relatório: {e}")
+
+
+def fetch_all_rows(model):
+    """
+    Busca todas as linhas do QSqlQueryModel de uma vez. O QSQLITE só encerra o comando
+    (e solta o lock de leitura) depois da última linha; sem isso o modelo busca aos poucos
+    conforme a rolagem e a leitura fica aberta enquanto o relatório estiver na tela.
+    """
+    while model.canFetchMore():
+        model.fetchMore()
+
+
+def attach_archive_partitions(qt_db, db_connection, inicio: str, fim: str) -> dict:
+    """
+    Anexa à conexão Qt do relatório só as partições de vendas arquivadas que o intervalo
+    [inicio, fim] toca (e desanexa as que sobraram do filtro anterior).
+    Retorna {tabela: fonte SQL} para o FROM; levanta ArchiveError (core/archive.py).
+    """
+    particoes = partitions_for_range(db_connection, inicio, fim)
+    necessarias = dict(particoes)
+
+    query = QSqlQuery(qt_db)
+    anexadas = set()
+    if query.exec("PRAGMA database_list"):
+        while query.next():
+            anexadas.add(query.value(1))
+
+    for alias in anexadas:
+        if alias.startswith('arq_') and alias not in necessarias:
+            query.exec(f"DETACH DATABASE {alias}")
+    for alias, caminho in particoes:
+        if alias not in anexadas:
+            query.prepare(f"ATTACH DATABASE ? AS {alias}")
+            query.addBindValue(caminho)
+            if not query.exec():
+                raise ArchiveError(f"não foi possível anexar {caminho}: {query.lastError().text()}")
+    query.finish()
+    return union_sources(db_connection, particoes)
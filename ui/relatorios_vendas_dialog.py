@@ -6,30 +6,30 @@ from PySide6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QGroupBox, QComboBox, 
     QStyledItemDelegate, QSizePolicy
 )
-from PySide6.QtSql import QSqlQueryModel, QSqlDatabase, QSqlQuery
-from PySide6.QtCore import Qt, QModelIndex, QDate, QLocale
+from PySide6.QtSql import QSqlQueryModel, QSqlQuery
+from PySide6.QtCore import Qt, QModelIndex, QDate
 from PySide6.QtGui import QFont
 
+from core.archive import ArchiveError
+from core.formatting import brl
+from ui.qt_db import open_report_database, release_report_database, fetch_all_rows, attach_archive_partitions
+
+REPORT_CONNECTION_NAME = "sales_history_conn"
+
 # ==============================================================================
 # CLASSE DELEGATE PARA FORMATAR VALORES MONETÁRIOS (Corrigido/Refatorado)
 # ==============================================================================
 
 class CurrencyDelegate(QStyledItemDelegate):
     """Delegate para formatar valores monetários com 2 casas decimais e alinhamento à direita."""
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        # Define a localização (pt-BR para formatação de moeda R$ 1.234,56)
-        self.locale = QLocale(QLocale.Portuguese, QLocale.Brazil)
-
     def displayText(self, value, locale):
-        """Formata o valor exibido na célula usando QLocale nativamente."""
+        """Formata o valor exibido na célula (R$ 1.234,56, formatador memoizado de core/formatting.py)."""
         if value is None or value == "":
             return ""
             
         try:
             number = float(value)
-            # ⭐️ Usando QLocale.toCurrencyString para formatação completa (R$, separador) ⭐️
-            return self.locale.toCurrencyString(number) 
+            return brl(number)
             
         except (ValueError, TypeError):
             return str(value)
@@ -70,29 +70,23 @@ class RelatoriosVendasDialog(QDialog):
             self.load_payment_summary() # NOVO: Sumário de pagamentos
 
     def setup_db_connection(self):
-        # ... (Mantido inalterado)
-        try:
-            cursor = self.db_connection.cursor()
-            cursor.execute("PRAGMA database_list") 
-            db_path = cursor.fetchone()[2] 
-        except Exception as e:
-            QMessageBox.critical(self, "Erro DB", f"Não foi possível obter o caminho do DB: {e}")
-            self.reject()
-            return
-        
-        connection_name = "sales_history_conn"
-        
-        if QSqlDatabase.contains(connection_name):
-            self.qt_db = QSqlDatabase.database(connection_name)
-        else:
-            self.qt_db = QSqlDatabase.addDatabase("QSQLITE", connection_name)
-            self.qt_db.setDatabaseName(db_path)
-            
-        if not self.qt_db.isOpen() and not self.qt_db.open():
+        """
+        Conexão Qt SÓ DE LEITURA para os relatórios (ou um snapshot do banco, com
+        PDV_RELATORIO_SNAPSHOT=1), para que consultas pesadas não atrasem a venda.
+        """
+        self.qt_db, self.snapshot_path = open_report_database(REPORT_CONNECTION_NAME, self.db_connection)
+
+        if not self.qt_db.isOpen():
             QMessageBox.critical(self, "Erro de Conexão DB", 
                                  f"Não foi possível abrir a conexão Qt: {self.qt_db.lastError().text()}")
             self.reject()
 
+    def done(self, result):
+        # Libera o lock de leitura e apaga o snapshot ao fechar o relatório
+        super().done(result)
+        release_report_database(REPORT_CONNECTION_NAME, self.snapshot_path)
+        self.snapshot_path = None
+
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
         input_font = QFont("Arial", 11)
@@ -245,6 +239,20 @@ class RelatoriosVendasDialog(QDialog):
         else:
             QMessageBox.warning(self, "Erro de Filtro", "Vendedor não encontrado na lista de filtros do sistema.")
 
+    def _sales_sources(self, start_date, end_date, avisar=True):
+        """
+        Fontes do FROM para o período: as tabelas ao vivo e, se o período tocar vendas
+        arquivadas, o UNION ALL com as partições necessárias. None em caso de erro.
+        """
+        try:
+            self.sources = attach_archive_partitions(self.qt_db, self.db_connection, start_date, end_date)
+        except (ArchiveError, sqlite3.Error) as e:
+            # O histórico já avisou; os sumários do mesmo período só ficam vazios
+            if avisar:
+                QMessageBox.warning(self, "Vendas Arquivadas", f"Não foi possível consultar o período: {e}")
+            return None
+        return self.sources
+
     def load_vendors(self):
         """Carrega todos os funcionários para o QComboBox de filtro."""
         
@@ -281,11 +289,15 @@ class RelatoriosVendasDialog(QDialog):
         
         filtro_vendedor_nome = self.vendedor_logado 
         
+        sources = self._sales_sources(start_date, end_date)
+        if sources is None:
+            return
+        
         if not filtro_vendedor_nome and hasattr(self, 'vendor_select'):
             filtro_vendedor_nome = self.vendor_select.currentData() 
         
         # Inclui valor_bruto, desconto_aplicado, e taxa_servico para ter mais detalhes no histórico
-        base_query = """
+        base_query = f"""
         SELECT 
             V.venda_id, 
             V.data_hora, 
@@ -296,7 +308,7 @@ class RelatoriosVendasDialog(QDialog):
             V.taxa_servico,
             V.valor_recebido,
             V.troco
-        FROM Vendas AS V
+        FROM {sources['Vendas']} AS V
         LEFT JOIN Funcionarios AS F ON V.id_funcionario = F.id 
         WHERE V.data_hora BETWEEN :start_date AND :end_date
         """
@@ -322,6 +334,7 @@ class RelatoriosVendasDialog(QDialog):
             
         self.model = QSqlQueryModel(self)
         self.model.setQuery(query)
+        fetch_all_rows(self.model)
             
         # Define os cabeçalhos (ajustados para 9 colunas)
         self.model.setHeaderData(0, Qt.Horizontal, "ID Venda")
@@ -373,11 +386,15 @@ class RelatoriosVendasDialog(QDialog):
         
         filtro_vendedor_nome = self.vendor_select.currentData()
         
-        query_text = """
+        sources = self._sales_sources(start_date, end_date, avisar=False)
+        if sources is None:
+            return
+        
+        query_text = f"""
             SELECT
                 F.nome AS vendedor_nome,
                 SUM(V.total_venda) AS total_vendido
-            FROM Vendas AS V
+            FROM {sources['Vendas']} AS V
             LEFT JOIN Funcionarios AS F ON V.id_funcionario = F.id 
             WHERE V.data_hora BETWEEN :start_date AND :end_date
             -- Garante que apenas vendas que possuem vendedor associado sejam contadas
@@ -418,8 +435,7 @@ class RelatoriosVendasDialog(QDialog):
             self.totals_table.setItem(row, 0, item_vendedor)
             
             # Coluna 1: Total Vendido - Usando o Delegate para formatar no display
-            locale = QLocale(QLocale.Portuguese, QLocale.Brazil)
-            total_formatado = locale.toCurrencyString(total)
+            total_formatado = brl(total)
             
             item_total = QTableWidgetItem(total_formatado)
             item_total.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
@@ -437,12 +453,16 @@ class RelatoriosVendasDialog(QDialog):
         start_date = self.date_start_input.date().toString("yyyy-MM-dd 00:00:00")
         end_date = self.date_end_input.date().toString("yyyy-MM-dd 23:59:59")
         
-        query_text = """
+        sources = self._sales_sources(start_date, end_date, avisar=False)
+        if sources is None:
+            return
+        
+        query_text = f"""
             SELECT
                 PV.metodo,
                 SUM(PV.valor) AS total_recebido
-            FROM Vendas AS V
-            JOIN PagamentosVenda AS PV ON V.venda_id = PV.venda_id
+            FROM {sources['Vendas']} AS V
+            JOIN {sources['PagamentosVenda']} AS PV ON V.venda_id = PV.venda_id
             WHERE V.data_hora BETWEEN :start_date AND :end_date
             GROUP BY PV.metodo
             ORDER BY total_recebido DESC
@@ -461,7 +481,6 @@ class RelatoriosVendasDialog(QDialog):
             
         row = 0
         total_geral_recebido = 0.0
-        locale = QLocale(QLocale.Portuguese, QLocale.Brazil)
         
         while query.next():
             metodo = query.value(0)
@@ -474,8 +493,7 @@ class RelatoriosVendasDialog(QDialog):
             self.payment_summary_table.setItem(row, 0, QTableWidgetItem(metodo))
             
             # Coluna 1: Total Recebido (Formatado)
-            total_formatado = locale.toCurrencyString(total)
-            item_total = QTableWidgetItem(total_formatado)
+            item_total = QTableWidgetItem(brl(total))
             item_total.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
             self.payment_summary_table.setItem(row, 1, item_total)
             
@@ -489,7 +507,7 @@ class RelatoriosVendasDialog(QDialog):
             item_label.setFont(QFont("Arial", 10, QFont.Bold))
             self.payment_summary_table.setItem(row, 0, item_label)
             
-            item_total_geral = QTableWidgetItem(locale.toCurrencyString(total_geral_recebido))
+            item_total_geral = QTableWidgetItem(brl(total_geral_recebido))
             item_total_geral.setFont(QFont("Arial", 10, QFont.Bold))
             item_total_geral.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
             self.payment_summary_table.setItem(row, 1, item_total_geral)
@@ -509,8 +527,7 @@ class RelatoriosVendasDialog(QDialog):
                 except (ValueError, TypeError):
                     continue
         
-        locale = QLocale(QLocale.Portuguese, QLocale.Brazil)
-        self.total_sales_label.setText(f"Total de Vendas Exibidas: {locale.toCurrencyString(total_sum)}")
+        self.total_sales_label.setText(f"Total de Vendas Exibidas: {brl(total_sum)}")
 
     def show_sale_details(self, index: QModelIndex):
         """
@@ -530,14 +547,16 @@ class RelatoriosVendasDialog(QDialog):
         if venda_id is None: return
 
         details_query = QSqlQuery(self.qt_db)
-        details_query.prepare("""
+        # Mesmas fontes da listagem (a venda pode estar numa partição arquivada)
+        itens_source = getattr(self, 'sources', {}).get('ItensVenda', 'ItensVenda')
+        details_query.prepare(f"""
         SELECT 
             nome_produto, 
             quantidade, 
             preco_unitario, 
             desconto_item, 
             total_liquido_item
-        FROM ItensVenda
+        FROM {itens_source}
         WHERE venda_id = :venda_id
         """)
         details_query.bindValue(":venda_id", venda_id)
@@ -547,6 +566,7 @@ class RelatoriosVendasDialog(QDialog):
             return
             
         self.details_model.setQuery(details_query)
+        fetch_all_rows(self.details_model)
             
         # ⭐️ NOVO HEADERS: 5 Colunas ⭐️
         self.details_model.setHeaderData(0, Qt.Horizontal, "Produto")
@@ -0,0 +1,57 @@
+# ui/scale_bridge.py
+
+import os
+
+from PySide6.QtCore import QObject, Signal
+
+from core.scale_reader import ScaleReader
+
+# Configuração da balança por variável de ambiente (ex: no atalho de inicialização do PDV)
+#   PDV_BALANCA_PORTA=/dev/ttyUSB0 (ou COM3)   PDV_BALANCA_PROTOCOLO=toledo|filizola
+#   PDV_BALANCA_BAUD=9600
+ENV_PORT = 'PDV_BALANCA_PORTA'
+ENV_PROTOCOL = 'PDV_BALANCA_PROTOCOLO'
+ENV_BAUD = 'PDV_BALANCA_BAUD'
+
+
+class ScaleSignalBridge(QObject):
+    """
+    Ponte entre a thread da balança e a interface.
+    A ScaleReader chama os métodos abaixo na thread dela; os Signals entregam o peso
+    na thread da interface (conexão enfileirada), sem polling no loop da GUI.
+    """
+
+    weight_changed = Signal(float, bool)   # peso ao vivo (kg), estável?
+    weight_stable = Signal(float)          # peso confirmado (kg)
+
+    def __init__(self, port: str, protocol: str = 'toledo', baudrate: int = 9600, parent=None):
+        super().__init__(parent)
+        self.reader = ScaleReader(
+            port, protocol, baudrate,
+            on_reading=lambda reading: self.weight_changed.emit(reading.weight, reading.stable),
+            on_stable=self.weight_stable.emit,
+        )
+
+    def start(self):
+        if not self.reader.is_alive():
+            self.reader.start()
+
+    def stop(self):
+        self.reader.stop()
+
+
+def create_scale_bridge_from_env(parent=None):
+    """Cria e inicia a ponte se PDV_BALANCA_PORTA estiver definida; senão retorna None."""
+    port = os.environ.get(ENV_PORT)
+    if not port:
+        return None
+
+    try:
+        baudrate = int(os.environ.get(ENV_BAUD, 9600))
+        bridge = ScaleSignalBridge(port, os.environ.get(ENV_PROTOCOL, 'toledo'), baudrate, parent)
+    except ValueError as e:
+        print(f"Erro na configuração da balança: {e}")
+        return None
+
+    bridge.start()
+    return bridge
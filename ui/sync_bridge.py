@@ -0,0 +1,48 @@
+# ui/sync_bridge.py
+
+import os
+
+from PySide6.QtCore import QObject, Signal, Slot
+
+from core.product_catalog import get_catalog
+from core.sync_client import SyncClient, ENV_SYNC_URL
+
+
+class SyncSignalBridge(QObject):
+    """
+    Ponte entre a thread de sincronização e a interface.
+    Os códigos alterados pelo servidor chegam por Signal (conexão enfileirada) e o
+    catálogo compartilhado é atualizado na thread da interface.
+    """
+
+    catalog_changed = Signal(list)
+
+    def __init__(self, db_connection, base_url: str, parent=None):
+        super().__init__(parent)
+        self.db_connection = db_connection
+        self.catalog_changed.connect(self._on_catalog_changed)
+        self.client = SyncClient(base_url, on_catalog_changed=self.catalog_changed.emit)
+
+    def start(self):
+        if not self.client.is_alive():
+            self.client.start()
+
+    def stop(self):
+        self.client.stop()
+
+    @Slot(list)
+    def _on_catalog_changed(self, codigos: list):
+        # O diário de alterações já registrou o que a sincronização gravou em Produtos
+        get_catalog().catch_up(self.db_connection)
+
+
+def create_sync_bridge_from_env(db_connection, parent=None):
+    """Cria e inicia a sincronização se PDV_SYNC_URL estiver definida; senão retorna None."""
+    base_url = os.environ.get(ENV_SYNC_URL)
+    if not base_url:
+        return None
+
+    bridge = SyncSignalBridge(db_connection, base_url, parent)
+    bridge.start()
+    print(f"LOG: Sincronização com o servidor da loja ativa ({base_url}, terminal {bridge.client.terminal}).")
+    return bridge
@@ -7,6 +7,9 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
 
+from core.formatting import brl
+
+
 class TotalDiscountDialog(QDialog):
     """
     Diálogo para aplicação de desconto ou acréscimo total (taxa de serviço)
@@ -67,7 +70,7 @@ class TotalDiscountDialog(QDialog):
 
     def _format_currency(self, value: float) -> str:
         """Formata um valor float para string de moeda brasileira."""
-        return f"R$ {value:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+        return brl(value)
 
     def _calculate_and_update(self):
         """Calcula o desconto/taxa e atualiza o display do total líquido."""
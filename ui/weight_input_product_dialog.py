@@ -1,20 +1,25 @@
 # CÓDIGO CORRIGIDO
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
-    QDoubleSpinBox, QPushButton
+    QDoubleSpinBox, QPushButton, QMessageBox
 )
 from PySide6.QtGui import QFont # ✅ QFont deve ser importado de QtGui
 from PySide6.QtCore import Qt
 # ...
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Slot
+
+from core.formatting import brl
+
 
 class WeightInputProductDialog(QDialog):
     """
     Diálogo para permitir que o caixa insira a quantidade (peso) 
     para produtos vendidos a granel.
+    ⭐️ Com balança conectada (scale_bridge), o peso chega sozinho: o campo acompanha a
+    leitura ao vivo e, quando o peso estabiliza, basta confirmar com Enter.
     """
 
-    def __init__(self, product_name: str, product_price: float, parent=None):
+    def __init__(self, product_name: str, product_price: float, parent=None, scale_bridge=None):
         super().__init__(parent)
         self.setWindowTitle(f"Entrada de Peso: {product_name}")
         self.setGeometry(400, 400, 350, 200) # Tamanho compacto
@@ -24,16 +29,22 @@ class WeightInputProductDialog(QDialog):
         self.weight_qty = 0.0 # Peso final
         self.total_value = 0.0 # Valor total calculado
         
+        self.scale_bridge = scale_bridge
+        
         self.setup_ui()
         self.update_total() # Inicializa o cálculo
 
+        if self.scale_bridge is not None:
+            self.scale_bridge.weight_changed.connect(self._on_scale_weight)
+            self.scale_bridge.weight_stable.connect(self._on_scale_stable)
+
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
         input_font = QFont("Arial", 14)
         
         # 1. Informações do Produto
         main_layout.addWidget(QLabel(f"Produto: **{self.product_name}**"))
-        price_label = QLabel(f"Preço por KG: R$ {self.product_price:,.2f}")
+        price_label = QLabel(f"Preço por KG: {brl(self.product_price)}")
         price_label.setStyleSheet("color: #4caf50; font-weight: bold;") # Verde de preço
         main_layout.addWidget(price_label)
         
@@ -52,6 +63,11 @@ class WeightInputProductDialog(QDialog):
         
         weight_layout.addWidget(self.weight_input)
         main_layout.addLayout(weight_layout)
+
+        # Situação da balança (só aparece quando há balança configurada)
+        self.scale_status = QLabel("Balança: aguardando peso..." if self.scale_bridge else "")
+        self.scale_status.setVisible(self.scale_bridge is not None)
+        main_layout.addWidget(self.scale_status)
         
         # 3. Display do Total Calculado
         total_layout = QHBoxLayout()
@@ -68,6 +84,7 @@ class WeightInputProductDialog(QDialog):
         # 4. Botões de Ação
         button_layout = QHBoxLayout()
         confirm_btn = QPushButton("Adicionar (Enter)")
+        self.confirm_btn = confirm_btn
         confirm_btn.setStyleSheet("background-color: #4caf50; color: white;")
         confirm_btn.clicked.connect(self.accept_weight)
         
@@ -84,9 +101,32 @@ class WeightInputProductDialog(QDialog):
         self.total_value = self.weight_qty * self.product_price
         
         # Formata para R$ BRL
-        formatted_total = f"R$ {self.total_value:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+        formatted_total = brl(self.total_value)
         self.total_display.setText(formatted_total)
 
+    @Slot(float, bool)
+    def _on_scale_weight(self, weight: float, stable: bool):
+        """Leitura ao vivo da balança (já na thread da interface)."""
+        if weight > 0:
+            self.weight_input.setValue(weight)
+        if not stable:
+            self.scale_status.setText("Balança: estabilizando...")
+
+    @Slot(float)
+    def _on_scale_stable(self, weight: float):
+        """Peso confirmado pela balança: preenche o campo e deixa pronto para o Enter."""
+        self.weight_input.setValue(weight)
+        self.scale_status.setText(f"Balança: peso estável ({weight:.3f} kg) - Enter para adicionar")
+        self.confirm_btn.setFocus()
+
+    def done(self, result):
+        # Desliga os sinais da balança (a ponte vive enquanto o PDV estiver aberto)
+        if self.scale_bridge is not None:
+            self.scale_bridge.weight_changed.disconnect(self._on_scale_weight)
+            self.scale_bridge.weight_stable.disconnect(self._on_scale_stable)
+            self.scale_bridge = None
+        super().done(result)
+
     def accept_weight(self):
         """Valida e aceita o peso para adicionar ao carrinho."""
         if self.weight_qty <= 0: